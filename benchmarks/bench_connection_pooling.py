@@ -0,0 +1,87 @@
+"""マルチパート送信のコネクションプール利用効果を計測するベンチマーク。
+
+ローカルスタブサーバーに対して pdf_to_page_images を繰り返し呼び出し、
+以下の2通りで開いたTCPコネクション数とレイテンシ（p50/p99）を比較します。
+
+- bare: 従来の実装と同じく呼び出しごとに requests.post を使う
+- session: ToolsClient（セッションのコネクションプールを共有）
+
+ループバック上の平文HTTPのため、本番環境で効いてくるTLSハンドシェイクの
+コストはこの計測には含まれません。コネクション数の差に注目してください。
+
+実行方法:
+    uv run python -m benchmarks.bench_connection_pooling --iterations 500
+"""
+
+import argparse
+import statistics
+import time
+from typing import Callable, List
+
+import requests
+
+from middleman_ai import ToolsClient
+from tests.stub_server import StubServer
+
+PDF_PATH = "tests/data/test.pdf"
+
+
+def _percentile(samples: List[float], percentile: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, round(percentile / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def _bare_upload(base_url: str) -> Callable[[], None]:
+    headers = {"Authorization": "Bearer bench"}
+
+    def call() -> None:
+        with open(PDF_PATH, "rb") as f:
+            response = requests.post(
+                f"{base_url}/api/v1/tools/pdf-to-page-images",
+                files={"pdf_file": (f.name, f.read(), "application/pdf")},
+                headers=headers,
+                timeout=30.0,
+            )
+        response.raise_for_status()
+
+    return call
+
+
+def _session_upload(base_url: str) -> Callable[[], None]:
+    client = ToolsClient(api_key="bench", base_url=base_url)
+
+    def call() -> None:
+        client.pdf_to_page_images(PDF_PATH)
+
+    return call
+
+
+def _run(name: str, factory: Callable[[str], Callable[[], None]], n: int) -> None:
+    with StubServer(record_bodies=False) as stub:
+        call = factory(stub.base_url)
+        call()  # ウォームアップ(計測対象外)
+        latencies: List[float] = []
+        for _ in range(n):
+            started = time.perf_counter()
+            call()
+            latencies.append((time.perf_counter() - started) * 1000)
+        print(
+            f"{name:<8} connections={stub.connections_opened:<5} "
+            f"p50={_percentile(latencies, 50):.2f}ms "
+            f"p99={_percentile(latencies, 99):.2f}ms "
+            f"mean={statistics.mean(latencies):.2f}ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    _run("bare", _bare_upload, args.iterations)
+    _run("session", _session_upload, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
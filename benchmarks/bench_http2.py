@@ -0,0 +1,96 @@
+"""HTTP/1.1とHTTP/2で同時に多数の呼び出しを行った場合のコネクション数とスループットを比較するベンチマーク。
+
+レスポンスを`--delay`秒遅らせるローカルスタブサーバーに対して、同時実行数ごとに
+`--rounds`回分のmd_to_docxを呼び出し、サーバーが受け付けたTCPコネクション数と
+1秒あたりの呼び出し数を計測します。HTTP/1.1は`tests/stub_server.py`、
+HTTP/2は`tests/h2_stub_server.py`（1コネクションあたり最大100ストリーム）に送信し、
+同時実行数が100を超える分はコネクションを追加して送信します。
+
+実行方法:
+    uv run python -m benchmarks.bench_http2 --concurrency 50 200 500 --client async
+"""
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import httpx
+
+from middleman_ai import AsyncToolsClient, HTTP2Adapter, HTTP2Transport, ToolsClient
+from tests.h2_stub_server import H2StubServer
+from tests.stub_server import StubServer
+
+
+def _run_sync(base_url: str, concurrency: int, calls: int, http2: bool) -> float:
+    client = ToolsClient(api_key="bench", base_url=base_url, pool_maxsize=concurrency)
+    adapter = None
+    if http2:
+        # スタブサーバーは平文のHTTP/2のため、prior knowledgeで接続する
+        adapter = HTTP2Adapter(http1=False, max_connections=concurrency)
+        client.session.mount("http://", adapter)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        started = time.perf_counter()
+        list(executor.map(lambda _: client.md_to_docx("# bench"), range(calls)))
+        elapsed = time.perf_counter() - started
+    client.close()
+    if adapter is not None:
+        adapter.close()
+    return elapsed
+
+
+async def _run_async(base_url: str, concurrency: int, calls: int, http2: bool) -> float:
+    transport: httpx.AsyncBaseTransport
+    if http2:
+        transport = HTTP2Transport(http1=False, max_connections=concurrency)
+    else:
+        transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(max_connections=concurrency)
+        )
+    async with AsyncToolsClient(
+        api_key="bench",
+        base_url=base_url,
+        max_concurrency=concurrency,
+        transport=transport,
+    ) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client.md_to_docx("# bench") for _ in range(calls)))
+        return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--rounds", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=0.05)
+    parser.add_argument("--client", choices=["sync", "async"], default="async")
+    args = parser.parse_args()
+
+    for concurrency in args.concurrency:
+        calls = concurrency * args.rounds
+        results: List[str] = []
+        for http2 in (False, True):
+            server = (
+                H2StubServer(delay=args.delay, record_bodies=False)
+                if http2
+                else StubServer(delay=args.delay, record_bodies=False)
+            )
+            with server as stub:
+                if args.client == "sync":
+                    elapsed = _run_sync(stub.base_url, concurrency, calls, http2)
+                else:
+                    elapsed = asyncio.run(
+                        _run_async(stub.base_url, concurrency, calls, http2)
+                    )
+            results.append(
+                f"{'HTTP/2' if http2 else 'HTTP/1.1':<8} "
+                f"connections={stub.connections_opened:>4} "
+                f"throughput={calls / elapsed:>8.1f} calls/s"
+            )
+        for line in results:
+            print(f"concurrency={concurrency:<4} {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""リクエストボディのgzip圧縮の効果を計測するベンチマーク。
+
+帯域を制限したローカルスタブサーバー（受信1MBあたり`--delay-per-mb`秒待機）に対して、
+大きなMarkdownのmd_to_docx（JSON）とmd_to_pdf（フォーム）を繰り返し呼び出し、
+圧縮なしと`CompressionPolicy`ありで送信したバイト数とレイテンシ（p50/p99）を比較します。
+
+実行方法:
+    uv run python -m benchmarks.bench_request_compression --size-mb 2 --iterations 20
+"""
+
+import argparse
+import statistics
+import time
+from typing import Callable, List
+
+from middleman_ai import CompressionPolicy, ToolsClient
+from tests.stub_server import StubServer
+
+
+def _percentile(samples: List[float], percentile: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, round(percentile / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def _markdown(size: int) -> str:
+    """見出し・表・本文を含む、実際の文書に近いMarkdownを生成します。"""
+    sections: List[str] = []
+    total = 0
+    i = 0
+    while total < size:
+        section = (
+            f"## {i + 1}. 売上の推移（第{i % 4 + 1}四半期）\n\n"
+            f"第{i % 4 + 1}四半期の売上は前年同期比で{100 + i % 37}%となりました。"
+            "主な要因は新規顧客の増加と既存顧客の単価の上昇です。\n\n"
+            "| 地域 | 売上 | 前年比 |\n|---|---:|---:|\n"
+            + "".join(
+                f"| 地域{j} | {(i * 7919 + j * 104729) % 100000:,} | "
+                f"{90 + (i + j) % 20}% |\n"
+                for j in range(8)
+            )
+            + "\n"
+        )
+        sections.append(section)
+        total += len(section.encode("utf-8"))
+        i += 1
+    return "".join(sections)
+
+
+def _run(
+    name: str,
+    call: Callable[[ToolsClient], None],
+    compression: CompressionPolicy | None,
+    args: argparse.Namespace,
+) -> None:
+    with StubServer(record_bodies=False, read_delay_per_mb=args.delay_per_mb) as stub:
+        client = ToolsClient(
+            api_key="bench", base_url=stub.base_url, compression=compression
+        )
+        call(client)  # ウォームアップ(計測対象外)
+        latencies: List[float] = []
+        for _ in range(args.iterations):
+            started = time.perf_counter()
+            call(client)
+            latencies.append((time.perf_counter() - started) * 1000)
+        wire = sum(r.body_size for r in stub.requests[1:]) / args.iterations
+        print(
+            f"{name:<22} wire={wire / 1024:>9.1f}KiB "
+            f"p50={_percentile(latencies, 50):>8.1f}ms "
+            f"p99={_percentile(latencies, 99):>8.1f}ms "
+            f"mean={statistics.mean(latencies):>8.1f}ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=float, default=2.0)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument(
+        "--delay-per-mb",
+        type=float,
+        default=0.8,
+        help="受信1MBあたりの待機秒数（0.8で約10Mbpsの回線を模擬）",
+    )
+    parser.add_argument("--level", type=int, default=6)
+    args = parser.parse_args()
+
+    markdown = _markdown(int(args.size_mb * 1024 * 1024))
+    calls = {
+        "md_to_docx(json)": lambda c: c.md_to_docx(markdown),
+        "md_to_pdf(form)": lambda c: c.md_to_pdf(markdown),
+    }
+    for name, call in calls.items():
+        _run(name, call, None, args)
+        _run(f"{name}+gzip", call, CompressionPolicy(level=args.level), args)
+
+
+if __name__ == "__main__":
+    main()
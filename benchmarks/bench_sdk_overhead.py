@@ -0,0 +1,83 @@
+"""ネットワークを介さずにSDK自体の1呼び出しあたりのオーバーヘッドを計測するベンチマーク。
+
+InMemoryTransportで固定のレスポンスを返すハンドラーを呼び出し、リクエストの組み立て・
+ヘッダーの付与・レスポンスの検証にかかる時間を計測します。比較のため、ローカルの
+スタブサーバー(`tests/stub_server.py`)にTCPとUnixドメインソケットで送信した場合も計測します。
+計測対象はJSONのmd_to_docxと、画像を添付するマルチパートのmd_to_pdfです。
+
+実行方法:
+    uv run python -m benchmarks.bench_sdk_overhead --calls 2000
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from middleman_ai import (
+    InMemoryRequest,
+    InMemoryTransport,
+    ToolsClient,
+    Transport,
+    UnixSocketTransport,
+)
+from tests.stub_server import DEFAULT_RESPONSES, StubServer
+
+
+def _handler(request: InMemoryRequest) -> Dict:
+    return DEFAULT_RESPONSES[request.path]
+
+
+def _measure(client: ToolsClient, calls: int, image: Path) -> Dict[str, float]:
+    cases: Dict[str, Callable[[], str]] = {
+        "md_to_docx": lambda: client.md_to_docx("# bench"),
+        "md_to_pdf": lambda: client.md_to_pdf(
+            "![logo](logo.png)", image_paths=[str(image)]
+        ),
+    }
+    results: Dict[str, float] = {}
+    for name, call in cases.items():
+        call()
+        started = time.perf_counter()
+        for _ in range(calls):
+            call()
+        results[name] = (time.perf_counter() - started) / calls * 1_000_000
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        image = Path(tmp) / "logo.png"
+        image.write_bytes(b"\x89PNG logo" * 1000)
+        socket_path = str(Path(tmp) / "api.sock")
+
+        rows: List[tuple] = []
+        client = ToolsClient(api_key="bench", transport=InMemoryTransport(_handler))
+        rows.append(("in-memory", _measure(client, args.calls, image)))
+        client.close()
+
+        with StubServer(record_bodies=False) as stub:
+            client = ToolsClient(api_key="bench", base_url=stub.base_url)
+            rows.append(("tcp", _measure(client, args.calls, image)))
+            client.close()
+
+        with StubServer(record_bodies=False, unix_socket=socket_path) as stub:
+            transport: Transport = UnixSocketTransport(socket_path)
+            client = ToolsClient(
+                api_key="bench", base_url=stub.base_url, transport=transport
+            )
+            rows.append(("unix-socket", _measure(client, args.calls, image)))
+            client.close()
+
+    for name, results in rows:
+        line = " ".join(f"{case}={us:>8.1f}us/call" for case, us in results.items())
+        print(f"{name:<12} {line}")
+
+
+if __name__ == "__main__":
+    main()
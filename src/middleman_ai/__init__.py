@@ -8,9 +8,30 @@
 - JSON → PPTX変換（テンプレート解析・実行）
 """
 
+from .async_client import AsyncToolsClient
+from .attachments import AttachmentBudget, AttachmentBundle
+from .batch import BatchResult
+from .cache import ResultCache
+from .cache_backends import (
+    CacheBackend,
+    CacheStats,
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    SQLiteCacheBackend,
+)
+from .cancellation import CancellationToken, cancellation
+from .circuit_breaker import CircuitBreaker
 from .client import ToolsClient
+from .coalesce import RequestCoalescer
+from .compression import CompressionPolicy, CompressionStats
+from .concurrency import AdaptiveConcurrency
+from .download import Downloader, DownloadResult
 from .exceptions import (
+    CancelledError,
+    CircuitOpenError,
     ConnectionError,
+    DeadlineExceededError,
+    DownloadError,
     ForbiddenError,
     InternalError,
     MiddlemanBaseException,
@@ -18,6 +39,21 @@ from .exceptions import (
     NotFoundError,
     ValidationError,
 )
+from .fingerprint import FileFingerprinter
+from .hedge import HedgingPolicy
+from .http2 import HTTP2Adapter, HTTP2Transport
+from .ratelimit import RateLimiter, RateLimitStats
+from .retry import RetryPolicy
+from .template_cache import TemplateCache
+from .timeouts import Timeout, deadline
+from .transport import (
+    InMemoryRequest,
+    InMemoryResponse,
+    InMemoryTransport,
+    RequestsTransport,
+    Transport,
+    UnixSocketTransport,
+)
 
 try:
     from importlib.metadata import version
@@ -26,12 +62,51 @@ try:
 except ImportError:
     __version__ = "unknown"
 __all__ = [
+    "AdaptiveConcurrency",
+    "AsyncToolsClient",
+    "AttachmentBudget",
+    "AttachmentBundle",
+    "BatchResult",
+    "CacheBackend",
+    "CacheStats",
+    "CancellationToken",
+    "CancelledError",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "CompressionPolicy",
+    "CompressionStats",
     "ConnectionError",
+    "DeadlineExceededError",
+    "DownloadError",
+    "DownloadResult",
+    "Downloader",
+    "FileFingerprinter",
     "ForbiddenError",
+    "HTTP2Adapter",
+    "HTTP2Transport",
+    "HedgingPolicy",
+    "InMemoryRequest",
+    "InMemoryResponse",
+    "InMemoryTransport",
     "InternalError",
+    "MemoryCacheBackend",
     "MiddlemanBaseException",
     "NotEnoughCreditError",
     "NotFoundError",
+    "RateLimitStats",
+    "RateLimiter",
+    "RedisCacheBackend",
+    "RequestCoalescer",
+    "RequestsTransport",
+    "ResultCache",
+    "RetryPolicy",
+    "SQLiteCacheBackend",
+    "TemplateCache",
+    "Timeout",
     "ToolsClient",
+    "Transport",
+    "UnixSocketTransport",
     "ValidationError",
+    "cancellation",
+    "deadline",
 ]
@@ -0,0 +1,998 @@
+"""Middleman.ai 非同期APIクライアントの実装。"""
+
+import asyncio
+import json
+import logging
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Sequence,
+    TypeVar,
+    cast,
+)
+
+import httpx
+from pydantic import ValidationError as PydanticValidationError
+
+from .attachments import AttachmentBundle
+from .cache import ResultCache, account_scope, keyable
+from .circuit_breaker import CircuitBreaker
+from .client import (
+    DOCX_MIME_TYPE,
+    HTTP_INTERNAL_SERVER_ERROR,
+    HTTP_NOT_MODIFIED,
+    PDF_MIME_TYPE,
+    PPTX_MIME_TYPE,
+    XLSX_MIME_TYPE,
+    ImageInput,
+    Presentation,
+    _document_part,
+    _error_for_status,
+    _image_parts,
+)
+from .coalesce import RequestCoalescer
+from .compression import GZIP_ENCODING, CompressionPolicy, GzipStream
+from .concurrency import AdaptiveConcurrency
+from .exceptions import (
+    CancelledError,
+    ConnectionError,
+    DeadlineExceededError,
+    ValidationError,
+)
+from .hedge import HedgingPolicy, ahedged_call, failed_response
+from .http2 import HTTP2Transport
+from .models import (
+    DocxToPageImagesResponse,
+    JsonToPptxAnalyzeResponse,
+    JsonToPptxExecuteResponse,
+    MdToDocxResponse,
+    MdToPdfResponse,
+    MermaidToImageOptions,
+    MermaidToImageResponse,
+    PdfToPageImagesResponse,
+    PptxToPageImagesResponse,
+    XlsxToPageImagesResponse,
+    XlsxToPdfAnalyzeResponse,
+    XlsxToPdfExecuteResponse,
+)
+from .multipart import FileInput, FilePart, MultipartEncoder
+from .ratelimit import RateLimiter
+from .retry import IDEMPOTENCY_KEY_HEADER, RetryPolicy
+from .template_cache import ConditionalResponse, TemplateCache
+from .timeouts import (
+    TimeoutLike,
+    deadline_exceeded,
+    fits_deadline,
+    httpx_timeout,
+    remaining,
+    to_httpx,
+)
+
+T = TypeVar("T")
+
+
+async def _aiter_body(body: MultipartEncoder | GzipStream) -> AsyncIterator[bytes]:
+    """マルチパートボディをワーカースレッドで読み出しながら返します。"""
+    while True:
+        chunk = await asyncio.to_thread(body.read, body.chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+class AsyncToolsClient:
+    """Middleman.ai 非同期APIクライアント。
+
+    ToolsClientと同じメソッドをasync/awaitで提供します。
+    1つのイベントループから多数の変換を同時に実行できるよう、
+    httpxのコネクションプールを共有し、同時実行数をセマフォで制限します。
+
+    ```python
+    async with AsyncToolsClient(api_key="YOUR_API_KEY") as client:
+        urls = await asyncio.gather(*(client.md_to_pdf(md) for md in documents))
+    ```
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        api_key: str,
+        base_url: str = "https://middleman-ai.com/",
+        timeout: TimeoutLike = 30.0,
+        *,
+        max_concurrency: int = 100,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        transport: httpx.AsyncBaseTransport | None = None,
+        retry: RetryPolicy | None = None,
+        cache: ResultCache | None = None,
+        template_cache: TemplateCache | None = None,
+        rate_limiter: RateLimiter | None = None,
+        concurrency: AdaptiveConcurrency | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        hedging: HedgingPolicy | None = None,
+        coalescing: RequestCoalescer | None = None,
+        compression: CompressionPolicy | None = None,
+        http2: bool = False,
+    ) -> None:
+        """クライアントを初期化します。
+
+        Args:
+            api_key: Middleman.aiで発行されたAPIキー
+            base_url: APIのベースURL
+            timeout: HTTP通信のタイムアウト秒数、または接続・読み込み・書き込みの
+                タイムアウトを個別に指定するTimeout
+            max_concurrency: 同時に実行するリクエストの最大数
+            max_connections: コネクションプールの最大コネクション数
+            max_keepalive_connections: 再利用のために保持するコネクションの最大数
+            transport: httpxのトランスポート（テストやUnixソケット接続などに使用）
+            retry: リトライポリシー。Noneの場合はリトライしません
+            cache: 変換結果のキャッシュ。Noneの場合はキャッシュしません
+            template_cache: テンプレート解析結果のキャッシュ。
+                Noneの場合はキャッシュしません
+            rate_limiter: エンドポイントごとのレートリミッター。
+                Noneの場合は送信ペースを制限しません
+            concurrency: レイテンシとスロットリングに応じて同時実行数を調整する制御。
+                Noneの場合は調整しません
+            circuit_breaker: エンドポイントごとのサーキットブレーカー。
+                Noneの場合は障害時も呼び出しを止めません
+            hedging: ヘッジリクエストのポリシー。Noneの場合はヘッジしません
+            coalescing: 同時に発生した同一のリクエストを1つにまとめる制御。
+                Noneの場合はまとめません
+            compression: 大きなリクエストボディのgzip圧縮のポリシー。
+                Noneの場合は圧縮しません
+            http2: Trueの場合、HTTP/2で多数の呼び出しを少数のコネクションに
+                多重化して送信します（HTTP2Transport）。サーバーが対応していない
+                場合はHTTP/1.1で送信します。transportを指定した場合は無視されます。
+                h2パッケージが必要です（`pip install middleman-ai[http2]`）
+
+        Raises:
+            ImportError: http2がTrueで、h2パッケージがインストールされていない場合
+        """
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.retry = retry
+        self.cache = cache
+        self.template_cache = template_cache
+        self.rate_limiter = rate_limiter
+        self.concurrency = concurrency
+        self.circuit_breaker = circuit_breaker
+        self.hedging = hedging
+        self.coalescing = coalescing
+        self.compression = compression
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        if http2 and transport is None:
+            transport = HTTP2Transport(max_connections=max_connections)
+        self.session = httpx.AsyncClient(
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=to_httpx(timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+            transport=transport,
+        )
+
+    async def __aenter__(self) -> "AsyncToolsClient":
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """コネクションプールを閉じます。"""
+        await self.session.aclose()
+
+    def _handle_response(self, response: httpx.Response) -> Dict[str, Any]:
+        """APIレスポンスを処理し、エラーがあれば適切な例外を発生させます。
+
+        Args:
+            response: httpxのレスポンスオブジェクト
+
+        Returns:
+            Dict[str, Any]: レスポンスのJSONデータ
+
+        Raises:
+            ToolsClient._handle_responseと同じ例外
+        """
+        try:
+            response.raise_for_status()
+            return cast(Dict[str, Any], response.json())
+        except httpx.HTTPStatusError as e:
+            error_body = {}
+            try:
+                error_body = response.json()
+            except json.JSONDecodeError:
+                pass
+            raise _error_for_status(response, error_body, str(e)) from e
+        except json.JSONDecodeError as e:
+            raise ValidationError("Invalid JSON response") from e
+
+    async def _post(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        payload: Dict[str, Any] | None,
+        body: MultipartEncoder | None,
+        *,
+        compress: bool = False,
+    ) -> httpx.Response:
+        """POSTリクエストを1回送信します。
+
+        concurrencyが指定されている場合は、セマフォに加えて同時実行数の枠を確保し、
+        結果を上限の調整に反映します。期限が設定されている場合は、
+        セマフォの待ち時間も含めて期限までに打ち切ります。
+
+        Raises:
+            DeadlineExceededError: 期限を過ぎた場合
+            ConnectionError: 接続エラー
+        """
+        limiter = self.concurrency
+        started = await limiter.aacquire() if limiter is not None else 0.0
+        try:
+            upload = (body.size or 0) if body is not None else 0
+            timeout = httpx_timeout(self.timeout, upload)
+            sending = self._post_once(
+                url, headers, payload, body, timeout, compress=compress
+            )
+            left = remaining()
+            if left is None:
+                response = await sending
+            else:
+                response = await asyncio.wait_for(sending, left)
+        except BaseException as e:
+            if limiter is not None:
+                # 呼び出し元の期限で短くなったタイムアウトは、過負荷として数えない
+                limiter.release(started, error=None if deadline_exceeded() else e)
+            if isinstance(e, (httpx.RequestError, asyncio.TimeoutError)):
+                if deadline_exceeded():
+                    raise DeadlineExceededError() from e
+                raise ConnectionError() from e
+            raise
+        if limiter is not None:
+            limiter.release(
+                started, status=response.status_code, headers=response.headers
+            )
+        return response
+
+    async def _post_once(  # noqa: PLR0913
+        self,
+        url: str,
+        headers: Dict[str, str],
+        payload: Dict[str, Any] | None,
+        body: MultipartEncoder | None,
+        timeout: httpx.Timeout,
+        *,
+        compress: bool,
+    ) -> httpx.Response:
+        policy = self.compression if compress else None
+        async with self._semaphore:
+            if body is None:
+                data = None
+                if policy is not None and payload is not None:
+                    data = await asyncio.to_thread(policy.compress_json, payload)
+                if data is None:
+                    return await self.session.post(
+                        url, json=payload, headers=headers, timeout=timeout
+                    )
+                return await self.session.post(
+                    url,
+                    timeout=timeout,
+                    content=data,
+                    headers={
+                        **headers,
+                        "Content-Type": "application/json",
+                        "Content-Encoding": GZIP_ENCODING,
+                    },
+                )
+            headers = {**headers, "Content-Type": body.content_type}
+            stream = policy.compress_form(body) if policy is not None else None
+            if stream is not None:
+                # 圧縮後のサイズは分からないため、チャンク形式で送信する
+                headers["Content-Encoding"] = GZIP_ENCODING
+                return await self.session.post(
+                    url, timeout=timeout, content=_aiter_body(stream), headers=headers
+                )
+            if body.size is not None:
+                # サイズが分からない入力はContent-Lengthを付けずにチャンク形式で送信する
+                headers["Content-Length"] = str(body.size)
+            return await self.session.post(
+                url, timeout=timeout, content=_aiter_body(body), headers=headers
+            )
+
+    async def _send(
+        self,
+        path: str,
+        payload: Dict[str, Any] | None = None,
+        body: MultipartEncoder | None = None,
+    ) -> Dict[str, Any]:
+        """APIを呼び出します。キャッシュにヒットした場合は通信せずに結果を返します。
+
+        キーの計算(添付ファイルのハッシュ)とディスクキャッシュの読み書きは
+        ワーカースレッドで行います。coalescingが指定されている場合は、
+        同じ内容の実行中の呼び出しと結果を共有します。
+
+        Args:
+            path: APIのパス（例: /api/v1/tools/md-to-docx）
+            payload: JSONボディ
+            body: マルチパートボディ（指定した場合はpayloadより優先）
+
+        Returns:
+            Dict[str, Any]: レスポンスのJSONデータ
+
+        Raises:
+            CircuitOpenError: サーキットがopenの場合
+            OSError: 添付ファイルが読み込めない場合
+            ConnectionError: 接続エラー
+            その他、_handle_responseで定義される例外
+        """
+        if self.circuit_breaker is not None:
+            # openの間は、キーの計算で添付ファイルを読む前に失敗させる
+            self.circuit_breaker.check(path)
+        coalescer = self.coalescing
+        if coalescer is None or not coalescer.applies_to(path):
+            return await self._send_cached(path, payload, body)
+        return await coalescer.ado(
+            path,
+            payload,
+            body,
+            lambda: self._send_cached(path, payload, body),
+            account_scope(self.base_url, self.api_key),
+        )
+
+    async def _send_cached(
+        self,
+        path: str,
+        payload: Dict[str, Any] | None,
+        body: MultipartEncoder | None,
+    ) -> Dict[str, Any]:
+        """キャッシュを確認してからAPIを呼び出します。"""
+        cache = self.cache
+        if cache is None or cache.ttl_for(path) <= 0 or not keyable(body):
+            return await self._send_with_retry(path, payload, body)
+        scope = account_scope(self.base_url, self.api_key)
+        key = await asyncio.to_thread(cache.key, path, payload, body, scope)
+        data = await asyncio.to_thread(cache.get, key)
+        if data is None:
+            data = await self._send_with_retry(path, payload, body)
+            await asyncio.to_thread(cache.set, key, path, data)
+        return data
+
+    async def _post_hedged(
+        self,
+        path: str,
+        url: str,
+        headers: Dict[str, str],
+        payload: Dict[str, Any] | None,
+        body: MultipartEncoder | None,
+    ) -> httpx.Response:
+        """ヘッジの対象のJSONエンドポイントであれば、ヘッジしながら送信します。
+
+        5xxなどリトライ対象の応答はもう一方の応答を待ち、負けた方のリクエストはタスクごと中断します。
+
+        Raises:
+            ConnectionError: 接続エラー
+        """
+        compress = self.compression is not None and self.compression.applies_to(path)
+        policy = self.hedging
+        if body is not None or policy is None or not policy.applies_to(path):
+            return await self._post(url, headers, payload, body, compress=compress)
+        return await ahedged_call(
+            policy,
+            path,
+            lambda: self._post(url, headers, payload, body, compress=compress),
+            failed_response(self.retry),
+        )
+
+    async def _attempt(
+        self,
+        path: str,
+        url: str,
+        headers: Dict[str, str],
+        payload: Dict[str, Any] | None,
+        body: MultipartEncoder | None,
+    ) -> httpx.Response:
+        """リクエストを1回送信します。
+
+        サーキットブレーカーの確認とレートリミッターの待機を行ってから送信し、
+        結果をサーキットブレーカーに記録します。
+        レートリミッターの待機はセマフォの外で行い、同時実行数の枠を占有しません。
+
+        Raises:
+            CircuitOpenError: サーキットがopenの場合
+            ConnectionError: 接続エラー
+        """
+        breaker = self.circuit_breaker
+        if breaker is not None:
+            breaker.before_call(path)
+        try:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.aacquire(path)
+            response = await self._post_hedged(path, url, headers, payload, body)
+        except (DeadlineExceededError, CancelledError):
+            # 呼び出し側の都合による中断は、APIの障害として数えない
+            if breaker is not None:
+                breaker.record_ignored(path)
+            raise
+        except ConnectionError:
+            if breaker is not None:
+                breaker.record_failure(path)
+            raise
+        except BaseException:
+            if breaker is not None:
+                breaker.record_ignored(path)
+            raise
+        if breaker is not None:
+            if response.status_code >= HTTP_INTERNAL_SERVER_ERROR:
+                breaker.record_failure(path)
+            else:
+                breaker.record_success(path)
+        return response
+
+    async def _send_with_retry(
+        self,
+        path: str,
+        payload: Dict[str, Any] | None = None,
+        body: MultipartEncoder | None = None,
+    ) -> Dict[str, Any]:
+        """APIを呼び出し、リトライポリシーに従って必要に応じて再送します。
+
+        リトライの待機中はセマフォを解放し、他のリクエストの送信を妨げません。
+
+        Args:
+            path: APIのパス（例: /api/v1/tools/md-to-docx）
+            payload: JSONボディ
+            body: マルチパートボディ（指定した場合はpayloadより優先）
+
+        Returns:
+            Dict[str, Any]: レスポンスのJSONデータ
+
+        Raises:
+            DeadlineExceededError: 期限を過ぎた場合
+            ConnectionError: 接続エラー
+            その他、_handle_responseで定義される例外
+        """
+        return self._handle_response(
+            await self._respond_with_retry(path, payload, body)
+        )
+
+    async def _respond_with_retry(
+        self,
+        path: str,
+        payload: Dict[str, Any] | None = None,
+        body: MultipartEncoder | None = None,
+        headers: Dict[str, str] | None = None,
+    ) -> httpx.Response:
+        """APIを呼び出し、リトライポリシーに従って再送した最後のレスポンスを返します。
+
+        Args:
+            path: APIのパス（例: /api/v1/tools/md-to-docx）
+            payload: JSONボディ
+            body: マルチパートボディ（指定した場合はpayloadより優先）
+            headers: 追加のリクエストヘッダー
+
+        Returns:
+            httpx.Response: 最後のレスポンス
+
+        Raises:
+            DeadlineExceededError: 期限を過ぎた場合
+            ConnectionError: 接続エラー
+        """
+        url = f"{self.base_url}{path}"
+        policy = self.retry
+        headers = dict(headers or {})
+        if policy is None or (body is not None and not body.replayable):
+            # イテレーターなどの送り直せない入力はリトライしない
+            return await self._attempt(path, url, headers, payload, body)
+
+        if policy.idempotency_key:
+            headers[IDEMPOTENCY_KEY_HEADER] = policy.new_idempotency_key()
+        attempt = 1
+        while True:
+            try:
+                response = await self._attempt(path, url, headers, payload, body)
+            except ConnectionError as e:
+                if not policy.is_retryable_exception(e.__cause__):
+                    raise
+                delay = policy.delay(attempt)
+                if delay is None or not fits_deadline(delay):
+                    raise
+                reason = repr(e.__cause__)
+            else:
+                if not policy.is_retryable_status(response.status_code):
+                    return response
+                delay = policy.delay(attempt, response.headers.get("Retry-After"))
+                if delay is None or not fits_deadline(delay):
+                    # 待機すると期限に間に合わない場合は、このレスポンスで打ち切る
+                    return response
+                reason = f"status_code={response.status_code}"
+            logging.info(
+                f"リトライします: url={url}, attempt={attempt}, "
+                f"reason={reason}, delay={delay:.2f}s"
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
+            if body is not None:
+                # アップロードはファイルの先頭から送り直す
+                await asyncio.to_thread(body.reset)
+
+    async def _analyze(
+        self,
+        path: str,
+        template_id: str,
+        payload: Dict[str, Any],
+        parse: Callable[[Dict[str, Any]], T],
+    ) -> T:
+        """テンプレート解析APIを呼び出し、結果をモデルに変換します。
+
+        template_cacheが指定されている場合は、キャッシュされた結果を返します。
+        template_cacheのrevalidateが有効な場合は、条件付きのリクエストで再取得します。
+
+        Args:
+            path: APIのパス
+            template_id: 解析するテンプレートID
+            payload: リクエストボディ
+            parse: レスポンスのJSONデータをモデルに変換する関数
+
+        Returns:
+            T: parseが返すモデル
+        """
+        cache = self.template_cache
+        if cache is None:
+            return parse(await self._post_json(path, payload))
+        key = json.dumps(
+            [account_scope(self.base_url, self.api_key), path, payload], sort_keys=True
+        )
+        if cache.revalidate:
+            return await cache.aget_or_revalidate(
+                template_id,
+                key,
+                lambda headers: self._post_conditional(path, payload, headers),
+                parse,
+            )
+        return parse(
+            await cache.aget_or_load(
+                template_id, key, lambda: self._post_json(path, payload)
+            )
+        )
+
+    async def _post_conditional(
+        self, path: str, payload: Dict[str, Any], headers: Dict[str, str]
+    ) -> ConditionalResponse:
+        """条件付きのリクエストヘッダーを付けてJSONボディでAPIを呼び出します。
+
+        Args:
+            path: APIのパス
+            payload: リクエストボディ
+            headers: If-None-Match / If-Modified-Sinceヘッダー
+
+        Returns:
+            ConditionalResponse: レスポンスのJSONデータとETag / Last-Modified。
+                304 Not Modifiedの場合、dataはNone
+
+        Raises:
+            ConnectionError: 接続エラー
+            その他、_handle_responseで定義される例外
+        """
+        response = await self._respond_with_retry(path, payload, headers=headers)
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code == HTTP_NOT_MODIFIED:
+            return ConditionalResponse(None, etag, last_modified)
+        return ConditionalResponse(self._handle_response(response), etag, last_modified)
+
+    async def _post_json(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """JSONボディでAPIを呼び出し、レスポンスのJSONデータを返します。
+
+        Args:
+            path: APIのパス（例: /api/v1/tools/md-to-docx）
+            payload: リクエストボディ
+
+        Returns:
+            Dict[str, Any]: レスポンスのJSONデータ
+
+        Raises:
+            ConnectionError: 接続エラー
+            その他、_handle_responseで定義される例外
+        """
+        return await self._send(path, payload=payload)
+
+    async def _post_form(
+        self,
+        path: str,
+        fields: Dict[str, str] | None = None,
+        files: List[FilePart] | None = None,
+    ) -> Dict[str, Any]:
+        """マルチパートフォームでAPIを呼び出し、レスポンスのJSONデータを返します。
+
+        ファイルの読み出しはワーカースレッドでチャンク単位に行い、
+        イベントループをブロックせずに送信します。
+
+        Args:
+            path: APIのパス（例: /api/v1/tools/pdf-to-page-images）
+            fields: テキストフィールド
+            files: 送信するファイルの一覧
+
+        Returns:
+            Dict[str, Any]: レスポンスのJSONデータ
+
+        Raises:
+            OSError: ファイルが読み込めない場合
+            ConnectionError: 接続エラー
+            その他、_handle_responseで定義される例外
+        """
+        body = await asyncio.to_thread(MultipartEncoder, fields, files or [])
+        try:
+            return await self._send(path, body=body)
+        finally:
+            await asyncio.to_thread(body.close)
+
+    async def md_to_pdf(
+        self,
+        markdown_text: str,
+        pdf_template_id: str | None = None,
+        image_paths: Sequence[ImageInput] | AttachmentBundle | None = None,
+    ) -> str:
+        """Markdown文字列をPDFに変換し、PDFのダウンロードURLを返します。
+
+        Args:
+            markdown_text: 変換対象のMarkdown文字列
+            pdf_template_id: テンプレートID(UUID)
+            image_paths: Markdown内で参照する画像のリスト（パス、ファイルオブジェクト、
+                (ファイル名, 中身)）、またはAttachmentBundle
+
+        Returns:
+            str: 生成されたPDFのURL
+
+        Raises:
+            ValidationError: 入力データが不正
+            その他、_handle_responseで定義される例外
+        """
+        try:
+            fields = {"markdown": markdown_text}
+            if pdf_template_id:
+                fields["pdf_template_id"] = pdf_template_id
+
+            # AttachmentBundleはstatで変更を確認するため、ワーカースレッドで変換する
+            files = await asyncio.to_thread(_image_parts, image_paths)
+            result_data = await self._post_form(
+                "/api/v1/tools/md-to-pdf/form", fields, files
+            )
+            result = MdToPdfResponse.model_validate(result_data)
+            return result.pdf_url
+        except PydanticValidationError as e:
+            raise ValidationError(str(e)) from e
+        except OSError as e:
+            raise ValidationError(f"Failed to read image file: {e}") from e
+
+    async def md_to_docx(
+        self,
+        markdown_text: str,
+        docx_template_id: str | None = None,
+    ) -> str:
+        """Markdown文字列をDOCXに変換し、DOCXのダウンロードURLを返します。
+
+        Args:
+            markdown_text: 変換対象のMarkdown文字列
+            docx_template_id: テンプレートID(UUID)
+
+        Returns:
+            str: 生成されたDOCXのURL
+
+        Raises:
+            ValidationError: 入力データが不正
+            その他、_handle_responseで定義される例外
+        """
+        try:
+            data = await self._post_json(
+                "/api/v1/tools/md-to-docx",
+                {
+                    "markdown": markdown_text,
+                    "docx_template_id": docx_template_id,
+                },
+            )
+            result = MdToDocxResponse.model_validate(data)
+            return result.docx_url
+        except PydanticValidationError as e:
+            raise ValidationError(str(e)) from e
+
+    async def pdf_to_page_images(
+        self, pdf_file_path: FileInput, filename: str | None = None
+    ) -> List[Dict[str, Any]]:
+        """PDFファイルをアップロードしてページごとに画像化し、それぞれの画像URLを返します。
+
+        Args:
+            pdf_file_path: ローカルのPDFファイルパス、またはバイト列・memoryview・
+                バイナリのファイルオブジェクト・チャンクのイテレーター
+            filename: 送信するファイル名（省略時はパスなどから推測）
+
+        Returns:
+            List[Dict[str, Any]]: [{"page_no": int, "image_url": str}, ...]
+
+        Raises:
+            ValidationError: 入力データが不正
+            その他、_handle_responseで定義される例外
+        """
+        try:
+            part = _document_part(
+                "pdf_file", pdf_file_path, PDF_MIME_TYPE, filename, ".pdf"
+            )
+            data = await self._post_form(
+                "/api/v1/tools/pdf-to-page-images", files=[part]
+            )
+            result = PdfToPageImagesResponse.model_validate(data)
+            return [
+                {"page_no": page.page_no, "image_url": page.image_url}
+                for page in result.pages
+            ]
+        except PydanticValidationError as e:
+            raise ValidationError(str(e)) from e
+        except OSError as e:
+            raise ValidationError(f"Failed to read PDF file: {e}") from e
+
+    async def pptx_to_page_images(
+        self, pptx_file_path: FileInput, filename: str | None = None
+    ) -> List[Dict[str, Any]]:
+        """PPTXファイルをアップロードしてスライドごとに画像化し、それぞれの画像URLを返します。
+
+        Args:
+            pptx_file_path: ローカルのPPTXファイルパス、またはバイト列・memoryview・
+                バイナリのファイルオブジェクト・チャンクのイテレーター
+            filename: 送信するファイル名（省略時はパスなどから推測）
+
+        Returns:
+            List[Dict[str, Any]]: [{"page_no": int, "image_url": str}, ...]
+
+        Raises:
+            ValidationError: 入力データが不正
+            その他、_handle_responseで定義される例外
+        """
+        try:
+            part = _document_part(
+                "pptx_file", pptx_file_path, PPTX_MIME_TYPE, filename, ".pptx"
+            )
+            data = await self._post_form(
+                "/api/v1/tools/pptx-to-page-images", files=[part]
+            )
+            result = PptxToPageImagesResponse.model_validate(data)
+            return [
+                {"page_no": page.page_no, "image_url": page.image_url}
+                for page in result.pages
+            ]
+        except PydanticValidationError as e:
+            raise ValidationError(str(e)) from e
+        except OSError as e:
+            raise ValidationError(f"Failed to read PPTX file: {e}") from e
+
+    async def docx_to_page_images(
+        self, docx_file_path: FileInput, filename: str | None = None
+    ) -> List[Dict[str, Any]]:
+        """DOCXファイルをアップロードしてページごとに画像化し、それぞれの画像URLを返します。
+
+        Args:
+            docx_file_path: ローカルのDOCXファイルパス、またはバイト列・memoryview・
+                バイナリのファイルオブジェクト・チャンクのイテレーター
+            filename: 送信するファイル名（省略時はパスなどから推測）
+
+        Returns:
+            List[Dict[str, Any]]: [{"page_no": int, "image_url": str}, ...]
+
+        Raises:
+            ValidationError: 入力データが不正
+            その他、_handle_responseで定義される例外
+        """
+        try:
+            part = _document_part(
+                "docx_file", docx_file_path, DOCX_MIME_TYPE, filename, ".docx"
+            )
+            data = await self._post_form(
+                "/api/v1/tools/docx-to-page-images", files=[part]
+            )
+            result = DocxToPageImagesResponse.model_validate(data)
+            return [
+                {"page_no": page.page_no, "image_url": page.image_url}
+                for page in result.pages
+            ]
+        except PydanticValidationError as e:
+            raise ValidationError(str(e)) from e
+        except OSError as e:
+            raise ValidationError(f"Failed to read DOCX file: {e}") from e
+
+    async def xlsx_to_page_images(
+        self, xlsx_file_path: FileInput, filename: str | None = None
+    ) -> List[Dict[str, Any]]:
+        """XLSXファイルをアップロードしてページごとに画像化し、それぞれの画像URLを返します。
+
+        Args:
+            xlsx_file_path: ローカルのXLSXファイルパス、またはバイト列・memoryview・
+                バイナリのファイルオブジェクト・チャンクのイテレーター
+            filename: 送信するファイル名（省略時はパスなどから推測）
+
+        Returns:
+            List[Dict[str, Any]]: [{"sheet_name": str, "image_url": str}, ...]
+
+        Raises:
+            ValidationError: 入力データが不正
+            その他、_handle_responseで定義される例外
+        """
+        try:
+            part = _document_part(
+                "xlsx_file", xlsx_file_path, XLSX_MIME_TYPE, filename, ".xlsx"
+            )
+            data = await self._post_form(
+                "/api/v1/tools/xlsx-to-page-images", files=[part]
+            )
+            result = XlsxToPageImagesResponse.model_validate(data)
+            return [
+                {"sheet_name": page.sheet_name, "image_url": page.image_url}
+                for page in result.pages
+            ]
+        except PydanticValidationError as e:
+            raise ValidationError(str(e)) from e
+        except OSError as e:
+            raise ValidationError(f"Failed to read XLSX file: {e}") from e
+
+    async def json_to_pptx_analyze_v2(
+        self, pptx_template_id: str
+    ) -> List[Dict[str, Any]]:
+        """PPTXテンプレートの構造を解析します。
+
+        Args:
+            pptx_template_id: テンプレートID(UUID)
+
+        Returns:
+            List[Dict[str, Any]]: テンプレート解析結果
+
+        Raises:
+            ValidationError: 入力データが不正
+            その他、_handle_responseで定義される例外
+        """
+        try:
+            result = await self._analyze(
+                "/api/v2/tools/json-to-pptx/analyze",
+                pptx_template_id,
+                {"pptx_template_id": pptx_template_id},
+                JsonToPptxAnalyzeResponse.model_validate,
+            )
+            return result.slides
+        except PydanticValidationError as e:
+            raise ValidationError(str(e)) from e
+
+    async def json_to_pptx_execute_v2(
+        self,
+        pptx_template_id: str,
+        presentation: Presentation,
+        image_paths: Sequence[ImageInput] | AttachmentBundle | None = None,
+    ) -> str:
+        """テンプレートIDとプレゼンテーションを指定し、合成したPPTXを生成します。
+
+        Args:
+            pptx_template_id: テンプレートID(UUID)
+            presentation: プレゼンテーションのJSON構造
+            image_paths: プレゼンテーション内で参照する画像のリスト（パス、
+                ファイルオブジェクト、(ファイル名, 中身)）、またはAttachmentBundle
+
+        Returns:
+            str: 生成されたPPTXのダウンロードURL
+
+        Raises:
+            ValidationError: 入力データが不正
+            その他、_handle_responseで定義される例外
+        """
+        try:
+            fields = {
+                "presentation_json": json.dumps(presentation.model_dump()),
+                "pptx_template_id": pptx_template_id,
+            }
+            files = await asyncio.to_thread(_image_parts, image_paths)
+            result_data = await self._post_form(
+                "/api/v2/tools/json-to-pptx/execute/form", fields, files
+            )
+            result = JsonToPptxExecuteResponse.model_validate(result_data)
+            return result.pptx_url
+        except PydanticValidationError as e:
+            raise ValidationError(str(e)) from e
+        except OSError as e:
+            raise ValidationError(f"Failed to read image file: {e}") from e
+
+    async def mermaid_to_image(
+        self,
+        mermaid_text: str,
+        options: MermaidToImageOptions | None = None,
+    ) -> str:
+        """Mermaidダイアグラムを画像に変換し、画像のダウンロードURLを返します。
+
+        Args:
+            mermaid_text: 変換対象のMermaidダイアグラムテキスト
+            options: 変換オプション（テーマ、背景色、サイズなど）
+
+        Returns:
+            str: 生成された画像のURL
+
+        Raises:
+            ValidationError: 入力データが不正
+            その他、_handle_responseで定義される例外
+        """
+        try:
+            request_data: Dict[str, Any] = {
+                "content": mermaid_text,
+            }
+
+            if options is not None:
+                options_dict = options.model_dump(exclude_none=True)
+                if options_dict:  # 空でない場合のみ追加
+                    request_data["options"] = options_dict
+
+            data = await self._post_json("/api/v1/tools/mermaid-to-image", request_data)
+            result = MermaidToImageResponse.model_validate(data)
+            return result.image_url
+        except PydanticValidationError as e:
+            raise ValidationError(str(e)) from e
+
+    async def xlsx_to_pdf_analyze(
+        self,
+        xlsx_template_id: str,
+        sheet_name: str | None = None,
+    ) -> XlsxToPdfAnalyzeResponse:
+        """Excelテンプレートを解析し、プレースホルダー情報を返します。
+
+        Args:
+            xlsx_template_id: ExcelテンプレートID(UUID)
+            sheet_name: 解析対象のシート名（省略時は最初のシート）
+
+        Returns:
+            XlsxToPdfAnalyzeResponse: 解析結果（シート名、プレースホルダー一覧）
+
+        Raises:
+            ValidationError: 入力データが不正
+            その他、_handle_responseで定義される例外
+        """
+        try:
+            return await self._analyze(
+                "/api/v1/tools/xlsx-to-pdf-analyze",
+                xlsx_template_id,
+                {
+                    "xlsx_template_id": xlsx_template_id,
+                    "sheet_name": sheet_name,
+                },
+                XlsxToPdfAnalyzeResponse.model_validate,
+            )
+        except PydanticValidationError as e:
+            raise ValidationError(str(e)) from e
+
+    async def xlsx_to_pdf_execute(
+        self,
+        xlsx_template_id: str,
+        placeholders: Dict[str, str],
+        sheet_name: str | None = None,
+    ) -> XlsxToPdfExecuteResponse:
+        """Excelテンプレートのプレースホルダーを置換し、PDFに変換します。
+
+        Args:
+            xlsx_template_id: ExcelテンプレートID(UUID)
+            placeholders: プレースホルダーの値（キー: 名前、値: 置換文字列）
+            sheet_name: 処理対象のシート名（省略時は最初のシート）
+
+        Returns:
+            XlsxToPdfExecuteResponse: 変換結果（PDF URL、警告メッセージ）
+
+        Raises:
+            ValidationError: 入力データが不正
+            その他、_handle_responseで定義される例外
+        """
+        try:
+            data = await self._post_json(
+                "/api/v1/tools/xlsx-to-pdf-execute",
+                {
+                    "xlsx_template_id": xlsx_template_id,
+                    "placeholders": placeholders,
+                    "sheet_name": sheet_name,
+                },
+            )
+            return XlsxToPdfExecuteResponse.model_validate(data)
+        except PydanticValidationError as e:
+            raise ValidationError(str(e)) from e
@@ -0,0 +1,288 @@
+"""繰り返し添付する画像をメモリ上に保持するバンドルを定義するモジュール。
+
+同じロゴやグラフの画像を多数の md_to_pdf / json_to_pptx_execute_v2 の呼び出しに
+添付する場合、AttachmentBundleに一度読み込んでおくと、呼び出しのたびにファイルを
+開いて読み直したり、MIMEタイプやハッシュ値を計算し直したりせずに送信できます。
+中身が同じファイルはバンドルをまたいで1つのバイト列を共有し、
+全てのバンドルの合計サイズはAttachmentBudgetの上限で制限します。
+"""
+
+import hashlib
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from .multipart import FilePart
+
+# デフォルトでメモリ上に保持する添付ファイルの合計サイズの上限
+DEFAULT_BUDGET_BYTES = 256 * 1024 * 1024
+
+# 読み込み中にファイルが変更された場合に読み直す回数
+_MAX_READ_ATTEMPTS = 3
+
+StatKey = Tuple[int, int, int, int]
+
+
+def _stat_key(st: os.stat_result) -> StatKey:
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _image_mime_type(filename: str) -> str:
+    """ファイル名から画像のMIMEタイプを推測"""
+    ext = filename.lower().split(".")[-1]
+    mime_types = {
+        "png": "image/png",
+        "jpg": "image/jpeg",
+        "jpeg": "image/jpeg",
+        "gif": "image/gif",
+        "webp": "image/webp",
+        "svg": "image/svg+xml",
+    }
+    return mime_types.get(ext, "application/octet-stream")
+
+
+class AttachmentBudget:
+    """添付ファイルをメモリ上に保持する合計サイズの上限。
+
+    中身のハッシュ値ごとに1つのバイト列を保持し、同じ中身のファイルは
+    バンドルをまたいで共有します。上限を超えるファイルはメモリに保持せず、
+    送信時にディスクから読み出します。
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_BUDGET_BYTES) -> None:
+        """上限を初期化します。
+
+        Args:
+            max_bytes: メモリ上に保持する添付ファイルの合計サイズの上限
+        """
+        self.max_bytes = max_bytes
+        self.used = 0
+        self._blobs: Dict[str, Tuple[bytes, int]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, digest: str, data: bytes) -> bytes | None:
+        """バイト列を保持し、共有するバイト列を返します。
+
+        Args:
+            digest: 中身のハッシュ値
+            data: ファイルの中身
+
+        Returns:
+            bytes | None: 共有するバイト列。上限を超える場合はNone
+        """
+        with self._lock:
+            blob = self._blobs.get(digest)
+            if blob is not None:
+                self._blobs[digest] = (blob[0], blob[1] + 1)
+                return blob[0]
+            if self.used + len(data) > self.max_bytes:
+                return None
+            self._blobs[digest] = (data, 1)
+            self.used += len(data)
+            return data
+
+    def release(self, digest: str) -> None:
+        """acquireで保持したバイト列の参照を1つ解放します。
+
+        Args:
+            digest: 中身のハッシュ値
+        """
+        with self._lock:
+            blob = self._blobs.get(digest)
+            if blob is None:
+                return
+            data, refs = blob
+            if refs > 1:
+                self._blobs[digest] = (data, refs - 1)
+                return
+            del self._blobs[digest]
+            self.used -= len(data)
+
+
+# 全てのバンドルで共有するデフォルトの上限
+GLOBAL_BUDGET = AttachmentBudget()
+
+
+@dataclass(frozen=True)
+class _Attachment:
+    path: str
+    filename: str
+    content_type: str
+    stat: StatKey
+    digest: str
+    data: bytes | None
+
+
+def _release_all(budget: AttachmentBudget, digests: List[str]) -> None:
+    for digest in digests:
+        budget.release(digest)
+    digests.clear()
+
+
+class AttachmentBundle:
+    """繰り返し添付する画像ファイルの集合。
+
+    md_to_pdf / json_to_pptx_execute_v2 の`image_paths`にそのまま指定できます。
+    ファイルは生成時に並列に読み込み、送信時はメモリ上のバイト列をコピーせずに使います。
+    使用するたびにstatでファイルの変更を確認し、変更されたファイルだけを読み直します。
+
+    ```python
+    bundle = AttachmentBundle(["logo.png", "chart.png"])
+    for report in reports:
+        client.md_to_pdf(report, image_paths=bundle)
+    ```
+    """
+
+    def __init__(
+        self,
+        paths: Iterable[str],
+        *,
+        max_workers: int = 8,
+        budget: AttachmentBudget | None = None,
+    ) -> None:
+        """バンドルを生成し、ファイルを読み込みます。
+
+        Args:
+            paths: 画像ファイルのパス
+            max_workers: ファイルを並列に読み込むスレッド数
+            budget: メモリ上に保持する合計サイズの上限（省略時はGLOBAL_BUDGET）
+
+        Raises:
+            OSError: ファイルが読み込めない場合
+        """
+        # 同じパスは1回だけ添付する
+        self.paths = list(dict.fromkeys(paths))
+        self.max_workers = max_workers
+        self.budget = budget or GLOBAL_BUDGET
+        self._attachments: List[_Attachment] = []
+        self._digests: List[str] = []
+        self._lock = threading.Lock()
+        # 変更の確認から読み直し・差し替えまでを1つのスレッドだけが行う
+        self._refresh_lock = threading.Lock()
+        self._finalizer = weakref.finalize(
+            self, _release_all, self.budget, self._digests
+        )
+        try:
+            self._attachments = self._load_all(self.paths)
+        except BaseException:
+            self.close()
+            raise
+
+    def _load(self, path: str) -> _Attachment:
+        """ファイルを読み込み、ハッシュ値を計算して上限の範囲で保持します。"""
+        for _ in range(_MAX_READ_ATTEMPTS):
+            before = os.stat(path)
+            with open(path, "rb") as f:
+                data = f.read()
+            after = os.stat(path)
+            if _stat_key(before) == _stat_key(after):
+                break
+        digest = hashlib.blake2b(data, digest_size=32).hexdigest()
+        shared = self.budget.acquire(digest, data)
+        if shared is not None:
+            with self._lock:
+                self._digests.append(digest)
+        filename = os.path.basename(path)
+        return _Attachment(
+            path=path,
+            filename=filename,
+            content_type=_image_mime_type(filename),
+            stat=_stat_key(after),
+            digest=digest,
+            data=shared,
+        )
+
+    def _load_all(self, paths: List[str]) -> List[_Attachment]:
+        if len(paths) <= 1:
+            return [self._load(path) for path in paths]
+        workers = min(self.max_workers, len(paths))
+        with ThreadPoolExecutor(workers, thread_name_prefix="middleman-attach") as ex:
+            return list(ex.map(self._load, paths))
+
+    def _forget(self, attachment: _Attachment) -> None:
+        if attachment.data is None:
+            return
+        with self._lock:
+            self._digests.remove(attachment.digest)
+        self.budget.release(attachment.digest)
+
+    def refresh(self) -> None:
+        """statでファイルの変更を確認し、変更されたファイルを読み直します。
+
+        複数のスレッドから同時に呼び出された場合は1つのスレッドだけが読み直し、
+        他のスレッドは読み直しの完了を待ちます。
+
+        Raises:
+            OSError: ファイルが削除された場合や読み込めない場合
+        """
+        if not self._changed(self._attachments):
+            return
+        with self._refresh_lock:
+            # 待っている間に他のスレッドが読み直した場合は何もしない
+            attachments = list(self._attachments)
+            changed = self._changed(attachments)
+            if not changed:
+                return
+            reloaded = self._load_all([attachments[i].path for i in changed])
+            for i, attachment in zip(changed, reloaded):
+                self._forget(attachments[i])
+                attachments[i] = attachment
+            self._attachments = attachments
+
+    @staticmethod
+    def _changed(attachments: List[_Attachment]) -> List[int]:
+        """statが読み込み時と異なる添付ファイルの位置を返します。"""
+        return [
+            i
+            for i, attachment in enumerate(attachments)
+            if _stat_key(os.stat(attachment.path)) != attachment.stat
+        ]
+
+    def parts(self, name: str = "files") -> List[FilePart]:
+        """送信用のファイル情報を返します。
+
+        Args:
+            name: マルチパートのフィールド名
+
+        Returns:
+            List[FilePart]: メモリ上のバイト列を参照するファイル情報
+
+        Raises:
+            OSError: ファイルが削除された場合や読み込めない場合
+        """
+        self.refresh()
+        return [
+            FilePart(
+                name=name,
+                path=a.path,
+                content_type=a.content_type,
+                filename=a.filename,
+                data=a.data,
+                digest=a.digest,
+            )
+            for a in self._attachments
+        ]
+
+    @property
+    def size(self) -> int:
+        """メモリ上に保持しているバイト数（他のバンドルとの共有分を含む）。"""
+        return sum(len(a.data) for a in self._attachments if a.data is not None)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.paths)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def close(self) -> None:
+        """保持しているバイト列を解放します。"""
+        self._finalizer()
+
+    def __enter__(self) -> "AttachmentBundle":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
@@ -0,0 +1,182 @@
+"""複数の変換をまとめて並列実行するバッチ処理を定義するモジュール。"""
+
+import contextvars
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    Mapping,
+    Sized,
+    Tuple,
+    TypeVar,
+)
+
+from .cancellation import CancellationToken, cancellation
+from .exceptions import CancelledError
+
+T = TypeVar("T")
+
+# 進捗コールバック (完了した件数, 全体の件数。不明な場合はNone)
+ProgressCallback = Callable[[int, "int | None"], None]
+
+# キャンセルを確認する間隔の秒数
+_CANCEL_POLL_INTERVAL = 0.05
+
+
+@dataclass(frozen=True)
+class BatchResult(Generic[T]):
+    """バッチ処理の1件分の結果。
+
+    Attributes:
+        index: 入力の中での位置（0始まり）
+        item: 入力された値
+        value: 変換結果（失敗した場合はNone）
+        error: 発生した例外（成功した場合はNone）
+    """
+
+    index: int
+    item: Any
+    value: T | None = None
+    error: BaseException | None = None
+
+    @property
+    def ok(self) -> bool:
+        """成功したかどうか。"""
+        return self.error is None
+
+    def unwrap(self) -> T:
+        """変換結果を返します。失敗していた場合は発生した例外を送出します。"""
+        if self.error is not None:
+            raise self.error
+        return self.value  # type: ignore[return-value]
+
+
+def _call(fn: Callable[..., T], item: Any, cancel: threading.Event | None) -> T:
+    """入力の値を引数に展開して関数を呼び出します。"""
+    if cancel is not None and cancel.is_set():
+        raise CancelledError()
+    if isinstance(cancel, CancellationToken):
+        # 実行中の呼び出しもキャンセル時に中断できるようにする
+        with cancellation(cancel):
+            return _invoke(fn, item)
+    return _invoke(fn, item)
+
+
+def _invoke(fn: Callable[..., T], item: Any) -> T:
+    """入力の値を引数に展開して関数を呼び出します。"""
+    if isinstance(item, Mapping):
+        return fn(**item)
+    if isinstance(item, tuple):
+        return fn(*item)
+    return fn(item)
+
+
+def _to_result(future: "Future[T]", index: int, item: Any) -> BatchResult[T]:
+    """完了したFutureを結果に変換します。"""
+    if future.cancelled():
+        return BatchResult(index, item, error=CancelledError())
+    error = future.exception()
+    if error is not None:
+        return BatchResult(index, item, error=error)
+    return BatchResult(index, item, value=future.result())
+
+
+def run_batch(  # noqa: PLR0913
+    fn: Callable[..., T],
+    items: Iterable[Any],
+    *,
+    max_concurrency: int = 8,
+    ordered: bool = True,
+    progress: ProgressCallback | None = None,
+    cancel: threading.Event | None = None,
+) -> Iterator[BatchResult[T]]:
+    """関数を入力ごとに並列で呼び出し、結果を順に返します。
+
+    入力は必要な分だけ読み出すため、大きなジェネレーターも渡せます。
+    同時に保持する未返却の結果は max_concurrency * 2 件までです。
+
+    Args:
+        fn: 呼び出す関数
+        items: 入力。dictはキーワード引数、tupleは位置引数として展開し、
+            それ以外は1つ目の引数として渡します
+        max_concurrency: 同時に実行する最大数
+        ordered: Trueの場合は入力の順序で、Falseの場合は完了した順に返します
+        progress: 1件完了するごとに呼び出すコールバック
+        cancel: セットされると新しい入力の実行を止めるイベント。
+            実行前だった入力はCancelledErrorの結果として返し、
+            まだ読み出していない入力は読み出さずに終了します。
+            CancellationTokenを指定した場合は、実行中の呼び出しも中断します
+
+    Returns:
+        Iterator[BatchResult[T]]: 1件分の結果。失敗した場合もerrorに例外を格納します
+    """
+    # 呼び出した時点のコンテキスト (deadlineの期限など) をワーカーに引き継ぐ。
+    # 結果を読み出し始めるのが期限の外でも、呼び出し時の期限を適用する
+    context = contextvars.copy_context()
+    return _run(fn, items, max_concurrency, ordered, progress, cancel, context)
+
+
+def _run(  # noqa: PLR0913, PLR0917
+    fn: Callable[..., T],
+    items: Iterable[Any],
+    max_concurrency: int,
+    ordered: bool,
+    progress: ProgressCallback | None,
+    cancel: threading.Event | None,
+    context: contextvars.Context,
+) -> Iterator[BatchResult[T]]:
+    """run_batchの本体です。"""
+    total = len(items) if isinstance(items, Sized) else None
+    iterator = enumerate(items)
+    window = max_concurrency * 2
+    pending: Dict[Future[T], Tuple[int, Any]] = {}
+    ready: Dict[int, BatchResult[T]] = {}
+    next_index = 0
+    completed = 0
+    exhausted = False
+    executor = ThreadPoolExecutor(
+        max_workers=max_concurrency, thread_name_prefix="middleman-batch"
+    )
+    try:
+        while True:
+            cancelled = cancel is not None and cancel.is_set()
+            while not (exhausted or cancelled) and len(pending) + len(ready) < window:
+                try:
+                    index, item = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                future = executor.submit(context.copy().run, _call, fn, item, cancel)
+                pending[future] = (index, item)
+            if cancelled:
+                for future in pending:
+                    future.cancel()
+            if not pending:
+                break
+
+            done, _ = wait(
+                pending,
+                timeout=None if cancel is None else _CANCEL_POLL_INTERVAL,
+                return_when=FIRST_COMPLETED,
+            )
+            for future in sorted(done, key=lambda f: pending[f][0]):
+                index, item = pending.pop(future)
+                result = _to_result(future, index, item)
+                completed += 1
+                if progress is not None:
+                    progress(completed, total)
+                if not ordered:
+                    yield result
+                    continue
+                ready[index] = result
+                while next_index in ready:
+                    yield ready.pop(next_index)
+                    next_index += 1
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,395 @@
+"""変換結果のキャッシュを定義するモジュール。
+
+同じ入力(エンドポイント・テンプレートID・ペイロード・添付ファイルの中身)に対する
+変換結果を保存し、2回目以降はAPIを呼び出さずに結果を返します。
+メモリ上のLRUと、任意でディスクまたは共有のバックエンドの2段構成になっています。
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, Mapping, Tuple
+
+from .cache_backends import CacheBackend, CacheStats, MemoryCacheBackend
+from .fingerprint import file_fingerprint
+from .multipart import FilePart, MultipartEncoder
+
+# メソッド名とエンドポイントのパスの対応
+ENDPOINT_PATHS: Dict[str, str] = {
+    "md_to_pdf": "/api/v1/tools/md-to-pdf/form",
+    "md_to_docx": "/api/v1/tools/md-to-docx",
+    "pdf_to_page_images": "/api/v1/tools/pdf-to-page-images",
+    "pptx_to_page_images": "/api/v1/tools/pptx-to-page-images",
+    "docx_to_page_images": "/api/v1/tools/docx-to-page-images",
+    "xlsx_to_page_images": "/api/v1/tools/xlsx-to-page-images",
+    "json_to_pptx_analyze_v2": "/api/v2/tools/json-to-pptx/analyze",
+    "json_to_pptx_execute_v2": "/api/v2/tools/json-to-pptx/execute/form",
+    "mermaid_to_image": "/api/v1/tools/mermaid-to-image",
+    "xlsx_to_pdf_analyze": "/api/v1/tools/xlsx-to-pdf-analyze",
+    "xlsx_to_pdf_execute": "/api/v1/tools/xlsx-to-pdf-execute",
+}
+
+# デフォルトのTTL秒数。結果の署名付きURLが失効する前にエントリを破棄する
+DEFAULT_TTL = 600.0
+
+# テンプレートの解析結果はテンプレートの更新で変わるため、デフォルトではキャッシュしない
+_UNCACHED_BY_DEFAULT = ("json_to_pptx_analyze_v2", "xlsx_to_pdf_analyze")
+
+
+def _resolve_path(endpoint: str) -> str:
+    """メソッド名またはパスをエンドポイントのパスに変換します。"""
+    return ENDPOINT_PATHS.get(endpoint, endpoint)
+
+
+def keyable(body: MultipartEncoder | None) -> bool:
+    """添付ファイルの中身を読み出さずにキーを計算できるかどうかを返します。
+
+    ファイルオブジェクトやイテレーターの入力は、ハッシュ値の計算で読み出すと
+    送信できなくなるため、キャッシュやリクエストのまとめの対象外とします。
+
+    Args:
+        body: マルチパートボディ
+
+    Returns:
+        bool: パスまたはメモリ上のバイト列のみの場合はTrue
+    """
+    if body is None:
+        return True
+    return all(
+        part.data is None or isinstance(part.data, (bytes, memoryview))
+        for part in body.files
+    )
+
+
+def _part_digest(part: FilePart) -> str:
+    if part.digest is not None:
+        return part.digest
+    if isinstance(part.data, (bytes, memoryview)):
+        return hashlib.blake2b(part.data, digest_size=32).hexdigest()
+    return file_fingerprint(part.path)
+
+
+def account_scope(base_url: str, api_key: str) -> str:
+    """接続先とアカウントごとにキャッシュのキーを分けるための値を返します。
+
+    共有のバックエンドに保存されるキーにAPIキーがそのまま残らないよう、
+    APIキーはハッシュ値にします。
+
+    Args:
+        base_url: APIのベースURL
+        api_key: APIキー
+
+    Returns:
+        str: ベースURLとAPIキーのハッシュ値を連結した値
+    """
+    account = hashlib.blake2b(api_key.encode("utf-8"), digest_size=16).hexdigest()
+    return f"{base_url} {account}"
+
+
+def request_key(
+    path: str,
+    payload: Mapping[str, Any] | None = None,
+    body: MultipartEncoder | None = None,
+    scope: str = "",
+) -> str:
+    """リクエストの内容を正規化したハッシュ値を返します。
+
+    JSONはキーの順序によらず同じ値になり、添付ファイルは中身のハッシュ値を使用します。
+    添付ファイルのハッシュ値はfingerprintのインデックスで再利用します。
+
+    Args:
+        path: エンドポイントのパス
+        payload: JSONボディ
+        body: マルチパートボディ
+        scope: 接続先とアカウント(account_scopeの値)。異なる場合は別のキーになります
+
+    Returns:
+        str: ハッシュ値
+
+    Raises:
+        OSError: 添付ファイルが読み込めない場合
+    """
+    material: Dict[str, Any] = {"scope": scope, "path": path, "payload": payload}
+    if body is not None:
+        material["fields"] = body.fields
+        material["files"] = [
+            [
+                part.name,
+                part.filename or os.path.basename(part.path),
+                part.content_type,
+                _part_digest(part),
+            ]
+            for part in body.files
+        ]
+    normalized = json.dumps(
+        material, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=32).hexdigest()
+
+
+class _DiskTier:
+    """1エントリ1ファイルでディレクトリに保存するキャッシュ。
+
+    ファイルの更新日時を最終アクセス日時として扱い、
+    合計サイズが上限を超えた場合は古いものから削除します。
+    """
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str, now: float) -> Tuple[float, str] | None:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                expires_at = float(f.readline())
+                value = f.read()
+        except (OSError, ValueError):
+            return None
+        if expires_at <= now:
+            self.delete(key)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return expires_at, value
+
+    def set(self, key: str, expires_at: float, value: str) -> None:
+        # 他のプロセスが書き込み途中のファイルを読まないよう、一時ファイルから置き換える
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(f"{expires_at}\n{value}")
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+        self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def delete(self, key: str) -> None:
+        try:
+            os.unlink(self._path(key))
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".json"):
+                    try:
+                        os.unlink(entry.path)
+                    except OSError:
+                        pass
+
+
+class ResultCache:
+    """変換結果のキャッシュ。
+
+    ToolsClient / AsyncToolsClientの`cache`引数に指定します。
+    キーはベースURL・APIキー・エンドポイント・ペイロード(テンプレートIDを含む)・
+    添付ファイルの中身のハッシュ値で、キャッシュにヒットした場合はAPIを呼び出しません。
+    エラーとなった呼び出しの結果は保存しません。
+
+    ```python
+    cache = ResultCache(directory=".middleman-cache", ttls={"mermaid_to_image": 300})
+    client = ToolsClient(api_key="YOUR_API_KEY", cache=cache)
+    ```
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        *,
+        max_entries: int = 1024,
+        max_memory_bytes: int = 64 * 1024 * 1024,
+        directory: str | None = None,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+        default_ttl: float = DEFAULT_TTL,
+        ttls: Mapping[str, float] | None = None,
+        backend: CacheBackend | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """キャッシュを初期化します。
+
+        Args:
+            max_entries: メモリ上に保持するエントリの最大数
+            max_memory_bytes: メモリ上に保持するエントリの合計サイズの上限
+            directory: ディスクキャッシュのディレクトリ（省略時はメモリのみ）
+            max_disk_bytes: ディスクキャッシュの合計サイズの上限
+            default_ttl: エントリの有効期間の秒数
+            ttls: エンドポイントごとの有効期間の秒数（キーはメソッド名またはパス）。
+                0以下を指定したエンドポイントはキャッシュしません。
+                テンプレート解析(json_to_pptx_analyze_v2, xlsx_to_pdf_analyze)は
+                ここで指定した場合のみキャッシュします
+            backend: 複数のプロセス・ホストで共有するバックエンド。
+                指定した場合はdirectoryの代わりに2段目として使用します
+            clock: 現在時刻を返す関数（テスト用）
+
+        Raises:
+            ValueError: directoryとbackendの両方を指定した場合
+        """
+        if directory and backend is not None:
+            raise ValueError("directory and backend cannot be used together")
+        self.default_ttl = default_ttl
+        self.ttls: Dict[str, float] = {
+            _resolve_path(name): 0.0 for name in _UNCACHED_BY_DEFAULT
+        }
+        for endpoint, ttl in (ttls or {}).items():
+            self.ttls[_resolve_path(endpoint)] = ttl
+        self.clock = clock
+        self._memory = MemoryCacheBackend(max_entries, max_memory_bytes, clock=clock)
+        self._disk = _DiskTier(directory, max_disk_bytes) if directory else None
+        self.backend = backend
+
+    def ttl_for(self, path: str) -> float:
+        """エンドポイントのエントリの有効期間を返します。
+
+        Args:
+            path: エンドポイントのパス
+
+        Returns:
+            float: 有効期間の秒数。0以下の場合はキャッシュしない
+        """
+        return self.ttls.get(path, self.default_ttl)
+
+    def key(
+        self,
+        path: str,
+        payload: Mapping[str, Any] | None = None,
+        body: MultipartEncoder | None = None,
+        scope: str = "",
+    ) -> str:
+        """リクエストの内容からキャッシュのキーを計算します。
+
+        Args:
+            path: エンドポイントのパス
+            payload: JSONボディ
+            body: マルチパートボディ（添付ファイルは中身のハッシュ値を使用）
+            scope: 接続先とアカウント(account_scopeの値)。
+                他の環境やアカウントの結果を返さないよう、クライアントが指定します
+
+        Returns:
+            str: キャッシュのキー
+
+        Raises:
+            OSError: 添付ファイルが読み込めない場合
+        """
+        return request_key(path, payload, body, scope)
+
+    def get(self, key: str) -> Dict[str, Any] | None:
+        """キャッシュされたレスポンスを取得します。
+
+        Args:
+            key: キャッシュのキー
+
+        Returns:
+            Dict[str, Any] | None: レスポンスのJSONデータ。ない場合はNone
+        """
+        value = self._memory.get(key)
+        if value is None:
+            entry = self._get_shared(key)
+            if entry is not None:
+                expires_at, value = entry
+                self._memory.set(key, value, expires_at - self.clock())
+        if value is None:
+            return None
+        # 呼び出し元が結果を変更してもキャッシュに影響しないよう、毎回デコードする
+        return dict(json.loads(value))
+
+    def _get_shared(self, key: str) -> Tuple[float, bytes] | None:
+        """2段目から有効期限とエントリを取得します。"""
+        if self._disk is not None:
+            entry = self._disk.get(key, self.clock())
+            if entry is None:
+                return None
+            return entry[0], entry[1].encode("utf-8")
+        if self.backend is not None:
+            stored = self.backend.get(key)
+            if stored is None:
+                return None
+            # 有効期限を先頭行に保存し、1段目に残りの期間だけ保持する
+            header, _, value = stored.partition(b"\n")
+            try:
+                return float(header), value
+            except ValueError:
+                return None
+        return None
+
+    def set(self, key: str, path: str, data: Mapping[str, Any]) -> None:
+        """レスポンスを保存します。
+
+        Args:
+            key: キャッシュのキー
+            path: エンドポイントのパス（有効期間の決定に使用）
+            data: レスポンスのJSONデータ
+        """
+        ttl = self.ttl_for(path)
+        if ttl <= 0:
+            return
+        expires_at = self.clock() + ttl
+        value = json.dumps(data, ensure_ascii=False)
+        self._memory.set(key, value.encode("utf-8"), ttl)
+        if self._disk is not None:
+            self._disk.set(key, expires_at, value)
+        if self.backend is not None:
+            self.backend.set(key, f"{expires_at!r}\n{value}".encode(), ttl)
+
+    def invalidate(self, key: str) -> None:
+        """エントリを削除します。"""
+        self._memory.delete(key)
+        if self._disk is not None:
+            self._disk.delete(key)
+        if self.backend is not None:
+            self.backend.delete(key)
+
+    def clear(self) -> None:
+        """全てのエントリを削除します。"""
+        self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> Dict[str, CacheStats]:
+        """段ごとの統計を返します。
+
+        Returns:
+            Dict[str, CacheStats]: "memory"と、backendを指定した場合は"backend"の統計
+        """
+        stats = {"memory": self._memory.stats()}
+        if self.backend is not None:
+            stats["backend"] = self.backend.stats()
+        return stats
@@ -0,0 +1,645 @@
+"""キャッシュの保存先(バックエンド)を定義するモジュール。
+
+ResultCache / TemplateCacheの`backend`引数に指定すると、キャッシュのエントリを
+プロセスの外に保存し、複数のプロセスやホストで共有できます。
+
+- MemoryCacheBackend: プロセス内のLRU
+- SQLiteCacheBackend: SQLiteのファイル。同じホスト上の複数のプロセスで共有できます
+- RedisCacheBackend: Redisプロトコル(RESP)のサーバー。複数のホストで共有できます
+
+いずれのバックエンドも、値の圧縮(zlib)とヒット・ミス・破棄の回数の集計に対応します。
+"""
+
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Any, Callable, List, Tuple
+from urllib.parse import unquote, urlsplit
+
+# 値の先頭に付ける、圧縮の有無を表す1バイト
+_RAW = b"r"
+_COMPRESSED = b"z"
+
+DEFAULT_COMPRESS_MIN_SIZE = 1024
+
+
+@dataclass
+class CacheStats:
+    """キャッシュの統計。
+
+    Attributes:
+        hits: 値が見つかった取得の回数
+        misses: 値が見つからなかった取得の回数
+        sets: 保存の回数
+        evictions: 容量の上限により破棄したエントリ数
+        errors: バックエンドとの通信に失敗した回数
+    """
+
+    hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    evictions: int = 0
+    errors: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """取得のうち、値が見つかった割合。"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class RedisError(Exception):
+    """Redisサーバーがエラーを返しました。"""
+
+
+# キャッシュのミス(保存・削除は無視)として扱うバックエンドの失敗。
+# 通信エラーのほか、サーバーのエラー応答、解析できない応答や壊れた値を含む
+_BACKEND_ERRORS = (OSError, RedisError, ValueError, zlib.error)
+
+
+class CacheBackend(ABC):
+    """キャッシュのエントリを保存するバックエンド。
+
+    サブクラスは_get / _set / _delete / _delete_prefixを実装します。
+    値の圧縮と統計の集計はこのクラスで行います。
+    通信エラーやサーバーのエラー応答、壊れた値は送出せず、
+    取得はミス・保存と削除は無視として扱います。
+    """
+
+    def __init__(
+        self,
+        *,
+        compress: bool = False,
+        compress_min_size: int = DEFAULT_COMPRESS_MIN_SIZE,
+    ) -> None:
+        """バックエンドを初期化します。
+
+        Args:
+            compress: Trueの場合、compress_min_sizeバイト以上の値をzlibで圧縮します
+            compress_min_size: 圧縮する値の最小バイト数
+        """
+        self.compress = compress
+        self.compress_min_size = compress_min_size
+        self._stats = CacheStats()
+        self._stats_lock = threading.Lock()
+
+    @abstractmethod
+    def _get(self, key: str) -> bytes | None:
+        """保存された値を返します。ない場合や期限切れの場合はNoneを返します。"""
+
+    @abstractmethod
+    def _set(self, key: str, value: bytes, ttl: float) -> None:
+        """値をttl秒間保存します。"""
+
+    @abstractmethod
+    def _delete(self, key: str) -> None:
+        """エントリを削除します。"""
+
+    @abstractmethod
+    def _delete_prefix(self, prefix: str) -> None:
+        """キーがprefixで始まるエントリを全て削除します。"""
+
+    def _count(self, **deltas: int) -> None:
+        with self._stats_lock:
+            for name, delta in deltas.items():
+                setattr(self._stats, name, getattr(self._stats, name) + delta)
+
+    def get(self, key: str) -> bytes | None:
+        """値を取得します。
+
+        Args:
+            key: キー
+
+        Returns:
+            bytes | None: 値。ない場合や期限切れの場合はNone
+        """
+        try:
+            stored = self._get(key)
+            value = None if stored is None else _decode(stored)
+        except _BACKEND_ERRORS as e:
+            logging.warning(f"キャッシュの取得に失敗しました: {e!r}")
+            self._count(errors=1, misses=1)
+            return None
+        if value is None:
+            self._count(misses=1)
+            return None
+        self._count(hits=1)
+        return value
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        """値を保存します。
+
+        Args:
+            key: キー
+            value: 値
+            ttl: 有効期間の秒数
+        """
+        if self.compress and len(value) >= self.compress_min_size:
+            stored = _COMPRESSED + zlib.compress(value)
+        else:
+            stored = _RAW + value
+        try:
+            self._set(key, stored, ttl)
+        except _BACKEND_ERRORS as e:
+            logging.warning(f"キャッシュの保存に失敗しました: {e!r}")
+            self._count(errors=1)
+            return
+        self._count(sets=1)
+
+    def delete(self, key: str) -> None:
+        """エントリを削除します。
+
+        Args:
+            key: キー
+        """
+        try:
+            self._delete(key)
+        except _BACKEND_ERRORS as e:
+            logging.warning(f"キャッシュの削除に失敗しました: {e!r}")
+            self._count(errors=1)
+
+    def delete_prefix(self, prefix: str) -> None:
+        """キーがprefixで始まるエントリを全て削除します。
+
+        Args:
+            prefix: キーの接頭辞。空文字列の場合は全てのエントリを削除します
+        """
+        try:
+            self._delete_prefix(prefix)
+        except _BACKEND_ERRORS as e:
+            logging.warning(f"キャッシュの削除に失敗しました: {e!r}")
+            self._count(errors=1)
+
+    def clear(self) -> None:
+        """全てのエントリを削除します。"""
+        self.delete_prefix("")
+
+    def stats(self) -> CacheStats:
+        """統計を返します。
+
+        Returns:
+            CacheStats: 統計のコピー
+        """
+        with self._stats_lock:
+            return replace(self._stats)
+
+    def reset_stats(self) -> None:
+        """統計を初期化します。"""
+        with self._stats_lock:
+            self._stats = CacheStats()
+
+    def close(self) -> None:  # noqa: B027
+        """バックエンドとの接続を閉じます。"""
+
+
+def _decode(stored: bytes) -> bytes:
+    """保存した形式から値を取り出します。
+
+    Raises:
+        ValueError: 形式が不明な場合
+        zlib.error: 圧縮した値が壊れている場合
+    """
+    if stored[:1] == _COMPRESSED:
+        return zlib.decompress(stored[1:])
+    if stored[:1] == _RAW:
+        return stored[1:]
+    raise ValueError(f"Unknown cache value format: {stored[:1]!r}")
+
+
+class MemoryCacheBackend(CacheBackend):
+    """プロセス内でエントリを保持するLRUのバックエンド。"""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        *,
+        clock: Callable[[], float] = time.time,
+        compress: bool = False,
+        compress_min_size: int = DEFAULT_COMPRESS_MIN_SIZE,
+    ) -> None:
+        """バックエンドを初期化します。
+
+        Args:
+            max_entries: 保持するエントリの最大数
+            max_bytes: 保持するエントリの合計サイズの上限
+            clock: 現在時刻を返す関数（テスト用）
+            compress: Trueの場合、大きな値を圧縮して保持します
+            compress_min_size: 圧縮する値の最小バイト数
+        """
+        super().__init__(compress=compress, compress_min_size=compress_min_size)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.size = 0
+        self._entries: OrderedDict[str, Tuple[float, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: bytes, ttl: float) -> None:
+        evicted = 0
+        with self._lock:
+            self._pop(key)
+            if len(value) > self.max_bytes:
+                return
+            self._entries[key] = (self.clock() + ttl, value)
+            self.size += len(value)
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                _, (_, old) = self._entries.popitem(last=False)
+                self.size -= len(old)
+                evicted += 1
+        if evicted:
+            self._count(evictions=evicted)
+
+    def _pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def _delete_prefix(self, prefix: str) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                self._pop(key)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """SQLiteのファイルにエントリを保存するバックエンド。
+
+    WALモードで開くため、同じホスト上の複数のプロセス・スレッドから
+    同じファイルを安全に読み書きできます。合計サイズが上限を超えた場合は、
+    最後にアクセスした日時が古いエントリから破棄します。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        max_bytes: int = 256 * 1024 * 1024,
+        clock: Callable[[], float] = time.time,
+        compress: bool = False,
+        compress_min_size: int = DEFAULT_COMPRESS_MIN_SIZE,
+    ) -> None:
+        """バックエンドを初期化します。
+
+        Args:
+            path: SQLiteのファイルのパス
+            max_bytes: 保存するエントリの合計サイズの上限
+            clock: 現在時刻を返す関数。プロセス間で共通の時計を使用します
+            compress: Trueの場合、大きな値を圧縮して保存します
+            compress_min_size: 圧縮する値の最小バイト数
+        """
+        super().__init__(compress=compress, compress_min_size=compress_min_size)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.clock = clock
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        with self._connection() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        """スレッドごと・プロセスごとの接続を返します。"""
+        pid = os.getpid()
+        current: sqlite3.Connection | None = getattr(self._local, "connection", None)
+        if current is not None and self._local.pid == pid:
+            return current
+        # fork後に親プロセスの接続を使うとファイルが壊れるため、新しく接続する
+        connection = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        self._local.connection = connection
+        self._local.pid = pid
+        with self._lock:
+            self._connections.append(connection)
+        return connection
+
+    def _get(self, key: str) -> bytes | None:
+        now = self.clock()
+        try:
+            with self._connection() as db:
+                row = db.execute(
+                    "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if row[1] <= now:
+                    db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    return None
+                db.execute(
+                    "UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+                return bytes(row[0])
+        except sqlite3.Error as e:
+            raise OSError(e) from e
+
+    def _set(self, key: str, value: bytes, ttl: float) -> None:
+        now = self.clock()
+        try:
+            with self._connection() as db:
+                db.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value), now + ttl, now),
+                )
+                evicted = self._evict(db, now)
+        except sqlite3.Error as e:
+            raise OSError(e) from e
+        if evicted:
+            self._count(evictions=evicted)
+
+    def _evict(self, db: sqlite3.Connection, now: float) -> int:
+        """期限切れのエントリを削除し、合計サイズが上限以下になるまで破棄します。"""
+        db.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        (total,) = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if total <= self.max_bytes:
+            return 0
+        keys = []
+        for key, size in db.execute(
+            "SELECT key, size FROM entries ORDER BY accessed_at"
+        ).fetchall():
+            keys.append((key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+        db.executemany("DELETE FROM entries WHERE key = ?", keys)
+        return len(keys)
+
+    def _delete(self, key: str) -> None:
+        try:
+            with self._connection() as db:
+                db.execute("DELETE FROM entries WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            raise OSError(e) from e
+
+    def _delete_prefix(self, prefix: str) -> None:
+        try:
+            with self._connection() as db:
+                # LIKEは大文字・小文字を区別しないため、範囲で指定する
+                if prefix:
+                    db.execute(
+                        "DELETE FROM entries WHERE key >= ? AND key < ?",
+                        (prefix, prefix + "\U0010ffff"),
+                    )
+                else:
+                    db.execute("DELETE FROM entries")
+        except sqlite3.Error as e:
+            raise OSError(e) from e
+
+    def close(self) -> None:
+        """このプロセスで開いた接続を閉じます。"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+
+class _RespConnection:
+    """Redisプロトコル(RESP2)で1つのサーバーと通信する接続。"""
+
+    def __init__(self, host: str, port: int, timeout: float) -> None:
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+
+    def execute(self, *args: str | bytes) -> Any:
+        """コマンドを送信し、応答を返します。"""
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg.encode("utf-8") if isinstance(arg, str) else arg
+            parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        self.sock.sendall(b"".join(parts))
+        return self._read()
+
+    def _read(self) -> Any:
+        line = self.reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionResetError("Connection closed by Redis server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            count = int(rest)
+            return None if count < 0 else [self._read() for _ in range(count)]
+        raise ConnectionResetError(f"Unexpected reply from Redis server: {line!r}")
+
+    def close(self) -> None:
+        self.reader.close()
+        self.sock.close()
+
+
+def _escape_glob(value: str) -> str:
+    """RedisのMATCHパターンで特別な意味を持つ文字をエスケープします。"""
+    return "".join("\\" + c if c in "*?[]\\" else c for c in value)
+
+
+class RedisCacheBackend(CacheBackend):
+    """Redisプロトコルのサーバーにエントリを保存するバックエンド。
+
+    GET / SET (PX) / DEL / SCANのみを使用するため、Redisのほか
+    ValkeyやKeyDBなどの互換サーバーも利用できます。
+    スレッドごとに1本の接続を使用し、切断された場合は1回だけ再接続します。
+    容量の上限による破棄はサーバーの設定(maxmemory-policy)に従います。
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        *,
+        db: int = 0,
+        password: str | None = None,
+        prefix: str = "middleman:",
+        timeout: float = 5.0,
+        compress: bool = False,
+        compress_min_size: int = DEFAULT_COMPRESS_MIN_SIZE,
+    ) -> None:
+        """バックエンドを初期化します。
+
+        Args:
+            host: サーバーのホスト名
+            port: サーバーのポート番号
+            db: 使用するデータベースの番号
+            password: AUTHに使用するパスワード
+            prefix: 全てのキーに付ける接頭辞
+            timeout: 接続・応答のタイムアウト秒数
+            compress: Trueの場合、大きな値を圧縮して保存します
+            compress_min_size: 圧縮する値の最小バイト数
+        """
+        super().__init__(compress=compress, compress_min_size=compress_min_size)
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.prefix = prefix
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections: List[_RespConnection] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "RedisCacheBackend":
+        """redis://[:password@]host[:port][/db] 形式のURLから生成します。
+
+        Args:
+            url: サーバーのURL
+            **kwargs: その他のコンストラクタの引数
+
+        Returns:
+            RedisCacheBackend: バックエンド
+        """
+        parts = urlsplit(url)
+        path = parts.path.lstrip("/")
+        return cls(
+            parts.hostname or "localhost",
+            parts.port or 6379,
+            db=int(path) if path else 0,
+            password=unquote(parts.password) if parts.password else None,
+            **kwargs,
+        )
+
+    def _connect(self) -> _RespConnection:
+        connection = _RespConnection(self.host, self.port, self.timeout)
+        try:
+            if self.password is not None:
+                connection.execute("AUTH", self.password)
+            if self.db:
+                connection.execute("SELECT", str(self.db))
+        except BaseException:
+            connection.close()
+            raise
+        with self._lock:
+            self._connections.append(connection)
+        return connection
+
+    def _execute(self, *args: str | bytes) -> Any:
+        """コマンドを実行します。切断されていた場合は1回だけ再接続します。"""
+        for attempt in range(2):
+            connection = getattr(self._local, "connection", None)
+            if connection is None:
+                connection = self._local.connection = self._connect()
+            try:
+                return connection.execute(*args)
+            except OSError:
+                self._local.connection = None
+                self._discard(connection)
+                if attempt:
+                    raise
+            except ValueError:
+                # 解析できない応答の後は応答の区切りがずれるため、接続を使い続けない
+                self._local.connection = None
+                self._discard(connection)
+                raise
+        raise AssertionError("unreachable")
+
+    def _discard(self, connection: _RespConnection) -> None:
+        with self._lock:
+            if connection in self._connections:
+                self._connections.remove(connection)
+        try:
+            connection.close()
+        except OSError:
+            pass
+
+    def _get(self, key: str) -> bytes | None:
+        value = self._execute("GET", self.prefix + key)
+        return None if value is None else bytes(value)
+
+    def _set(self, key: str, value: bytes, ttl: float) -> None:
+        milliseconds = max(1, int(ttl * 1000))
+        self._execute("SET", self.prefix + key, value, "PX", str(milliseconds))
+
+    def _delete(self, key: str) -> None:
+        self._execute("DEL", self.prefix + key)
+
+    def _delete_prefix(self, prefix: str) -> None:
+        pattern = _escape_glob(self.prefix + prefix) + "*"
+        cursor = "0"
+        while True:
+            cursor_bytes, keys = self._execute(
+                "SCAN", cursor, "MATCH", pattern, "COUNT", "500"
+            )
+            if keys:
+                self._execute("DEL", *keys)
+            cursor = cursor_bytes.decode()
+            if cursor == "0":
+                return
+
+    def close(self) -> None:
+        """開いている接続を閉じます。"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            try:
+                connection.close()
+            except OSError:
+                pass
+        self._local = threading.local()
+
+
+def backend_from_url(url: str, **kwargs: Any) -> CacheBackend:
+    """URLからバックエンドを生成します。
+
+    - memory:// : MemoryCacheBackend
+    - sqlite:///path/to/cache.db : SQLiteCacheBackend
+    - redis://[:password@]host[:port][/db] : RedisCacheBackend
+
+    Args:
+        url: バックエンドのURL
+        **kwargs: その他のコンストラクタの引数
+
+    Returns:
+        CacheBackend: バックエンド
+
+    Raises:
+        ValueError: 対応していないスキームの場合
+    """
+    scheme = urlsplit(url).scheme
+    if scheme == "memory":
+        return MemoryCacheBackend(**kwargs)
+    if scheme == "sqlite":
+        return SQLiteCacheBackend(unquote(url[len("sqlite://") :]), **kwargs)
+    if scheme == "redis":
+        return RedisCacheBackend.from_url(url, **kwargs)
+    raise ValueError(f"Unsupported cache backend URL: {url}")
@@ -0,0 +1,321 @@
+"""実行中の呼び出しを別のスレッドから中断するキャンセルトークンを定義するモジュール。
+
+cancellationのwith文の中でToolsClientのメソッドを呼び出すと、
+トークンがキャンセルされた時点でアップロード中のボディの送信を打ち切り、
+使用中のソケットをshutdownしてレスポンス待ちも中断します。
+中断したコネクションは破棄され、コネクションプールの枠は解放されます。
+"""
+
+import contextvars
+import heapq
+import itertools
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, List
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from .exceptions import CancelledError, DeadlineExceededError
+from .timeouts import check_deadline, deadline_exceeded, remaining
+
+# 現在のキャンセルトークン
+_token: "contextvars.ContextVar[CancellationToken | None]" = contextvars.ContextVar(
+    "middleman_cancellation", default=None
+)
+
+# 現在の呼び出しで使用しているコネクション
+_connections: "contextvars.ContextVar[List[HTTPConnection] | None]" = (
+    contextvars.ContextVar("middleman_connections", default=None)
+)
+
+
+class CancellationToken(threading.Event):
+    """呼び出しをキャンセルするためのトークン。
+
+    threading.Eventのサブクラスのため、ToolsClient.batchの`cancel`引数にも
+    そのまま指定できます。
+
+    ```python
+    token = CancellationToken()
+    with cancellation(token):
+        client.pdf_to_page_images("large.pdf")  # 別のスレッドで token.cancel()
+    ```
+    """
+
+    def __init__(self) -> None:
+        """トークンを初期化します。"""
+        super().__init__()
+        self._callbacks: List[Callable[[], None]] = []
+        self._callbacks_lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        """キャンセルされたかどうか。"""
+        return self.is_set()
+
+    def cancel(self) -> None:
+        """トークンをキャンセルし、実行中の呼び出しを中断します。"""
+        self.set()
+
+    def set(self) -> None:
+        """cancelと同じです。登録されたコールバックを呼び出します。"""
+        with self._callbacks_lock:
+            callbacks, self._callbacks = self._callbacks, []
+        super().set()
+        for callback in callbacks:
+            callback()
+
+    def raise_if_cancelled(self) -> None:
+        """キャンセルされている場合はCancelledErrorを送出します。
+
+        Raises:
+            CancelledError: キャンセルされている場合
+        """
+        if self.is_set():
+            raise CancelledError()
+
+    def add_callback(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """キャンセルされた時に呼び出すコールバックを登録します。
+
+        既にキャンセルされている場合は、その場で呼び出します。
+
+        Args:
+            callback: 引数なしで呼び出す関数
+
+        Returns:
+            Callable[[], None]: 登録を解除する関数
+        """
+        with self._callbacks_lock:
+            if not self.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove_callback(callback)
+        callback()
+        return lambda: None
+
+    def _remove_callback(self, callback: Callable[[], None]) -> None:
+        with self._callbacks_lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+@contextmanager
+def cancellation(token: CancellationToken) -> Iterator[None]:
+    """with文の中の呼び出しをトークンでキャンセルできるようにします。
+
+    トークンはcontextvarsで保持するため、ToolsClient.batchのワーカースレッドにも
+    引き継がれます。
+
+    Args:
+        token: キャンセルトークン
+    """
+    reset = _token.set(token)
+    try:
+        yield
+    finally:
+        _token.reset(reset)
+
+
+def current_token() -> CancellationToken | None:
+    """現在のキャンセルトークンを返します。
+
+    Returns:
+        CancellationToken | None: トークン。設定されていない場合はNone
+    """
+    return _token.get()
+
+
+def check_cancelled() -> None:
+    """現在のトークンがキャンセルされていないか確認します。
+
+    Raises:
+        CancelledError: キャンセルされている場合
+    """
+    token = _token.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+@contextmanager
+def abort_on_cancel() -> Iterator[None]:
+    """with文の中の通信を、キャンセルされた時点または期限を過ぎた時点で中断します。
+
+    with文の中で使用したコネクションのソケットをキャンセル時や期限の到来時に
+    shutdownし、送受信中のスレッドを起こします。requestsのタイムアウトは接続や
+    ソケットの読み込みごとに適用されるため、少しずつ応答が届く場合でも
+    呼び出し全体が期限までに終わるよう、期限はタイマーで監視します。
+    中断による接続エラーはCancelledErrorまたはDeadlineExceededErrorに変換します。
+
+    Raises:
+        CancelledError: キャンセルされた場合
+        DeadlineExceededError: 期限を過ぎた場合
+    """
+    token = _token.get()
+    left = remaining()
+    if token is None and left is None:
+        yield
+        return
+    if token is not None:
+        token.raise_if_cancelled()
+    connections: List[HTTPConnection] = []
+    reset = _connections.set(connections)
+    unregister = (
+        token.add_callback(lambda: _shutdown(connections))
+        if token is not None
+        else None
+    )
+    unwatch = (
+        _watchdog.watch(time.monotonic() + left, connections)
+        if left is not None
+        else None
+    )
+    try:
+        yield
+    except requests.exceptions.RequestException as e:
+        if token is not None and token.is_set():
+            raise CancelledError() from e
+        if deadline_exceeded():
+            raise DeadlineExceededError() from e
+        raise
+    finally:
+        if unwatch is not None:
+            unwatch()
+        if unregister is not None:
+            unregister()
+        _connections.reset(reset)
+
+
+@dataclass(order=True)
+class _Watch:
+    """期限までに終わらなければshutdownするコネクション。"""
+
+    at: float
+    seq: int
+    connections: List[HTTPConnection] = field(compare=False)
+    active: bool = field(default=True, compare=False)
+
+
+class _DeadlineWatchdog:
+    """期限を過ぎた呼び出しのコネクションをshutdownする監視スレッド。
+
+    呼び出しごとにタイマーのスレッドを作らないよう、1本のスレッドで
+    期限の早い順に監視します。
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._heap: List[_Watch] = []
+        self._seq = itertools.count()
+        self._thread: threading.Thread | None = None
+
+    def watch(self, at: float, connections: List[HTTPConnection]) -> Callable[[], None]:
+        """at(time.monotonicの時刻)を過ぎたらコネクションをshutdownします。
+
+        Args:
+            at: 期限の時刻
+            connections: 呼び出しで使用するコネクション(後から追加されたものも対象)
+
+        Returns:
+            Callable[[], None]: 監視を解除する関数
+        """
+        entry = _Watch(at, next(self._seq), connections)
+        with self._cond:
+            heapq.heappush(self._heap, entry)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="middleman-deadline", daemon=True
+                )
+                self._thread.start()
+            if self._heap[0] is entry:
+                self._cond.notify()
+
+        def unwatch() -> None:
+            # 解除した後にshutdownしないようロックを取る。ヒープからは期限の到来時に除く
+            with self._cond:
+                entry.active = False
+
+        return unwatch
+
+    def _run(self) -> None:
+        with self._cond:
+            while True:
+                while self._heap and not self._heap[0].active:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                delay = self._heap[0].at - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                _shutdown(heapq.heappop(self._heap).connections)
+
+
+_watchdog = _DeadlineWatchdog()
+
+
+def _shutdown(connections: List[HTTPConnection]) -> None:
+    """コネクションのソケットをshutdownし、ブロック中の送受信を失敗させます。"""
+    for connection in list(connections):
+        sock = connection.sock
+        if sock is None:
+            continue
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            # 既に閉じられている
+            pass
+
+
+class _TrackedPool:
+    """送信に使うコネクションを現在の呼び出しに記録するMixin。"""
+
+    def _new_conn(self) -> Any:
+        # 接続前のコネクションはソケットがないためキャンセル時にshutdownできない。
+        # 接続の完了後にトークンと期限を確認し、キャンセル済みか期限切れであれば
+        # すぐに中断する。
+        # vcrpyなどによるConnectionClsの差し替えを妨げないよう、インスタンスで包む
+        conn = super()._new_conn()  # type: ignore[misc]
+        connect = conn.connect
+
+        def connect_then_check() -> None:
+            connect()
+            check_cancelled()
+            check_deadline()
+
+        conn.connect = connect_then_check
+        return conn
+
+    def _make_request(self, conn: HTTPConnection, *args: Any, **kwargs: Any) -> Any:
+        connections = _connections.get()
+        if connections is not None:
+            connections.append(conn)
+            # 記録する前にキャンセルされたり期限を過ぎたりした場合は
+            # shutdownされないため、ここで確認する
+            check_cancelled()
+            check_deadline()
+        return super()._make_request(conn, *args, **kwargs)  # type: ignore[misc]
+
+
+class _HTTPConnectionPool(_TrackedPool, HTTPConnectionPool):  # type: ignore[misc]
+    pass
+
+
+class _HTTPSConnectionPool(_TrackedPool, HTTPSConnectionPool):  # type: ignore[misc]
+    pass
+
+
+class CancellableAdapter(HTTPAdapter):
+    """キャンセル時に使用中のソケットを中断できるHTTPAdapter。"""
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _HTTPConnectionPool,
+            "https": _HTTPSConnectionPool,
+        }
@@ -0,0 +1,276 @@
+"""エンドポイントごとのサーキットブレーカーを定義するモジュール。
+
+障害が続いているエンドポイントへの呼び出しを一定時間止め、
+タイムアウトを待たずにCircuitOpenErrorで即座に失敗させます。
+
+- closed: 通常どおり呼び出します。直近window秒間の失敗率がしきい値を超えるとopenへ
+- open: 呼び出さずにCircuitOpenErrorを送出します。open_duration秒後にhalf_openへ
+- half_open: 試行として一部の呼び出しだけを通し、成功すればclosed、失敗すればopenへ
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Tuple
+
+from .cache import _resolve_path
+from .exceptions import CircuitOpenError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+@dataclass(frozen=True)
+class CircuitSnapshot:
+    """エンドポイントのサーキットの状態。
+
+    Attributes:
+        state: closed / open / half_open
+        requests: 直近window秒間に記録した呼び出し数
+        failures: 直近window秒間に記録した失敗数
+        failure_rate: 直近window秒間の失敗率
+        retry_after: openの場合、half_openになるまでの秒数
+    """
+
+    state: str
+    requests: int
+    failures: int
+    failure_rate: float
+    retry_after: float
+
+
+@dataclass
+class _Circuit:
+    state: str = CLOSED
+    # (時刻, 失敗したかどうか) の一覧
+    outcomes: Deque[Tuple[float, bool]] = field(default_factory=deque)
+    failures: int = 0
+    opened_at: float = 0.0
+    trials: int = 0
+
+
+class CircuitBreaker:
+    """エンドポイントごとのサーキットブレーカー。
+
+    ToolsClient / AsyncToolsClientの`circuit_breaker`引数に指定します。
+    接続エラー・タイムアウトとサーバーエラー(5xx)を失敗として数えます。
+    4xxはサーバーが応答しているため失敗として数えません。
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        *,
+        failure_rate_threshold: float = 0.5,
+        minimum_requests: int = 10,
+        window: float = 60.0,
+        open_duration: float = 30.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """サーキットブレーカーを初期化します。
+
+        Args:
+            failure_rate_threshold: openにする失敗率（0〜1）
+            minimum_requests: 失敗率を判定するのに必要な直近の呼び出し数
+            window: 失敗率を計算する期間の秒数
+            open_duration: openにしてからhalf_openにするまでの秒数
+            half_open_max_calls: half_openの間に同時に通す試行の呼び出し数
+            clock: 現在時刻を返す関数（テスト用）
+        """
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_requests = minimum_requests
+        self.window = window
+        self.open_duration = open_duration
+        self.half_open_max_calls = half_open_max_calls
+        self.clock = clock
+        self._circuits: Dict[str, _Circuit] = {}
+        self._lock = threading.Lock()
+
+    def _circuit(self, path: str) -> _Circuit:
+        circuit = self._circuits.get(path)
+        if circuit is None:
+            circuit = self._circuits[path] = _Circuit()
+        return circuit
+
+    def _prune(self, circuit: _Circuit, now: float) -> None:
+        while circuit.outcomes and circuit.outcomes[0][0] <= now - self.window:
+            _, failed = circuit.outcomes.popleft()
+            circuit.failures -= failed
+
+    def check(self, endpoint: str) -> None:
+        """呼び出しの準備をする前に、呼び出せる状態かどうかを確認します。
+
+        before_callと異なり状態を変更せず、half_openの試行の枠も消費しません。
+        キャッシュのキーの計算(添付ファイルのハッシュ)などを省略するために使用します。
+
+        Args:
+            endpoint: メソッド名またはパス
+
+        Raises:
+            CircuitOpenError: openの場合、またはhalf_openで試行の枠がない場合
+        """
+        path = _resolve_path(endpoint)
+        now = self.clock()
+        with self._lock:
+            circuit = self._circuits.get(path)
+            if circuit is None:
+                return
+            if circuit.state == OPEN:
+                retry_after = circuit.opened_at + self.open_duration - now
+                if retry_after > 0:
+                    raise CircuitOpenError(
+                        f"Circuit is open: {path} (retry after {retry_after:.1f}s)",
+                        retry_after=retry_after,
+                    )
+            elif (
+                circuit.state == HALF_OPEN
+                and circuit.trials >= self.half_open_max_calls
+            ):
+                raise CircuitOpenError(f"Circuit is half-open: {path}", retry_after=0.0)
+
+    def before_call(self, endpoint: str) -> None:
+        """呼び出し前に状態を確認します。
+
+        通過した場合は、呼び出しの結果をrecord_success / record_failure /
+        record_ignoredのいずれかで必ず記録してください。
+
+        Args:
+            endpoint: メソッド名またはパス
+
+        Raises:
+            CircuitOpenError: openの場合、またはhalf_openで試行の枠がない場合
+        """
+        path = _resolve_path(endpoint)
+        now = self.clock()
+        with self._lock:
+            circuit = self._circuit(path)
+            if circuit.state == OPEN:
+                retry_after = circuit.opened_at + self.open_duration - now
+                if retry_after > 0:
+                    raise CircuitOpenError(
+                        f"Circuit is open: {path} (retry after {retry_after:.1f}s)",
+                        retry_after=retry_after,
+                    )
+                circuit.state = HALF_OPEN
+                circuit.trials = 0
+            if circuit.state == HALF_OPEN:
+                if circuit.trials >= self.half_open_max_calls:
+                    raise CircuitOpenError(
+                        f"Circuit is half-open: {path}", retry_after=0.0
+                    )
+                circuit.trials += 1
+
+    def record_success(self, endpoint: str) -> None:
+        """呼び出しの成功を記録します。
+
+        Args:
+            endpoint: メソッド名またはパス
+        """
+        path = _resolve_path(endpoint)
+        now = self.clock()
+        with self._lock:
+            circuit = self._circuit(path)
+            if circuit.state == HALF_OPEN:
+                # 試行が成功したため、過去の失敗を忘れて通常の状態に戻す
+                self._circuits[path] = circuit = _Circuit()
+            circuit.outcomes.append((now, False))
+            self._prune(circuit, now)
+
+    def record_failure(self, endpoint: str) -> None:
+        """呼び出しの失敗を記録します。
+
+        Args:
+            endpoint: メソッド名またはパス
+        """
+        path = _resolve_path(endpoint)
+        now = self.clock()
+        with self._lock:
+            circuit = self._circuit(path)
+            if circuit.state == HALF_OPEN:
+                circuit.state = OPEN
+                circuit.opened_at = now
+                return
+            circuit.outcomes.append((now, True))
+            circuit.failures += 1
+            self._prune(circuit, now)
+            requests = len(circuit.outcomes)
+            if (
+                circuit.state == CLOSED
+                and requests >= self.minimum_requests
+                and circuit.failures / requests >= self.failure_rate_threshold
+            ):
+                circuit.state = OPEN
+                circuit.opened_at = now
+
+    def record_ignored(self, endpoint: str) -> None:
+        """成功・失敗のどちらとも判定できない終了(キャンセルなど)を記録します。
+
+        half_openの場合は試行の枠を戻します。
+
+        Args:
+            endpoint: メソッド名またはパス
+        """
+        path = _resolve_path(endpoint)
+        with self._lock:
+            circuit = self._circuit(path)
+            if circuit.state == HALF_OPEN and circuit.trials > 0:
+                circuit.trials -= 1
+
+    def state(self, endpoint: str) -> str:
+        """エンドポイントの現在の状態を返します。
+
+        Args:
+            endpoint: メソッド名またはパス
+
+        Returns:
+            str: closed / open / half_open
+        """
+        return (
+            self.snapshot()
+            .get(
+                _resolve_path(endpoint),
+                CircuitSnapshot(CLOSED, 0, 0, 0.0, 0.0),
+            )
+            .state
+        )
+
+    def snapshot(self) -> Dict[str, CircuitSnapshot]:
+        """エンドポイントのパスごとの状態を返します。監視に使用します。
+
+        Returns:
+            Dict[str, CircuitSnapshot]: パスごとの状態
+        """
+        now = self.clock()
+        result: Dict[str, CircuitSnapshot] = {}
+        with self._lock:
+            for path, circuit in self._circuits.items():
+                self._prune(circuit, now)
+                requests = len(circuit.outcomes)
+                state = circuit.state
+                retry_after = 0.0
+                if state == OPEN:
+                    retry_after = max(0.0, circuit.opened_at + self.open_duration - now)
+                    if retry_after == 0:
+                        state = HALF_OPEN
+                result[path] = CircuitSnapshot(
+                    state=state,
+                    requests=requests,
+                    failures=circuit.failures,
+                    failure_rate=circuit.failures / requests if requests else 0.0,
+                    retry_after=retry_after,
+                )
+        return result
+
+    def reset(self, endpoint: str | None = None) -> None:
+        """状態を初期化し、closedに戻します。
+
+        Args:
+            endpoint: 初期化するメソッド名またはパス。Noneの場合は全てのエンドポイント
+        """
+        with self._lock:
+            if endpoint is None:
+                self._circuits.clear()
+            else:
+                self._circuits.pop(_resolve_path(endpoint), None)
@@ -10,6 +10,7 @@ import click
 from middleman_ai.client import Placeholder, Presentation, Slide, ToolsClient
 from middleman_ai.exceptions import MiddlemanBaseException
 from middleman_ai.models import CustomSize, MermaidToImageOptions
+from middleman_ai.template_cache import TemplateCache
 
 
 def get_base_url() -> str:
@@ -31,7 +32,13 @@ def get_client() -> ToolsClient:
     """Get client from environment variable."""
     base_url = get_base_url()
     api_key = get_api_key()
-    return ToolsClient(base_url=base_url, api_key=api_key)
+    template_cache = TemplateCache.from_env()
+    if template_cache is not None:
+        # 裏での再取得はデーモンスレッドで行われるため、終了する前に完了を待つ
+        click.get_current_context().call_on_close(template_cache.join)
+    return ToolsClient(
+        base_url=base_url, api_key=api_key, template_cache=template_cache
+    )
 
 
 @click.group()
@@ -179,10 +186,15 @@ def xlsx_to_page_images(xlsx_path: str) -> None:
 
 @cli.command()
 @click.argument("template_id")
-def json_to_pptx_analyze(template_id: str) -> None:
+@click.option(
+    "--refresh", is_flag=True, help="キャッシュされた解析結果を破棄して再取得します。"
+)
+def json_to_pptx_analyze(template_id: str, refresh: bool = False) -> None:
     """Analyze PPTX template."""
     try:
         client = get_client()
+        if refresh and client.template_cache is not None:
+            client.template_cache.invalidate(template_id)
         with click.progressbar(
             length=1, label="テンプレートを解析中...", show_eta=False
         ) as bar:
@@ -295,10 +307,17 @@ def mermaid_to_image(
 @cli.command()
 @click.argument("xlsx_template_id")
 @click.option("--sheet-name", help="解析対象のシート名（省略時は最初のシート）")
-def xlsx_to_pdf_analyze(xlsx_template_id: str, sheet_name: str | None = None) -> None:
+@click.option(
+    "--refresh", is_flag=True, help="キャッシュされた解析結果を破棄して再取得します。"
+)
+def xlsx_to_pdf_analyze(
+    xlsx_template_id: str, sheet_name: str | None = None, refresh: bool = False
+) -> None:
     """Analyze Excel template and show placeholders."""
     try:
         client = get_client()
+        if refresh and client.template_cache is not None:
+            client.template_cache.invalidate(xlsx_template_id)
         with click.progressbar(
             length=1, label="テンプレートを解析中...", show_eta=False
         ) as bar:
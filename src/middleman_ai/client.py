@@ -3,21 +3,53 @@
 import json
 import logging
 import os
-from typing import Any, Dict, List, cast
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
+from urllib.parse import unquote, urlsplit
 
 import requests
 from pydantic import BaseModel, Field
 from pydantic import ValidationError as PydanticValidationError
-
+from requests.adapters import BaseAdapter
+
+from .attachments import AttachmentBundle, _image_mime_type
+from .batch import BatchResult, ProgressCallback, run_batch
+from .cache import ENDPOINT_PATHS, ResultCache, account_scope, keyable
+from .cancellation import CancellableAdapter, abort_on_cancel, current_token
+from .circuit_breaker import CircuitBreaker
+from .coalesce import RequestCoalescer
+from .compression import GZIP_ENCODING, CompressionPolicy
+from .concurrency import AdaptiveConcurrency
+from .download import Destination, Downloader, DownloadResult
 from .exceptions import (
     BadRequestError,
+    CancelledError,
     ConnectionError,
+    DeadlineExceededError,
     ForbiddenError,
     InternalError,
+    MiddlemanBaseException,
     NotEnoughCreditError,
     NotFoundError,
     ValidationError,
 )
+from .hedge import HedgingPolicy, failed_response, hedged_call
+from .http2 import HTTP2Adapter
 from .models import (
     DocxToPageImagesResponse,
     JsonToPptxAnalyzeResponse,
@@ -32,8 +64,22 @@ from .models import (
     XlsxToPdfAnalyzeResponse,
     XlsxToPdfExecuteResponse,
 )
+from .multipart import (
+    FileData,
+    FileInput,
+    FilePart,
+    MultipartEncoder,
+    file_part,
+    input_name,
+)
+from .ratelimit import RateLimiter
+from .retry import IDEMPOTENCY_KEY_HEADER, RetryPolicy
+from .template_cache import ConditionalResponse, TemplateCache
+from .timeouts import TimeoutLike, deadline_exceeded, fits_deadline, requests_timeout
+from .transport import RequestsTransport, Transport
 
 # HTTPステータスコード
+HTTP_NOT_MODIFIED = 304
 HTTP_BAD_REQUEST = 400
 HTTP_PAYMENT_REQUIRED = 402
 HTTP_UNAUTHORIZED = 401
@@ -42,6 +88,139 @@ HTTP_NOT_FOUND = 404
 HTTP_UNPROCESSABLE_ENTITY = 422
 HTTP_INTERNAL_SERVER_ERROR = 500
 
+T = TypeVar("T")
+
+# アップロードするファイルのMIMEタイプ
+PDF_MIME_TYPE = "application/pdf"
+PPTX_MIME_TYPE = (
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+)
+DOCX_MIME_TYPE = (
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+)
+XLSX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# ステータスコードとSDKの例外の対応
+_STATUS_ERRORS: Dict[int, type[MiddlemanBaseException]] = {
+    HTTP_BAD_REQUEST: BadRequestError,
+    HTTP_PAYMENT_REQUIRED: NotEnoughCreditError,
+    HTTP_UNAUTHORIZED: ForbiddenError,
+    HTTP_FORBIDDEN: ForbiddenError,
+    HTTP_NOT_FOUND: NotFoundError,
+}
+
+
+def _error_for_status(
+    response: Any, error_body: Any, default_message: str
+) -> MiddlemanBaseException:
+    """エラーレスポンスのステータスコードに対応するSDKの例外を生成します。
+
+    同期（requests）・非同期（httpx）クライアントで共通のエラー変換処理です。
+
+    Args:
+        response: レスポンスオブジェクト（status_code, url, headers, textを持つもの）
+        error_body: レスポンスボディのJSON（パースできない場合は空）
+        default_message: 対応する例外がない場合のメッセージ
+
+    Returns:
+        MiddlemanBaseException: 発生させる例外
+    """
+    status_code = response.status_code
+    if status_code in _STATUS_ERRORS:
+        return _STATUS_ERRORS[status_code]()
+    if status_code >= HTTP_INTERNAL_SERVER_ERROR:
+        # サーバーエラーの詳細情報をログに出力
+        logging.error(
+            f"サーバーエラー発生: "
+            f"status_code={status_code}, "
+            f"url={response.url}, \n"
+            f"headers={response.headers}, \n"
+            f"body={error_body if error_body else response.text[:500]}"
+        )
+        return InternalError(
+            f"サーバーエラー: {error_body if error_body else response.text[:500]}"
+        )
+    if status_code == HTTP_UNPROCESSABLE_ENTITY:
+        return ValidationError(
+            f"Validation error: {error_body}" if error_body else default_message
+        )
+    return BadRequestError(default_message)
+
+
+# 画像の入力。バイト列などファイル名が分からない入力は(ファイル名, 中身)で指定する
+ImageInput = Union[FileInput, Tuple[str, FileData]]
+
+
+def _document_part(
+    name: str,
+    source: FileInput,
+    content_type: str,
+    filename: str | None,
+    extension: str,
+) -> FilePart:
+    """変換対象の文書を送信用のファイル情報に変換します。"""
+    filename = filename or input_name(source) or f"document{extension}"
+    return file_part(name, source, content_type, filename)
+
+
+def _image_parts(
+    image_paths: Sequence[ImageInput] | AttachmentBundle | None,
+) -> List[FilePart]:
+    """添付画像のリストを送信用のファイル情報に変換します。
+
+    Raises:
+        ValidationError: ファイル名が分からない入力がある場合
+    """
+    if isinstance(image_paths, AttachmentBundle):
+        return image_paths.parts("files")
+    parts = []
+    for image in image_paths or []:
+        filename, source = image if isinstance(image, tuple) else (None, image)
+        filename = filename or input_name(source)
+        if filename is None:
+            raise ValidationError(
+                "Image data without a file name must be given as (filename, data)"
+            )
+        parts.append(file_part("files", source, _image_mime_type(filename), filename))
+    return parts
+
+
+# 変換結果のファイルをダウンロードできるメソッド
+_DOWNLOADABLE_METHODS = (
+    "md_to_pdf",
+    "md_to_docx",
+    "pdf_to_page_images",
+    "pptx_to_page_images",
+    "docx_to_page_images",
+    "xlsx_to_page_images",
+    "json_to_pptx_execute_v2",
+    "mermaid_to_image",
+    "xlsx_to_pdf_execute",
+)
+
+
+def _url_filename(url: str) -> str:
+    """URLのパスからファイル名を取り出します。"""
+    return os.path.basename(unquote(urlsplit(url).path)) or "download"
+
+
+def _result_files(result: Any) -> List[Tuple[str, str]]:
+    """変換結果からダウンロードするURLと保存時のファイル名の一覧を取り出します。"""
+    if isinstance(result, XlsxToPdfExecuteResponse):
+        result = result.pdf_url
+    if isinstance(result, str):
+        return [(result, _url_filename(result))]
+    files = []
+    for page in result:
+        url = page["image_url"]
+        ext = os.path.splitext(_url_filename(url))[1] or ".png"
+        if "page_no" in page:
+            stem = f"page_{page['page_no']:04d}"
+        else:
+            stem = re.sub(r'[\\/:*?"<>|]', "_", page["sheet_name"])
+        files.append((url, stem + ext))
+    return files
+
 
 class Placeholder(BaseModel):
     name: str = Field(description="The key of the placeholder")
@@ -71,28 +250,299 @@ class Presentation(BaseModel):
 class ToolsClient:
     """Middleman.ai APIクライアント。"""
 
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         api_key: str,
         base_url: str = "https://middleman-ai.com/",
-        timeout: float = 30.0,
+        timeout: TimeoutLike = 30.0,
+        *,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        thread_safe: bool = False,
+        retry: RetryPolicy | None = None,
+        cache: ResultCache | None = None,
+        template_cache: TemplateCache | None = None,
+        rate_limiter: RateLimiter | None = None,
+        concurrency: AdaptiveConcurrency | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        hedging: HedgingPolicy | None = None,
+        coalescing: RequestCoalescer | None = None,
+        compression: CompressionPolicy | None = None,
+        http2: bool = False,
+        transport: Transport | None = None,
     ) -> None:
         """クライアントを初期化します。
 
         Args:
             api_key: Middleman.aiで発行されたAPIキー
             base_url: APIのベースURL
-            timeout: HTTP通信のタイムアウト秒数
+            timeout: HTTP通信のタイムアウト秒数、または接続・読み込み・書き込みの
+                タイムアウトを個別に指定するTimeout
+            pool_connections: ホストごとに保持するコネクションプールの数
+            pool_maxsize: 1ホストあたりに保持するコネクションの最大数。
+                同時に利用するスレッド数以上を指定してください
+            pool_block: Trueの場合、コネクションがpool_maxsize本使用中であれば
+                空きが出るまで待機し、同時接続数をpool_maxsize以下に制限します
+            thread_safe: Trueの場合、スレッドごとに別のSessionを使用します。
+                コネクションプールは全てのSessionで共有されます
+            retry: リトライポリシー。Noneの場合はリトライしません
+            cache: 変換結果のキャッシュ。Noneの場合はキャッシュしません
+            template_cache: テンプレート解析結果のキャッシュ。
+                Noneの場合はキャッシュしません
+            rate_limiter: エンドポイントごとのレートリミッター。
+                Noneの場合は送信ペースを制限しません
+            concurrency: レイテンシとスロットリングに応じて同時実行数を調整する制御。
+                Noneの場合は調整しません
+            circuit_breaker: エンドポイントごとのサーキットブレーカー。
+                Noneの場合は障害時も呼び出しを止めません
+            hedging: ヘッジリクエストのポリシー。Noneの場合はヘッジしません
+            coalescing: 同時に発生した同一のリクエストを1つにまとめる制御。
+                Noneの場合はまとめません
+            compression: 大きなリクエストボディのgzip圧縮のポリシー。
+                Noneの場合は圧縮しません
+            http2: Trueの場合、HTTP/2で多数の呼び出しを少数のコネクションに
+                多重化して送信します。サーバーが対応していない場合はHTTP/1.1で
+                送信します。h2パッケージが必要です（`pip install middleman-ai[http2]`）
+            transport: APIの呼び出しに使用する送信手段。Noneの場合は
+                ToolsClient.sessionで送信するRequestsTransportを使用します。
+                指定した場合、コネクションプールとhttp2の設定は使用されません
+
+        Raises:
+            ImportError: http2がTrueで、h2パッケージがインストールされていない場合
         """
         self.api_key = api_key
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
-        self.session = requests.Session()
-        self.session.headers.update(
-            {
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            }
+        self.thread_safe = thread_safe
+        self.retry = retry
+        self.cache = cache
+        self.template_cache = template_cache
+        self.rate_limiter = rate_limiter
+        self.concurrency = concurrency
+        self.circuit_breaker = circuit_breaker
+        self.hedging = hedging
+        self.coalescing = coalescing
+        self.compression = compression
+        # 全てのSessionで同じアダプター(=urllib3のコネクションプール)を共有する
+        self._adapter: BaseAdapter
+        if http2:
+            self._adapter = HTTP2Adapter(max_connections=pool_maxsize)
+        else:
+            self._adapter = CancellableAdapter(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block,
+            )
+        self._local = threading.local()
+        self._downloader: Downloader | None = None
+        self._pool_maxsize = pool_maxsize
+        self._hedge_executor: ThreadPoolExecutor | None = None
+        self._hedge_lock = threading.Lock()
+        self._session = self._create_session()
+        self.transport = transport or RequestsTransport(lambda: self.session)
+
+    def _create_session(self) -> requests.Session:
+        """認証ヘッダーと共有アダプターを設定したSessionを生成します。
+
+        Returns:
+            requests.Session: 生成したSession
+        """
+        session = requests.Session()
+        session.mount("https://", self._adapter)
+        session.mount("http://", self._adapter)
+        session.headers.update(self._headers())
+        return session
+
+    def _headers(self) -> Dict[str, str]:
+        """全てのリクエストに付けるヘッダーを返します。"""
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+
+    @property
+    def session(self) -> requests.Session:
+        """API呼び出しに使用するSession。
+
+        thread_safeが有効な場合は、呼び出し元のスレッド専用のSessionを返します。
+        """
+        if not self.thread_safe:
+            return self._session
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._create_session()
+            self._local.session = session
+        return cast(requests.Session, session)
+
+    @session.setter
+    def session(self, session: requests.Session) -> None:
+        if self.thread_safe:
+            self._local.session = session
+        else:
+            self._session = session
+
+    def close(self) -> None:
+        """コネクションプールとトランスポートを解放します。"""
+        self.transport.close()
+        self._session.close()
+        self._adapter.close()
+        if self._downloader is not None:
+            self._downloader.close()
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+
+    @property
+    def downloader(self) -> Downloader:
+        """変換結果のダウンロードに使用するDownloader。
+
+        APIキーを送信しないよう、API呼び出しとは別のセッションを使用します。
+        """
+        if self._downloader is None:
+            self._downloader = Downloader(timeout=self.timeout)
+        return self._downloader
+
+    @downloader.setter
+    def downloader(self, downloader: Downloader) -> None:
+        self._downloader = downloader
+
+    def download(self, url: str, destination: Destination) -> DownloadResult:
+        """変換結果のURLのファイルをダウンロードします。
+
+        Args:
+            url: 変換結果のURL
+            destination: 保存先のパス、またはwriteメソッドを持つオブジェクト
+
+        Returns:
+            DownloadResult: ダウンロード結果
+
+        Raises:
+            DownloadError: HTTPエラーやサイズの不一致が発生した場合
+            ConnectionError: 接続エラー
+        """
+        return self.downloader.download(url, destination)
+
+    def download_many(
+        self,
+        items: Iterable[Tuple[str, Destination]],
+        *,
+        max_concurrency: int | None = None,
+        ordered: bool = True,
+        progress: ProgressCallback | None = None,
+    ) -> Iterator[BatchResult[DownloadResult]]:
+        """複数の変換結果のURLを並列にダウンロードします。
+
+        Args:
+            items: (URL, 保存先) の組の一覧
+            max_concurrency: 同時にダウンロードするファイル数
+            ordered: Trueの場合は入力の順序で、Falseの場合は完了した順に返します
+            progress: 1件完了するごとに(完了件数, 全体の件数)で呼び出すコールバック
+
+        Returns:
+            Iterator[BatchResult[DownloadResult]]: 1件ごとの結果
+        """
+        return self.downloader.download_many(
+            items, max_concurrency=max_concurrency, ordered=ordered, progress=progress
+        )
+
+    def convert_and_download(
+        self, method: str, *args: Any, destination: str, **kwargs: Any
+    ) -> List[DownloadResult]:
+        """変換を実行し、結果のファイルをダウンロードします。
+
+        ```python
+        client.convert_and_download("md_to_pdf", "# Title", destination="out.pdf")
+        client.convert_and_download(
+            "pdf_to_page_images", "input.pdf", destination="pages/"
+        )
+        ```
+
+        Args:
+            method: 変換メソッドの名前（例: "md_to_pdf"）
+            *args: 変換メソッドに渡す位置引数
+            destination: 保存先のパス。ページ画像変換の場合や既存のディレクトリを
+                指定した場合は、ディレクトリ内にファイルを保存します
+            **kwargs: 変換メソッドに渡すキーワード引数
+
+        Returns:
+            List[DownloadResult]: ダウンロードしたファイルごとの結果
+
+        Raises:
+            ValueError: ファイルを生成しないメソッドを指定した場合
+            その他、変換メソッドとdownloadで定義される例外
+        """
+        if method not in _DOWNLOADABLE_METHODS:
+            raise ValueError(f"Method does not produce files: {method}")
+        files = _result_files(getattr(self, method)(*args, **kwargs))
+        if method.endswith("_page_images") or os.path.isdir(destination):
+            os.makedirs(destination, exist_ok=True)
+            targets = [(url, os.path.join(destination, name)) for url, name in files]
+        else:
+            targets = [(files[0][0], destination)]
+        return [result.unwrap() for result in self.download_many(targets)]
+
+    def __enter__(self) -> "ToolsClient":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def batch(  # noqa: PLR0913
+        self,
+        method: str | Callable[..., Any],
+        items: Iterable[Any],
+        *,
+        max_concurrency: int | None = None,
+        ordered: bool = True,
+        progress: ProgressCallback | None = None,
+        cancel: threading.Event | None = None,
+    ) -> Iterator[BatchResult[Any]]:
+        """同じメソッドを複数の入力に対して並列に呼び出します。
+
+        全ての呼び出しはこのクライアントのコネクションプールを共有します。
+        max_concurrencyがpool_maxsizeを超える場合は、コネクションが破棄されて
+        再接続が発生するため、pool_maxsizeも合わせて大きくしてください。
+        concurrencyを指定したクライアントでは、実際に同時に送信する数は
+        その時点の上限までに調整されます。
+
+        ```python
+        for result in client.batch("md_to_pdf", documents, max_concurrency=16):
+            print(result.index, result.value if result.ok else result.error)
+        ```
+
+        Args:
+            method: 呼び出すメソッドの名前（例: "md_to_pdf"）または関数
+            items: 入力。dictはキーワード引数、tupleは位置引数として展開し、
+                それ以外は1つ目の引数として渡します
+            max_concurrency: 同時に実行する最大数。省略時は8
+                （concurrencyを指定した場合はその上限の最大値）
+            ordered: Trueの場合は入力の順序で、Falseの場合は完了した順に返します
+            progress: 1件完了するごとに(完了件数, 全体の件数)で呼び出すコールバック
+            cancel: セットされると実行前の入力をCancelledErrorとして打ち切るイベント。
+                CancellationTokenを指定した場合は、実行中の呼び出しも中断します
+
+        Returns:
+            Iterator[BatchResult[Any]]: 1件ごとの結果。失敗した入力は例外をerrorに格納
+
+        Raises:
+            ValueError: 存在しないメソッド名を指定した場合
+        """
+        if isinstance(method, str):
+            if method not in ENDPOINT_PATHS:
+                raise ValueError(f"Unknown method: {method}")
+            fn: Callable[..., Any] = getattr(self, method)
+        else:
+            fn = method
+        if max_concurrency is None:
+            limiter = self.concurrency
+            max_concurrency = limiter.max_limit if limiter is not None else 8
+        return run_batch(
+            fn,
+            items,
+            max_concurrency=max_concurrency,
+            ordered=ordered,
+            progress=progress,
+            cancel=cancel,
         )
 
     def _handle_response(self, response: requests.Response) -> Dict[str, Any]:
@@ -121,52 +571,391 @@ class ToolsClient:
                 error_body = response.json()
             except json.JSONDecodeError:
                 pass
-
-            if response.status_code == HTTP_BAD_REQUEST:
-                raise BadRequestError() from e
-            if response.status_code == HTTP_PAYMENT_REQUIRED:
-                raise NotEnoughCreditError() from e
-            if response.status_code in (HTTP_UNAUTHORIZED, HTTP_FORBIDDEN):
-                raise ForbiddenError() from e
-            if response.status_code == HTTP_NOT_FOUND:
-                raise NotFoundError() from e
-            if response.status_code >= HTTP_INTERNAL_SERVER_ERROR:
-                # サーバーエラーの詳細情報をログに出力
-                logging.error(
-                    f"サーバーエラー発生: "
-                    f"status_code={response.status_code}, "
-                    f"url={response.url}, \n"
-                    f"headers={response.headers}, \n"
-                    f"body={error_body if error_body else response.text[:500]}"
-                )
-                error_message = (
-                    f"サーバーエラー: "
-                    f"{error_body if error_body else response.text[:500]}"
-                )
-                raise InternalError(error_message) from e
-            if response.status_code == HTTP_UNPROCESSABLE_ENTITY:
-                error_message = (
-                    f"Validation error: {error_body}" if error_body else str(e)
-                )
-                raise ValidationError(error_message) from e
-            raise BadRequestError(str(e)) from e
+            raise _error_for_status(response, error_body, str(e)) from e
         except requests.exceptions.RequestException as e:
             raise ConnectionError() from e
         except json.JSONDecodeError as e:
             raise ValidationError("Invalid JSON response") from e
 
+    def _post(self, url: str, **kwargs: Any) -> requests.Response:
+        """トランスポートでPOSTリクエストを1回送信します。
+
+        concurrencyが指定されている場合は、同時実行数の枠を確保してから送信し、
+        結果を上限の調整に反映します。タイムアウトは期限までの残り時間に切り詰めます。
+
+        Raises:
+            DeadlineExceededError: 期限を過ぎた場合
+            ConnectionError: 接続エラー
+        """
+        body = kwargs.get("data")
+        upload = 0
+        if isinstance(body, MultipartEncoder):
+            upload = body.size or 0
+            if body.size is None:
+                # サイズが分からない入力はチャンク形式で送信する
+                kwargs = {**kwargs, "data": iter(body)}
+        elif isinstance(body, bytes):
+            upload = len(body)
+        limiter = self.concurrency
+        started = limiter.acquire() if limiter is not None else 0.0
+        try:
+            timeout = requests_timeout(self.timeout, upload)
+            with abort_on_cancel():
+                response = self.transport.post(
+                    url,
+                    headers={**self._headers(), **kwargs.get("headers", {})},
+                    timeout=timeout,
+                    json=kwargs.get("json"),
+                    data=kwargs.get("data"),
+                )
+        except BaseException as e:
+            if limiter is not None:
+                # 呼び出し元の期限で短くなったタイムアウトは、過負荷として数えない
+                limiter.release(started, error=None if deadline_exceeded() else e)
+            if isinstance(e, requests.exceptions.RequestException):
+                if deadline_exceeded():
+                    raise DeadlineExceededError() from e
+                raise ConnectionError() from e
+            raise
+        if limiter is not None:
+            limiter.release(
+                started, status=response.status_code, headers=response.headers
+            )
+        return response
+
+    def _send(self, path: str, **kwargs: Any) -> Dict[str, Any]:
+        """APIを呼び出します。キャッシュにヒットした場合は通信せずに結果を返します。
+
+        coalescingが指定されている場合は、同じ内容の実行中の呼び出しと結果を共有します。
+
+        Args:
+            path: APIのパス（例: /api/v1/tools/md-to-docx）
+            **kwargs: Transport.postに渡す引数（json・data・headers）
+
+        Returns:
+            Dict[str, Any]: レスポンスのJSONデータ
+
+        Raises:
+            CircuitOpenError: サーキットがopenの場合
+            OSError: 添付ファイルが読み込めない場合
+            ConnectionError: 接続エラー
+            その他、_handle_responseで定義される例外
+        """
+        if self.circuit_breaker is not None:
+            # openの間は、キーの計算で添付ファイルを読む前に失敗させる
+            self.circuit_breaker.check(path)
+        coalescer = self.coalescing
+        if coalescer is None or not coalescer.applies_to(path):
+            return self._send_cached(path, **kwargs)
+        return coalescer.do(
+            path,
+            kwargs.get("json"),
+            kwargs.get("data"),
+            lambda: self._send_cached(path, **kwargs),
+            account_scope(self.base_url, self.api_key),
+        )
+
+    def _send_cached(self, path: str, **kwargs: Any) -> Dict[str, Any]:
+        """キャッシュを確認してからAPIを呼び出します。"""
+        cache = self.cache
+        body = kwargs.get("data")
+        if cache is None or cache.ttl_for(path) <= 0 or not keyable(body):
+            return self._send_with_retry(path, **kwargs)
+        key = cache.key(
+            path,
+            kwargs.get("json"),
+            kwargs.get("data"),
+            account_scope(self.base_url, self.api_key),
+        )
+        data = cache.get(key)
+        if data is None:
+            data = self._send_with_retry(path, **kwargs)
+            cache.set(key, path, data)
+        return data
+
+    def _compress(self, path: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """compressionの対象であれば、ボディをgzipで圧縮する送信引数を返します。
+
+        リトライではマルチパートボディをresetしてから呼び出すため、
+        送信のたびに圧縮し直します。
+        """
+        policy = self.compression
+        if policy is None or not policy.applies_to(path):
+            return kwargs
+        headers = {**kwargs.get("headers", {}), "Content-Encoding": GZIP_ENCODING}
+        if kwargs.get("json") is not None:
+            data = policy.compress_json(kwargs["json"])
+            if data is None:
+                return kwargs
+            rest = {k: v for k, v in kwargs.items() if k != "json"}
+            headers["Content-Type"] = "application/json"
+            return {**rest, "data": data, "headers": headers}
+        body = kwargs.get("data")
+        if isinstance(body, MultipartEncoder):
+            stream = policy.compress_form(body)
+            if stream is not None:
+                return {**kwargs, "data": stream, "headers": headers}
+        return kwargs
+
+    def _post_hedged(self, path: str, url: str, **kwargs: Any) -> requests.Response:
+        """ヘッジの対象のJSONエンドポイントであれば、ヘッジしながら送信します。
+
+        5xxなどリトライ対象の応答はもう一方の応答を待ち、負けた方のリクエストは中断します。
+
+        Raises:
+            ConnectionError: 接続エラー
+        """
+        policy = self.hedging
+        hedge = policy is not None and "json" in kwargs and policy.applies_to(path)
+        kwargs = self._compress(path, kwargs)
+        if policy is None or not hedge:
+            return self._post(url, **kwargs)
+        with self._hedge_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(
+                    max_workers=self._pool_maxsize * 2,
+                    thread_name_prefix="middleman-hedge",
+                )
+            executor = self._hedge_executor
+        return hedged_call(
+            policy,
+            path,
+            executor,
+            lambda: self._post(url, **kwargs),
+            lambda response: response.close(),
+            failed_response(self.retry),
+        )
+
+    def _attempt(self, path: str, url: str, **kwargs: Any) -> requests.Response:
+        """リクエストを1回送信します。
+
+        サーキットブレーカーの確認とレートリミッターの待機を行ってから送信し、
+        結果をサーキットブレーカーに記録します。
+
+        Raises:
+            CircuitOpenError: サーキットがopenの場合
+            ConnectionError: 接続エラー
+        """
+        breaker = self.circuit_breaker
+        if breaker is not None:
+            breaker.before_call(path)
+        try:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(path)
+            response = self._post_hedged(path, url, **kwargs)
+        except (DeadlineExceededError, CancelledError):
+            # 呼び出し側の都合による中断は、APIの障害として数えない
+            if breaker is not None:
+                breaker.record_ignored(path)
+            raise
+        except ConnectionError:
+            if breaker is not None:
+                breaker.record_failure(path)
+            raise
+        except BaseException:
+            if breaker is not None:
+                breaker.record_ignored(path)
+            raise
+        if breaker is not None:
+            if response.status_code >= HTTP_INTERNAL_SERVER_ERROR:
+                breaker.record_failure(path)
+            else:
+                breaker.record_success(path)
+        return response
+
+    def _send_with_retry(self, path: str, **kwargs: Any) -> Dict[str, Any]:
+        """APIを呼び出し、リトライポリシーに従って必要に応じて再送します。
+
+        Args:
+            path: APIのパス（例: /api/v1/tools/md-to-docx）
+            **kwargs: Transport.postに渡す引数（json・data・headers）
+
+        Returns:
+            Dict[str, Any]: レスポンスのJSONデータ
+
+        Raises:
+            DeadlineExceededError: 期限を過ぎた場合
+            ConnectionError: 接続エラー
+            その他、_handle_responseで定義される例外
+        """
+        return self._handle_response(self._respond_with_retry(path, **kwargs))
+
+    def _respond_with_retry(self, path: str, **kwargs: Any) -> requests.Response:
+        """APIを呼び出し、リトライポリシーに従って再送した最後のレスポンスを返します。
+
+        Args:
+            path: APIのパス（例: /api/v1/tools/md-to-docx）
+            **kwargs: Transport.postに渡す引数（json・data・headers）
+
+        Returns:
+            requests.Response: 最後のレスポンス
+
+        Raises:
+            DeadlineExceededError: 期限を過ぎた場合
+            ConnectionError: 接続エラー
+        """
+        url = f"{self.base_url}{path}"
+        policy = self.retry
+        body = kwargs.get("data")
+        if policy is None or (
+            isinstance(body, MultipartEncoder) and not body.replayable
+        ):
+            # イテレーターなどの送り直せない入力はリトライしない
+            return self._attempt(path, url, **kwargs)
+
+        if policy.idempotency_key:
+            # リトライしても同じ操作として扱われるよう、全試行で同じキーを送る
+            kwargs["headers"] = {
+                **kwargs.get("headers", {}),
+                IDEMPOTENCY_KEY_HEADER: policy.new_idempotency_key(),
+            }
+        attempt = 1
+        while True:
+            try:
+                response = self._attempt(path, url, **kwargs)
+            except ConnectionError as e:
+                if not policy.is_retryable_exception(e.__cause__):
+                    raise
+                delay = policy.delay(attempt)
+                if delay is None or not fits_deadline(delay):
+                    raise
+                reason = repr(e.__cause__)
+            else:
+                if not policy.is_retryable_status(response.status_code):
+                    return response
+                delay = policy.delay(attempt, response.headers.get("Retry-After"))
+                if delay is None or not fits_deadline(delay):
+                    # 待機すると期限に間に合わない場合は、このレスポンスで打ち切る
+                    return response
+                reason = f"status_code={response.status_code}"
+                response.close()
+            logging.info(
+                f"リトライします: url={url}, attempt={attempt}, "
+                f"reason={reason}, delay={delay:.2f}s"
+            )
+            token = current_token()
+            if token is None:
+                time.sleep(delay)
+            elif token.wait(delay):
+                # 待機中にキャンセルされた
+                raise CancelledError()
+            attempt += 1
+            if isinstance(body, MultipartEncoder):
+                # アップロードはファイルの先頭から送り直す
+                body.reset()
+
+    def _analyze(
+        self,
+        path: str,
+        template_id: str,
+        payload: Dict[str, Any],
+        parse: Callable[[Dict[str, Any]], T],
+    ) -> T:
+        """テンプレート解析APIを呼び出し、結果をモデルに変換します。
+
+        template_cacheが指定されている場合は、キャッシュされた結果を返します。
+        template_cacheのrevalidateが有効な場合は、条件付きのリクエストで再取得します。
+
+        Args:
+            path: APIのパス
+            template_id: 解析するテンプレートID
+            payload: リクエストボディ
+            parse: レスポンスのJSONデータをモデルに変換する関数
+
+        Returns:
+            T: parseが返すモデル
+        """
+        cache = self.template_cache
+        if cache is None:
+            return parse(self._post_json(path, payload))
+        key = json.dumps(
+            [account_scope(self.base_url, self.api_key), path, payload], sort_keys=True
+        )
+        if cache.revalidate:
+            return cache.get_or_revalidate(
+                template_id,
+                key,
+                lambda headers: self._post_conditional(path, payload, headers),
+                parse,
+            )
+        return parse(
+            cache.get_or_load(template_id, key, lambda: self._post_json(path, payload))
+        )
+
+    def _post_conditional(
+        self, path: str, payload: Dict[str, Any], headers: Dict[str, str]
+    ) -> ConditionalResponse:
+        """条件付きのリクエストヘッダーを付けてJSONボディでAPIを呼び出します。
+
+        Args:
+            path: APIのパス
+            payload: リクエストボディ
+            headers: If-None-Match / If-Modified-Sinceヘッダー
+
+        Returns:
+            ConditionalResponse: レスポンスのJSONデータとETag / Last-Modified。
+                304 Not Modifiedの場合、dataはNone
+
+        Raises:
+            ConnectionError: 接続エラー
+            その他、_handle_responseで定義される例外
+        """
+        response = self._respond_with_retry(path, json=payload, headers=headers)
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code == HTTP_NOT_MODIFIED:
+            response.close()
+            return ConditionalResponse(None, etag, last_modified)
+        return ConditionalResponse(self._handle_response(response), etag, last_modified)
+
+    def _post_json(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """JSONボディでAPIを呼び出し、レスポンスのJSONデータを返します。
+
+        Args:
+            path: APIのパス（例: /api/v1/tools/md-to-docx）
+            payload: リクエストボディ
+
+        Returns:
+            Dict[str, Any]: レスポンスのJSONデータ
+
+        Raises:
+            ConnectionError: 接続エラー
+            その他、_handle_responseで定義される例外
+        """
+        return self._send(path, json=payload)
+
+    def _post_form(self, path: str, body: MultipartEncoder) -> Dict[str, Any]:
+        """マルチパートフォームでAPIを呼び出し、レスポンスのJSONデータを返します。
+
+        JSONの呼び出しと同じセッションを使うことで、コネクションプールを共有します。
+        ボディはファイルから読み出しながら送信し、全体をメモリに載せません。
+
+        Args:
+            path: APIのパス（例: /api/v1/tools/pdf-to-page-images）
+            body: 送信するマルチパートボディ
+
+        Returns:
+            Dict[str, Any]: レスポンスのJSONデータ
+
+        Raises:
+            ConnectionError: 接続エラー
+            その他、_handle_responseで定義される例外
+        """
+        return self._send(path, data=body, headers={"Content-Type": body.content_type})
+
     def md_to_pdf(
         self,
         markdown_text: str,
         pdf_template_id: str | None = None,
-        image_paths: List[str] | None = None,
+        image_paths: Sequence[ImageInput] | AttachmentBundle | None = None,
     ) -> str:
         """Markdown文字列をPDFに変換し、PDFのダウンロードURLを返します。
 
         Args:
             markdown_text: 変換対象のMarkdown文字列
             pdf_template_id: テンプレートID(UUID)
-            image_paths: ローカル画像ファイルパスのリスト（Markdown内で参照可能）
+            image_paths: Markdown内で参照する画像のリスト（パス、ファイルオブジェクト、
+                (ファイル名, 中身)）、またはAttachmentBundle
 
         Returns:
             str: 生成されたPDFのURL
@@ -176,51 +965,22 @@ class ToolsClient:
             その他、_handle_responseで定義される例外
         """
         try:
-            files: List[tuple[str, tuple[str, bytes, str]]] = []
-            if image_paths:
-                for path in image_paths:
-                    with open(path, "rb") as f:
-                        filename = os.path.basename(path)
-                        content = f.read()
-                        mime_type = self._get_image_mime_type(filename)
-                        files.append(("files", (filename, content, mime_type)))
-
-            data: Dict[str, Any] = {"markdown": markdown_text}
+            fields = {"markdown": markdown_text}
             if pdf_template_id:
-                data["pdf_template_id"] = pdf_template_id
-
-            headers = dict(self.session.headers)
-            del headers["Content-Type"]
+                fields["pdf_template_id"] = pdf_template_id
 
-            response = requests.post(
-                f"{self.base_url}/api/v1/tools/md-to-pdf/form",
-                data=data,
-                files=files if files else None,
-                headers=headers,
-                timeout=self.timeout,
-            )
-            result_data = self._handle_response(response)
+            with MultipartEncoder(fields, _image_parts(image_paths)) as body:
+                result_data = self._post_form("/api/v1/tools/md-to-pdf/form", body)
             result = MdToPdfResponse.model_validate(result_data)
             return result.pdf_url
         except PydanticValidationError as e:
             raise ValidationError(str(e)) from e
-        except requests.exceptions.RequestException as e:
-            raise ConnectionError() from e
         except OSError as e:
             raise ValidationError(f"Failed to read image file: {e}") from e
 
     def _get_image_mime_type(self, filename: str) -> str:
         """ファイル名から画像のMIMEタイプを推測"""
-        ext = filename.lower().split(".")[-1]
-        mime_types = {
-            "png": "image/png",
-            "jpg": "image/jpeg",
-            "jpeg": "image/jpeg",
-            "gif": "image/gif",
-            "webp": "image/webp",
-            "svg": "image/svg+xml",
-        }
-        return mime_types.get(ext, "application/octet-stream")
+        return _image_mime_type(filename)
 
     def md_to_docx(
         self,
@@ -241,25 +1001,27 @@ class ToolsClient:
             その他、_handle_responseで定義される例外
         """
         try:
-            response = self.session.post(
-                f"{self.base_url}/api/v1/tools/md-to-docx",
-                json={
+            data = self._post_json(
+                "/api/v1/tools/md-to-docx",
+                {
                     "markdown": markdown_text,
                     "docx_template_id": docx_template_id,
                 },
-                timeout=self.timeout,
             )
-            data = self._handle_response(response)
             result = MdToDocxResponse.model_validate(data)
             return result.docx_url
         except PydanticValidationError as e:
             raise ValidationError(str(e)) from e
 
-    def pdf_to_page_images(self, pdf_file_path: str) -> List[Dict[str, Any]]:
+    def pdf_to_page_images(
+        self, pdf_file_path: FileInput, filename: str | None = None
+    ) -> List[Dict[str, Any]]:
         """PDFファイルをアップロードしてページごとに画像化し、それぞれの画像URLを返します。
 
         Args:
-            pdf_file_path: ローカルのPDFファイルパス
+            pdf_file_path: ローカルのPDFファイルパス、またはバイト列・memoryview・
+                バイナリのファイルオブジェクト・チャンクのイテレーター
+            filename: 送信するファイル名（省略時はパスなどから推測）
             request_id: 任意のリクエストID
 
         Returns:
@@ -270,34 +1032,30 @@ class ToolsClient:
             その他、_handle_responseで定義される例外
         """
         try:
-            with open(pdf_file_path, "rb") as f:
-                files = {"pdf_file": (f.name, f.read(), "application/pdf")}
-                headers = dict(self.session.headers)
-                del headers["Content-Type"]
-                # sessionを共有するとContent-Typeがapplicatoin/jsonになるので
-                # マルチパートの送信を可能にするために直接requestsを使用
-                response = requests.post(
-                    f"{self.base_url}/api/v1/tools/pdf-to-page-images",
-                    files=files,
-                    headers=headers,
-                    timeout=self.timeout,
-                )
-                data = self._handle_response(response)
-                result = PdfToPageImagesResponse.model_validate(data)
-                return [
-                    {"page_no": page.page_no, "image_url": page.image_url}
-                    for page in result.pages
-                ]
+            part = _document_part(
+                "pdf_file", pdf_file_path, PDF_MIME_TYPE, filename, ".pdf"
+            )
+            with MultipartEncoder(files=[part]) as body:
+                data = self._post_form("/api/v1/tools/pdf-to-page-images", body)
+            result = PdfToPageImagesResponse.model_validate(data)
+            return [
+                {"page_no": page.page_no, "image_url": page.image_url}
+                for page in result.pages
+            ]
         except PydanticValidationError as e:
             raise ValidationError(str(e)) from e
         except OSError as e:
             raise ValidationError(f"Failed to read PDF file: {e}") from e
 
-    def pptx_to_page_images(self, pptx_file_path: str) -> List[Dict[str, Any]]:
+    def pptx_to_page_images(
+        self, pptx_file_path: FileInput, filename: str | None = None
+    ) -> List[Dict[str, Any]]:
         """PPTXファイルをアップロードしてスライドごとに画像化し、それぞれの画像URLを返します。
 
         Args:
-            pptx_file_path: ローカルのPPTXファイルパス
+            pptx_file_path: ローカルのPPTXファイルパス、またはバイト列・memoryview・
+                バイナリのファイルオブジェクト・チャンクのイテレーター
+            filename: 送信するファイル名（省略時はパスなどから推測）
 
         Returns:
             List[Dict[str, Any]]: [{"page_no": int, "image_url": str}, ...]
@@ -307,40 +1065,30 @@ class ToolsClient:
             その他、_handle_responseで定義される例外
         """
         try:
-            with open(pptx_file_path, "rb") as f:
-                files = {
-                    "pptx_file": (
-                        f.name,
-                        f.read(),
-                        "application/vnd.openxmlformats-officedocument.presentationml.presentation",
-                    )
-                }
-                headers = dict(self.session.headers)
-                del headers["Content-Type"]
-                # sessionを共有するとContent-Typeがapplicatoin/jsonになるので
-                # マルチパートの送信を可能にするために直接requestsを使用
-                response = requests.post(
-                    f"{self.base_url}/api/v1/tools/pptx-to-page-images",
-                    files=files,
-                    headers=headers,
-                    timeout=self.timeout,
-                )
-                data = self._handle_response(response)
-                result = PptxToPageImagesResponse.model_validate(data)
-                return [
-                    {"page_no": page.page_no, "image_url": page.image_url}
-                    for page in result.pages
-                ]
+            part = _document_part(
+                "pptx_file", pptx_file_path, PPTX_MIME_TYPE, filename, ".pptx"
+            )
+            with MultipartEncoder(files=[part]) as body:
+                data = self._post_form("/api/v1/tools/pptx-to-page-images", body)
+            result = PptxToPageImagesResponse.model_validate(data)
+            return [
+                {"page_no": page.page_no, "image_url": page.image_url}
+                for page in result.pages
+            ]
         except PydanticValidationError as e:
             raise ValidationError(str(e)) from e
         except OSError as e:
             raise ValidationError(f"Failed to read PPTX file: {e}") from e
 
-    def docx_to_page_images(self, docx_file_path: str) -> List[Dict[str, Any]]:
+    def docx_to_page_images(
+        self, docx_file_path: FileInput, filename: str | None = None
+    ) -> List[Dict[str, Any]]:
         """DOCXファイルをアップロードしてページごとに画像化し、それぞれの画像URLを返します。
 
         Args:
-            docx_file_path: ローカルのDOCXファイルパス
+            docx_file_path: ローカルのDOCXファイルパス、またはバイト列・memoryview・
+                バイナリのファイルオブジェクト・チャンクのイテレーター
+            filename: 送信するファイル名（省略時はパスなどから推測）
 
         Returns:
             List[Dict[str, Any]]: [{"page_no": int, "image_url": str}, ...]
@@ -350,40 +1098,30 @@ class ToolsClient:
             その他、_handle_responseで定義される例外
         """
         try:
-            with open(docx_file_path, "rb") as f:
-                files = {
-                    "docx_file": (
-                        f.name,
-                        f.read(),
-                        "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                    )
-                }
-                headers = dict(self.session.headers)
-                del headers["Content-Type"]
-                # sessionを共有するとContent-Typeがapplicatoin/jsonになるので
-                # マルチパートの送信を可能にするために直接requestsを使用
-                response = requests.post(
-                    f"{self.base_url}/api/v1/tools/docx-to-page-images",
-                    files=files,
-                    headers=headers,
-                    timeout=self.timeout,
-                )
-                data = self._handle_response(response)
-                result = DocxToPageImagesResponse.model_validate(data)
-                return [
-                    {"page_no": page.page_no, "image_url": page.image_url}
-                    for page in result.pages
-                ]
+            part = _document_part(
+                "docx_file", docx_file_path, DOCX_MIME_TYPE, filename, ".docx"
+            )
+            with MultipartEncoder(files=[part]) as body:
+                data = self._post_form("/api/v1/tools/docx-to-page-images", body)
+            result = DocxToPageImagesResponse.model_validate(data)
+            return [
+                {"page_no": page.page_no, "image_url": page.image_url}
+                for page in result.pages
+            ]
         except PydanticValidationError as e:
             raise ValidationError(str(e)) from e
         except OSError as e:
             raise ValidationError(f"Failed to read DOCX file: {e}") from e
 
-    def xlsx_to_page_images(self, xlsx_file_path: str) -> List[Dict[str, Any]]:
+    def xlsx_to_page_images(
+        self, xlsx_file_path: FileInput, filename: str | None = None
+    ) -> List[Dict[str, Any]]:
         """XLSXファイルをアップロードしてページごとに画像化し、それぞれの画像URLを返します。
 
         Args:
-            xlsx_file_path: ローカルのXLSXファイルパス
+            xlsx_file_path: ローカルのXLSXファイルパス、またはバイト列・memoryview・
+                バイナリのファイルオブジェクト・チャンクのイテレーター
+            filename: 送信するファイル名（省略時はパスなどから推測）
 
         Returns:
             List[Dict[str, Any]]: [{"page_no": int, "image_url": str}, ...]
@@ -393,30 +1131,16 @@ class ToolsClient:
             その他、_handle_responseで定義される例外
         """
         try:
-            with open(xlsx_file_path, "rb") as f:
-                files = {
-                    "xlsx_file": (
-                        f.name,
-                        f.read(),
-                        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    )
-                }
-                headers = dict(self.session.headers)
-                del headers["Content-Type"]
-                # sessionを共有するとContent-Typeがapplicatoin/jsonになるので
-                # マルチパートの送信を可能にするために直接requestsを使用
-                response = requests.post(
-                    f"{self.base_url}/api/v1/tools/xlsx-to-page-images",
-                    files=files,
-                    headers=headers,
-                    timeout=self.timeout,
-                )
-                data = self._handle_response(response)
-                result = XlsxToPageImagesResponse.model_validate(data)
-                return [
-                    {"sheet_name": page.sheet_name, "image_url": page.image_url}
-                    for page in result.pages
-                ]
+            part = _document_part(
+                "xlsx_file", xlsx_file_path, XLSX_MIME_TYPE, filename, ".xlsx"
+            )
+            with MultipartEncoder(files=[part]) as body:
+                data = self._post_form("/api/v1/tools/xlsx-to-page-images", body)
+            result = XlsxToPageImagesResponse.model_validate(data)
+            return [
+                {"sheet_name": page.sheet_name, "image_url": page.image_url}
+                for page in result.pages
+            ]
         except PydanticValidationError as e:
             raise ValidationError(str(e)) from e
         except OSError as e:
@@ -436,13 +1160,12 @@ class ToolsClient:
             その他、_handle_responseで定義される例外
         """
         try:
-            response = self.session.post(
-                f"{self.base_url}/api/v2/tools/json-to-pptx/analyze",
-                json={"pptx_template_id": pptx_template_id},
-                timeout=self.timeout,
+            result = self._analyze(
+                "/api/v2/tools/json-to-pptx/analyze",
+                pptx_template_id,
+                {"pptx_template_id": pptx_template_id},
+                JsonToPptxAnalyzeResponse.model_validate,
             )
-            data = self._handle_response(response)
-            result = JsonToPptxAnalyzeResponse.model_validate(data)
             return result.slides
         except PydanticValidationError as e:
             raise ValidationError(str(e)) from e
@@ -451,7 +1174,7 @@ class ToolsClient:
         self,
         pptx_template_id: str,
         presentation: Presentation,
-        image_paths: List[str] | None = None,
+        image_paths: Sequence[ImageInput] | AttachmentBundle | None = None,
     ) -> str:
         """テンプレートIDとプレゼンテーションを指定し、合成したPPTXを生成します。
 
@@ -473,8 +1196,8 @@ class ToolsClient:
                         ...
                     ]
                 }
-            image_paths: ローカル画像ファイルパスのリスト
-                （プレゼンテーション内で参照可能）
+            image_paths: プレゼンテーション内で参照する画像のリスト（パス、
+                ファイルオブジェクト、(ファイル名, 中身)）、またはAttachmentBundle
 
         Returns:
             str: 生成されたPPTXのダウンロードURL
@@ -484,37 +1207,19 @@ class ToolsClient:
             その他、_handle_responseで定義される例外
         """
         try:
-            files: List[tuple[str, tuple[str, bytes, str]]] = []
-            if image_paths:
-                for path in image_paths:
-                    with open(path, "rb") as f:
-                        filename = os.path.basename(path)
-                        content = f.read()
-                        mime_type = self._get_image_mime_type(filename)
-                        files.append(("files", (filename, content, mime_type)))
-
-            data: Dict[str, Any] = {
+            fields = {
                 "presentation_json": json.dumps(presentation.model_dump()),
                 "pptx_template_id": pptx_template_id,
             }
 
-            headers = dict(self.session.headers)
-            del headers["Content-Type"]
-
-            response = requests.post(
-                f"{self.base_url}/api/v2/tools/json-to-pptx/execute/form",
-                data=data,
-                files=files if files else None,
-                headers=headers,
-                timeout=self.timeout,
-            )
-            result_data = self._handle_response(response)
+            with MultipartEncoder(fields, _image_parts(image_paths)) as body:
+                result_data = self._post_form(
+                    "/api/v2/tools/json-to-pptx/execute/form", body
+                )
             result = JsonToPptxExecuteResponse.model_validate(result_data)
             return result.pptx_url
         except PydanticValidationError as e:
             raise ValidationError(str(e)) from e
-        except requests.exceptions.RequestException as e:
-            raise ConnectionError() from e
         except OSError as e:
             raise ValidationError(f"Failed to read image file: {e}") from e
 
@@ -546,18 +1251,14 @@ class ToolsClient:
                 if options_dict:  # 空でない場合のみ追加
                     request_data["options"] = options_dict
 
-            response = self.session.post(
-                f"{self.base_url}/api/v1/tools/mermaid-to-image",
-                json=request_data,
-                timeout=self.timeout,
+            data = self._post_json(
+                "/api/v1/tools/mermaid-to-image",
+                request_data,
             )
-            data = self._handle_response(response)
             result = MermaidToImageResponse.model_validate(data)
             return result.image_url
         except PydanticValidationError as e:
             raise ValidationError(str(e)) from e
-        except requests.exceptions.RequestException as e:
-            raise ConnectionError() from e
 
     def xlsx_to_pdf_analyze(
         self,
@@ -578,20 +1279,17 @@ class ToolsClient:
             その他、_handle_responseで定義される例外
         """
         try:
-            response = self.session.post(
-                f"{self.base_url}/api/v1/tools/xlsx-to-pdf-analyze",
-                json={
+            return self._analyze(
+                "/api/v1/tools/xlsx-to-pdf-analyze",
+                xlsx_template_id,
+                {
                     "xlsx_template_id": xlsx_template_id,
                     "sheet_name": sheet_name,
                 },
-                timeout=self.timeout,
+                XlsxToPdfAnalyzeResponse.model_validate,
             )
-            data = self._handle_response(response)
-            return XlsxToPdfAnalyzeResponse.model_validate(data)
         except PydanticValidationError as e:
             raise ValidationError(str(e)) from e
-        except requests.exceptions.RequestException as e:
-            raise ConnectionError() from e
 
     def xlsx_to_pdf_execute(
         self,
@@ -614,18 +1312,14 @@ class ToolsClient:
             その他、_handle_responseで定義される例外
         """
         try:
-            response = self.session.post(
-                f"{self.base_url}/api/v1/tools/xlsx-to-pdf-execute",
-                json={
+            data = self._post_json(
+                "/api/v1/tools/xlsx-to-pdf-execute",
+                {
                     "xlsx_template_id": xlsx_template_id,
                     "placeholders": placeholders,
                     "sheet_name": sheet_name,
                 },
-                timeout=self.timeout,
             )
-            data = self._handle_response(response)
             return XlsxToPdfExecuteResponse.model_validate(data)
         except PydanticValidationError as e:
             raise ValidationError(str(e)) from e
-        except requests.exceptions.RequestException as e:
-            raise ConnectionError() from e
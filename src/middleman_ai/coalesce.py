@@ -0,0 +1,266 @@
+"""同時に発生した同一のリクエストを1つにまとめる(single-flight)処理を定義するモジュール。
+
+同じエンドポイント・同じ内容の呼び出しが実行中の場合、後から来た呼び出しは
+新しくリクエストを送信せず、実行中のリクエストの結果(または例外)を受け取ります。
+人気のテンプレートのキャッシュが切れた瞬間に同じ解析リクエストが殺到するのを防ぎます。
+"""
+
+import asyncio
+import contextvars
+import copy
+import threading
+from dataclasses import dataclass, replace
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Tuple, cast
+
+from .cache import _resolve_path, keyable, request_key
+from .exceptions import CancelledError, DeadlineExceededError
+from .multipart import MultipartEncoder
+from .timeouts import remaining
+
+# デフォルトでまとめるエンドポイント
+DEFAULT_COALESCE_ENDPOINTS: FrozenSet[str] = frozenset(
+    {
+        "/api/v2/tools/json-to-pptx/analyze",
+        "/api/v1/tools/xlsx-to-pdf-analyze",
+        "/api/v1/tools/mermaid-to-image",
+    }
+)
+
+
+@dataclass
+class CoalesceStats:
+    """エンドポイントごとのリクエストをまとめた回数の統計。
+
+    Attributes:
+        calls: まとめる対象となった呼び出し数
+        shared: 実行中のリクエストの結果を受け取った(送信しなかった)呼び出し数
+    """
+
+    calls: int = 0
+    shared: int = 0
+
+    @property
+    def share_rate(self) -> float:
+        """呼び出しのうち、送信せずに済んだ割合。"""
+        return self.shared / self.calls if self.calls else 0.0
+
+
+class _Call:
+    """実行中のリクエスト。"""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Dict[str, Any] | None = None
+        self.error: BaseException | None = None
+        # 先頭の呼び出しが自身の期限切れやキャンセルで失敗した場合はTrue
+        self.abandoned = False
+
+
+class RequestCoalescer:
+    """同時に発生した同一のリクエストを1つにまとめる制御。
+
+    ToolsClient / AsyncToolsClientの`coalescing`引数に指定します。
+    同じ内容かどうかは、エンドポイントのパスと正規化したリクエストボディ
+    (JSONのキーの順序は問わない、添付ファイルは中身のハッシュ値)で判定します。
+    まとめた呼び出しは、結果のコピーまたは同じ例外を受け取ります。
+    ただし、リクエストを送信した呼び出しが自身の期限切れやキャンセルで失敗した場合は、
+    その例外を共有せず、待っていた呼び出しの1つが改めて送信します。
+    """
+
+    def __init__(
+        self, *, endpoints: FrozenSet[str] = DEFAULT_COALESCE_ENDPOINTS
+    ) -> None:
+        """制御を初期化します。
+
+        Args:
+            endpoints: まとめるエンドポイント（メソッド名またはパス）
+        """
+        self.endpoints = frozenset(_resolve_path(e) for e in endpoints)
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: Dict[
+            Tuple[asyncio.AbstractEventLoop, str], asyncio.Task[Dict[str, Any]]
+        ] = {}
+        # タスクごとの結果を待っている呼び出しの数
+        self._waiters: Dict[asyncio.Task[Dict[str, Any]], int] = {}
+        self._stats: Dict[str, CoalesceStats] = {}
+        self._lock = threading.Lock()
+
+    def applies_to(self, endpoint: str) -> bool:
+        """エンドポイントがまとめる対象かどうかを返します。
+
+        Args:
+            endpoint: メソッド名またはパス
+
+        Returns:
+            bool: まとめる対象であればTrue
+        """
+        return _resolve_path(endpoint) in self.endpoints
+
+    def _record(self, path: str, shared: bool) -> None:
+        stats = self._stats.setdefault(path, CoalesceStats())
+        stats.calls += 1
+        if shared:
+            stats.shared += 1
+
+    def do(
+        self,
+        path: str,
+        payload: Dict[str, Any] | None,
+        body: MultipartEncoder | None,
+        send: Callable[[], Dict[str, Any]],
+        scope: str = "",
+    ) -> Dict[str, Any]:
+        """同じ内容のリクエストが実行中であればその結果を待ち、なければ送信します。
+
+        Args:
+            path: エンドポイントのパス
+            payload: JSONボディ
+            body: マルチパートボディ
+            send: リクエストを送信してレスポンスのJSONデータを返す関数
+            scope: 接続先とアカウント(account_scopeの値)。異なる呼び出しはまとめません
+
+        Returns:
+            Dict[str, Any]: レスポンスのJSONデータ
+
+        Raises:
+            DeadlineExceededError: 結果を待つ間に期限を過ぎた場合
+            その他、sendが送出する例外
+        """
+        if not keyable(body):
+            # ストリームの入力は中身を比較できないため、まとめずに送信する
+            return send()
+        key = request_key(path, payload, body, scope)
+        arrived = False
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if call is None:
+                    call = self._calls[key] = _Call()
+                if not arrived:
+                    self._record(path, shared=not leader)
+                    arrived = True
+                elif leader:
+                    # 結果を受け取れずに自分で送信するため、共有した数から除く
+                    self._stats[path].shared -= 1
+            if leader:
+                break
+            if not call.done.wait(remaining()):
+                raise DeadlineExceededError()
+            if call.abandoned:
+                # 送信した呼び出しに固有の失敗は共有せず、改めて送信する
+                continue
+            if call.error is not None:
+                raise call.error
+            # 呼び出し元が結果を変更しても、他の呼び出しに影響しないようにする
+            return copy.deepcopy(cast(Dict[str, Any], call.result))
+        try:
+            call.result = send()
+            return call.result
+        except (DeadlineExceededError, CancelledError):
+            call.abandoned = True
+            raise
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(
+        self,
+        path: str,
+        payload: Dict[str, Any] | None,
+        body: MultipartEncoder | None,
+        send: Callable[[], Awaitable[Dict[str, Any]]],
+        scope: str = "",
+    ) -> Dict[str, Any]:
+        """doの非同期版です。
+
+        リクエストは呼び出し元とは別のタスクで、呼び出し元の期限やキャンセルを
+        引き継がない空のコンテキストで実行します。最初の呼び出し元が期限切れや
+        キャンセルで待つのをやめても、まとめた他の呼び出しは結果を受け取れます。
+        結果を待つ呼び出しがいなくなった場合は、リクエストを中断します。
+
+        Args:
+            path: エンドポイントのパス
+            payload: JSONボディ
+            body: マルチパートボディ
+            send: リクエストを送信してレスポンスのJSONデータを返すコルーチン関数
+            scope: 接続先とアカウント(account_scopeの値)
+
+        Returns:
+            Dict[str, Any]: レスポンスのJSONデータ
+
+        Raises:
+            DeadlineExceededError: 結果を待つ間に期限を過ぎた場合
+            その他、sendが送出する例外
+        """
+        if not keyable(body):
+            return await send()
+        if body is None:
+            key = request_key(path, payload, scope=scope)
+        else:
+            key = await asyncio.to_thread(request_key, path, payload, body, scope)
+        task_key = (asyncio.get_running_loop(), key)
+        arrived = False
+        while True:
+            with self._lock:
+                task = self._tasks.get(task_key)
+                # 待つ呼び出しがいなくなって中断されたタスクには相乗りしない
+                leader = task is None or task.cancelled()
+                if task is None or leader:
+                    task = self._tasks[task_key] = contextvars.Context().run(
+                        lambda: asyncio.ensure_future(send())
+                    )
+                    task.add_done_callback(lambda t: self._forget(task_key, t))
+                self._waiters[task] = self._waiters.get(task, 0) + 1
+                if not arrived:
+                    self._record(path, shared=not leader)
+                    arrived = True
+                elif leader:
+                    # 結果を受け取れずに自分で送信するため、共有した数から除く
+                    self._stats[path].shared -= 1
+            try:
+                result = await asyncio.wait_for(asyncio.shield(task), remaining())
+            except asyncio.TimeoutError:
+                raise DeadlineExceededError() from None
+            except (DeadlineExceededError, CancelledError):
+                if leader:
+                    raise
+                # 送信した呼び出しに固有の失敗は共有せず、改めて送信する
+                continue
+            finally:
+                self._leave(task)
+            return result if leader else copy.deepcopy(result)
+
+    def _leave(self, task: "asyncio.Task[Dict[str, Any]]") -> None:
+        with self._lock:
+            self._waiters[task] -= 1
+            if self._waiters[task] > 0:
+                return
+            del self._waiters[task]
+        if not task.done():
+            # 結果を待つ呼び出しがいないリクエストは続けても無駄なため中断する
+            task.cancel()
+
+    def _forget(
+        self,
+        task_key: Tuple[asyncio.AbstractEventLoop, str],
+        task: "asyncio.Task[Dict[str, Any]]",
+    ) -> None:
+        with self._lock:
+            self._tasks.pop(task_key, None)
+        if not task.cancelled():
+            # 待っている呼び出しがいなくても、例外が未取得と警告されないようにする
+            task.exception()
+
+    def stats(self) -> Dict[str, CoalesceStats]:
+        """エンドポイントのパスごとの統計を返します。
+
+        Returns:
+            Dict[str, CoalesceStats]: 統計のコピー
+        """
+        with self._lock:
+            return {path: replace(s) for path, s in self._stats.items()}
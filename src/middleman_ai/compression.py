@@ -0,0 +1,192 @@
+"""大きなリクエストボディをgzipで圧縮して送信するためのポリシーを定義するモジュール。
+
+Markdownの書籍やプレゼンテーションのJSON、大量のプレースホルダーなど、
+テキストのリクエストボディは圧縮すると大幅に小さくなります。JSONボディは
+しきい値以上のサイズの場合に、フォームはテキストフィールドの合計がしきい値以上の
+場合に、ボディ全体をgzipで圧縮して`Content-Encoding: gzip`を付けて送信します。
+フォームは送信しながら圧縮するため、チャンク形式で送信されます。
+"""
+
+import json
+import threading
+import zlib
+from dataclasses import dataclass, replace
+from typing import Any, FrozenSet, Iterator, Mapping
+
+from .cache import _resolve_path
+from .multipart import MultipartEncoder
+
+# 圧縮したボディに付けるContent-Encoding
+GZIP_ENCODING = "gzip"
+
+# デフォルトで圧縮するエンドポイント。大きなテキストを送信するもの
+DEFAULT_COMPRESS_ENDPOINTS: FrozenSet[str] = frozenset(
+    {
+        "/api/v1/tools/md-to-docx",
+        "/api/v1/tools/md-to-pdf/form",
+        "/api/v1/tools/xlsx-to-pdf-execute",
+        "/api/v2/tools/json-to-pptx/execute/form",
+    }
+)
+
+# gzip形式で出力するためのwbits
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+@dataclass
+class CompressionStats:
+    """リクエストの圧縮の統計。
+
+    Attributes:
+        requests: 圧縮して送信したリクエスト数
+        raw_bytes: 圧縮前のボディのバイト数
+        compressed_bytes: 圧縮後のボディのバイト数
+    """
+
+    requests: int = 0
+    raw_bytes: int = 0
+    compressed_bytes: int = 0
+
+    @property
+    def ratio(self) -> float:
+        """圧縮後のサイズの圧縮前に対する割合。"""
+        return self.compressed_bytes / self.raw_bytes if self.raw_bytes else 1.0
+
+
+class CompressionPolicy:
+    """リクエストボディのgzip圧縮のポリシー。
+
+    ToolsClient / AsyncToolsClientの`compression`引数に指定します。
+    サーバーが`Content-Encoding: gzip`のリクエストに対応している場合のみ
+    有効にしてください。
+    """
+
+    def __init__(
+        self,
+        *,
+        min_size: int = 16 * 1024,
+        level: int = 6,
+        endpoints: FrozenSet[str] = DEFAULT_COMPRESS_ENDPOINTS,
+    ) -> None:
+        """ポリシーを初期化します。
+
+        Args:
+            min_size: 圧縮するボディ（フォームの場合はテキストフィールドの合計）の
+                最小バイト数
+            level: gzipの圧縮レベル（1〜9）
+            endpoints: 圧縮するエンドポイントのパスまたはメソッド名
+        """
+        self.min_size = min_size
+        self.level = level
+        self.endpoints = frozenset(_resolve_path(e) for e in endpoints)
+        self._stats = CompressionStats()
+        self._lock = threading.Lock()
+
+    def applies_to(self, endpoint: str) -> bool:
+        """エンドポイントが圧縮の対象かどうかを返します。
+
+        Args:
+            endpoint: メソッド名またはパス
+
+        Returns:
+            bool: 圧縮の対象であればTrue
+        """
+        return _resolve_path(endpoint) in self.endpoints
+
+    def compress_json(self, payload: Mapping[str, Any]) -> bytes | None:
+        """JSONボディをシリアライズし、しきい値以上であれば圧縮します。
+
+        Args:
+            payload: JSONボディ
+
+        Returns:
+            bytes | None: 圧縮したボディ。しきい値未満の場合はNone
+        """
+        raw = json.dumps(
+            payload, ensure_ascii=False, separators=(",", ":"), allow_nan=False
+        ).encode("utf-8")
+        if len(raw) < self.min_size:
+            return None
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, _GZIP_WBITS)
+        compressed = compressor.compress(raw) + compressor.flush()
+        self._count(len(raw), len(compressed))
+        return compressed
+
+    def compress_form(self, body: MultipartEncoder) -> "GzipStream | None":
+        """テキストフィールドの合計がしきい値以上であれば、圧縮しながら読み出すボディを返します。
+
+        Args:
+            body: マルチパートボディ
+
+        Returns:
+            GzipStream | None: 圧縮しながら読み出すボディ。しきい値未満の場合はNone
+        """
+        text_size = sum(len(value.encode("utf-8")) for value in body.fields.values())
+        if text_size < self.min_size:
+            return None
+        return GzipStream(body, self)
+
+    def _count(self, raw: int, compressed: int, requests: int = 1) -> None:
+        with self._lock:
+            self._stats.requests += requests
+            self._stats.raw_bytes += raw
+            self._stats.compressed_bytes += compressed
+
+    def stats(self) -> CompressionStats:
+        """統計を返します。
+
+        Returns:
+            CompressionStats: 統計のコピー
+        """
+        with self._lock:
+            return replace(self._stats)
+
+
+class GzipStream:
+    """マルチパートボディを読み出しながらgzipで圧縮するボディ。
+
+    圧縮後のサイズは送信し終えるまで分からないため、チャンク形式で送信します。
+    送信のたびに新しく作成し、リトライ時は元のボディをresetしてから作り直します。
+    """
+
+    def __init__(self, body: MultipartEncoder, policy: CompressionPolicy) -> None:
+        self.body = body
+        self.policy = policy
+        self._compressor = zlib.compressobj(policy.level, zlib.DEFLATED, _GZIP_WBITS)
+        self._raw = 0
+        self._compressed = 0
+        self._finished = False
+
+    @property
+    def chunk_size(self) -> int:
+        """元のボディから1回に読み出すバイト数。"""
+        return self.body.chunk_size
+
+    def read(self, size: int = -1) -> bytes:
+        """圧縮したボディの続きを読み出します。
+
+        Args:
+            size: 元のボディから1回に読み出す最大バイト数
+                （負の値の場合はチャンクサイズ）
+
+        Returns:
+            bytes: 圧縮したデータ。末尾に達した場合は空のバイト列
+        """
+        if size < 0:
+            size = self.body.chunk_size
+        while not self._finished:
+            chunk = self.body.read(size)
+            if chunk:
+                self._raw += len(chunk)
+                data = self._compressor.compress(chunk)
+            else:
+                self._finished = True
+                data = self._compressor.flush()
+                self.policy._count(self._raw, self._compressed + len(data))
+            if data:
+                self._compressed += len(data)
+                return data
+        return b""
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self.read, b"")
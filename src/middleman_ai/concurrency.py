@@ -0,0 +1,312 @@
+"""レイテンシとスロットリングに応じて同時実行数を調整する制御を定義するモジュール。
+
+AIMD(加算増加・乗算減少)で同時に送信するリクエスト数の上限を調整します。
+レイテンシのp95が安定している間は上限を1ずつ増やし、
+429/5xx・タイムアウト・レイテンシの悪化を検知すると上限を一定の割合で減らします。
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, List, Mapping, Tuple
+
+import httpx
+import requests
+
+from .cancellation import current_token
+from .exceptions import DeadlineExceededError
+from .timeouts import remaining
+
+# 過負荷とみなすステータスコード
+DEFAULT_OVERLOAD_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# 過負荷とみなす例外 (タイムアウト)
+TIMEOUT_EXCEPTIONS: Tuple[type, ...] = (
+    requests.exceptions.Timeout,
+    httpx.TimeoutException,
+)
+
+# 残りのリクエスト数を表すレスポンスヘッダー
+RATE_LIMIT_REMAINING_HEADERS = ("RateLimit-Remaining", "X-RateLimit-Remaining")
+
+# p95を計算するのに必要な最小のサンプル数
+MIN_SAMPLES = 10
+
+# ベースラインのp95を現在のp95に近づける割合
+BASELINE_DRIFT = 0.1
+
+
+def _percentile(values: List[float], q: float) -> float:
+    """値の一覧のパーセンタイル(最近傍法)を返します。"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+
+@dataclass(frozen=True)
+class ConcurrencySnapshot:
+    """適応的な同時実行数の制御の状態。
+
+    Attributes:
+        limit: 現在の同時実行数の上限
+        in_flight: 実行中のリクエスト数
+        p95: 直近のレイテンシのp95秒数（サンプルが足りない場合はNone）
+        baseline: 基準とするレイテンシのp95秒数
+        increases: 上限を増やした回数
+        decreases: 上限を減らした回数
+    """
+
+    limit: int
+    in_flight: int
+    p95: float | None
+    baseline: float | None
+    increases: int
+    decreases: int
+
+
+class AdaptiveConcurrency:
+    """AIMDで同時実行数の上限を調整する制御。
+
+    ToolsClient / AsyncToolsClientの`concurrency`引数に指定します。
+    複数のスレッドやイベントループから同時に使用できます。
+
+    - 上限と同じ数のリクエストが成功するごとにレイテンシのp95を確認し、
+      基準の`latency_tolerance`倍以下であれば上限を1増やします
+    - p95が悪化した場合や、429/5xx・タイムアウトが発生した場合は
+      上限を`backoff`倍に減らします。減らす前に送信したリクエストの失敗では
+      続けて減らしません
+    - レスポンスのRateLimit-Remainingヘッダーが0の場合は、
+      429と同様に上限を`backoff`倍に減らします
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        *,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff: float = 0.5,
+        latency_tolerance: float = 1.5,
+        window: int = 100,
+        overload_statuses: frozenset[int] = DEFAULT_OVERLOAD_STATUSES,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """制御を初期化します。
+
+        Args:
+            initial: 同時実行数の上限の初期値
+            min_limit: 同時実行数の上限の最小値
+            max_limit: 同時実行数の上限の最大値
+            backoff: 過負荷を検知した場合に上限に掛ける割合
+            latency_tolerance: 基準のp95に対して許容するp95の倍率
+            window: p95の計算に使用する直近のサンプル数
+            overload_statuses: 過負荷とみなすステータスコード
+            clock: 現在時刻を返す関数（テスト用）
+
+        Raises:
+            ValueError: 上限の範囲や割合が不正な場合
+        """
+        if not 1 <= min_limit <= initial <= max_limit:
+            raise ValueError("min_limit <= initial <= max_limit must hold")
+        if not 0 < backoff < 1:
+            raise ValueError("backoff must be between 0 and 1")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.overload_statuses = overload_statuses
+        self.clock = clock
+        self._limit = float(initial)
+        self._in_flight = 0
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._since_adjust = 0
+        self._baseline: float | None = None
+        self._last_decrease = -math.inf
+        self._increases = 0
+        self._decreases = 0
+        self._cond = threading.Condition()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future[None]]] = []
+
+    @property
+    def limit(self) -> int:
+        """現在の同時実行数の上限。"""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """実行中のリクエスト数。"""
+        return self._in_flight
+
+    def snapshot(self) -> ConcurrencySnapshot:
+        """現在の状態を返します。
+
+        Returns:
+            ConcurrencySnapshot: 上限・実行中の数・レイテンシなどの状態
+        """
+        with self._cond:
+            latencies = list(self._latencies)
+            return ConcurrencySnapshot(
+                limit=self.limit,
+                in_flight=self._in_flight,
+                p95=(
+                    _percentile(latencies, 0.95)
+                    if len(latencies) >= MIN_SAMPLES
+                    else None
+                ),
+                baseline=self._baseline,
+                increases=self._increases,
+                decreases=self._decreases,
+            )
+
+    def acquire(self) -> float:
+        """実行中のリクエスト数が上限を下回るまで待機し、枠を確保します。
+
+        期限が設定されている場合は、期限までに枠を確保できなければ失敗します。
+        待機中にキャンセルトークンがキャンセルされた場合も失敗します。
+
+        Returns:
+            float: 確保した時刻。releaseに渡します
+
+        Raises:
+            DeadlineExceededError: 期限までに枠を確保できない場合
+            CancelledError: 待機中にキャンセルされた場合
+        """
+        token = current_token()
+        unregister: Callable[[], None] | None = None
+        with self._cond:
+            try:
+                while self._in_flight >= self.limit:
+                    if token is not None:
+                        if unregister is None:
+                            # キャンセルされたら待機中のスレッドを起こす
+                            unregister = token.add_callback(self._notify)
+                        token.raise_if_cancelled()
+                    left = remaining()
+                    if left is not None and left <= 0:
+                        raise DeadlineExceededError()
+                    self._cond.wait(left)
+            finally:
+                if unregister is not None:
+                    unregister()
+            self._in_flight += 1
+            return self.clock()
+
+    def _notify(self) -> None:
+        """待機中のスレッドを起こします。"""
+        with self._cond:
+            self._cond.notify_all()
+
+    async def aacquire(self) -> float:
+        """acquireの非同期版です。待機中はイベントループをブロックしません。
+
+        Returns:
+            float: 確保した時刻。releaseに渡します
+
+        Raises:
+            DeadlineExceededError: 期限までに枠を確保できない場合
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._in_flight < self.limit:
+                    self._in_flight += 1
+                    return self.clock()
+                left = remaining()
+                if left is not None and left <= 0:
+                    raise DeadlineExceededError()
+                future = loop.create_future()
+                self._waiters.append((loop, future))
+            # 期限を過ぎた場合はループの先頭で失敗させる
+            await asyncio.wait({future}, timeout=left)
+
+    def release(
+        self,
+        started: float,
+        *,
+        status: int | None = None,
+        headers: Mapping[str, Any] | None = None,
+        error: BaseException | None = None,
+    ) -> None:
+        """枠を解放し、リクエストの結果を上限の調整に反映します。
+
+        Args:
+            started: acquireが返した時刻
+            status: レスポンスのステータスコード
+            headers: レスポンスヘッダー
+            error: リクエストが例外で終了した場合の例外
+        """
+        now = self.clock()
+        with self._cond:
+            self._in_flight -= 1
+            if isinstance(error, TIMEOUT_EXCEPTIONS) or (
+                status in self.overload_statuses
+            ):
+                self._decrease(started, now)
+            elif error is None and status is not None:
+                self._apply_headers(headers or {}, started, now)
+                # 前回減らす前に送信したリクエストのレイテンシは過負荷時のものなので除く
+                if started >= self._last_decrease:
+                    self._record(now - started, now)
+            self._wake()
+
+    def _wake(self) -> None:
+        """待機中のスレッドとタスクを起こします。"""
+        self._cond.notify_all()
+        for loop, future in self._waiters:
+            loop.call_soon_threadsafe(_set_result, future)
+        self._waiters = []
+
+    def _apply_headers(
+        self, headers: Mapping[str, Any], started: float, now: float
+    ) -> None:
+        for name in RATE_LIMIT_REMAINING_HEADERS:
+            value = headers.get(name)
+            if value is None:
+                continue
+            try:
+                remaining = int(value)
+            except ValueError:
+                return
+            # 残りの数は他のクライアントとも共有するため上限には使わず、
+            # 使い切った場合だけ減らす。それ以外はAIMDに任せる
+            if remaining <= 0:
+                self._decrease(started, now)
+            return
+
+    def _record(self, latency: float, now: float) -> None:
+        """成功したリクエストのレイテンシを記録し、必要に応じて上限を調整します。"""
+        self._latencies.append(latency)
+        self._since_adjust += 1
+        if len(self._latencies) < MIN_SAMPLES or self._since_adjust < self.limit:
+            return
+        self._since_adjust = 0
+        p95 = _percentile(list(self._latencies), 0.95)
+        if self._baseline is None or p95 < self._baseline:
+            self._baseline = p95
+        elif p95 > self._baseline * self.latency_tolerance:
+            # レイテンシが悪化した場合は、上限を減らしつつ基準も少し近づける。
+            # 恒常的にレイテンシが変わった場合でも上限が下がり続けないようにする
+            self._baseline += (p95 - self._baseline) * BASELINE_DRIFT
+            self._decrease(now, now)
+            return
+        if self._limit < self.max_limit:
+            self._limit = min(float(self.max_limit), self._limit + 1)
+            self._increases += 1
+
+    def _decrease(self, started: float, now: float) -> None:
+        """上限を乗算的に減らします。"""
+        if started < self._last_decrease:
+            # 前回減らす前に送信したリクエストの結果は、同じ過負荷によるものとみなす
+            return
+        self._limit = max(float(self.min_limit), self._limit * self.backoff)
+        self._last_decrease = now
+        self._latencies.clear()
+        self._since_adjust = 0
+        self._decreases += 1
+
+
+def _set_result(future: "asyncio.Future[None]") -> None:
+    if not future.done():
+        future.set_result(None)
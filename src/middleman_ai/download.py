@@ -0,0 +1,344 @@
+"""変換結果のURLからファイルをダウンロードするモジュール。
+
+大きなファイルはHTTPのRangeリクエストで分割して並列にダウンロードし、
+中断した場合は完了済みの部分を残して再開できます。
+データはチャンク単位でディスクやファイルライクオブジェクトに書き込み、
+ファイル全体をメモリに載せません。
+"""
+
+import contextvars
+import json
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import IO, Any, Dict, Iterable, Iterator, List, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .batch import BatchResult, ProgressCallback, run_batch
+from .cancellation import check_cancelled
+from .exceptions import (
+    CancelledError,
+    ConnectionError,
+    DeadlineExceededError,
+    DownloadError,
+)
+from .timeouts import TimeoutLike, deadline_exceeded, requests_timeout
+
+# 1つのRangeリクエストで取得するバイト数
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+# ディスクに書き込む単位のバイト数
+STREAM_CHUNK_SIZE = 64 * 1024
+# 1つの部分のダウンロードを試みる最大回数
+PART_ATTEMPTS = 3
+
+# ダウンロード中のファイルと再開用の状態ファイルの拡張子
+PART_SUFFIX = ".part"
+STATE_SUFFIX = ".part.json"
+
+# HTTPステータスコード
+HTTP_PARTIAL_CONTENT = 206
+HTTP_BAD_REQUEST = 400
+
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+Destination = Union[str, "os.PathLike[str]", IO[bytes]]
+
+
+@dataclass(frozen=True)
+class DownloadResult:
+    """1ファイル分のダウンロード結果。
+
+    Attributes:
+        url: ダウンロードしたURL
+        path: 保存先のパス（ファイルライクオブジェクトに書き込んだ場合はNone）
+        size: ファイルのバイト数
+        parts: 分割してダウンロードした部分の数
+        resumed_bytes: 前回の中断時にダウンロード済みだったため省略したバイト数
+    """
+
+    url: str
+    path: str | None
+    size: int
+    parts: int = 1
+    resumed_bytes: int = 0
+
+
+def _load_state(state_path: str) -> Dict[str, Any] | None:
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            return dict(json.load(f))
+    except (OSError, ValueError):
+        return None
+
+
+def _save_state(state_path: str, state: Dict[str, Any]) -> None:
+    directory = os.path.dirname(state_path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+
+class Downloader:
+    """変換結果のファイルをダウンロードするクライアント。
+
+    結果のURLは署名付きURLのため、APIキー(Authorizationヘッダー)は送信しません。
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int = 4,
+        part_concurrency: int = 4,
+        part_size: int = DEFAULT_PART_SIZE,
+        timeout: TimeoutLike = 30.0,
+    ) -> None:
+        """ダウンローダーを初期化します。
+
+        Args:
+            max_concurrency: download_manyで同時にダウンロードするファイル数
+            part_concurrency: 1ファイルあたりに同時に取得する部分の数
+            part_size: 1つのRangeリクエストで取得するバイト数
+            timeout: HTTP通信のタイムアウト秒数、またはTimeout
+        """
+        self.max_concurrency = max_concurrency
+        self.part_concurrency = part_concurrency
+        self.part_size = part_size
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=max_concurrency * part_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def close(self) -> None:
+        """コネクションプールを解放します。"""
+        self.session.close()
+
+    def __enter__(self) -> "Downloader":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def _get(self, url: str, headers: Dict[str, str]) -> requests.Response:
+        timeout = requests_timeout(self.timeout)
+        try:
+            response = self.session.get(
+                url, headers=headers, stream=True, timeout=timeout
+            )
+        except requests.exceptions.RequestException as e:
+            if deadline_exceeded():
+                raise DeadlineExceededError() from e
+            raise ConnectionError() from e
+        if response.status_code >= HTTP_BAD_REQUEST:
+            response.close()
+            raise DownloadError(
+                f"Download failed: status_code={response.status_code}, url={url}"
+            )
+        return response
+
+    def download(
+        self, url: str, destination: Destination, *, resume: bool = True
+    ) -> DownloadResult:
+        """URLのファイルをダウンロードします。
+
+        保存先にパスを指定した場合は、サーバーがRangeリクエストに対応していれば
+        part_sizeごとに分割して並列にダウンロードします。ダウンロード中は
+        `<保存先>.part`に書き込み、完了後に保存先へ移動します。
+
+        Args:
+            url: ダウンロードするURL
+            destination: 保存先のパス、またはwriteメソッドを持つオブジェクト
+                （オブジェクトの場合は分割せず先頭から順に書き込みます）
+            resume: 前回中断したダウンロードの続きから再開するかどうか。
+                サーバーがETagもLast-Modifiedも返さない場合は最初からダウンロードします
+
+        Returns:
+            DownloadResult: ダウンロード結果
+
+        Raises:
+            DownloadError: HTTPエラーやサイズの不一致が発生した場合
+            ConnectionError: 接続エラー
+        """
+        if hasattr(destination, "write"):
+            return self._download_to_sink(url, destination)  # type: ignore[arg-type]
+        return self._download_to_path(url, os.fspath(destination), resume)
+
+    def download_many(
+        self,
+        items: Iterable[Tuple[str, Destination]],
+        *,
+        max_concurrency: int | None = None,
+        ordered: bool = True,
+        progress: ProgressCallback | None = None,
+        cancel: threading.Event | None = None,
+    ) -> Iterator[BatchResult[DownloadResult]]:
+        """複数のURLを並列にダウンロードします。
+
+        Args:
+            items: (URL, 保存先) の組の一覧
+            max_concurrency: 同時にダウンロードするファイル数（省略時は初期化時の値）
+            ordered: Trueの場合は入力の順序で、Falseの場合は完了した順に返します
+            progress: 1件完了するごとに(完了件数, 全体の件数)で呼び出すコールバック
+            cancel: セットされると開始前のダウンロードを打ち切るイベント
+
+        Returns:
+            Iterator[BatchResult[DownloadResult]]: 1件ごとの結果
+        """
+        return run_batch(
+            self.download,
+            items,
+            max_concurrency=max_concurrency or self.max_concurrency,
+            ordered=ordered,
+            progress=progress,
+            cancel=cancel,
+        )
+
+    def _download_to_sink(self, url: str, sink: IO[bytes]) -> DownloadResult:
+        response = self._get(url, {})
+        with response:
+            size = self._copy(response, sink)
+        expected = response.headers.get("Content-Length")
+        # Content-Encodingで圧縮されている場合は展開後のサイズと比較できない
+        encoded = response.headers.get("Content-Encoding", "identity") != "identity"
+        if expected is not None and not encoded and size != int(expected):
+            raise ConnectionError(f"Download was truncated: {size} of {expected} bytes")
+        return DownloadResult(url=url, path=None, size=size)
+
+    def _copy(self, response: requests.Response, sink: IO[bytes]) -> int:
+        size = 0
+        try:
+            for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                check_cancelled()
+                sink.write(chunk)
+                size += len(chunk)
+        except requests.exceptions.RequestException as e:
+            if deadline_exceeded():
+                raise DeadlineExceededError() from e
+            raise ConnectionError() from e
+        return size
+
+    def _download_to_path(self, url: str, path: str, resume: bool) -> DownloadResult:
+        part_path = path + PART_SUFFIX
+        state_path = path + STATE_SUFFIX
+        # 署名付きURLはHEADでは署名が一致しないことがあるため、
+        # 最初の部分をGETで取得してRange対応とサイズを確認する
+        first = self._get(url, {"Range": f"bytes=0-{self.part_size - 1}"})
+        match = _CONTENT_RANGE.match(first.headers.get("Content-Range", ""))
+        if first.status_code != HTTP_PARTIAL_CONTENT or match is None:
+            # Range非対応のサーバーからは一括でダウンロードする
+            with first, open(part_path, "wb") as f:
+                size = self._copy(first, f)
+            os.replace(part_path, path)
+            _remove(state_path)
+            return DownloadResult(url=url, path=path, size=size)
+
+        total = int(match.group(3))
+        validator = first.headers.get("ETag") or first.headers.get("Last-Modified")
+        # ETagもLast-Modifiedもない場合はファイルの変更を検出できないため、
+        # 前回の部分を使わずに最初からダウンロードし直す
+        state = _load_state(state_path) if resume and validator else None
+        if (
+            state is None
+            or state.get("total") != total
+            or state.get("part_size") != self.part_size
+            or state.get("validator") != validator
+            or not os.path.exists(part_path)
+            or os.path.getsize(part_path) != total
+        ):
+            state = {
+                "total": total,
+                "part_size": self.part_size,
+                "validator": validator,
+                "done": [],
+            }
+            with open(part_path, "wb") as f:
+                f.truncate(total)
+            _save_state(state_path, state)
+
+        done = set(state["done"])
+        ranges = [
+            (start, min(start + self.part_size, total) - 1)
+            for start in range(0, total, self.part_size)
+        ]
+        resumed = sum(end - start + 1 for start, end in ranges if start in done)
+        if 0 in done:
+            first.close()
+        lock = threading.Lock()
+
+        def fetch(start: int, end: int) -> None:
+            response = first if start == 0 else None
+            self._fetch_part(url, part_path, start, end, response)
+            with lock:
+                done.add(start)
+                state["done"] = sorted(done)
+                _save_state(state_path, state)
+
+        errors: List[BaseException] = []
+        with ThreadPoolExecutor(max_workers=self.part_concurrency) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, fetch, start, end)
+                for start, end in ranges
+                if start not in done
+            ]
+            for future in futures:
+                error = future.exception()
+                if error is not None:
+                    errors.append(error)
+        first.close()
+        if errors:
+            # 完了した部分は状態ファイルに記録済みのため、次回はその続きから再開できる
+            raise errors[0]
+
+        os.replace(part_path, path)
+        _remove(state_path)
+        return DownloadResult(
+            url=url, path=path, size=total, parts=len(ranges), resumed_bytes=resumed
+        )
+
+    def _fetch_part(
+        self,
+        url: str,
+        part_path: str,
+        start: int,
+        end: int,
+        response: requests.Response | None,
+    ) -> None:
+        """ファイルの一部分をダウンロードして所定の位置に書き込みます。"""
+        for attempt in range(1, PART_ATTEMPTS + 1):
+            try:
+                if response is None:
+                    response = self._get(url, {"Range": f"bytes={start}-{end}"})
+                match = _CONTENT_RANGE.match(response.headers.get("Content-Range", ""))
+                if response.status_code != HTTP_PARTIAL_CONTENT or match is None:
+                    raise DownloadError(f"Range request was not honored: {url}")
+                if int(match.group(1)) != start:
+                    raise DownloadError(f"Unexpected Content-Range: {url}")
+                with open(part_path, "r+b") as f:
+                    f.seek(start)
+                    size = self._copy(response, f)
+                if size != end - start + 1:
+                    raise ConnectionError(f"Part was truncated: {size} bytes")
+                return
+            except (DeadlineExceededError, CancelledError):
+                # 期限切れやキャンセルは再試行しても成功しないため、すぐに中断する
+                raise
+            except ConnectionError:
+                if attempt == PART_ATTEMPTS:
+                    raise
+            finally:
+                if response is not None:
+                    response.close()
+                response = None
+
+
+def _remove(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
@@ -41,3 +41,29 @@ class ConnectionError(MiddlemanBaseException):
 
 class ValidationError(MiddlemanBaseException):
     """入力データのバリデーションに失敗しました。"""
+
+
+class DownloadError(MiddlemanBaseException):
+    """変換結果のファイルのダウンロードに失敗しました。"""
+
+
+class CancelledError(MiddlemanBaseException):
+    """処理がキャンセルされました。"""
+
+
+class CircuitOpenError(ConnectionError):
+    """障害が続いているため、APIを呼び出さずに失敗しました。"""
+
+    def __init__(self, message: Optional[str] = None, retry_after: float = 0.0) -> None:
+        """例外を初期化します。
+
+        Args:
+            message: エラーメッセージ
+            retry_after: 再び呼び出しを試みるまでの秒数
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(ConnectionError):
+    """呼び出しの期限を過ぎました。"""
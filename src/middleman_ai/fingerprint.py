@@ -0,0 +1,206 @@
+"""ファイルの中身のフィンガープリント(ハッシュ値)を計算するモジュール。
+
+変換結果のキャッシュやリクエストのまとめでは、添付ファイルの中身のハッシュ値を
+キーに使用します。大きなファイルを呼び出しのたびに読み直さないよう、計算した
+ハッシュ値を(デバイス, inode, サイズ, 更新日時)をキーとするインデックスに記録し、
+変更されていないファイルは1回のstatで識別します。
+
+インデックスはメモリ上のLRUと、任意でSQLiteのファイルの2段構成です。
+SQLiteのファイルは同じホスト上の複数のプロセスで共有できます。
+"""
+
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
+
+from .cache_backends import MemoryCacheBackend, SQLiteCacheBackend
+
+# 永続インデックスのSQLiteのファイルを指定する環境変数
+FINGERPRINT_INDEX_ENV = "MIDDLEMAN_FINGERPRINT_INDEX"
+
+# ハッシュ計算時に1回で読み込むバイト数
+READ_SIZE = 1024 * 1024
+
+# 更新日時がこの秒数以内のファイルは、同じ時刻のうちに書き換えられると
+# 変更を検出できないため、インデックスに記録しない
+RACY_WINDOW = 2.0
+
+# インデックスのエントリの有効期間の秒数
+INDEX_TTL = 30 * 24 * 3600.0
+
+# 同じファイルのハッシュ計算を1回にまとめるためのロックの数
+_LOCK_STRIPES = 64
+
+
+@dataclass
+class FingerprintStats:
+    """フィンガープリントの統計。
+
+    Attributes:
+        hits: インデックスから返した回数
+        misses: ファイルを読み込んでハッシュ値を計算した回数
+        hashed_bytes: ハッシュ値の計算で読み込んだバイト数
+    """
+
+    hits: int = 0
+    misses: int = 0
+    hashed_bytes: int = 0
+
+
+def hash_file(path: str) -> str:
+    """ファイルの中身をチャンク単位で読み込みながらハッシュ値を計算します。
+
+    Args:
+        path: ファイルのパス
+
+    Returns:
+        str: BLAKE2bのハッシュ値（16進数）
+
+    Raises:
+        OSError: ファイルが読み込めない場合
+    """
+    digest = hashlib.blake2b(digest_size=32)
+    buffer = bytearray(READ_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            digest.update(view[:size])
+    return digest.hexdigest()
+
+
+def _stat_key(st: os.stat_result) -> str:
+    return f"fp:{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+
+
+class FileFingerprinter:
+    """ファイルのフィンガープリントを計算し、statの結果で再利用するインデックス。
+
+    複数のスレッドから同時に同じファイルを指定しても、ハッシュ値の計算は1回です。
+
+    ```python
+    fingerprinter = FileFingerprinter(index_path="/var/cache/middleman/fp.db")
+    fingerprinter.fingerprint("large.pdf")  # 初回はファイルを読み込む
+    fingerprinter.fingerprint("large.pdf")  # 2回目以降はstatのみ
+    ```
+    """
+
+    def __init__(
+        self, *, index_path: str | None = None, max_entries: int = 4096
+    ) -> None:
+        """インデックスを初期化します。
+
+        Args:
+            index_path: 永続インデックスのSQLiteのファイル（省略時はメモリのみ）
+            max_entries: メモリ上に保持するエントリの最大数
+        """
+        self._memory = MemoryCacheBackend(max_entries=max_entries)
+        self._index = SQLiteCacheBackend(index_path) if index_path else None
+        self._locks = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+        self._stats = FingerprintStats()
+        self._stats_lock = threading.Lock()
+
+    def _lookup(self, key: str) -> str | None:
+        value = self._memory.get(key)
+        if value is None and self._index is not None:
+            value = self._index.get(key)
+            if value is not None:
+                self._memory.set(key, value, INDEX_TTL)
+        return None if value is None else value.decode("ascii")
+
+    def fingerprint(self, path: str) -> str:
+        """ファイルの中身のハッシュ値を返します。
+
+        (デバイス, inode, サイズ, 更新日時)が記録済みであれば、ファイルを読みません。
+
+        Args:
+            path: ファイルのパス
+
+        Returns:
+            str: BLAKE2bのハッシュ値（16進数）
+
+        Raises:
+            OSError: ファイルが読み込めない場合
+        """
+        key = _stat_key(os.stat(path))
+        digest = self._lookup(key)
+        if digest is not None:
+            self._count(hits=1)
+            return digest
+        with self._locks[hash(key) % _LOCK_STRIPES]:
+            # 同じファイルを他のスレッドが計算し終えていれば、その結果を使う
+            digest = self._lookup(key)
+            if digest is not None:
+                self._count(hits=1)
+                return digest
+            digest = hash_file(path)
+            after = os.stat(path)
+            self._count(misses=1, hashed_bytes=after.st_size)
+            # 読み込み中に変更された場合や、直後に書き換えられる可能性がある場合は
+            # 記録しない
+            if _stat_key(after) == key and time.time() - after.st_mtime > RACY_WINDOW:
+                value = digest.encode("ascii")
+                self._memory.set(key, value, INDEX_TTL)
+                if self._index is not None:
+                    self._index.set(key, value, INDEX_TTL)
+        return digest
+
+    def _count(self, hits: int = 0, misses: int = 0, hashed_bytes: int = 0) -> None:
+        with self._stats_lock:
+            self._stats.hits += hits
+            self._stats.misses += misses
+            self._stats.hashed_bytes += hashed_bytes
+
+    def stats(self) -> FingerprintStats:
+        """統計を返します。
+
+        Returns:
+            FingerprintStats: 統計のコピー
+        """
+        with self._stats_lock:
+            return replace(self._stats)
+
+    def close(self) -> None:
+        """永続インデックスの接続を閉じます。"""
+        if self._index is not None:
+            self._index.close()
+
+
+_default: FileFingerprinter | None = None
+_default_lock = threading.Lock()
+
+
+def default_fingerprinter() -> FileFingerprinter:
+    """SDK全体で共有するインデックスを返します。
+
+    環境変数MIDDLEMAN_FINGERPRINT_INDEXが指定されている場合は、
+    そのSQLiteのファイルを永続インデックスとして使用します。
+
+    Returns:
+        FileFingerprinter: インデックス
+    """
+    global _default  # noqa: PLW0603
+    with _default_lock:
+        if _default is None:
+            index_path = os.environ.get(FINGERPRINT_INDEX_ENV) or None
+            _default = FileFingerprinter(index_path=index_path)
+        return _default
+
+
+def file_fingerprint(path: str) -> str:
+    """共有のインデックスを使ってファイルの中身のハッシュ値を返します。
+
+    Args:
+        path: ファイルのパス
+
+    Returns:
+        str: BLAKE2bのハッシュ値（16進数）
+
+    Raises:
+        OSError: ファイルが読み込めない場合
+    """
+    return default_fingerprinter().fingerprint(path)
@@ -0,0 +1,336 @@
+"""テールレイテンシを短縮するためのヘッジリクエストを定義するモジュール。
+
+応答が一定時間(直近のレイテンシのパーセンタイル)を過ぎても返らない場合に、
+同じリクエストをもう1つ送信し、先に成功した方の結果を使用します。
+5xxなどリトライ対象のステータスコードの応答は成功とみなさず、もう一方の応答を待ちます。
+複数回実行しても結果が変わらないJSONのエンドポイントにのみ適用します。
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, replace
+from typing import Any, Awaitable, Callable, Deque, Dict, FrozenSet, List, TypeVar
+
+from .cache import _resolve_path
+from .cancellation import CancellationToken, cancellation, current_token
+from .concurrency import MIN_SAMPLES, _percentile
+from .retry import RetryPolicy
+
+T = TypeVar("T")
+
+# これ以上のステータスコードの応答は、ヘッジでは失敗とみなす
+HTTP_SERVER_ERROR = 500
+
+# デフォルトでヘッジするエンドポイント
+DEFAULT_HEDGE_ENDPOINTS: FrozenSet[str] = frozenset(
+    {
+        "/api/v1/tools/md-to-docx",
+        "/api/v1/tools/mermaid-to-image",
+        "/api/v2/tools/json-to-pptx/analyze",
+        "/api/v1/tools/xlsx-to-pdf-analyze",
+    }
+)
+
+
+@dataclass
+class HedgeStats:
+    """エンドポイントごとのヘッジの統計。
+
+    Attributes:
+        requests: ヘッジの対象となった呼び出し数
+        hedges: 追加で送信したリクエスト数
+        hedge_wins: 追加で送信したリクエストの方が先に返った回数
+        budget_denied: 予算の上限により追加の送信を見送った回数
+    """
+
+    requests: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    budget_denied: int = 0
+
+    @property
+    def win_rate(self) -> float:
+        """追加で送信したリクエストのうち、先に返った割合。"""
+        return self.hedge_wins / self.hedges if self.hedges else 0.0
+
+
+class HedgingPolicy:
+    """ヘッジリクエストのポリシー。
+
+    ToolsClient / AsyncToolsClientの`hedging`引数に指定します。
+    追加のリクエストは、全エンドポイントの合計で呼び出し数の`budget`の割合までに
+    制限します。負けた方のリクエストは中断します。
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        *,
+        percentile: float = 0.95,
+        initial_delay: float = 1.0,
+        min_delay: float = 0.05,
+        max_delay: float = 10.0,
+        budget: float = 0.1,
+        window: int = 200,
+        endpoints: FrozenSet[str] = DEFAULT_HEDGE_ENDPOINTS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """ポリシーを初期化します。
+
+        Args:
+            percentile: 追加で送信するまでの待機時間とするレイテンシのパーセンタイル
+            initial_delay: レイテンシのサンプルが足りない間の待機秒数
+            min_delay: 待機秒数の下限
+            max_delay: 待機秒数の上限
+            budget: 呼び出し数に対する追加のリクエスト数の割合の上限
+            window: パーセンタイルの計算に使用する直近のサンプル数
+            endpoints: ヘッジするエンドポイント（メソッド名またはパス）
+            clock: 現在時刻を返す関数（テスト用）
+        """
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.window = window
+        self.endpoints = frozenset(_resolve_path(e) for e in endpoints)
+        self.clock = clock
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._stats: Dict[str, HedgeStats] = {}
+        self._requests = 0
+        self._hedges = 0
+        self._lock = threading.Lock()
+
+    def applies_to(self, endpoint: str) -> bool:
+        """エンドポイントがヘッジの対象かどうかを返します。
+
+        Args:
+            endpoint: メソッド名またはパス
+
+        Returns:
+            bool: ヘッジの対象であればTrue
+        """
+        return _resolve_path(endpoint) in self.endpoints
+
+    def start(self, path: str) -> float:
+        """呼び出しの開始を記録し、追加で送信するまでの待機秒数を返します。
+
+        Args:
+            path: エンドポイントのパス
+
+        Returns:
+            float: 待機秒数
+        """
+        with self._lock:
+            self._requests += 1
+            self._stats.setdefault(path, HedgeStats()).requests += 1
+            latencies = self._latencies.get(path)
+            if latencies is None or len(latencies) < MIN_SAMPLES:
+                delay = self.initial_delay
+            else:
+                delay = _percentile(list(latencies), self.percentile)
+        return min(self.max_delay, max(self.min_delay, delay))
+
+    def acquire_hedge(self, path: str) -> bool:
+        """予算の範囲内であれば、追加のリクエストの送信を記録します。
+
+        Args:
+            path: エンドポイントのパス
+
+        Returns:
+            bool: 追加で送信してよい場合はTrue
+        """
+        with self._lock:
+            stats = self._stats.setdefault(path, HedgeStats())
+            if self._hedges + 1 > self.budget * self._requests:
+                stats.budget_denied += 1
+                return False
+            self._hedges += 1
+            stats.hedges += 1
+            return True
+
+    def finish(self, path: str, latency: float, hedge_won: bool) -> None:
+        """呼び出しの完了を記録します。
+
+        Args:
+            path: エンドポイントのパス
+            latency: 呼び出しの開始から結果が返るまでの秒数
+            hedge_won: 追加で送信したリクエストの方が先に返った場合はTrue
+        """
+        with self._lock:
+            latencies = self._latencies.get(path)
+            if latencies is None:
+                latencies = self._latencies[path] = deque(maxlen=self.window)
+            latencies.append(latency)
+            if hedge_won:
+                self._stats.setdefault(path, HedgeStats()).hedge_wins += 1
+
+    def stats(self) -> Dict[str, HedgeStats]:
+        """エンドポイントのパスごとの統計を返します。
+
+        Returns:
+            Dict[str, HedgeStats]: 統計のコピー
+        """
+        with self._lock:
+            return {path: replace(s) for path, s in self._stats.items()}
+
+
+def failed_response(retry: RetryPolicy | None) -> Callable[[Any], bool]:
+    """ヘッジで失敗とみなす応答かどうかを判定する関数を返します。
+
+    5xx、またはリトライポリシーがリトライの対象とするステータスコードの応答は、
+    先に返っても結果として採用せず、もう一方の応答を待ちます。
+
+    Args:
+        retry: クライアントのリトライポリシー
+
+    Returns:
+        Callable[[Any], bool]: 応答を受け取り、失敗であればTrueを返す関数
+    """
+
+    def failed(response: Any) -> bool:
+        status = response.status_code
+        if status >= HTTP_SERVER_ERROR:
+            return True
+        return retry is not None and retry.is_retryable_status(status)
+
+    return failed
+
+
+def _pick(futures: "List[Future[T]]", failed: Callable[[Any], bool]) -> "Future[T]":
+    """最初に成功したFutureを返します。全て失敗した場合は最初に失敗したものを返します。"""
+    pending = set(futures)
+    first_error: Future[T] | None = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in sorted(done, key=futures.index):
+            if future.exception() is None and not failed(future.result()):
+                return future
+            if first_error is None:
+                first_error = future
+    assert first_error is not None
+    return first_error
+
+
+def _run_cancellable(token: CancellationToken, send: Callable[[], T]) -> T:
+    with cancellation(token):
+        return send()
+
+
+def hedged_call(  # noqa: PLR0913, PLR0917
+    policy: HedgingPolicy,
+    path: str,
+    executor: ThreadPoolExecutor,
+    send: Callable[[], T],
+    discard: Callable[[T], None],
+    failed: Callable[[Any], bool] = lambda result: False,
+) -> T:
+    """ヘッジしながら関数を呼び出します。
+
+    それぞれのリクエストは個別のCancellationTokenの下で送信し、
+    負けた方はキャンセルしてコネクションや同時実行数の枠をすぐに解放します。
+    呼び出し元のトークンがキャンセルされた場合は、両方のリクエストをキャンセルします。
+
+    Args:
+        policy: ヘッジのポリシー
+        path: エンドポイントのパス
+        executor: リクエストを送信するスレッドプール
+        send: リクエストを1回送信する関数
+        discard: 負けた方の結果を破棄する関数
+        failed: 成功として採用しない結果かどうかを判定する関数
+
+    Returns:
+        T: 先に成功した方の結果。全て失敗した場合は最初に失敗した方の結果
+    """
+    delay = policy.start(path)
+    started = policy.clock()
+    tokens: List[CancellationToken] = []
+    outer = current_token()
+
+    def submit() -> "Future[T]":
+        token = CancellationToken()
+        tokens.append(token)
+        if outer is not None and outer.is_set():
+            token.cancel()
+        # deadlineの期限などのコンテキストを送信するスレッドに引き継ぐ
+        context = contextvars.copy_context()
+        return executor.submit(context.run, _run_cancellable, token, send)
+
+    def cancel_all() -> None:
+        for token in list(tokens):
+            token.cancel()
+
+    unregister = outer.add_callback(cancel_all) if outer is not None else None
+    try:
+        primary = submit()
+        done, _ = wait([primary], timeout=delay)
+        futures = [primary]
+        if not done and policy.acquire_hedge(path):
+            futures.append(submit())
+        winner = _pick(futures, failed)
+    finally:
+        if unregister is not None:
+            unregister()
+    for future, token in zip(futures, tokens):
+        if future is winner or future.cancel():
+            continue
+        token.cancel()
+        future.add_done_callback(
+            lambda f: discard(f.result()) if f.exception() is None else None
+        )
+    policy.finish(path, policy.clock() - started, winner is not primary)
+    return winner.result()
+
+
+async def ahedged_call(
+    policy: HedgingPolicy,
+    path: str,
+    send: Callable[[], Awaitable[T]],
+    failed: Callable[[Any], bool] = lambda result: False,
+) -> T:
+    """hedged_callの非同期版です。負けた方のリクエストはタスクごと中断します。
+
+    Args:
+        policy: ヘッジのポリシー
+        path: エンドポイントのパス
+        send: リクエストを1回送信するコルーチン関数
+        failed: 成功として採用しない結果かどうかを判定する関数
+
+    Returns:
+        T: 先に成功した方の結果。全て失敗した場合は最初に失敗した方の結果
+    """
+    delay = policy.start(path)
+    started = policy.clock()
+    primary: asyncio.Future[T] = asyncio.ensure_future(send())
+    tasks: List[asyncio.Future[T]] = [primary]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done and policy.acquire_hedge(path):
+            tasks.append(asyncio.ensure_future(send()))
+        pending = set(tasks)
+        first_error: asyncio.Future[T] | None = None
+        winner: asyncio.Future[T] | None = None
+        while pending and winner is None:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in sorted(done, key=tasks.index):
+                if task.exception() is None and not failed(task.result()):
+                    winner = task
+                    break
+                if first_error is None:
+                    first_error = task
+        result_task = winner or first_error
+        assert result_task is not None
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                # 負けた方の例外が未取得のまま破棄されたと警告されないようにする
+                task.exception()
+    policy.finish(path, policy.clock() - started, result_task is not primary)
+    return result_task.result()
@@ -0,0 +1,492 @@
+"""HTTP/2でAPIを呼び出すためのrequestsのアダプターを定義するモジュール。
+
+requestsのSessionはHTTP/1.1のみに対応しており、同時に実行中の呼び出しごとに
+TCP(+TLS)のコネクションが必要です。HTTP2AdapterはhttpxのHTTP/2対応の
+コネクションプールでリクエストを送信し、多数の呼び出しを少数のコネクションに
+多重化します。TLSのALPNでHTTP/2をネゴシエートできない場合はHTTP/1.1で送信します。
+
+httpxの同期クライアントは多数のスレッドから1本のHTTP/2コネクションを共有すると
+ストリームIDの順序が崩れることがあるため、アダプター専用のイベントループの
+スレッドで非同期クライアントを動かし、各スレッドの送信をそこに委ねます。
+
+httpxのHTTP/2のコネクションプールは、コネクションのストリーム数がサーバーの上限に
+達しても新しいコネクションを張らずに空きを待ちます。HTTP2Transportは実行中の
+リクエスト数に応じてコネクションを追加し、最も空いているコネクションに振り分けます。
+
+HTTP/2を使用するにはh2パッケージが必要です（`pip install middleman-ai[http2]`）。
+"""
+
+import asyncio
+import concurrent.futures
+import importlib.util
+import os
+import ssl
+import threading
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterator,
+    Coroutine,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Tuple,
+    TypeVar,
+    cast,
+)
+
+import certifi
+import httpx
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from .cancellation import current_token
+
+T = TypeVar("T")
+
+# h2パッケージがない場合のエラーメッセージ
+H2_INSTALL_HINT = (
+    "HTTP/2 support requires the h2 package: pip install 'middleman-ai[http2]'"
+)
+
+# ファイルライクなボディから1回に読み出すバイト数
+_READ_SIZE = 64 * 1024
+
+# HTTP/2では送信できないコネクション固有のヘッダー
+_HOP_BY_HOP_HEADERS = frozenset(
+    {"connection", "keep-alive", "proxy-connection", "transfer-encoding", "upgrade"}
+)
+
+
+def require_h2() -> None:
+    """h2パッケージがインストールされていることを確認します。
+
+    Raises:
+        ImportError: h2パッケージがインストールされていない場合
+    """
+    if importlib.util.find_spec("h2") is None:
+        raise ImportError(H2_INSTALL_HINT)
+
+
+def _timeout(timeout: Any) -> httpx.Timeout:
+    """requestsのタイムアウト（秒数または(接続, 読み込み)の組）を変換します。"""
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+    return httpx.Timeout(timeout)
+
+
+def _ssl_context(verify: Any, cert: Any) -> ssl.SSLContext:
+    """requestsのverify・certの指定からSSLコンテキストを生成します。"""
+    if verify is False:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    elif isinstance(verify, str) and os.path.isdir(verify):
+        context = ssl.create_default_context(capath=verify)
+    else:
+        cafile = verify if isinstance(verify, str) else certifi.where()
+        context = ssl.create_default_context(cafile=cafile)
+    if cert:
+        context.load_cert_chain(*((cert,) if isinstance(cert, str) else cert))
+    return context
+
+
+async def _read_chunks(body: Any) -> AsyncIterator[bytes]:
+    """ファイルライクなボディをワーカースレッドで読み出しながら返します。"""
+    while True:
+        chunk = await asyncio.to_thread(body.read, _READ_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def _iter_chunks(body: Any) -> AsyncIterator[bytes]:
+    """イテレータのボディをワーカースレッドで読み出しながら返します。"""
+    chunks = iter(body)
+    while True:
+        chunk = await asyncio.to_thread(next, chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def _content(body: Any) -> Any:
+    """requestsのボディをhttpxのcontentに変換します。"""
+    if body is None or isinstance(body, bytes):
+        return body
+    if isinstance(body, str):
+        return body.encode("utf-8")
+    if hasattr(body, "read"):
+        # MultipartEncoderなどのファイルライクなボディは読み出しながら送信する
+        return _read_chunks(body)
+    return _iter_chunks(body)
+
+
+async def _next(chunks: AsyncIterator[bytes]) -> bytes | None:
+    try:
+        return await chunks.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+class _RawResponse:
+    """httpxのレスポンスをrequests.Response.rawとして扱うためのラッパー。"""
+
+    def __init__(self, response: httpx.Response, adapter: "HTTP2Adapter") -> None:
+        self.response = response
+        self.adapter = adapter
+        self._chunks: Iterator[bytes] | None = None
+        self._buffer = b""
+
+    @property
+    def version(self) -> str:
+        return self.response.http_version
+
+    def stream(
+        self, amt: int = _READ_SIZE, decode_content: bool = True
+    ) -> Iterator[bytes]:
+        if self.response.is_stream_consumed:
+            # 読み込み済みのボディ
+            yield from self.response.iter_bytes(amt)
+            return
+        chunks = (
+            self.response.aiter_bytes(amt)
+            if decode_content
+            else self.response.aiter_raw(amt)
+        )
+        while True:
+            chunk = self.adapter._call(_next(chunks))
+            if chunk is None:
+                return
+            yield chunk
+
+    def read(self, amt: int | None = None, decode_content: bool = True) -> bytes:
+        if self._chunks is None:
+            self._chunks = self.stream(_READ_SIZE, decode_content)
+        while amt is None or len(self._buffer) < amt:
+            chunk = next(self._chunks, b"")
+            if not chunk:
+                break
+            self._buffer += chunk
+        if amt is None:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:amt], self._buffer[amt:]
+        return data
+
+    def close(self) -> None:
+        if not self.response.is_closed:
+            self.adapter._call(self.response.aclose())
+
+    def release_conn(self) -> None:
+        self.close()
+
+
+@dataclass
+class _Shard:
+    """1本のHTTP/2コネクションを持つ内部のトランスポートと、実行中のリクエスト数。"""
+
+    transport: httpx.AsyncBaseTransport
+    active: int = 0
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    """レスポンスを閉じた時に実行中のリクエスト数を減らすボディのストリーム。"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, shard: _Shard) -> None:
+        self.stream = stream
+        self.shard = shard
+        self._closed = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self.shard.active -= 1
+            await self.stream.aclose()
+
+
+class HTTP2Transport(httpx.AsyncBaseTransport):
+    """実行中のリクエスト数に応じてHTTP/2のコネクションを追加するhttpxのトランスポート。
+
+    実行中のリクエストが全てのコネクションでstreams_per_connection本に達した場合に
+    コネクションを追加し、新しいリクエストは最も空いているコネクションに送信します。
+    AsyncToolsClientの`http2=True`とHTTP2Adapterで使用されます。
+    サーバーがHTTP/1.1で応答した場合はコネクションを追加せず、通常のhttpxの
+    コネクションプール（最大max_connections本）で送信します。
+
+    ```python
+    transport = HTTP2Transport(max_connections=4, streams_per_connection=128)
+    client = AsyncToolsClient(api_key="YOUR_API_KEY", transport=transport)
+    ```
+    """
+
+    def __init__(
+        self,
+        *,
+        max_connections: int = 10,
+        streams_per_connection: int = 100,
+        http1: bool = True,
+        verify: ssl.SSLContext | bool = True,
+    ) -> None:
+        """トランスポートを初期化します。
+
+        Args:
+            max_connections: HTTP/2のコネクションの最大数（HTTP/1.1で送信する場合は
+                HTTP/1.1のコネクションの最大数）
+            streams_per_connection: 1本のコネクションで同時に送信するリクエスト数の
+                目安。サーバーのSETTINGS_MAX_CONCURRENT_STREAMSに合わせてください
+            http1: HTTP/1.1での送信を許可するかどうか。Falseの場合は平文の
+                http://でもHTTP/2で接続します（prior knowledge）
+            verify: サーバー証明書の検証の設定
+
+        Raises:
+            ImportError: h2パッケージがインストールされていない場合
+        """
+        require_h2()
+        self.max_connections = max_connections
+        self.streams_per_connection = streams_per_connection
+        self.http1 = http1
+        self.verify = verify
+        self._shards: List[_Shard] = []
+        self._fallback = False
+
+    def _pick(self) -> _Shard:
+        """送信に使うコネクションを選びます。全て埋まっていれば追加します。"""
+        shard = min(self._shards, key=lambda s: s.active, default=None)
+        if shard is None or (
+            shard.active >= self.streams_per_connection
+            and not self._fallback
+            and len(self._shards) < self.max_connections
+        ):
+            shard = _Shard(
+                httpx.AsyncHTTPTransport(
+                    verify=self.verify,
+                    http1=self.http1,
+                    http2=True,
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections,
+                    ),
+                )
+            )
+            self._shards.append(shard)
+        return shard
+
+    @property
+    def connections(self) -> int:
+        """HTTP/2のコネクション(=内部のトランスポート)の数。"""
+        return len(self._shards)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        shard = self._pick()
+        shard.active += 1
+        try:
+            response = await shard.transport.handle_async_request(request)
+        except BaseException:
+            shard.active -= 1
+            raise
+        if response.extensions.get("http_version") == b"HTTP/1.1":
+            self._fallback = True
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            stream=_TrackedStream(cast(httpx.AsyncByteStream, response.stream), shard),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        shards, self._shards = self._shards, []
+        for shard in shards:
+            await shard.transport.aclose()
+
+
+class HTTP2Adapter(BaseAdapter):
+    """httpxのHTTP/2対応のコネクションプールで送信するrequestsのアダプター。
+
+    ToolsClientの`http2=True`で使用されます。Sessionにmountして直接使うこともできます。
+    https://ではALPNでHTTP/2をネゴシエートし、サーバーが対応していなければ
+    HTTP/1.1で送信します。平文のhttp://ではHTTP/1.1で送信します。
+    ローカルのプロキシなどHTTP/2を平文で受け付けるサーバーには`http1=False`を
+    指定します（prior knowledge）。
+
+    キャンセルされた呼び出しはそのストリームだけをリセットし、
+    同じコネクションの他の呼び出しは続行します。
+
+    ```python
+    session.mount("http://", HTTP2Adapter(http1=False))
+    ```
+    """
+
+    def __init__(
+        self,
+        *,
+        max_connections: int = 10,
+        streams_per_connection: int = 100,
+        http1: bool = True,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        """アダプターを初期化します。
+
+        Args:
+            max_connections: コネクションの最大数。HTTP/1.1で送信する場合は
+                全て使用中であれば空きが出るまで待機します
+            streams_per_connection: 1本のコネクションで同時に送信するリクエスト数の
+                目安。これを超えるとコネクションを追加します
+            http1: HTTP/1.1での送信を許可するかどうか
+            transport: httpxのトランスポート（テストなどに使用）
+
+        Raises:
+            ImportError: transportを指定せず、h2パッケージがインストールされていない場合
+        """
+        super().__init__()
+        if transport is None:
+            require_h2()
+        self.max_connections = max_connections
+        self.streams_per_connection = streams_per_connection
+        self.http1 = http1
+        self.transport = transport
+        # 証明書の検証の設定ごとのクライアント(=コネクションプール)
+        self._clients: Dict[Tuple[Any, Any], httpx.AsyncClient] = {}
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """送信に使うイベントループのスレッドを必要に応じて起動します。"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="http2-adapter", daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+    def _call(self, coro: Coroutine[Any, Any, T]) -> T:
+        """コルーチンをイベントループで実行し、結果を待ちます。"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result()
+
+    def _client(self, verify: Any, cert: Any) -> httpx.AsyncClient:
+        """証明書の検証の設定に対応するクライアントを返します。"""
+        key = (verify, cert)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                transport = self.transport or HTTP2Transport(
+                    max_connections=self.max_connections,
+                    streams_per_connection=self.streams_per_connection,
+                    http1=self.http1,
+                    verify=_ssl_context(verify, cert),
+                )
+                client = httpx.AsyncClient(transport=transport, trust_env=False)
+                self._clients[key] = client
+            return client
+
+    def send(  # noqa: PLR0913, PLR0917
+        self,
+        request: requests.PreparedRequest,
+        stream: bool = False,
+        timeout: Any = None,
+        verify: Any = True,
+        cert: Any = None,
+        proxies: Mapping[str, str] | None = None,
+    ) -> requests.Response:
+        """リクエストを送信し、requestsのレスポンスに変換して返します。
+
+        Raises:
+            requests.exceptions.ConnectTimeout: 接続がタイムアウトした場合
+            requests.exceptions.ReadTimeout: 読み込みがタイムアウトした場合
+            requests.exceptions.ConnectionError: キャンセルされた場合や
+                その他の通信エラー
+        """
+        assert request.url is not None and request.method is not None
+        client = self._client(verify, cert)
+        headers = {
+            k: v
+            for k, v in request.headers.items()
+            if k.lower() not in _HOP_BY_HOP_HEADERS
+        }
+        built = client.build_request(
+            request.method,
+            request.url,
+            headers=headers,
+            content=_content(request.body),
+            timeout=_timeout(timeout),
+        )
+        future = asyncio.run_coroutine_threadsafe(
+            self._send(client, built, stream), self._ensure_loop()
+        )
+
+        def cancel() -> None:
+            # 送信中のストリームだけをリセットし、コネクションは維持する
+            future.cancel()
+
+        token = current_token()
+        unregister = token.add_callback(cancel) if token is not None else None
+        try:
+            response = future.result()
+        except concurrent.futures.CancelledError as e:
+            raise requests.exceptions.ConnectionError(
+                "request cancelled", request=request
+            ) from e
+        except httpx.ConnectTimeout as e:
+            raise requests.exceptions.ConnectTimeout(e, request=request) from e
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.ReadTimeout(e, request=request) from e
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(e, request=request) from e
+        finally:
+            if unregister is not None:
+                unregister()
+        return self._build_response(request, response)
+
+    async def _send(
+        self, client: httpx.AsyncClient, request: httpx.Request, stream: bool
+    ) -> httpx.Response:
+        """イベントループ上で送信します。ストリーミングしない場合はボディも読み込みます。"""
+        response = await client.send(request, stream=True)
+        if not stream:
+            try:
+                await response.aread()
+            finally:
+                await response.aclose()
+        return response
+
+    def _build_response(
+        self, request: requests.PreparedRequest, response: httpx.Response
+    ) -> requests.Response:
+        """httpxのレスポンスをrequestsのレスポンスに変換します。"""
+        result = requests.Response()
+        result.status_code = response.status_code
+        result.headers = CaseInsensitiveDict(response.headers.multi_items())
+        result.encoding = get_encoding_from_headers(result.headers)
+        result.reason = response.reason_phrase
+        result.url = str(request.url)
+        result.request = request
+        result.raw = _RawResponse(response, self)
+        result.connection = self  # type: ignore[assignment]
+        return result
+
+    def close(self) -> None:
+        """コネクションプールとイベントループのスレッドを閉じます。"""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        for client in clients:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join()
+        loop.close()
@@ -8,6 +8,7 @@ from mcp.server.fastmcp import FastMCP
 from middleman_ai import ToolsClient
 from middleman_ai.client import Placeholder, Presentation, Slide
 from middleman_ai.models import CustomSize, MermaidToImageOptions
+from middleman_ai.template_cache import TemplateCache
 
 print("Starting server.py...", file=sys.stderr)
 print(f"Python version: {sys.version}", file=sys.stderr)
@@ -19,7 +20,11 @@ mcp = FastMCP("Middleman Tools")
 
 api_key = os.environ.get("MIDDLEMAN_API_KEY", "")
 base_url = os.environ.get("MIDDLEMAN_BASE_URL", "https://middleman-ai.com/")
-client = ToolsClient(api_key=api_key, base_url=base_url)
+# テンプレート解析結果のキャッシュはCLIと同じ環境変数で設定し、共有できるようにする
+# (環境変数を指定しない場合は無効)
+client = ToolsClient(
+    api_key=api_key, base_url=base_url, template_cache=TemplateCache.from_env()
+)
 
 
 @mcp.tool()
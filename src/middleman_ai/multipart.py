@@ -0,0 +1,409 @@
+"""ストリーミング送信用のマルチパートエンコーダーを定義するモジュール。
+
+ファイルの中身をメモリに読み込まずに、送信しながらディスクからチャンク単位で
+読み出すことで、ファイルサイズによらずメモリ使用量を一定に保ちます。
+AttachmentBundleで読み込み済みのファイルは、メモリ上のバイト列をそのまま送信します。
+
+パスの代わりに、バイト列・memoryview・バイナリのファイルオブジェクト・
+チャンクのイテレーターも入力として受け付けます。サイズが分からない入力
+（シークできないストリームやイテレーター）を含むボディは、チャンク形式
+（Transfer-Encoding: chunked）で送信します。
+"""
+
+import os
+import uuid
+from dataclasses import dataclass, field
+from typing import IO, Iterable, Iterator, List, Mapping, Sequence, Union
+
+from .cancellation import check_cancelled
+from .timeouts import check_deadline
+
+# ディスクから1回に読み出すバイト数
+CHUNK_SIZE = 64 * 1024
+
+# パスの代わりに送信できるファイルの中身
+FileData = Union[bytes, bytearray, memoryview, IO[bytes], Iterable[bytes]]
+
+# アップロードの入力として受け付ける値
+FileInput = Union[str, os.PathLike[str], FileData]
+
+
+@dataclass(frozen=True)
+class FilePart:
+    """マルチパートで送信するファイル1件分の情報。
+
+    dataを指定した場合はファイルを開かずにその中身（バイト列、ファイルオブジェクト、
+    チャンクのイテレーター）を送信し、digestを指定した場合はキャッシュのキーに
+    そのハッシュ値を使用します。
+    """
+
+    name: str
+    path: str
+    content_type: str
+    filename: str | None = None
+    data: FileData | None = field(default=None, repr=False, compare=False)
+    digest: str | None = None
+
+
+def input_name(source: FileInput) -> str | None:
+    """入力のファイル名（パスのベース名、またはファイルオブジェクトのname）を返します。
+
+    Args:
+        source: アップロードの入力
+
+    Returns:
+        str | None: ファイル名。バイト列やイテレーターの場合はNone
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.basename(os.fspath(source))
+    name = getattr(source, "name", None)
+    if isinstance(name, str) and name and not name.startswith("<"):
+        return os.path.basename(name)
+    return None
+
+
+def file_part(
+    name: str, source: FileInput, content_type: str, filename: str | None = None
+) -> FilePart:
+    """アップロードの入力から送信用のファイル情報を作成します。
+
+    バイト列やファイルオブジェクトはコピーせずに参照し、送信時に読み出します。
+
+    Args:
+        name: マルチパートのフィールド名
+        source: ファイルのパス、バイト列、memoryview、バイナリのファイルオブジェクト、
+            またはチャンクのイテレーター
+        content_type: Content-Type
+        filename: 送信するファイル名（省略時は入力から推測）
+
+    Returns:
+        FilePart: 送信用のファイル情報
+
+    Raises:
+        TypeError: 入力の型に対応していない場合
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return FilePart(name, os.fspath(source), content_type, filename)
+    data: FileData
+    if isinstance(source, bytes):
+        data = source
+    elif isinstance(source, (bytearray, memoryview)):
+        data = memoryview(source).cast("B")
+    elif hasattr(source, "read") or isinstance(source, Iterable):
+        data = source
+    else:
+        raise TypeError(f"Unsupported file input: {type(source).__name__}")
+    return FilePart(
+        name, "", content_type, filename or input_name(source) or name, data
+    )
+
+
+def _quote(value: str) -> bytes:
+    """Content-Dispositionのパラメータ値をHTML5形式でエスケープします。"""
+    return (
+        value.replace("\\", "\\\\")
+        .replace('"', "%22")
+        .replace("\r", "%0D")
+        .replace("\n", "%0A")
+        .encode("utf-8")
+    )
+
+
+class _FileSegment:
+    """ディスク上のファイルから読み出すボディの一部分。"""
+
+    replayable = True
+
+    def __init__(self, path: str) -> None:
+        self.file: IO[bytes] = open(path, "rb")
+        self.size = os.path.getsize(path)
+        self.position = 0
+
+    def read(self, size: int) -> bytes:
+        data = self.file.read(min(size, self.size - self.position))
+        if not data and self.position < self.size:
+            raise OSError("File was truncated while uploading")
+        self.position += len(data)
+        return data
+
+    def reset(self) -> None:
+        self.file.seek(0)
+        self.position = 0
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class _BytesSegment:
+    """メモリ上のバイト列から読み出すボディの一部分。"""
+
+    replayable = True
+
+    def __init__(self, data: bytes | memoryview) -> None:
+        self.data = data
+        self.size = len(data)
+        self.position = 0
+
+    def read(self, size: int) -> bytes:
+        # memoryviewは読み出すチャンクの分だけをコピーする
+        data = self.data[self.position : self.position + size]
+        self.position += len(data)
+        return data if isinstance(data, bytes) else data.tobytes()
+
+    def reset(self) -> None:
+        self.position = 0
+
+    def close(self) -> None:
+        pass
+
+
+def _seekable(file: IO[bytes]) -> bool:
+    try:
+        return bool(file.seekable())
+    except (AttributeError, OSError, ValueError):
+        return False
+
+
+class _StreamSegment:
+    """ファイルオブジェクトから読み出すボディの一部分。
+
+    シークできる場合は現在位置から末尾までをサイズとし、先頭から送り直せます。
+    ファイルオブジェクトは呼び出し元が閉じます。
+    """
+
+    def __init__(self, file: IO[bytes]) -> None:
+        self.file = file
+        self.start: int | None = None
+        self.size: int | None = None
+        if _seekable(file):
+            self.start = file.tell()
+            self.size = file.seek(0, os.SEEK_END) - self.start
+            file.seek(self.start)
+        self.position = 0
+
+    @property
+    def replayable(self) -> bool:
+        return self.start is not None
+
+    def read(self, size: int) -> bytes:
+        if self.size is not None:
+            size = min(size, self.size - self.position)
+            if size <= 0:
+                return b""
+        data = self.file.read(size)
+        if not data and self.size is not None and self.position < self.size:
+            raise OSError("Stream was truncated while uploading")
+        self.position += len(data)
+        return bytes(data)
+
+    def reset(self) -> None:
+        if self.start is None:
+            if self.position:
+                raise OSError("Stream cannot be re-sent")
+            return
+        self.file.seek(self.start)
+        self.position = 0
+
+    def close(self) -> None:
+        pass
+
+
+class _IterSegment:
+    """チャンクのイテレーターから読み出すボディの一部分。サイズは不明で、送り直せません。"""
+
+    replayable = False
+    size = None
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self.chunks = iter(chunks)
+        self.pending: bytes | memoryview = b""
+        self.started = False
+
+    def read(self, size: int) -> bytes:
+        while not self.pending:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return b""
+            self.started = True
+            self.pending = chunk if isinstance(chunk, bytes) else memoryview(chunk)
+        if len(self.pending) <= size and isinstance(self.pending, bytes):
+            data, self.pending = self.pending, b""
+            return data
+        # チャンクが要求より大きい場合は、コピーせずに残りを参照する
+        view = memoryview(self.pending).cast("B")
+        self.pending = view[size:]
+        return view[:size].tobytes()
+
+    def reset(self) -> None:
+        if self.started:
+            raise OSError("Iterator input cannot be re-sent")
+
+    def close(self) -> None:
+        pass
+
+
+_Segment = Union[_FileSegment, _BytesSegment, _StreamSegment, _IterSegment]
+
+
+def _data_segment(data: FileData) -> _Segment:
+    if isinstance(data, (bytes, memoryview)):
+        return _BytesSegment(data)
+    if isinstance(data, bytearray):
+        return _BytesSegment(memoryview(data))
+    if hasattr(data, "read"):
+        return _StreamSegment(data)  # type: ignore[arg-type]
+    return _IterSegment(data)
+
+
+class MultipartEncoder:
+    """multipart/form-data のボディをストリーミングで生成するエンコーダー。
+
+    requestsの`data`引数にそのまま渡せるファイルライクオブジェクトです。
+    `__len__`で全体のサイズを返すため、Content-Length付きで送信されます。
+    サイズが分からない入力を含む場合は`size`がNoneになり、`__len__`はTypeErrorを
+    送出します。
+    ファイルはコンストラクタで開かれ、`close()`（またはwith文の終了）で閉じられます。
+    """
+
+    def __init__(
+        self,
+        fields: Mapping[str, str] | None = None,
+        files: Sequence[FilePart] = (),
+        boundary: str | None = None,
+        chunk_size: int = CHUNK_SIZE,
+    ) -> None:
+        """エンコーダーを初期化します。
+
+        Args:
+            fields: テキストフィールド（キー: フィールド名、値: 文字列）
+            files: 送信するファイルの一覧
+            boundary: マルチパートの境界文字列（省略時はランダムに生成）
+            chunk_size: 1回の読み出しで返す最大バイト数
+
+        Raises:
+            OSError: ファイルが開けない場合
+        """
+        self.fields = dict(fields or {})
+        self.files = list(files)
+        self.boundary = boundary or uuid.uuid4().hex
+        self.chunk_size = chunk_size
+        self._segments: List[_Segment] = []
+        self._index = 0
+        try:
+            self._build()
+        except OSError:
+            self.close()
+            raise
+
+    def _build(self) -> None:
+        delimiter = f"--{self.boundary}\r\n".encode()
+        for name, value in self.fields.items():
+            self._segments.append(
+                _BytesSegment(
+                    delimiter
+                    + b'Content-Disposition: form-data; name="'
+                    + _quote(name)
+                    + b'"\r\n\r\n'
+                    + value.encode("utf-8")
+                    + b"\r\n"
+                )
+            )
+        for part in self.files:
+            filename = part.filename or os.path.basename(part.path)
+            self._segments.append(
+                _BytesSegment(
+                    delimiter
+                    + b'Content-Disposition: form-data; name="'
+                    + _quote(part.name)
+                    + b'"; filename="'
+                    + _quote(filename)
+                    + b'"\r\nContent-Type: '
+                    + part.content_type.encode("latin-1")
+                    + b"\r\n\r\n"
+                )
+            )
+            if part.data is not None:
+                self._segments.append(_data_segment(part.data))
+            else:
+                self._segments.append(_FileSegment(part.path))
+            self._segments.append(_BytesSegment(b"\r\n"))
+        self._segments.append(_BytesSegment(f"--{self.boundary}--\r\n".encode()))
+
+    @property
+    def content_type(self) -> str:
+        """boundary付きのContent-Typeヘッダー値。"""
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    @property
+    def size(self) -> int | None:
+        """ボディ全体のバイト数。サイズが分からない入力を含む場合はNone。"""
+        total = 0
+        for segment in self._segments:
+            if segment.size is None:
+                return None
+            total += segment.size
+        return total
+
+    @property
+    def replayable(self) -> bool:
+        """reset()で先頭から送り直せるかどうか（イテレーターなどを含む場合はFalse）。"""
+        return all(segment.replayable for segment in self._segments)
+
+    def __len__(self) -> int:
+        size = self.size
+        if size is None:
+            raise TypeError("Body size is unknown")
+        return size
+
+    def __bool__(self) -> bool:
+        # サイズが不明な場合も__len__を使わずに真とする
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        """ボディの続きを読み出します。
+
+        Args:
+            size: 読み出す最大バイト数。負の値の場合は残り全てを読み出します
+
+        Returns:
+            bytes: 読み出したデータ。末尾に達した場合は空のバイト列
+
+        Raises:
+            DeadlineExceededError: 送信中に期限を過ぎた場合
+            CancelledError: 送信中にキャンセルされた場合
+        """
+        # 大きなファイルの送信中も、チャンクごとに期限とキャンセルを確認する
+        check_deadline()
+        check_cancelled()
+        if size < 0:
+            return b"".join(iter(lambda: self.read(self.chunk_size), b""))
+        while self._index < len(self._segments):
+            data = self._segments[self._index].read(size)
+            if data:
+                return data
+            self._index += 1
+        return b""
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(lambda: self.read(self.chunk_size), b"")
+
+    def reset(self) -> None:
+        """先頭から読み直せるように読み出し位置を戻します。
+
+        Raises:
+            OSError: 読み出し済みのイテレーターなど、送り直せない入力を含む場合
+        """
+        for segment in self._segments:
+            segment.reset()
+        self._index = 0
+
+    def close(self) -> None:
+        """開いているファイルを閉じます。"""
+        for segment in self._segments:
+            segment.close()
+
+    def __enter__(self) -> "MultipartEncoder":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
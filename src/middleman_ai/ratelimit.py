@@ -0,0 +1,433 @@
+"""クライアント側でリクエストの送信ペースを制限するレートリミッターを定義するモジュール。
+
+エンドポイントごとにトークンバケットを持ち、1秒あたりのリクエスト数(rate)と
+連続して送信できるリクエスト数(burst)を超えないよう、送信前に待機します。
+バケットの状態はバックエンドに保持し、FileBackendを使うと
+同じホスト上の複数のプロセスで1つの上限を共有できます。
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Mapping, Tuple, Union
+
+from .cache import _resolve_path
+from .cancellation import current_token
+from .exceptions import CancelledError, DeadlineExceededError
+from .timeouts import fits_deadline
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+
+# FileBackendのファイルに書き込む状態 (トークン数 更新時刻) のバイト数
+_STATE_SIZE = 64
+
+# 1秒あたりのリクエスト数、または (1秒あたりのリクエスト数, バースト) の組
+Limit = Union[float, Tuple[float, float]]
+
+
+@dataclass
+class RateLimitStats:
+    """エンドポイントごとのレートリミッターの待機時間の統計。
+
+    Attributes:
+        requests: レートリミッターを通過したリクエスト数
+        waited: 待機が発生したリクエスト数
+        total_wait: 待機した秒数の合計
+        max_wait: 1リクエストあたりの最大待機秒数
+    """
+
+    requests: int = 0
+    waited: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        """1リクエストあたりの平均待機秒数。"""
+        return self.total_wait / self.requests if self.requests else 0.0
+
+
+class TokenBucket:
+    """トークンバケット。複数のスレッドから同時に使用できます。"""
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float | None = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """トークンバケットを初期化します。
+
+        Args:
+            rate: 1秒あたりに補充するトークン数
+            burst: バケットの容量（省略時はrateと1の大きい方）
+            clock: 現在時刻を返す関数（テスト用）
+
+        Raises:
+            ValueError: rateが0以下、またはburstが1未満の場合
+        """
+        self.rate, self.burst = _validate(rate, burst)
+        self.clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """トークンを1つ予約し、送信できるまでの待機秒数を返します。
+
+        トークンが足りない場合も先に予約するため、返された秒数だけ待機すれば
+        送信できます。待機中の呼び出しは予約した順に送信できるようになります。
+
+        Returns:
+            float: 待機秒数（すぐに送信できる場合は0）
+        """
+        with self._lock:
+            now = self.clock()
+            self._tokens, wait = _take(
+                self.rate, self.burst, self._tokens, now - self._updated
+            )
+            self._updated = now
+            return wait
+
+    def refund(self) -> None:
+        """reserveで予約したトークンを1つ返却します。"""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+
+def _validate(rate: float, burst: float | None) -> Tuple[float, float]:
+    """rateとburstを検証し、burstを省略した場合の値を補います。"""
+    if rate <= 0:
+        raise ValueError("rate must be positive")
+    if burst is None:
+        burst = max(1.0, rate)
+    if burst < 1:
+        raise ValueError("burst must be at least 1")
+    return rate, burst
+
+
+def _take(
+    rate: float, burst: float, tokens: float, elapsed: float
+) -> Tuple[float, float]:
+    """経過時間分のトークンを補充してから1つ取り出します。
+
+    Returns:
+        Tuple[float, float]: (取り出した後のトークン数, 待機秒数)
+    """
+    tokens = min(burst, tokens + max(0.0, elapsed) * rate) - 1
+    return tokens, max(0.0, -tokens / rate)
+
+
+class RateLimitBackend(ABC):
+    """トークンバケットの状態を保持するバックエンド。
+
+    複数のホストで上限を共有する場合は、Redisなどのネットワーク上のストアで
+    reserveをアトミックに実装したサブクラスをRateLimiterに指定します。
+    """
+
+    @abstractmethod
+    def reserve(self, key: str, rate: float, burst: float) -> float:
+        """キーのバケットからトークンを1つ予約し、待機すべき秒数を返します。
+
+        Args:
+            key: バケットのキー（エンドポイントのパス）
+            rate: 1秒あたりに補充するトークン数
+            burst: バケットの容量
+
+        Returns:
+            float: 待機秒数（すぐに送信できる場合は0）
+        """
+
+    def refund(self, key: str, rate: float, burst: float) -> None:  # noqa: B027
+        """reserveで予約したトークンを1つ返却します。
+
+        期限までに送信できず、予約を取り消す場合に呼び出されます。
+        返却に対応しないバックエンドでは何もしません。
+
+        Args:
+            key: バケットのキー（エンドポイントのパス）
+            rate: 1秒あたりに補充するトークン数
+            burst: バケットの容量
+        """
+
+
+class MemoryBackend(RateLimitBackend):
+    """プロセス内でバケットを保持するバックエンド。"""
+
+    def __init__(self, *, clock: Callable[[], float] = time.monotonic) -> None:
+        """バックエンドを初期化します。
+
+        Args:
+            clock: 現在時刻を返す関数（テスト用）
+        """
+        self.clock = clock
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, key: str, rate: float, burst: float) -> float:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(rate, burst, clock=self.clock)
+                self._buckets[key] = bucket
+        return bucket.reserve()
+
+    def refund(self, key: str, rate: float, burst: float) -> None:
+        with self._lock:
+            bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket.refund()
+
+
+class FileBackend(RateLimitBackend):
+    """ディレクトリ内のファイルでバケットを保持し、複数のプロセスで共有するバックエンド。
+
+    バケットごとに1ファイルを作成し、更新時はflockで排他ロックを取得します。
+    gunicornのワーカーなど、同じホスト上のプロセスで同じディレクトリを指定すると、
+    全プロセスの合計が上限を超えないよう送信ペースを制限できます。
+    POSIX環境(fcntl)でのみ使用できます。
+    """
+
+    def __init__(
+        self, directory: str, *, clock: Callable[[], float] = time.time
+    ) -> None:
+        """バックエンドを初期化します。
+
+        Args:
+            directory: バケットのファイルを保存するディレクトリ
+            clock: 現在時刻を返す関数。プロセス間で共通の時計を使用します
+
+        Raises:
+            RuntimeError: fcntlを使用できない環境の場合
+        """
+        if fcntl is None:
+            raise RuntimeError("FileBackend requires fcntl (POSIX only)")
+        self.directory = directory
+        self.clock = clock
+        os.makedirs(directory, exist_ok=True)
+        self._fds: Dict[str, int] = {}
+        self._pid = os.getpid()
+        # flockはファイル記述子単位のため、同じプロセス内のスレッド間は別に排他する
+        self._lock = threading.Lock()
+
+    def _fd(self, key: str) -> int:
+        if self._pid != os.getpid():
+            # fork後に親プロセスと同じファイル記述子を使うとロックを共有してしまう
+            self._fds = {}
+            self._pid = os.getpid()
+        fd = self._fds.get(key)
+        if fd is None:
+            name = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+            path = os.path.join(self.directory, f"{name}.bucket")
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._fds[key] = fd
+        return fd
+
+    def reserve(self, key: str, rate: float, burst: float) -> float:
+        with self._lock:
+            fd = self._fd(key)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                now = self.clock()
+                try:
+                    raw = os.pread(fd, _STATE_SIZE, 0).split()
+                    tokens, updated = float(raw[0]), float(raw[1])
+                except (IndexError, ValueError):
+                    # 新しく作成したファイル
+                    tokens, updated = burst, now
+                tokens, wait = _take(rate, burst, tokens, now - updated)
+                data = f"{tokens!r} {now!r}".encode().ljust(_STATE_SIZE)
+                os.pwrite(fd, data, 0)
+                return wait
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def refund(self, key: str, rate: float, burst: float) -> None:
+        with self._lock:
+            fd = self._fd(key)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                raw = os.pread(fd, _STATE_SIZE, 0).split()
+                try:
+                    tokens, updated = float(raw[0]), float(raw[1])
+                except (IndexError, ValueError):
+                    return
+                tokens = min(burst, tokens + 1)
+                data = f"{tokens!r} {updated!r}".encode().ljust(_STATE_SIZE)
+                os.pwrite(fd, data, 0)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        """開いているファイルを閉じます。"""
+        with self._lock:
+            if self._pid == os.getpid():
+                for fd in self._fds.values():
+                    os.close(fd)
+            self._fds = {}
+
+
+class RateLimiter:
+    """エンドポイントごとのレートリミッター。
+
+    ToolsClient / AsyncToolsClientの`rate_limiter`引数に指定します。
+    リトライによる再送も1リクエストとして数えます。
+
+    ```python
+    limiter = RateLimiter(
+        rate=10,  # 個別に指定しないエンドポイントは1秒あたり10リクエストまで
+        limits={"md_to_pdf": (2, 5), "/api/v1/tools/mermaid-to-image": 20},
+    )
+    ```
+    """
+
+    def __init__(
+        self,
+        rate: float | None = None,
+        burst: float | None = None,
+        *,
+        limits: Mapping[str, Limit] | None = None,
+        backend: RateLimitBackend | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """レートリミッターを初期化します。
+
+        Args:
+            rate: limitsで指定しないエンドポイントの1秒あたりのリクエスト数。
+                Noneの場合は制限しません
+            burst: rateに対するバースト（連続して送信できるリクエスト数）
+            limits: エンドポイントごとの制限。キーはメソッド名（例: "md_to_pdf"）
+                またはパス、値は1秒あたりのリクエスト数か (リクエスト数, バースト)
+            backend: バケットの状態を保持するバックエンド。
+                省略時はプロセス内のMemoryBackend
+            clock: 現在時刻を返す関数（MemoryBackendを使う場合のテスト用）
+
+        Raises:
+            ValueError: rateが0以下、またはburstが1未満の場合
+        """
+        self.default = None if rate is None else _validate(rate, burst)
+        self.limits: Dict[str, Tuple[float, float]] = {}
+        for endpoint, limit in (limits or {}).items():
+            pair = limit if isinstance(limit, tuple) else (limit, None)
+            self.limits[_resolve_path(endpoint)] = _validate(*pair)
+        self.backend = backend or MemoryBackend(clock=clock)
+        self._stats: Dict[str, RateLimitStats] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, endpoint: str) -> float:
+        """エンドポイントのトークンを1つ予約し、待機すべき秒数を返します。
+
+        Args:
+            endpoint: メソッド名またはパス
+
+        Returns:
+            float: 待機秒数（すぐに送信できる場合や制限がない場合は0）
+        """
+        path = _resolve_path(endpoint)
+        limit = self.limits.get(path, self.default)
+        wait = 0.0 if limit is None else self.backend.reserve(path, *limit)
+        self._record(path, wait)
+        return wait
+
+    def _reserve_within_deadline(
+        self, endpoint: str
+    ) -> Tuple[float, Callable[[], None]]:
+        """トークンを予約し、期限までに送信できない場合は予約を取り消します。
+
+        Returns:
+            Tuple[float, Callable[[], None]]: (待機秒数, 予約を取り消す関数)
+
+        Raises:
+            DeadlineExceededError: 待機すると期限を過ぎる場合
+        """
+        path = _resolve_path(endpoint)
+        limit = self.limits.get(path, self.default)
+        if limit is None:
+            self._record(path, 0.0)
+            return 0.0, lambda: None
+        wait = self.backend.reserve(path, *limit)
+        if wait > 0 and not fits_deadline(wait):
+            # 待機せずに失敗させ、後続のリクエストのためにトークンを返却する
+            self.backend.refund(path, *limit)
+            raise DeadlineExceededError()
+        self._record(path, wait)
+        return wait, lambda: self.backend.refund(path, *limit)
+
+    def _record(self, path: str, wait: float) -> None:
+        """待機時間の統計を更新します。"""
+        with self._lock:
+            stats = self._stats.setdefault(path, RateLimitStats())
+            stats.requests += 1
+            if wait > 0:
+                stats.waited += 1
+                stats.total_wait += wait
+                stats.max_wait = max(stats.max_wait, wait)
+
+    def acquire(self, endpoint: str) -> float:
+        """送信できるようになるまで待機します。
+
+        期限が設定されていて、待機すると期限を過ぎる場合は待機せずに失敗します。
+        待機中にキャンセルトークンがキャンセルされた場合は、予約したトークンを
+        返却して失敗します。
+
+        Args:
+            endpoint: メソッド名またはパス
+
+        Returns:
+            float: 待機した秒数
+
+        Raises:
+            DeadlineExceededError: 待機すると期限を過ぎる場合
+            CancelledError: 待機中にキャンセルされた場合
+        """
+        token = current_token()
+        if token is not None:
+            token.raise_if_cancelled()
+        wait, refund = self._reserve_within_deadline(endpoint)
+        if wait <= 0:
+            return wait
+        if token is None:
+            time.sleep(wait)
+        elif token.wait(wait):
+            refund()
+            raise CancelledError()
+        return wait
+
+    async def aacquire(self, endpoint: str) -> float:
+        """acquireの非同期版です。待機中はイベントループをブロックしません。
+
+        Args:
+            endpoint: メソッド名またはパス
+
+        Returns:
+            float: 待機した秒数
+
+        Raises:
+            DeadlineExceededError: 待機すると期限を過ぎる場合
+        """
+        wait, _ = self._reserve_within_deadline(endpoint)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def stats(self) -> Dict[str, RateLimitStats]:
+        """エンドポイントのパスごとの待機時間の統計を返します。
+
+        Returns:
+            Dict[str, RateLimitStats]: 統計のコピー
+        """
+        with self._lock:
+            return {path: replace(s) for path, s in self._stats.items()}
+
+    def reset_stats(self) -> None:
+        """待機時間の統計を初期化します。"""
+        with self._lock:
+            self._stats.clear()
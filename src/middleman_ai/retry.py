@@ -0,0 +1,122 @@
+"""APIリクエストのリトライポリシーを定義するモジュール。
+
+一時的なサーバーエラーや接続エラーが発生した場合に、指数バックオフ
+(フルジッター)で待機してからリクエストを再送します。
+"""
+
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Tuple
+
+import httpx
+import requests
+
+# 1回の論理的な操作に付与する冪等キーのヘッダー名
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+
+# デフォルトでリトライするHTTPステータスコード
+DEFAULT_RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+# デフォルトでリトライする例外 (接続エラー・タイムアウト)
+DEFAULT_RETRY_EXCEPTIONS: Tuple[type[BaseException], ...] = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    httpx.TransportError,
+)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Retry-Afterヘッダーの値を待機秒数に変換します。
+
+    Args:
+        value: Retry-Afterヘッダーの値（秒数またはHTTP日付）
+
+    Returns:
+        float | None: 待機秒数。解釈できない場合はNone
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """リトライの動作を定義するポリシー。
+
+    ToolsClient / AsyncToolsClientの`retry`引数に指定します。
+    ポリシーを指定した場合、各API呼び出しに`Idempotency-Key`ヘッダーが付与され、
+    リトライ時も同じキーが送信されるため、サーバー側で二重に処理されません。
+
+    Attributes:
+        max_attempts: 最初の送信を含めた最大試行回数
+        backoff_base: バックオフの基準秒数（n回目のリトライは最大 base * 2**(n-1) 秒）
+        backoff_max: バックオフの上限秒数
+        retry_statuses: リトライするHTTPステータスコード
+        retry_exceptions: リトライする例外の型
+        respect_retry_after: Retry-Afterヘッダーの待機秒数に従うかどうか
+        max_retry_after: 従うRetry-Afterの上限秒数。これより長い場合はリトライしない
+        idempotency_key: Idempotency-Keyヘッダーを付与するかどうか
+    """
+
+    max_attempts: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    retry_statuses: frozenset[int] = DEFAULT_RETRY_STATUSES
+    retry_exceptions: Tuple[type[BaseException], ...] = DEFAULT_RETRY_EXCEPTIONS
+    respect_retry_after: bool = True
+    max_retry_after: float = 60.0
+    idempotency_key: bool = True
+
+    def is_retryable_status(self, status_code: int) -> bool:
+        """ステータスコードがリトライ対象かどうかを返します。"""
+        return status_code in self.retry_statuses
+
+    def is_retryable_exception(self, error: BaseException | None) -> bool:
+        """例外がリトライ対象かどうかを返します。"""
+        return error is not None and isinstance(error, self.retry_exceptions)
+
+    def backoff(self, attempt: int) -> float:
+        """フルジッター付きの指数バックオフの待機秒数を返します。
+
+        Args:
+            attempt: 失敗した試行の回数（1始まり）
+
+        Returns:
+            float: 0以上、min(backoff_max, backoff_base * 2**(attempt-1)) 以下の秒数
+        """
+        cap = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        return random.uniform(0, cap)
+
+    def delay(self, attempt: int, retry_after: str | None = None) -> float | None:
+        """次の試行までの待機秒数を返します。
+
+        Args:
+            attempt: 失敗した試行の回数（1始まり）
+            retry_after: レスポンスのRetry-Afterヘッダーの値
+
+        Returns:
+            float | None: 待機秒数。リトライしない場合はNone
+        """
+        if attempt >= self.max_attempts:
+            return None
+        if self.respect_retry_after:
+            seconds = parse_retry_after(retry_after)
+            if seconds is not None:
+                return seconds if seconds <= self.max_retry_after else None
+        return self.backoff(attempt)
+
+    def new_idempotency_key(self) -> str:
+        """論理的な操作1回分の冪等キーを生成します。"""
+        return str(uuid.uuid4())
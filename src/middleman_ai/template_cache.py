@@ -0,0 +1,595 @@
+"""テンプレート解析結果のキャッシュを定義するモジュール。
+
+json_to_pptx_analyze_v2 / xlsx_to_pdf_analyze の結果はテンプレートが更新されない限り
+変わらないため、テンプレートIDごとに結果を保持して通信を省略します。
+有効期間が切れた後もしばらくは古い結果を即座に返し、裏で再取得します
+(stale-while-revalidate)。存在しないテンプレートの結果(NotFoundError)も短時間保持します。
+revalidateを有効にすると、ETag / Last-Modifiedを結果と共に保持し、再取得を条件付きの
+リクエストで行います。304 Not Modifiedの場合は解析済みのモデルをそのまま返します。
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Set, Tuple, TypeVar, cast
+
+from .cache_backends import CacheBackend, backend_from_url
+from .exceptions import NotFoundError, ValidationError
+
+# 共有キャッシュのディレクトリを指定する環境変数
+TEMPLATE_CACHE_DIR_ENV = "MIDDLEMAN_TEMPLATE_CACHE_DIR"
+# 有効期間の秒数を指定する環境変数 (0でキャッシュを無効化)
+TEMPLATE_CACHE_TTL_ENV = "MIDDLEMAN_TEMPLATE_CACHE_TTL"
+# 共有キャッシュのバックエンドのURLを指定する環境変数 (sqlite:///path, redis://host)
+TEMPLATE_CACHE_URL_ENV = "MIDDLEMAN_TEMPLATE_CACHE_URL"
+
+DEFAULT_TTL = 300.0
+DEFAULT_STALE_TTL = 3600.0
+DEFAULT_NEGATIVE_TTL = 60.0
+
+# 解析済みのモデルを保持するエントリの最大数
+MAX_PARSED_ENTRIES = 256
+# プロセス内のストアに保持するエントリの最大数
+MAX_MEMORY_ENTRIES = 1024
+
+# エントリの状態
+_FRESH = "fresh"
+_STALE = "stale"
+_MISS = "miss"
+
+Entry = Dict[str, Any]
+T = TypeVar("T")
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:32]
+
+
+@dataclass
+class ConditionalResponse:
+    """条件付きリクエストの結果。
+
+    Attributes:
+        data: レスポンスのJSONデータ。304 Not Modifiedの場合はNone
+        etag: ETagヘッダーの値
+        last_modified: Last-Modifiedヘッダーの値
+    """
+
+    data: Dict[str, Any] | None
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+class _MemoryStore:
+    """プロセス内でエントリを保持するストア。
+
+    エントリ数が上限を超えた場合は、最も長く使われていないエントリから破棄します。
+    """
+
+    def __init__(self, max_entries: int = MAX_MEMORY_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Tuple[str, str], Entry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, template_id: str, key: str) -> Entry | None:
+        with self._lock:
+            entry = self._entries.get((template_id, key))
+            if entry is not None:
+                self._entries.move_to_end((template_id, key))
+            return entry
+
+    def set(self, template_id: str, key: str, entry: Entry) -> None:
+        with self._lock:
+            self._entries[(template_id, key)] = entry
+            self._entries.move_to_end((template_id, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, template_id: str | None) -> None:
+        with self._lock:
+            if template_id is None:
+                self._entries.clear()
+                return
+            for k in [k for k in self._entries if k[0] == template_id]:
+                del self._entries[k]
+
+
+class _DirectoryStore:
+    """ディレクトリにエントリを保存し、複数のプロセスで共有するストア。"""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, template_id: str, key: str) -> str:
+        return os.path.join(
+            self.directory, f"{_digest(template_id)}-{_digest(key)}.json"
+        )
+
+    def get(self, template_id: str, key: str) -> Entry | None:
+        try:
+            with open(self._path(template_id, key), encoding="utf-8") as f:
+                return dict(json.load(f))
+        except (OSError, ValueError):
+            return None
+
+    def set(self, template_id: str, key: str, entry: Entry) -> None:
+        # 他のプロセスが書き込み途中のファイルを読まないよう、一時ファイルから置き換える
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(template_id, key))
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def delete(self, template_id: str | None) -> None:
+        prefix = "" if template_id is None else f"{_digest(template_id)}-"
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.startswith(prefix) and entry.name.endswith(".json"):
+                    try:
+                        os.unlink(entry.path)
+                    except OSError:
+                        pass
+
+
+class _BackendStore:
+    """CacheBackendにエントリを保存するストア。"""
+
+    def __init__(self, backend: CacheBackend, ttl: float) -> None:
+        self.backend = backend
+        self.ttl = ttl
+
+    def _key(self, template_id: str, key: str) -> str:
+        return f"template:{_digest(template_id)}-{_digest(key)}"
+
+    def get(self, template_id: str, key: str) -> Entry | None:
+        value = self.backend.get(self._key(template_id, key))
+        if value is None:
+            return None
+        try:
+            return dict(json.loads(value))
+        except ValueError:
+            return None
+
+    def set(self, template_id: str, key: str, entry: Entry) -> None:
+        value = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        self.backend.set(self._key(template_id, key), value, self.ttl)
+
+    def delete(self, template_id: str | None) -> None:
+        prefix = (
+            "template:" if template_id is None else f"template:{_digest(template_id)}-"
+        )
+        self.backend.delete_prefix(prefix)
+
+
+class TemplateCache:
+    """テンプレート解析結果のキャッシュ。
+
+    ToolsClient / AsyncToolsClientの`template_cache`引数に指定します。
+    `directory`を指定すると、同じディレクトリを使うMCPサーバーやCLIと
+    キャッシュを共有できます。`backend`を指定すると、SQLiteやRedisなどを介して
+    複数のプロセス・ホストでキャッシュを共有できます。
+
+    - 取得から`ttl`秒以内: キャッシュした結果を返します
+    - さらに`stale_ttl`秒以内: キャッシュした結果を即座に返し、裏で再取得します
+    - それ以降: 同期的に再取得します
+    - NotFoundErrorは`negative_ttl`秒間保持し、その間は通信せずに送出します
+    - `revalidate=True`の場合、再取得はIf-None-Match / If-Modified-Sinceを付けた
+      条件付きのリクエストで行い、304の場合は解析済みのモデルを返します
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        *,
+        ttl: float = DEFAULT_TTL,
+        stale_ttl: float = DEFAULT_STALE_TTL,
+        negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+        directory: str | None = None,
+        backend: CacheBackend | None = None,
+        revalidate: bool = False,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """キャッシュを初期化します。
+
+        Args:
+            ttl: 結果をそのまま返す秒数
+            stale_ttl: ttl経過後、古い結果を返しつつ裏で再取得する秒数
+            negative_ttl: NotFoundErrorを保持する秒数
+            directory: 共有キャッシュのディレクトリ（省略時はプロセス内のみ）
+            backend: エントリを保存するバックエンド（directoryの代わりに使用）
+            revalidate: Trueの場合、ETag / Last-Modifiedによる条件付きのリクエストで
+                再取得します
+            clock: 現在時刻を返す関数（テスト用）
+
+        Raises:
+            ValueError: directoryとbackendの両方を指定した場合
+        """
+        if directory and backend is not None:
+            raise ValueError("directory and backend cannot be used together")
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.revalidate = revalidate
+        self.clock = clock
+        self._store: _MemoryStore | _DirectoryStore | _BackendStore
+        if backend is not None:
+            # 古い結果を返す期間を過ぎたエントリはバックエンドに破棄させる
+            lifetime = max(ttl + stale_ttl, negative_ttl)
+            self._store = _BackendStore(backend, lifetime)
+        elif directory:
+            self._store = _DirectoryStore(directory)
+        else:
+            self._store = _MemoryStore()
+        self._refreshing: Set[Tuple[str, str]] = set()
+        self._threads: Set[threading.Thread] = set()
+        self._tasks: Set[asyncio.Task[None]] = set()
+        self._parsed: OrderedDict[Tuple[str, str], Tuple[Tuple[Any, Any], Any]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "TemplateCache | None":
+        """環境変数の設定からキャッシュを生成します。
+
+        MIDDLEMAN_TEMPLATE_CACHE_DIRでディレクトリを、MIDDLEMAN_TEMPLATE_CACHE_TTLで
+        有効期間の秒数を指定します。MIDDLEMAN_TEMPLATE_CACHE_URLを指定した場合は、
+        ディレクトリの代わりにそのバックエンドを使用します。
+        MCPサーバーとCLIはこの設定を共有します。
+        キャッシュは、これらの環境変数のいずれかを指定した場合のみ有効になります。
+
+        Returns:
+            TemplateCache | None: キャッシュ。環境変数が指定されていない場合や、
+                TTLに0が指定された場合はNone
+        """
+        envs = (TEMPLATE_CACHE_DIR_ENV, TEMPLATE_CACHE_TTL_ENV, TEMPLATE_CACHE_URL_ENV)
+        if not any(os.environ.get(env) for env in envs):
+            return None
+        ttl = float(os.environ.get(TEMPLATE_CACHE_TTL_ENV) or DEFAULT_TTL)
+        if ttl <= 0:
+            return None
+        url = os.environ.get(TEMPLATE_CACHE_URL_ENV)
+        if url:
+            return cls(ttl=ttl, backend=backend_from_url(url))
+        return cls(ttl=ttl, directory=os.environ.get(TEMPLATE_CACHE_DIR_ENV) or None)
+
+    def _state(self, entry: Entry | None) -> str:
+        if entry is None:
+            return _MISS
+        age = self.clock() - entry["fetched_at"]
+        if entry.get("not_found"):
+            return _FRESH if age < self.negative_ttl else _MISS
+        if age < self.ttl:
+            return _FRESH
+        if age < self.ttl + self.stale_ttl:
+            return _STALE
+        return _MISS
+
+    def _lookup(self, template_id: str, key: str) -> Tuple[str, Entry | None]:
+        entry = self._store.get(template_id, key)
+        state = self._state(entry)
+        return state, None if state == _MISS else entry
+
+    def _result(self, entry: Entry) -> Dict[str, Any]:
+        if entry.get("not_found"):
+            raise NotFoundError()
+        return dict(entry["data"])
+
+    def _store_data(self, template_id: str, key: str, data: Dict[str, Any]) -> None:
+        entry = {"fetched_at": self.clock(), "data": data}
+        self._store.set(template_id, key, entry)
+
+    def _store_not_found(self, template_id: str, key: str) -> None:
+        entry = {"fetched_at": self.clock(), "not_found": True}
+        self._store.set(template_id, key, entry)
+
+    def _begin_refresh(self, template_id: str, key: str) -> bool:
+        with self._lock:
+            if (template_id, key) in self._refreshing:
+                return False
+            self._refreshing.add((template_id, key))
+            return True
+
+    def _end_refresh(self, template_id: str, key: str) -> None:
+        with self._lock:
+            self._refreshing.discard((template_id, key))
+
+    def _start_refresh(
+        self, template_id: str, key: str, update: Callable[[], object]
+    ) -> None:
+        thread = threading.Thread(
+            target=self._refresh, args=(template_id, key, update), daemon=True
+        )
+        with self._lock:
+            self._threads.add(thread)
+        thread.start()
+
+    def _refresh(
+        self, template_id: str, key: str, update: Callable[[], object]
+    ) -> None:
+        try:
+            update()
+        except NotFoundError:
+            self._store_not_found(template_id, key)
+        except Exception as e:
+            # 再取得に失敗した場合は古い結果を使い続ける
+            logging.warning(f"テンプレート解析結果の再取得に失敗しました: {e!r}")
+        finally:
+            self._end_refresh(template_id, key)
+            with self._lock:
+                self._threads.discard(threading.current_thread())
+
+    def get_or_load(
+        self, template_id: str, key: str, loader: Callable[[], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """キャッシュされた結果を返し、なければloaderで取得して保存します。
+
+        Args:
+            template_id: テンプレートID
+            key: テンプレート内で結果を区別するキー（エンドポイントやシート名）
+            loader: APIを呼び出してレスポンスのJSONデータを返す関数
+
+        Returns:
+            Dict[str, Any]: レスポンスのJSONデータ
+
+        Raises:
+            NotFoundError: テンプレートが存在しない場合（キャッシュされた結果を含む）
+            その他、loaderが送出する例外
+        """
+        state, entry = self._lookup(template_id, key)
+        if state == _STALE and self._begin_refresh(template_id, key):
+            self._start_refresh(
+                template_id,
+                key,
+                lambda: self._store_data(template_id, key, loader()),
+            )
+        if entry is not None:
+            return self._result(entry)
+        try:
+            data = loader()
+        except NotFoundError:
+            self._store_not_found(template_id, key)
+            raise
+        self._store_data(template_id, key, data)
+        return data
+
+    async def aget_or_load(
+        self,
+        template_id: str,
+        key: str,
+        loader: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        """get_or_loadの非同期版です。裏での再取得はタスクとして実行します。
+
+        Args:
+            template_id: テンプレートID
+            key: テンプレート内で結果を区別するキー（エンドポイントやシート名）
+            loader: APIを呼び出してレスポンスのJSONデータを返すコルーチン関数
+
+        Returns:
+            Dict[str, Any]: レスポンスのJSONデータ
+
+        Raises:
+            NotFoundError: テンプレートが存在しない場合（キャッシュされた結果を含む）
+            その他、loaderが送出する例外
+        """
+        state, entry = self._lookup(template_id, key)
+        if state == _STALE and self._begin_refresh(template_id, key):
+
+            async def update() -> None:
+                self._store_data(template_id, key, await loader())
+
+            self._start_arefresh(template_id, key, update)
+        if entry is not None:
+            return self._result(entry)
+        try:
+            data = await loader()
+        except NotFoundError:
+            self._store_not_found(template_id, key)
+            raise
+        self._store_data(template_id, key, data)
+        return data
+
+    def _start_arefresh(
+        self, template_id: str, key: str, update: Callable[[], Awaitable[object]]
+    ) -> None:
+        task = asyncio.create_task(self._arefresh(template_id, key, update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _arefresh(
+        self, template_id: str, key: str, update: Callable[[], Awaitable[object]]
+    ) -> None:
+        try:
+            await update()
+        except NotFoundError:
+            self._store_not_found(template_id, key)
+        except Exception as e:
+            # 再取得に失敗した場合は古い結果を使い続ける
+            logging.warning(f"テンプレート解析結果の再取得に失敗しました: {e!r}")
+        finally:
+            self._end_refresh(template_id, key)
+
+    def _conditional_headers(self, entry: Entry | None) -> Dict[str, str]:
+        """エントリのETag / Last-Modifiedから条件付きのリクエストヘッダーを作ります。"""
+        headers: Dict[str, str] = {}
+        if entry is None or "data" not in entry:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def _apply(
+        self,
+        template_id: str,
+        key: str,
+        entry: Entry | None,
+        response: ConditionalResponse,
+    ) -> Entry:
+        """条件付きのリクエストの結果をエントリに反映して保存します。"""
+        if response.data is not None:
+            updated: Entry = {"fetched_at": self.clock(), "data": response.data}
+        elif entry is not None and "data" in entry:
+            # 304 Not Modified: 保持している結果の取得日時だけを更新する
+            updated = {**entry, "fetched_at": self.clock()}
+        else:
+            raise ValidationError("Unexpected 304 Not Modified response")
+        if response.etag:
+            updated["etag"] = response.etag
+        if response.last_modified:
+            updated["last_modified"] = response.last_modified
+        self._store.set(template_id, key, updated)
+        return updated
+
+    def _parsed_result(
+        self,
+        template_id: str,
+        key: str,
+        entry: Entry,
+        parse: Callable[[Dict[str, Any]], T],
+    ) -> T:
+        """エントリの結果を解析したモデルを返します。
+
+        ETag / Last-Modifiedが同じ間は、前回解析したモデルをそのまま返します。
+        """
+        if entry.get("not_found"):
+            raise NotFoundError()
+        validators = (entry.get("etag"), entry.get("last_modified"))
+        if validators == (None, None):
+            return parse(dict(entry["data"]))
+        with self._lock:
+            parsed = self._parsed.get((template_id, key))
+            if parsed is not None and parsed[0] == validators:
+                self._parsed.move_to_end((template_id, key))
+                return cast(T, parsed[1])
+        result = parse(dict(entry["data"]))
+        with self._lock:
+            self._parsed[(template_id, key)] = (validators, result)
+            self._parsed.move_to_end((template_id, key))
+            while len(self._parsed) > MAX_PARSED_ENTRIES:
+                self._parsed.popitem(last=False)
+        return result
+
+    def get_or_revalidate(
+        self,
+        template_id: str,
+        key: str,
+        fetch: Callable[[Dict[str, str]], ConditionalResponse],
+        parse: Callable[[Dict[str, Any]], T],
+    ) -> T:
+        """キャッシュされた結果を返し、期限切れであれば条件付きのリクエストで再取得します。
+
+        Args:
+            template_id: テンプレートID
+            key: テンプレート内で結果を区別するキー（エンドポイントやシート名）
+            fetch: 条件付きのリクエストヘッダーを付けてAPIを呼び出す関数
+            parse: レスポンスのJSONデータをモデルに変換する関数
+
+        Returns:
+            T: parseが返すモデル。同じETag / Last-Modifiedの間は同じオブジェクト
+
+        Raises:
+            NotFoundError: テンプレートが存在しない場合（キャッシュされた結果を含む）
+            ValidationError: 保持していない結果に対して304が返された場合
+            その他、fetch / parseが送出する例外
+        """
+        entry = self._store.get(template_id, key)
+        state = self._state(entry)
+        if state == _STALE and self._begin_refresh(template_id, key):
+            headers = self._conditional_headers(entry)
+            self._start_refresh(
+                template_id,
+                key,
+                lambda: self._apply(template_id, key, entry, fetch(headers)),
+            )
+        if state != _MISS and entry is not None:
+            return self._parsed_result(template_id, key, entry, parse)
+        try:
+            response = fetch(self._conditional_headers(entry))
+        except NotFoundError:
+            self._store_not_found(template_id, key)
+            raise
+        entry = self._apply(template_id, key, entry, response)
+        return self._parsed_result(template_id, key, entry, parse)
+
+    async def aget_or_revalidate(
+        self,
+        template_id: str,
+        key: str,
+        fetch: Callable[[Dict[str, str]], Awaitable[ConditionalResponse]],
+        parse: Callable[[Dict[str, Any]], T],
+    ) -> T:
+        """get_or_revalidateの非同期版です。裏での再取得はタスクとして実行します。
+
+        Args:
+            template_id: テンプレートID
+            key: テンプレート内で結果を区別するキー（エンドポイントやシート名）
+            fetch: 条件付きのリクエストヘッダーを付けてAPIを呼び出すコルーチン関数
+            parse: レスポンスのJSONデータをモデルに変換する関数
+
+        Returns:
+            T: parseが返すモデル。同じETag / Last-Modifiedの間は同じオブジェクト
+
+        Raises:
+            NotFoundError: テンプレートが存在しない場合（キャッシュされた結果を含む）
+            ValidationError: 保持していない結果に対して304が返された場合
+            その他、fetch / parseが送出する例外
+        """
+        entry = self._store.get(template_id, key)
+        state = self._state(entry)
+        if state == _STALE and self._begin_refresh(template_id, key):
+            stale = entry
+            headers = self._conditional_headers(stale)
+
+            async def update() -> None:
+                self._apply(template_id, key, stale, await fetch(headers))
+
+            self._start_arefresh(template_id, key, update)
+        if state != _MISS and entry is not None:
+            return self._parsed_result(template_id, key, entry, parse)
+        try:
+            response = await fetch(self._conditional_headers(entry))
+        except NotFoundError:
+            self._store_not_found(template_id, key)
+            raise
+        entry = self._apply(template_id, key, entry, response)
+        return self._parsed_result(template_id, key, entry, parse)
+
+    def invalidate(self, template_id: str | None = None) -> None:
+        """エントリを削除します。
+
+        Args:
+            template_id: 削除するテンプレートID。Noneの場合は全てのエントリを削除
+        """
+        self._store.delete(template_id)
+        with self._lock:
+            if template_id is None:
+                self._parsed.clear()
+            else:
+                for k in [k for k in self._parsed if k[0] == template_id]:
+                    del self._parsed[k]
+
+    def join(self, timeout: float | None = None) -> None:
+        """裏で実行中の再取得（スレッド）の完了を待ちます。
+
+        Args:
+            timeout: 1スレッドあたりの最大待機秒数
+        """
+        with self._lock:
+            threads = list(self._threads)
+        for thread in threads:
+            thread.join(timeout)
@@ -0,0 +1,211 @@
+"""タイムアウトと呼び出しの期限(デッドライン)を定義するモジュール。
+
+Timeoutで接続・読み込み・書き込みのタイムアウトを個別に指定し、
+アップロードのサイズに応じて読み込み・書き込みのタイムアウトを延ばせます。
+deadlineのwith文の中では、リトライを含む全ての通信が期限までに終わるよう、
+各通信のタイムアウトを残り時間に切り詰めます。期限はcontextvarsで保持するため、
+バッチ処理のワーカースレッドや非同期タスクにも引き継がれます。
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from typing import Iterator, Tuple, Union
+
+import httpx
+
+from .exceptions import DeadlineExceededError
+
+_MB = 1024 * 1024
+
+# 現在の期限 (time.monotonicの時刻)
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar(
+    "middleman_deadline", default=None
+)
+
+
+@dataclass(frozen=True)
+class Timeout:
+    """接続・読み込み・書き込みのタイムアウト秒数。
+
+    ToolsClient / AsyncToolsClientの`timeout`引数に指定します。
+
+    Attributes:
+        connect: 接続のタイムアウト秒数
+        read: レスポンスを待つタイムアウト秒数
+        write: リクエストボディを送信するタイムアウト秒数
+        per_mb: アップロード1MBあたりに読み込み・書き込みのタイムアウトへ加える秒数
+    """
+
+    connect: float = 10.0
+    read: float = 30.0
+    write: float = 30.0
+    per_mb: float = 0.0
+
+    def scaled(self, upload_bytes: int) -> "Timeout":
+        """アップロードのサイズに応じて延ばしたタイムアウトを返します。
+
+        Args:
+            upload_bytes: アップロードするバイト数
+
+        Returns:
+            Timeout: 読み込み・書き込みのタイムアウトを延ばしたTimeout
+        """
+        extra = self.per_mb * upload_bytes / _MB
+        return replace(self, read=self.read + extra, write=self.write + extra)
+
+    def capped(self, limit: float) -> "Timeout":
+        """全てのタイムアウトをlimit秒以下に切り詰めたTimeoutを返します。
+
+        Args:
+            limit: 上限の秒数
+
+        Returns:
+            Timeout: 切り詰めたTimeout
+        """
+        return replace(
+            self,
+            connect=min(self.connect, limit),
+            read=min(self.read, limit),
+            write=min(self.write, limit),
+        )
+
+
+TimeoutLike = Union[float, Timeout]
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """with文の中の呼び出しに期限を設定します。
+
+    期限を過ぎると、呼び出しはDeadlineExceededErrorで失敗します。
+    入れ子にした場合は、より早い方の期限が適用されます。
+
+    ```python
+    with deadline(60):
+        client.pdf_to_page_images("large.pdf")
+    ```
+
+    Args:
+        seconds: 期限までの秒数
+    """
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(at if current is None else min(current, at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> float | None:
+    """現在の期限までの残り秒数を返します。
+
+    Returns:
+        float | None: 残り秒数。期限が設定されていない場合はNone
+    """
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def deadline_exceeded() -> bool:
+    """期限を過ぎているかどうかを返します。
+
+    Returns:
+        bool: 期限が設定されていて、それを過ぎている場合はTrue
+    """
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def fits_deadline(delay: float) -> bool:
+    """delay秒待機しても期限に間に合うかどうかを返します。
+
+    Args:
+        delay: 待機する秒数
+
+    Returns:
+        bool: 期限が設定されていないか、待機後も時間が残る場合はTrue
+    """
+    left = remaining()
+    return left is None or delay < left
+
+
+def check_deadline() -> None:
+    """期限を過ぎていないか確認します。
+
+    Raises:
+        DeadlineExceededError: 期限を過ぎている場合
+    """
+    if deadline_exceeded():
+        raise DeadlineExceededError()
+
+
+def _resolve(timeout: TimeoutLike, upload_bytes: int) -> TimeoutLike:
+    """アップロードのサイズと期限までの残り時間を反映したタイムアウトを返します。"""
+    check_deadline()
+    left = remaining()
+    if not isinstance(timeout, Timeout):
+        return timeout if left is None else min(timeout, left)
+    resolved = timeout.scaled(upload_bytes)
+    return resolved if left is None else resolved.capped(left)
+
+
+def requests_timeout(
+    timeout: TimeoutLike, upload_bytes: int = 0
+) -> Union[float, Tuple[float, float]]:
+    """requestsに渡すタイムアウトを返します。
+
+    requestsは送信中もソケットの読み込みタイムアウトを使用するため、
+    読み込みと書き込みのうち長い方を読み込みタイムアウトとします。
+
+    Args:
+        timeout: 秒数またはTimeout
+        upload_bytes: アップロードするバイト数
+
+    Returns:
+        float | Tuple[float, float]: 秒数、または (接続, 読み込み) の組
+
+    Raises:
+        DeadlineExceededError: 期限を過ぎている場合
+    """
+    resolved = _resolve(timeout, upload_bytes)
+    if not isinstance(resolved, Timeout):
+        return resolved
+    return resolved.connect, max(resolved.read, resolved.write)
+
+
+def to_httpx(timeout: TimeoutLike) -> httpx.Timeout:
+    """秒数またはTimeoutをhttpxのタイムアウトに変換します。
+
+    Args:
+        timeout: 秒数またはTimeout
+
+    Returns:
+        httpx.Timeout: httpxのタイムアウト
+    """
+    if not isinstance(timeout, Timeout):
+        return httpx.Timeout(timeout)
+    return httpx.Timeout(
+        connect=timeout.connect,
+        read=timeout.read,
+        write=timeout.write,
+        pool=timeout.connect,
+    )
+
+
+def httpx_timeout(timeout: TimeoutLike, upload_bytes: int = 0) -> httpx.Timeout:
+    """httpxに渡すタイムアウトを返します。
+
+    Args:
+        timeout: 秒数またはTimeout
+        upload_bytes: アップロードするバイト数
+
+    Returns:
+        httpx.Timeout: httpxのタイムアウト
+
+    Raises:
+        DeadlineExceededError: 期限を過ぎている場合
+    """
+    return to_httpx(_resolve(timeout, upload_bytes))
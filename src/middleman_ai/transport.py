@@ -0,0 +1,345 @@
+"""ToolsClientがAPIの呼び出しに使用する送信手段(トランスポート)を定義するモジュール。
+
+全てのエンドポイントのメソッドはTransport.postでリクエストを送信します。
+デフォルトはrequestsのSessionで送信するRequestsTransportです。
+ローカルのサイドカーやプロキシにUnixドメインソケットで接続するUnixSocketTransportと、
+通信せずにPythonの関数を直接呼び出すInMemoryTransport（テストや負荷試験、
+SDK自体のオーバーヘッドの計測に使用）も提供します。
+
+非同期クライアント（AsyncToolsClient）はhttpxのトランスポートを`transport`引数で
+受け付けます（`httpx.MockTransport`や`httpx.AsyncHTTPTransport(uds=...)`）。
+"""
+
+import io
+import json as jsonlib
+import socket
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Any, Callable, Dict, Mapping, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+
+# requestsに渡すタイムアウト。秒数、または (接続, 読み込み) の組
+TransportTimeout = Union[float, Tuple[float, float]]
+
+# ボディを1回に読み出すバイト数
+_READ_SIZE = 64 * 1024
+
+
+class Transport(ABC):
+    """ToolsClientがAPIの呼び出しに使用する送信手段の基底クラス。
+
+    ToolsClientの`transport`引数に指定します。送信したリクエストのレスポンスを
+    requests.Responseとして返します。通信エラーは
+    requests.exceptions.RequestExceptionとして送出してください
+    （ToolsClientがConnectionErrorに変換し、リトライの対象になります）。
+    """
+
+    @abstractmethod
+    def post(
+        self,
+        url: str,
+        *,
+        headers: Mapping[str, str],
+        timeout: TransportTimeout,
+        json: Any = None,
+        data: Any = None,
+    ) -> requests.Response:
+        """POSTリクエストを送信します。
+
+        Args:
+            url: リクエストのURL
+            headers: 認証ヘッダーを含むリクエストのヘッダー
+            timeout: タイムアウト秒数、または (接続, 読み込み) の組
+            json: JSONボディ
+            data: JSON以外のボディ。バイト列、チャンクのイテレーター、
+                `read`で読み出せるファイルライクオブジェクト（MultipartEncoderなど）
+
+        Returns:
+            requests.Response: レスポンス
+
+        Raises:
+            requests.exceptions.RequestException: 通信エラー
+        """
+
+    def close(self) -> None:  # noqa: B027
+        """リソースを解放します。ToolsClient.closeから呼び出されます。"""
+
+
+class RequestsTransport(Transport):
+    """requestsのSessionで送信するトランスポート（デフォルト）。
+
+    ToolsClientが生成する場合は、ToolsClient.sessionで送信します
+    （thread_safeの場合はスレッドごとのSession）。
+    """
+
+    def __init__(
+        self, session: requests.Session | Callable[[], requests.Session] | None = None
+    ) -> None:
+        """トランスポートを初期化します。
+
+        Args:
+            session: 送信に使うSession、またはSessionを返す関数。
+                Noneの場合は新しいSessionを生成し、closeで閉じます
+        """
+        self._owned: requests.Session | None = None
+        if session is None:
+            session = self._owned = requests.Session()
+        self._session = session
+
+    @property
+    def session(self) -> requests.Session:
+        """送信に使うSession。"""
+        if isinstance(self._session, requests.Session):
+            return self._session
+        return self._session()
+
+    def post(
+        self,
+        url: str,
+        *,
+        headers: Mapping[str, str],
+        timeout: TransportTimeout,
+        json: Any = None,
+        data: Any = None,
+    ) -> requests.Response:
+        session = self.session
+        kwargs: Dict[str, Any] = {}
+        # Sessionに設定済みのヘッダー(ToolsClientの認証ヘッダーなど)は
+        # Sessionでマージされるため、異なるものだけを渡す
+        extra = {k: v for k, v in headers.items() if session.headers.get(k) != v}
+        if extra:
+            kwargs["headers"] = extra
+        if json is not None:
+            kwargs["json"] = json
+        if data is not None:
+            kwargs["data"] = data
+        return session.post(url, timeout=timeout, **kwargs)
+
+    def close(self) -> None:
+        if self._owned is not None:
+            self._owned.close()
+
+
+class _UnixSocketConnection(HTTPConnection):
+    """Unixドメインソケットに接続するurllib3のコネクション。"""
+
+    def __init__(self, socket_path: str, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.socket_path = socket_path
+
+    def _new_conn(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+
+class _UnixSocketPool(HTTPConnectionPool):
+    """Unixドメインソケットのコネクションを保持するurllib3のコネクションプール。"""
+
+    def __init__(self, socket_path: str, **kwargs: Any) -> None:
+        super().__init__("localhost", **kwargs)
+        self.socket_path = socket_path
+
+    def _new_conn(self) -> HTTPConnection:
+        self.num_connections += 1
+        return _UnixSocketConnection(
+            self.socket_path,
+            host=self.host,
+            port=self.port,
+            timeout=self.timeout.connect_timeout,
+        )
+
+
+class _UnixSocketAdapter(HTTPAdapter):
+    """全てのリクエストをUnixドメインソケットに送信するrequestsのアダプター。"""
+
+    def __init__(self, socket_path: str, pool_maxsize: int) -> None:
+        super().__init__(pool_maxsize=pool_maxsize)
+        self.pool = _UnixSocketPool(socket_path, maxsize=pool_maxsize)
+
+    def get_connection_with_tls_context(
+        self,
+        request: requests.PreparedRequest,
+        verify: Any,
+        proxies: Any = None,
+        cert: Any = None,
+    ) -> HTTPConnectionPool:
+        return self.pool
+
+    def get_connection(self, url: Any, proxies: Any = None) -> HTTPConnectionPool:
+        # requests 2.32より前のバージョン向け
+        return self.pool
+
+    def request_url(self, request: requests.PreparedRequest, proxies: Any) -> str:
+        # ソケットに送るリクエストラインはパスとクエリのみ
+        parts = urlsplit(request.url or "/")
+        return (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+    def close(self) -> None:
+        super().close()
+        self.pool.close()
+
+
+class UnixSocketTransport(RequestsTransport):
+    """Unixドメインソケットで待ち受けるローカルのサイドカーやプロキシに送信するトランスポート。
+
+    URLのホストはHostヘッダーとしてそのまま送信され、接続先はsocket_pathに固定されます。
+
+    ```python
+    transport = UnixSocketTransport("/run/middleman/proxy.sock")
+    client = ToolsClient(api_key="YOUR_API_KEY", transport=transport)
+    ```
+    """
+
+    def __init__(self, socket_path: str, *, pool_maxsize: int = 10) -> None:
+        """トランスポートを初期化します。
+
+        Args:
+            socket_path: 接続するUnixドメインソケットのパス
+            pool_maxsize: 保持するコネクションの最大数
+        """
+        super().__init__()
+        self.socket_path = socket_path
+        adapter = _UnixSocketAdapter(socket_path, pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+
+@dataclass
+class InMemoryRequest:
+    """InMemoryTransportのハンドラーに渡すリクエスト。
+
+    Attributes:
+        method: HTTPメソッド
+        url: リクエストのURL
+        path: URLのパス（例: /api/v1/tools/md-to-docx）
+        headers: リクエストのヘッダー
+        body: ボディ（マルチパートボディは全て読み出したもの）
+    """
+
+    method: str
+    url: str
+    path: str
+    headers: Dict[str, str]
+    body: bytes
+
+    def json(self) -> Any:
+        """ボディをJSONとして読み込みます。"""
+        return jsonlib.loads(self.body)
+
+
+@dataclass
+class InMemoryResponse:
+    """InMemoryTransportのハンドラーが返すレスポンス。
+
+    Attributes:
+        status_code: ステータスコード
+        json: JSONのボディ。contentを指定しない場合に使用します
+        content: ボディのバイト列
+        headers: レスポンスのヘッダー
+    """
+
+    status_code: int = 200
+    json: Any = None
+    content: bytes | None = None
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+InMemoryHandler = Callable[[InMemoryRequest], Union[InMemoryResponse, Dict[str, Any]]]
+
+
+def _read_body(data: Any) -> bytes:
+    """送信するボディを全て読み出します。"""
+    if data is None:
+        return b""
+    if isinstance(data, bytes):
+        return data
+    if isinstance(data, str):
+        return data.encode("utf-8")
+    if hasattr(data, "read"):
+        return b"".join(iter(lambda: data.read(_READ_SIZE), b""))
+    return b"".join(data)
+
+
+class InMemoryTransport(Transport):
+    """通信せずにPythonの関数を直接呼び出すトランスポート。
+
+    テストや負荷試験で、requestsをパッチせずに応答を差し替えるために使用します。
+    ネットワークを介さないため、SDK自体のオーバーヘッドの計測にも使用できます。
+    ハンドラーが辞書を返した場合は、そのJSONをステータスコード200で返します。
+
+    ```python
+    def handler(request: InMemoryRequest) -> dict:
+        return {"docx_url": "https://example.com/test.docx"}
+
+    client = ToolsClient(api_key="test", transport=InMemoryTransport(handler))
+    ```
+    """
+
+    def __init__(self, handler: InMemoryHandler) -> None:
+        """トランスポートを初期化します。
+
+        Args:
+            handler: リクエストを受け取り、レスポンスを返す関数。
+                requests.exceptions.RequestExceptionを送出すると通信エラーになります
+        """
+        self.handler = handler
+
+    def post(
+        self,
+        url: str,
+        *,
+        headers: Mapping[str, str],
+        timeout: TransportTimeout,
+        json: Any = None,
+        data: Any = None,
+    ) -> requests.Response:
+        headers = dict(headers)
+        if json is not None:
+            body = jsonlib.dumps(json).encode("utf-8")
+            headers.setdefault("Content-Type", "application/json")
+        else:
+            body = _read_body(data)
+        request = InMemoryRequest(
+            method="POST",
+            url=url,
+            path=urlsplit(url).path,
+            headers=headers,
+            body=body,
+        )
+        result = self.handler(request)
+        if not isinstance(result, InMemoryResponse):
+            result = InMemoryResponse(json=result)
+        return self._build_response(url, result)
+
+    def _build_response(self, url: str, result: InMemoryResponse) -> requests.Response:
+        """ハンドラーのレスポンスをrequestsのレスポンスに変換します。"""
+        headers = CaseInsensitiveDict(result.headers)
+        content = result.content
+        if content is None:
+            content = jsonlib.dumps(result.json).encode("utf-8")
+            headers.setdefault("Content-Type", "application/json")
+        response = requests.Response()
+        response.status_code = result.status_code
+        try:
+            response.reason = HTTPStatus(result.status_code).phrase
+        except ValueError:
+            response.reason = ""
+        response.headers = headers
+        response.encoding = get_encoding_from_headers(headers)
+        response.url = url
+        response.raw = io.BytesIO(content)
+        return response
@@ -88,6 +88,15 @@ def test_json_to_pptx_analyze_cli(runner, mock_client):
     assert result.exit_code == 0
     assert "title" in result.output
     mock_client.json_to_pptx_analyze_v2.assert_called_once_with("template-123")
+    mock_client.template_cache.invalidate.assert_not_called()
+
+
+def test_json_to_pptx_analyze_cli_refresh(runner, mock_client):
+    """Test json_to_pptx_analyze CLI command with --refresh."""
+    mock_client.json_to_pptx_analyze_v2.return_value = []
+    result = runner.invoke(cli, ["json-to-pptx-analyze", "template-123", "--refresh"])
+    assert result.exit_code == 0
+    mock_client.template_cache.invalidate.assert_called_once_with("template-123")
 
 
 def test_json_to_pptx_execute_cli(runner, mock_client):
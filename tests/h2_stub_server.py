@@ -0,0 +1,189 @@
+"""HTTP/2のテスト・ベンチマーク用のローカルスタブサーバー。
+
+h2パッケージを使い、平文のHTTP/2(h2c, prior knowledge)で応答するサーバーです。
+StubServerと同じ形式のJSONレスポンスを返し、受け付けたTCPコネクション数、
+リクエスト内容、1本のコネクションで同時に処理したストリーム数の最大値を記録します。
+レスポンスの待機はイベントループ上で行うため、多重化されたストリームは並行に処理されます。
+"""
+
+import asyncio
+import threading
+from typing import Any, Dict, Set
+
+import h2.config
+import h2.connection
+import h2.events
+import h2.exceptions
+import h2.settings
+
+from tests.stub_server import RecordedRequest, StubHandler, StubServer
+
+
+class _H2Protocol(asyncio.Protocol):
+    """1本のTCPコネクション上のHTTP/2ストリームを処理するプロトコル。"""
+
+    def __init__(self, stub: "H2StubServer") -> None:
+        self.stub = stub
+        self.conn = h2.connection.H2Connection(
+            h2.config.H2Configuration(client_side=False, header_encoding="utf-8")
+        )
+        self.transport: asyncio.Transport | None = None
+        self.streams: Dict[int, Dict[str, Any]] = {}
+        self.active = 0
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        assert isinstance(transport, asyncio.Transport)
+        self.transport = transport
+        with self.stub.state.lock:
+            self.stub.state.connections_opened += 1
+        self.stub._transports.add(transport)
+        # 初期値として設定し、最初のSETTINGSフレームで通知する
+        self.conn.local_settings = h2.settings.Settings(
+            client=False,
+            initial_values={
+                h2.settings.SettingCodes.MAX_CONCURRENT_STREAMS: (
+                    self.stub.max_concurrent_streams
+                ),
+            },
+        )
+        self.conn.initiate_connection()
+        self._flush()
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        if self.transport is not None:
+            self.stub._transports.discard(self.transport)
+
+    def data_received(self, data: bytes) -> None:
+        try:
+            events = self.conn.receive_data(data)
+        except h2.exceptions.ProtocolError:
+            self._flush()
+            assert self.transport is not None
+            self.transport.close()
+            return
+        for event in events:
+            if isinstance(event, h2.events.RequestReceived):
+                self.streams[event.stream_id] = {
+                    "headers": dict(event.headers),
+                    "body": bytearray(),
+                }
+                self.active += 1
+                self.stub._observe_streams(self.active)
+            elif isinstance(event, h2.events.DataReceived):
+                self.streams[event.stream_id]["body"] += event.data
+                self.conn.acknowledge_received_data(
+                    event.flow_controlled_length, event.stream_id
+                )
+            elif isinstance(event, h2.events.StreamEnded):
+                self._dispatch(event.stream_id)
+            elif isinstance(event, h2.events.StreamReset):
+                if self.streams.pop(event.stream_id, None) is not None:
+                    self.active -= 1
+            elif isinstance(event, h2.events.ConnectionTerminated):
+                assert self.transport is not None
+                self.transport.close()
+        self._flush()
+
+    def _dispatch(self, stream_id: int) -> None:
+        stream = self.streams[stream_id]
+        headers: Dict[str, str] = stream["headers"]
+        body = bytes(stream["body"])
+        request = RecordedRequest(
+            method=headers[":method"],
+            path=headers[":path"],
+            headers={k: v for k, v in headers.items() if not k.startswith(":")},
+            body=body if self.stub.record_bodies else b"",
+            body_size=len(body),
+        )
+        with self.stub.state.lock:
+            self.stub.state.requests.append(request)
+        loop = asyncio.get_running_loop()
+        loop.call_later(self.stub.delay, self._respond, stream_id, request)
+
+    def _respond(self, stream_id: int, request: RecordedRequest) -> None:
+        if self.streams.pop(stream_id, None) is None:
+            return
+        self.active -= 1
+        stub = self.stub
+        response = stub.handler(request) if stub.handler else None
+        if response is None:
+            response = stub.default_response(request)
+        status, headers, payload = response
+        response_headers = [(":status", str(status))]
+        response_headers += [(k.lower(), v) for k, v in headers.items()]
+        if "Content-Type" not in headers:
+            response_headers.append(("content-type", "application/json"))
+        response_headers.append(("content-length", str(len(payload))))
+        try:
+            self.conn.send_headers(stream_id, response_headers)
+            self.conn.send_data(stream_id, payload, end_stream=True)
+        except h2.exceptions.StreamClosedError:
+            return
+        self._flush()
+
+    def _flush(self) -> None:
+        data = self.conn.data_to_send()
+        if data and self.transport is not None and not self.transport.is_closing():
+            self.transport.write(data)
+
+
+class H2StubServer(StubServer):
+    """Middleman.ai APIを模したローカルのHTTP/2(h2c)サーバー。
+
+    with文で起動・停止します。レスポンスの内容はStubServerと同じです。
+
+    Attributes:
+        max_concurrent_streams: 1本のコネクションで同時に受け付けるストリーム数
+        max_active_streams: 1本のコネクションで同時に処理したストリーム数の最大値
+    """
+
+    def __init__(
+        self,
+        handler: StubHandler | None = None,
+        delay: float = 0.0,
+        record_bodies: bool = True,
+        *,
+        max_concurrent_streams: int = 100,
+    ) -> None:
+        super().__init__(handler, delay, record_bodies)
+        self.max_concurrent_streams = max_concurrent_streams
+        self.max_active_streams = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._h2_server: asyncio.AbstractServer | None = None
+        self._transports: Set[asyncio.BaseTransport] = set()
+
+    def _observe_streams(self, active: int) -> None:
+        self.max_active_streams = max(self.max_active_streams, active)
+
+    def __enter__(self) -> "H2StubServer":
+        loop = asyncio.new_event_loop()
+        self._loop = loop
+        self._thread = threading.Thread(target=loop.run_forever, daemon=True)
+        self._thread.start()
+        future = asyncio.run_coroutine_threadsafe(
+            loop.create_server(lambda: _H2Protocol(self), "127.0.0.1", 0), loop
+        )
+        self._h2_server = future.result()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        assert self._loop is not None and self._h2_server is not None
+        loop, server = self._loop, self._h2_server
+
+        def stop() -> None:
+            server.close()
+            for transport in list(self._transports):
+                transport.close()
+            loop.stop()
+
+        loop.call_soon_threadsafe(stop)
+        if self._thread is not None:
+            self._thread.join()
+        loop.close()
+
+    @property
+    def base_url(self) -> str:
+        """サーバーのベースURL。"""
+        assert self._h2_server is not None
+        host, port = self._h2_server.sockets[0].getsockname()[:2]
+        return f"http://{host!s}:{port}"
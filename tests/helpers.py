@@ -0,0 +1,51 @@
+"""複数のテストモジュールで共通して使用するヘルパー。"""
+
+import os
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from pathlib import Path
+from typing import Any, Dict, List
+
+
+class FakeClock:
+    """テスト用に進められる時計。"""
+
+    def __init__(self, now: float = 0.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def write_file(path: Path, data: bytes, age: float = 60.0) -> None:
+    """ファイルを書き込み、更新日時をage秒前にします。"""
+    path.write_bytes(data)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+
+
+def multipart_parts(request: Any) -> List[Any]:
+    """記録したリクエストのマルチパートボディを各パートに分解します。
+
+    Args:
+        request: headersとbodyを持つリクエスト（RecordedRequestやInMemoryRequest）
+
+    Returns:
+        List[Any]: パート(email.message.EmailMessage)のリスト
+    """
+    # HTTP/2ではヘッダー名が小文字になるため、大文字小文字を区別せずに探す
+    headers = {k.lower(): v for k, v in request.headers.items()}
+    header = f"Content-Type: {headers['content-type']}\r\n\r\n".encode()
+    message = BytesParser(policy=HTTP).parsebytes(header + request.body)
+    return list(message.iter_parts())
+
+
+def multipart_files(request: Any) -> Dict[str, Any]:
+    """記録したリクエストから添付ファイル名と中身の対応を取り出します。"""
+    files: Dict[str, Any] = {}
+    for part in multipart_parts(request):
+        filename = part.get_filename()
+        if filename:
+            files[filename] = part.get_payload(decode=True)
+    return files
@@ -0,0 +1,183 @@
+"""テスト用のRedisプロトコル(RESP2)のスタブサーバー。
+
+RedisCacheBackendが使用するコマンド(PING / AUTH / SELECT / GET / SET / DEL /
+SCAN / FLUSHDB)のみを実装した、プロセス内で動作するサーバーです。
+"""
+
+import fnmatch
+import socketserver
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "_RespTCPServer"
+
+    def handle(self) -> None:
+        db = 0
+        authorized = self.server.owner.password is None
+        while True:
+            try:
+                args = self._read_command()
+            except (ConnectionError, ValueError):
+                return
+            if args is None:
+                return
+            command = args[0].upper()
+            owner = self.server.owner
+            with owner.lock:
+                owner.commands.append(command.decode())
+            if command == b"AUTH":
+                authorized = args[-1].decode() == owner.password
+                self._reply_ok() if authorized else self._reply_error("WRONGPASS")
+                continue
+            if not authorized:
+                self._reply_error("NOAUTH Authentication required.")
+                continue
+            if command == b"SELECT":
+                db = int(args[1])
+                self._reply_ok()
+            elif command == b"PING":
+                self.wfile.write(b"+PONG\r\n")
+            elif owner.error is not None:
+                self._reply_error(owner.error)
+            else:
+                self._write(owner.execute(db, command, args[1:]))
+
+    def _read_command(self) -> List[bytes] | None:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            raise ValueError(line)
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def _reply_ok(self) -> None:
+        self.wfile.write(b"+OK\r\n")
+
+    def _reply_error(self, message: str) -> None:
+        self.wfile.write(f"-{message}\r\n".encode())
+
+    def _write(self, value: Any) -> None:
+        self.wfile.write(_encode(value))
+
+
+class RespError(str):
+    """エラー応答として返す文字列。"""
+
+
+def _to_fnmatch(pattern: bytes) -> bytes:
+    """RedisのMATCHパターンのバックスラッシュのエスケープをfnmatchの形式に変換します。"""
+    out = b""
+    i = 0
+    while i < len(pattern):
+        if pattern[i : i + 1] == b"\\" and i + 1 < len(pattern):
+            out += b"[" + pattern[i + 1 : i + 2] + b"]"
+            i += 2
+        else:
+            out += pattern[i : i + 1]
+            i += 1
+    return out
+
+
+def _encode(value: Any) -> bytes:
+    if isinstance(value, RespError):
+        return f"-{value}\r\n".encode()
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, int):
+        return f":{value}\r\n".encode()
+    if isinstance(value, str):
+        return f"+{value}\r\n".encode()
+    if isinstance(value, bytes):
+        return f"${len(value)}\r\n".encode() + value + b"\r\n"
+    return f"*{len(value)}\r\n".encode() + b"".join(_encode(v) for v in value)
+
+
+class _RespTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, owner: "RespServer") -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.owner = owner
+
+
+class RespServer:
+    """Redisプロトコルのスタブサーバー。with文で起動・停止します。
+
+    Attributes:
+        password: AUTHで要求するパスワード（Noneの場合は不要）
+        data: データベース番号ごとの保存内容（キー -> (有効期限, 値)）
+        commands: これまでに受け付けたコマンド名
+        error: 設定した場合、データを扱うコマンドにこのエラー応答を返す(-OOMなどの模擬)
+    """
+
+    def __init__(self, password: str | None = None) -> None:
+        self.password = password
+        self.error: str | None = None
+        self.data: Dict[int, Dict[bytes, Tuple[float | None, bytes]]] = {}
+        self.commands: List[str] = []
+        self.lock = threading.Lock()
+        self._server: _RespTCPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self) -> "RespServer":
+        self._server = _RespTCPServer(self)
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.05}
+        )
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        assert self._server is not None
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    @property
+    def port(self) -> int:
+        """サーバーのポート番号。"""
+        assert self._server is not None
+        return int(self._server.server_address[1])
+
+    @property
+    def url(self) -> str:
+        """サーバーのURL。"""
+        return f"redis://127.0.0.1:{self.port}/0"
+
+    def execute(self, db: int, command: bytes, args: List[bytes]) -> Any:
+        """コマンドを実行して応答を返します。"""
+        with self.lock:
+            store = self.data.setdefault(db, {})
+            now = time.monotonic()
+            for key in [k for k, (exp, _) in store.items() if exp and exp <= now]:
+                del store[key]
+            if command == b"GET":
+                entry = store.get(args[0])
+                return None if entry is None else entry[1]
+            if command == b"SET":
+                expires_at = None
+                if len(args) >= 4 and args[2].upper() == b"PX":
+                    expires_at = now + int(args[3]) / 1000
+                store[args[0]] = (expires_at, args[1])
+                return "OK"
+            if command == b"DEL":
+                return sum(store.pop(k, None) is not None for k in args)
+            if command == b"SCAN":
+                pattern = args[args.index(b"MATCH") + 1] if b"MATCH" in args else b"*"
+                pattern = _to_fnmatch(pattern)
+                keys = [k for k in store if fnmatch.fnmatchcase(k, pattern)]
+                return [b"0", keys]
+            if command == b"FLUSHDB":
+                store.clear()
+                return "OK"
+        return RespError(f"ERR unknown command '{command.decode()}'")
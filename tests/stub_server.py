@@ -0,0 +1,317 @@
+"""テスト・ベンチマーク用のローカルスタブサーバー。
+
+実際のMiddleman.ai APIの代わりにローカルで起動するHTTP/1.1サーバーです。
+各エンドポイントに対して正しい形式のJSONレスポンスを返し、
+受け付けたTCPコネクション数やリクエスト内容を記録します。
+`unix_socket`を指定した場合はUnixドメインソケットで待ち受けます。
+`Content-Encoding: gzip`のリクエストボディは展開して記録します。
+"""
+
+import gzip
+import hashlib
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingUnixStreamServer
+from typing import Any, Callable, Dict, List, Tuple
+
+# エンドポイントごとのデフォルトレスポンス
+DEFAULT_RESPONSES: Dict[str, Dict[str, Any]] = {
+    "/api/v1/tools/md-to-pdf/form": {"pdf_url": "https://example.com/test.pdf"},
+    "/api/v1/tools/md-to-docx": {"docx_url": "https://example.com/test.docx"},
+    "/api/v1/tools/pdf-to-page-images": {
+        "pages": [{"page_no": 1, "image_url": "https://example.com/page1.png"}]
+    },
+    "/api/v1/tools/pptx-to-page-images": {
+        "pages": [{"page_no": 1, "image_url": "https://example.com/page1.png"}]
+    },
+    "/api/v1/tools/docx-to-page-images": {
+        "pages": [{"page_no": 1, "image_url": "https://example.com/page1.png"}]
+    },
+    "/api/v1/tools/xlsx-to-page-images": {
+        "pages": [{"sheet_name": "Sheet1", "image_url": "https://example.com/s1.png"}]
+    },
+    "/api/v2/tools/json-to-pptx/analyze": {
+        "slides": [{"type": "title", "placeholders": [{"name": "title"}]}]
+    },
+    "/api/v2/tools/json-to-pptx/execute/form": {
+        "pptx_url": "https://example.com/test.pptx"
+    },
+    "/api/v1/tools/mermaid-to-image": {
+        "image_url": "https://example.com/mermaid.png",
+        "format": "png",
+    },
+    "/api/v1/tools/xlsx-to-pdf-analyze": {
+        "sheet_name": "Sheet1",
+        "placeholders": [],
+        "placeholders_json_schema": "{}",
+    },
+    "/api/v1/tools/xlsx-to-pdf-execute": {
+        "pdf_url": "https://example.com/output.pdf",
+        "warnings": [],
+    },
+}
+
+
+_RANGE = re.compile(r"bytes=(\d+)-(\d*)")
+
+
+@dataclass
+class RecordedRequest:
+    """スタブサーバーが受け付けたリクエストの記録。
+
+    bodyは展開後のボディ、body_sizeは受信したバイト数（圧縮後のサイズ）です。
+    """
+
+    method: str
+    path: str
+    headers: Dict[str, str]
+    body: bytes
+    body_size: int
+
+
+# (ステータスコード, 追加ヘッダー, ボディ) の組
+StubResponse = Tuple[int, Dict[str, str], bytes]
+StubHandler = Callable[[RecordedRequest], StubResponse | None]
+
+
+@dataclass
+class _ServerState:
+    connections_opened: int = 0
+    requests: List[RecordedRequest] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # ヘッダーとボディを別々に書き込むため、Nagleによる遅延を避ける
+    disable_nagle_algorithm = True
+    server: "_StubHTTPServer | _StubUnixServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.state.lock:
+            self.server.state.connections_opened += 1
+
+    def _read_body(self) -> Tuple[bytes, int]:
+        stub = self.server.stub
+        chunks: List[bytes] = []
+        size = 0
+
+        def consume(data: bytes) -> None:
+            nonlocal size
+            size += len(data)
+            if stub.record_bodies:
+                chunks.append(data)
+            if stub.read_delay_per_mb:
+                time.sleep(len(data) / (1024 * 1024) * stub.read_delay_per_mb)
+
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while True:
+                line = self.rfile.readline().strip()
+                chunk_size = int(line.split(b";")[0], 16)
+                if chunk_size == 0:
+                    self.rfile.readline()
+                    break
+                remaining = chunk_size
+                while remaining:
+                    data = self.rfile.read(min(remaining, 64 * 1024))
+                    consume(data)
+                    remaining -= len(data)
+                self.rfile.readline()
+        else:
+            remaining = int(self.headers.get("Content-Length") or 0)
+            while remaining:
+                data = self.rfile.read(min(remaining, 64 * 1024))
+                if not data:
+                    break
+                consume(data)
+                remaining -= len(data)
+        body = b"".join(chunks)
+        if body and self.headers.get("Content-Encoding", "").lower() == "gzip":
+            body = gzip.decompress(body)
+        return body, size
+
+    def do_POST(self) -> None:
+        self._dispatch()
+
+    def do_GET(self) -> None:
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        stub = self.server.stub
+        body, size = self._read_body()
+        request = RecordedRequest(
+            method=self.command,
+            path=self.path,
+            headers={k: v for k, v in self.headers.items()},
+            body=body,
+            body_size=size,
+        )
+        with self.server.state.lock:
+            self.server.state.requests.append(request)
+
+        if stub.delay:
+            time.sleep(stub.delay)
+
+        response = stub.handler(request) if stub.handler else None
+        if response is None:
+            response = stub.default_response(request)
+        status, headers, payload = response
+
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        if "Content-Type" not in headers:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+        if not stub.trickle_delay:
+            self.wfile.write(payload)
+            return
+        for i in range(len(payload)):
+            self.wfile.write(payload[i : i + 1])
+            self.wfile.flush()
+            time.sleep(stub.trickle_delay)
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # 多数のスレッドから同時に接続されても取りこぼさないようにする
+    request_queue_size = 128
+
+    def __init__(self, stub: "StubServer") -> None:
+        self.stub = stub
+        self.state = stub.state
+        super().__init__(("127.0.0.1", 0), _Handler)
+
+
+class _UnixHandler(_Handler):
+    # UnixドメインソケットにはTCP_NODELAYを設定できない
+    disable_nagle_algorithm = False
+
+
+class _StubUnixServer(ThreadingUnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, stub: "StubServer", path: str) -> None:
+        self.stub = stub
+        self.state = stub.state
+        super().__init__(path, _UnixHandler)
+
+
+class StubServer:
+    """Middleman.ai APIを模したローカルHTTPサーバー。
+
+    with文で起動・停止します。
+
+    Attributes:
+        handler: レスポンスを差し替える関数。Noneを返した場合はデフォルトの応答
+        delay: レスポンスを返すまでの待機秒数
+        record_bodies: リクエストボディを記録するかどうか
+        read_delay_per_mb: ボディ受信1MBあたりの待機秒数（低速回線の模擬）
+        files: GETで返すファイルのパスと内容（変換結果のダウンロードの模擬）
+        range_support: filesのGETでRangeリクエストに応答するかどうか
+        trickle_delay: レスポンスボディを1バイトずつ送る間隔の秒数（低速な応答の模擬）
+        unix_socket: 待ち受けるUnixドメインソケットのパス。Noneの場合はTCPで待ち受け
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        handler: StubHandler | None = None,
+        delay: float = 0.0,
+        record_bodies: bool = True,
+        read_delay_per_mb: float = 0.0,
+        *,
+        files: Dict[str, bytes] | None = None,
+        range_support: bool = True,
+        trickle_delay: float = 0.0,
+        unix_socket: str | None = None,
+    ) -> None:
+        self.handler = handler
+        self.delay = delay
+        self.record_bodies = record_bodies
+        self.read_delay_per_mb = read_delay_per_mb
+        self.files = files or {}
+        self.range_support = range_support
+        self.trickle_delay = trickle_delay
+        self.unix_socket = unix_socket
+        self.state = _ServerState()
+        self._server: _StubHTTPServer | _StubUnixServer | None = None
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self) -> "StubServer":
+        if self.unix_socket is not None:
+            self._server = _StubUnixServer(self, self.unix_socket)
+        else:
+            self._server = _StubHTTPServer(self)
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.05}
+        )
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        assert self._server is not None
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    @property
+    def base_url(self) -> str:
+        """サーバーのベースURL。Unixドメインソケットの場合はホスト名にlocalhostを使用。"""
+        assert self._server is not None
+        if self.unix_socket is not None:
+            return "http://localhost"
+        host, port = self._server.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    @property
+    def connections_opened(self) -> int:
+        """これまでに受け付けたTCPコネクション数。"""
+        return self.state.connections_opened
+
+    @property
+    def requests(self) -> List[RecordedRequest]:
+        """これまでに受け付けたリクエスト。"""
+        with self.state.lock:
+            return list(self.state.requests)
+
+    def file_url(self, path: str) -> str:
+        """filesに登録したファイルのURLを返します。"""
+        return self.base_url + path
+
+    def file_response(self, request: RecordedRequest) -> StubResponse:
+        """filesに登録したファイルを返します。Rangeヘッダーがあれば一部分を返します。"""
+        content = self.files[request.path.split("?")[0]]
+        headers = {
+            "Content-Type": "application/octet-stream",
+            "ETag": f'"{hashlib.md5(content).hexdigest()}"',
+        }
+        match = _RANGE.match(request.headers.get("Range", ""))
+        if not self.range_support or match is None:
+            return 200, headers, content
+        start = int(match.group(1))
+        end = min(int(match.group(2) or len(content) - 1), len(content) - 1)
+        headers["Content-Range"] = f"bytes {start}-{end}/{len(content)}"
+        return 206, headers, bytes(memoryview(content)[start : end + 1])
+
+    def default_response(self, request: RecordedRequest) -> StubResponse:
+        """パスに対応するデフォルトのJSONレスポンスを返します。"""
+        path = request.path.split("?")[0]
+        if request.method == "GET" and path in self.files:
+            return self.file_response(request)
+        if path not in DEFAULT_RESPONSES:
+            return 404, {}, b'{"detail": "Not Found"}'
+        return 200, {}, json.dumps(DEFAULT_RESPONSES[path]).encode()
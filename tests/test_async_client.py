@@ -0,0 +1,236 @@
+"""AsyncToolsClientのテストモジュール。"""
+
+import asyncio
+import json
+from typing import Any, Callable, Dict, List
+
+import httpx
+import pytest
+
+from middleman_ai.async_client import AsyncToolsClient
+from middleman_ai.client import (
+    HTTP_FORBIDDEN,
+    HTTP_INTERNAL_SERVER_ERROR,
+    HTTP_NOT_FOUND,
+    HTTP_PAYMENT_REQUIRED,
+    HTTP_UNAUTHORIZED,
+    Placeholder,
+    Presentation,
+    Slide,
+)
+from middleman_ai.exceptions import (
+    ConnectionError,
+    ForbiddenError,
+    InternalError,
+    NotEnoughCreditError,
+    NotFoundError,
+    ValidationError,
+)
+from middleman_ai.models import MermaidToImageOptions
+from tests.stub_server import DEFAULT_RESPONSES, StubServer
+
+
+def _mock_client(
+    handler: Callable[[httpx.Request], httpx.Response],
+) -> AsyncToolsClient:
+    """MockTransportを使うAsyncToolsClientを生成します。"""
+    return AsyncToolsClient(
+        api_key="test_api_key", transport=httpx.MockTransport(handler)
+    )
+
+
+def _json_handler(requests: List[httpx.Request]) -> Callable:
+    """リクエストを記録し、パスに応じたデフォルトレスポンスを返すハンドラー。"""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        request.read()
+        requests.append(request)
+        return httpx.Response(200, json=DEFAULT_RESPONSES[request.url.path])
+
+    return handler
+
+
+def test_md_to_docx_success() -> None:
+    """md_to_docx成功時のテスト。"""
+    requests: List[httpx.Request] = []
+
+    async def run() -> str:
+        async with _mock_client(_json_handler(requests)) as client:
+            return await client.md_to_docx("# Test", docx_template_id="tid")
+
+    assert asyncio.run(run()) == "https://example.com/test.docx"
+    request = requests[0]
+    assert str(request.url) == "https://middleman-ai.com/api/v1/tools/md-to-docx"
+    assert request.headers["Authorization"] == "Bearer test_api_key"
+    assert json.loads(request.content) == {
+        "markdown": "# Test",
+        "docx_template_id": "tid",
+    }
+
+
+def test_md_to_pdf_with_images() -> None:
+    """md_to_pdf 画像付き成功時のテスト。"""
+    requests: List[httpx.Request] = []
+
+    async def run() -> str:
+        async with _mock_client(_json_handler(requests)) as client:
+            return await client.md_to_pdf(
+                "# Test", image_paths=["tests/data/test_image.png"]
+            )
+
+    assert asyncio.run(run()) == "https://example.com/test.pdf"
+    request = requests[0]
+    assert request.headers["Content-Type"].startswith("multipart/form-data")
+    assert int(request.headers["Content-Length"]) == len(request.content)
+    assert b'name="markdown"' in request.content
+    assert b'filename="test_image.png"' in request.content
+
+
+def test_all_methods_parity() -> None:
+    """全メソッドが同期クライアントと同じ戻り値の型を返すことのテスト。"""
+    requests: List[httpx.Request] = []
+    presentation = Presentation(
+        slides=[Slide(type="title", placeholders=[Placeholder(name="t", content="T")])]
+    )
+
+    async def run() -> Dict[str, Any]:
+        async with _mock_client(_json_handler(requests)) as client:
+            return {
+                "md_to_pdf": await client.md_to_pdf("# Test"),
+                "md_to_docx": await client.md_to_docx("# Test"),
+                "pdf": await client.pdf_to_page_images("tests/data/test.pdf"),
+                "pptx": await client.pptx_to_page_images("tests/data/test.pptx"),
+                "docx": await client.docx_to_page_images("tests/data/test.docx"),
+                "xlsx": await client.xlsx_to_page_images("tests/data/test.xlsx"),
+                "analyze": await client.json_to_pptx_analyze_v2("tid"),
+                "execute": await client.json_to_pptx_execute_v2("tid", presentation),
+                "mermaid": await client.mermaid_to_image(
+                    "graph TD; A-->B", options=MermaidToImageOptions(theme="dark")
+                ),
+                "xlsx_analyze": await client.xlsx_to_pdf_analyze("tid"),
+                "xlsx_execute": await client.xlsx_to_pdf_execute("tid", {"a": "b"}),
+            }
+
+    results = asyncio.run(run())
+
+    assert results["md_to_pdf"] == "https://example.com/test.pdf"
+    assert results["pdf"] == [
+        {"page_no": 1, "image_url": "https://example.com/page1.png"}
+    ]
+    assert results["xlsx"][0]["sheet_name"] == "Sheet1"
+    assert results["analyze"][0]["type"] == "title"
+    assert results["execute"] == "https://example.com/test.pptx"
+    assert results["mermaid"] == "https://example.com/mermaid.png"
+    assert results["xlsx_analyze"].sheet_name == "Sheet1"
+    assert results["xlsx_execute"].pdf_url == "https://example.com/output.pdf"
+    assert len(requests) == 11
+
+
+@pytest.mark.parametrize(
+    "status_code,expected_exception",
+    [
+        (HTTP_PAYMENT_REQUIRED, NotEnoughCreditError),
+        (HTTP_UNAUTHORIZED, ForbiddenError),
+        (HTTP_FORBIDDEN, ForbiddenError),
+        (HTTP_NOT_FOUND, NotFoundError),
+        (HTTP_INTERNAL_SERVER_ERROR, InternalError),
+    ],
+)
+def test_http_errors(status_code: int, expected_exception: type[Exception]) -> None:
+    """HTTP エラー時に同期クライアントと同じ例外となることのテスト。"""
+
+    async def run() -> None:
+        async with _mock_client(lambda r: httpx.Response(status_code)) as client:
+            await client.mermaid_to_image("graph TD; A-->B")
+
+    with pytest.raises(expected_exception):
+        asyncio.run(run())
+
+
+def test_connection_error() -> None:
+    """接続エラー時のテスト。"""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("connection refused")
+
+    async def run() -> None:
+        async with _mock_client(handler) as client:
+            await client.md_to_docx("# Test")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(run())
+
+
+def test_validation_error() -> None:
+    """レスポンスの形式が不正な場合のテスト。"""
+
+    async def run() -> None:
+        async with _mock_client(lambda r: httpx.Response(200, json={})) as client:
+            await client.xlsx_to_pdf_analyze("tid")
+
+    with pytest.raises(ValidationError):
+        asyncio.run(run())
+
+
+def test_file_error() -> None:
+    """ファイルが存在しない場合のテスト。"""
+
+    async def run() -> None:
+        async with _mock_client(lambda r: httpx.Response(200)) as client:
+            await client.pdf_to_page_images("nonexistent.pdf")
+
+    with pytest.raises(ValidationError, match="Failed to read PDF file"):
+        asyncio.run(run())
+
+
+def test_concurrency_limit() -> None:
+    """同時実行数がmax_concurrencyに制限されることのテスト。"""
+    in_flight = 0
+    peak = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200, json=DEFAULT_RESPONSES[request.url.path])
+
+    async def run() -> List[str]:
+        async with AsyncToolsClient(
+            api_key="test_api_key",
+            max_concurrency=5,
+            transport=httpx.MockTransport(handler),
+        ) as client:
+            return await asyncio.gather(
+                *(client.md_to_docx(f"# {i}") for i in range(50))
+            )
+
+    results = asyncio.run(run())
+
+    assert len(results) == 50
+    assert peak == 5
+
+
+def test_many_in_flight_against_stub_server() -> None:
+    """多数の同時変換がコネクションプールを共有して実行されることのテスト。"""
+
+    async def run(base_url: str) -> List[Any]:
+        async with AsyncToolsClient(
+            api_key="test_api_key",
+            base_url=base_url,
+            max_concurrency=20,
+            max_connections=20,
+        ) as client:
+            uploads = [
+                client.pdf_to_page_images("tests/data/test.pdf") for _ in range(50)
+            ]
+            docs = [client.md_to_docx(f"# {i}") for i in range(150)]
+            return await asyncio.gather(*uploads, *docs)
+
+    with StubServer(delay=0.01) as stub:
+        results = asyncio.run(run(stub.base_url))
+
+    assert len(results) == 200
+    assert len(stub.requests) == 200
+    assert stub.connections_opened <= 20
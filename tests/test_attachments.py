@@ -0,0 +1,148 @@
+"""添付ファイルのバンドルのテストモジュール。"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+from middleman_ai.async_client import AsyncToolsClient
+from middleman_ai.attachments import AttachmentBudget, AttachmentBundle
+from middleman_ai.client import ToolsClient
+from middleman_ai.exceptions import ValidationError
+from tests.helpers import multipart_files, write_file
+from tests.stub_server import StubServer
+
+
+@pytest.fixture
+def images(tmp_path: Path) -> Dict[str, Path]:
+    paths = {
+        "logo.png": tmp_path / "logo.png",
+        "chart.svg": tmp_path / "chart.svg",
+        "copy.png": tmp_path / "copy.png",
+    }
+    write_file(paths["logo.png"], b"\x89PNG logo")
+    write_file(paths["chart.svg"], b"<svg>chart</svg>")
+    write_file(paths["copy.png"], b"\x89PNG logo")
+    return paths
+
+
+def test_bundle_is_sent_without_reading_files(
+    images: Dict[str, Path], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """読み込み済みのバンドルはファイルを開かずに送信されることのテスト。"""
+    budget = AttachmentBudget()
+    bundle = AttachmentBundle([str(p) for p in images.values()], budget=budget)
+
+    def fail(path: str) -> None:
+        raise AssertionError(f"{path} was opened")
+
+    monkeypatch.setattr("middleman_ai.multipart._FileSegment", fail)
+    with StubServer() as stub:
+        with ToolsClient(api_key="test_api_key", base_url=stub.base_url) as client:
+            for _ in range(3):
+                client.md_to_pdf("![logo](logo.png)", image_paths=bundle)
+
+    assert len(stub.requests) == 3
+    assert multipart_files(stub.requests[2]) == {
+        "logo.png": b"\x89PNG logo",
+        "chart.svg": b"<svg>chart</svg>",
+        "copy.png": b"\x89PNG logo",
+    }
+    parts = bundle.parts()
+    assert parts[1].content_type == "image/svg+xml"
+    # 中身が同じファイルは1つのバイト列を共有する
+    assert parts[0].data is parts[2].data
+    assert budget.used == len(b"\x89PNG logo") + len(b"<svg>chart</svg>")
+    bundle.close()
+    assert budget.used == 0
+
+
+def test_bundle_reloads_changed_files(images: Dict[str, Path]) -> None:
+    """statで変更を検出したファイルだけを読み直すことのテスト。"""
+    budget = AttachmentBudget()
+    with AttachmentBundle([str(images["logo.png"])], budget=budget) as bundle:
+        first = bundle.parts()[0]
+        write_file(images["logo.png"], b"\x89PNG new logo", age=30)
+        second = bundle.parts()[0]
+
+        assert second.data == b"\x89PNG new logo"
+        assert second.digest != first.digest
+        assert budget.used == len(b"\x89PNG new logo")
+
+        images["logo.png"].unlink()
+        with StubServer() as stub:
+            with ToolsClient(api_key="test_api_key", base_url=stub.base_url) as client:
+                with pytest.raises(ValidationError):
+                    client.md_to_pdf("# report", image_paths=bundle)
+        assert stub.requests == []
+
+
+def test_concurrent_refresh_reloads_once(
+    images: Dict[str, Path], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """多数のスレッドが同時に変更を検出しても、読み直しと解放は1回だけ行われることのテスト。"""
+    budget = AttachmentBudget()
+    bundle = AttachmentBundle([str(images["logo.png"])], budget=budget)
+    load_all = bundle._load_all
+
+    def slow_load_all(paths: List[str]) -> list:
+        # 読み直しが重なるように遅らせる
+        time.sleep(0.05)
+        return load_all(paths)
+
+    monkeypatch.setattr(bundle, "_load_all", slow_load_all)
+    write_file(images["logo.png"], b"\x89PNG new logo", age=30)
+    barrier = threading.Barrier(8)
+
+    def parts() -> bytes | None:
+        barrier.wait()
+        return bundle.parts()[0].data
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: parts(), range(8)))
+
+    assert results == [b"\x89PNG new logo"] * 8
+    assert bundle._digests == [bundle.parts()[0].digest]
+    assert budget.used == len(b"\x89PNG new logo")
+    bundle.close()
+    assert budget.used == 0
+
+
+def test_budget_shared_between_bundles(images: Dict[str, Path]) -> None:
+    """上限を超えるファイルはディスクから送信し、中身はバンドル間で共有されることのテスト。"""
+    budget = AttachmentBudget(max_bytes=len(b"\x89PNG logo"))
+    first = AttachmentBundle([str(images["logo.png"])], budget=budget)
+    second = AttachmentBundle(
+        [str(images["copy.png"]), str(images["chart.svg"])], budget=budget
+    )
+
+    parts = second.parts()
+    assert parts[0].data is first.parts()[0].data
+    assert parts[1].data is None
+    with StubServer() as stub:
+        with ToolsClient(api_key="test_api_key", base_url=stub.base_url) as client:
+            client.md_to_pdf("# report", image_paths=second)
+    assert multipart_files(stub.requests[0])["chart.svg"] == b"<svg>chart</svg>"
+
+    first.close()
+    assert budget.used == len(b"\x89PNG logo")
+    second.close()
+    assert budget.used == 0
+
+
+def test_async_client_accepts_bundle(images: Dict[str, Path]) -> None:
+    """非同期クライアントでもバンドルを添付できることのテスト。"""
+    bundle = AttachmentBundle([str(images["chart.svg"])], budget=AttachmentBudget())
+
+    async def run(base_url: str) -> str:
+        async with AsyncToolsClient(api_key="test_api_key", base_url=base_url) as c:
+            return await c.md_to_pdf("# report", image_paths=bundle)
+
+    with StubServer() as stub:
+        assert asyncio.run(run(stub.base_url)) == "https://example.com/test.pdf"
+
+    assert multipart_files(stub.requests[0]) == {"chart.svg": b"<svg>chart</svg>"}
@@ -0,0 +1,190 @@
+"""バッチ処理のテストモジュール。"""
+
+import json
+import threading
+import time
+from typing import Any, Iterator, List, Tuple
+
+import pytest
+
+from middleman_ai.batch import run_batch
+from middleman_ai.client import Placeholder, Presentation, Slide, ToolsClient
+from middleman_ai.exceptions import CancelledError, NotFoundError
+from tests.stub_server import RecordedRequest, StubServer
+
+
+class ConcurrencyProbe:
+    """スタブサーバーで同時に処理中のリクエスト数の最大値を記録するハンドラー。"""
+
+    def __init__(self, delay: float = 0.02) -> None:
+        self.delay = delay
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, request: RecordedRequest) -> Any:
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        if b"missing" in request.body:
+            return 404, {}, b"{}"
+        return None
+
+
+@pytest.fixture
+def probe() -> ConcurrencyProbe:
+    """同時実行数を記録するハンドラーを生成します。"""
+    return ConcurrencyProbe()
+
+
+@pytest.fixture
+def client(probe: ConcurrencyProbe) -> Iterator[ToolsClient]:
+    """スタブサーバーに接続するToolsClientを生成します。"""
+    with StubServer(handler=probe) as stub:
+        yield ToolsClient(api_key="test_api_key", base_url=stub.base_url)
+
+
+def test_ordered_results_with_bounded_concurrency(
+    client: ToolsClient, probe: ConcurrencyProbe
+) -> None:
+    """入力の順序で結果が返り、同時実行数が上限以下であることのテスト。"""
+    documents = [f"# Doc {i}" for i in range(40)]
+
+    results = list(client.batch("md_to_docx", documents, max_concurrency=8))
+
+    assert [r.index for r in results] == list(range(40))
+    assert [r.item for r in results] == documents
+    assert all(r.ok and r.value == "https://example.com/test.docx" for r in results)
+    assert 1 < probe.peak <= 8
+
+
+def test_as_completed_results() -> None:
+    """ordered=Falseの場合は完了した順に結果が返ることのテスト。"""
+
+    def slow(delay: float) -> float:
+        time.sleep(delay)
+        return delay
+
+    results = list(run_batch(slow, [0.2, 0.0, 0.1], max_concurrency=3, ordered=False))
+
+    assert [r.index for r in results] == [1, 2, 0]
+    assert [r.unwrap() for r in results] == [0.0, 0.1, 0.2]
+
+
+def test_per_item_errors(client: ToolsClient) -> None:
+    """失敗した入力の例外が結果ごとに格納され、他の入力は成功することのテスト。"""
+    items = ["# ok", "# missing", "# ok"]
+
+    results = list(client.batch("md_to_docx", items))
+
+    assert [r.ok for r in results] == [True, False, True]
+    assert isinstance(results[1].error, NotFoundError)
+    with pytest.raises(NotFoundError):
+        results[1].unwrap()
+
+
+def test_every_endpoint(client: ToolsClient) -> None:
+    """全てのエンドポイントをバッチ処理できることのテスト。"""
+    presentation = Presentation(
+        slides=[Slide(type="title", placeholders=[Placeholder(name="t", content="T")])]
+    )
+    calls: List[Tuple[str, List[Any]]] = [
+        ("md_to_pdf", [{"markdown_text": "# A", "image_paths": None}]),
+        ("md_to_docx", ["# A"]),
+        ("pdf_to_page_images", ["tests/data/test.pdf"]),
+        ("pptx_to_page_images", ["tests/data/test.pptx"]),
+        ("docx_to_page_images", ["tests/data/test.docx"]),
+        ("xlsx_to_page_images", ["tests/data/test.xlsx"]),
+        ("json_to_pptx_analyze_v2", ["tid"]),
+        ("json_to_pptx_execute_v2", [("tid", presentation)]),
+        ("mermaid_to_image", ["graph TD; A-->B"]),
+        ("xlsx_to_pdf_analyze", [("tid", "Sheet1")]),
+        ("xlsx_to_pdf_execute", [("tid", {"a": "b"})]),
+    ]
+
+    for method, items in calls:
+        results = list(client.batch(method, items * 3, max_concurrency=3))
+        assert all(r.ok for r in results), (method, results)
+        assert len(results) == 3
+
+
+def test_unknown_method(client: ToolsClient) -> None:
+    """存在しないメソッド名を指定した場合にValueErrorとなることのテスト。"""
+    with pytest.raises(ValueError):
+        client.batch("close", [None])
+
+
+def test_progress_callback(client: ToolsClient) -> None:
+    """1件完了するごとに進捗コールバックが呼ばれることのテスト。"""
+    progress: List[Tuple[int, Any]] = []
+
+    list(
+        client.batch(
+            "md_to_docx",
+            [f"# {i}" for i in range(10)],
+            progress=lambda done, total: progress.append((done, total)),
+        )
+    )
+
+    assert progress == [(i, 10) for i in range(1, 11)]
+
+
+def test_progress_with_unknown_total(client: ToolsClient) -> None:
+    """ジェネレーターを渡した場合は全体の件数がNoneとなることのテスト。"""
+    totals: List[Any] = []
+
+    results = list(
+        client.batch(
+            "md_to_docx",
+            (f"# {i}" for i in range(5)),
+            progress=lambda done, total: totals.append(total),
+        )
+    )
+
+    assert len(results) == 5
+    assert totals == [None] * 5
+
+
+def test_cancel(client: ToolsClient, probe: ConcurrencyProbe) -> None:
+    """キャンセル後は実行前の入力が実行されずCancelledErrorとなることのテスト。"""
+    cancel = threading.Event()
+    consumed = 0
+
+    def documents() -> Iterator[str]:
+        nonlocal consumed
+        for i in range(1000):
+            consumed += 1
+            yield f"# {i}"
+
+    def on_progress(done: int, total: Any) -> None:
+        if done == 5:
+            cancel.set()
+
+    results = list(
+        client.batch(
+            "md_to_docx",
+            documents(),
+            max_concurrency=4,
+            progress=on_progress,
+            cancel=cancel,
+        )
+    )
+
+    assert [r.index for r in results] == list(range(len(results)))
+    assert sum(r.ok for r in results) >= 5
+    assert any(isinstance(r.error, CancelledError) for r in results)
+    assert consumed < 20
+    assert probe.peak <= 4
+
+
+def test_request_bodies_match_items(probe: ConcurrencyProbe) -> None:
+    """各入力がそれぞれ1回ずつ送信されることのテスト。"""
+    with StubServer(handler=probe) as stub:
+        client = ToolsClient(api_key="test_api_key", base_url=stub.base_url)
+        list(client.batch("md_to_docx", [f"# {i}" for i in range(20)], ordered=False))
+
+    sent = sorted(json.loads(r.body)["markdown"] for r in stub.requests)
+    assert sent == sorted(f"# {i}" for i in range(20))
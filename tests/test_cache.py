@@ -0,0 +1,219 @@
+"""変換結果キャッシュのテストモジュール。"""
+
+import asyncio
+import os
+from pathlib import Path
+from typing import Any, Iterator, List
+
+import httpx
+import pytest
+
+from middleman_ai.async_client import AsyncToolsClient
+from middleman_ai.cache import ENDPOINT_PATHS, ResultCache, account_scope
+from middleman_ai.client import ToolsClient
+from middleman_ai.exceptions import InternalError
+from middleman_ai.models import XlsxToPdfExecuteResponse
+from tests.helpers import FakeClock
+from tests.stub_server import DEFAULT_RESPONSES, RecordedRequest, StubServer
+
+
+@pytest.fixture
+def stub() -> Iterator[StubServer]:
+    """ローカルスタブサーバーを起動します。"""
+    with StubServer() as server:
+        yield server
+
+
+def _client(stub: StubServer, cache: ResultCache) -> ToolsClient:
+    return ToolsClient(api_key="test_api_key", base_url=stub.base_url, cache=cache)
+
+
+def test_hit_skips_network(stub: StubServer) -> None:
+    """同じ入力の2回目の呼び出しで通信しないことのテスト。"""
+    client = _client(stub, ResultCache())
+
+    first = client.xlsx_to_pdf_execute("tid", {"a": "1", "b": "2"})
+    # プレースホルダーの順序が異なっても同じ入力として扱う
+    second = client.xlsx_to_pdf_execute("tid", {"b": "2", "a": "1"})
+    client.mermaid_to_image("graph TD; A-->B")
+    client.mermaid_to_image("graph TD; A-->B")
+
+    assert isinstance(second, XlsxToPdfExecuteResponse)
+    assert first == second
+    assert len(stub.requests) == 2
+
+
+def test_key_includes_template_and_payload(stub: StubServer) -> None:
+    """テンプレートIDやペイロードが異なる場合は別のエントリになることのテスト。"""
+    client = _client(stub, ResultCache())
+
+    client.md_to_docx("# Test", docx_template_id="t1")
+    client.md_to_docx("# Test", docx_template_id="t2")
+    client.md_to_docx("# Other", docx_template_id="t1")
+    client.md_to_docx("# Test", docx_template_id="t1")
+
+    assert len(stub.requests) == 3
+
+
+def test_key_includes_account_and_base_url(stub: StubServer) -> None:
+    """APIキーや接続先が異なるクライアント間でエントリを共有しないことのテスト。"""
+    cache = ResultCache()
+    with StubServer() as other:
+        clients = [
+            ToolsClient(api_key="key_a", base_url=stub.base_url, cache=cache),
+            ToolsClient(api_key="key_b", base_url=stub.base_url, cache=cache),
+            ToolsClient(api_key="key_a", base_url=other.base_url, cache=cache),
+        ]
+        for client in clients * 2:
+            client.mermaid_to_image("graph TD; A-->B")
+
+        assert len(stub.requests) == 2
+        assert len(other.requests) == 1
+    # 共有のバックエンドに保存されるキーの材料にもAPIキーをそのまま含めない
+    assert "key_a" not in account_scope(stub.base_url, "key_a")
+
+
+def test_async_key_includes_account() -> None:
+    """AsyncToolsClientでもAPIキーが異なる場合は別のエントリになることのテスト。"""
+    requests: List[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json=DEFAULT_RESPONSES[request.url.path])
+
+    async def run(cache: ResultCache) -> None:
+        for api_key in ["key_a", "key_b", "key_a"]:
+            async with AsyncToolsClient(
+                api_key=api_key,
+                transport=httpx.MockTransport(handler),
+                cache=cache,
+            ) as client:
+                await client.mermaid_to_image("graph TD; A-->B")
+
+    asyncio.run(run(ResultCache()))
+    assert len(requests) == 2
+
+
+def test_key_includes_attachment_bytes(stub: StubServer, tmp_path: Path) -> None:
+    """添付ファイルの中身が変わった場合は再度通信することのテスト。"""
+    client = _client(stub, ResultCache())
+    image = tmp_path / "image.png"
+    image.write_bytes(b"\x89PNG first")
+
+    client.md_to_pdf("# Test", image_paths=[str(image)])
+    client.md_to_pdf("# Test", image_paths=[str(image)])
+    image.write_bytes(b"\x89PNG second")
+    client.md_to_pdf("# Test", image_paths=[str(image)])
+    client.pdf_to_page_images("tests/data/test.pdf")
+    client.pdf_to_page_images("tests/data/test.pdf")
+
+    assert len(stub.requests) == 3
+
+
+def test_ttl_expiry(stub: StubServer) -> None:
+    """エンドポイントごとのTTLを過ぎたエントリは使われないことのテスト。"""
+    clock = FakeClock(1_000_000.0)
+    cache = ResultCache(ttls={"mermaid_to_image": 60}, clock=clock)
+    client = _client(stub, cache)
+
+    client.mermaid_to_image("graph TD; A-->B")
+    clock.now += 59
+    client.mermaid_to_image("graph TD; A-->B")
+    clock.now += 2
+    client.mermaid_to_image("graph TD; A-->B")
+
+    assert len(stub.requests) == 2
+    assert cache.ttl_for(ENDPOINT_PATHS["mermaid_to_image"]) == 60
+    assert cache.ttl_for(ENDPOINT_PATHS["md_to_pdf"]) == cache.default_ttl
+
+
+def test_disabled_endpoints(stub: StubServer) -> None:
+    """TTLが0のエンドポイントとテンプレート解析はキャッシュされないことのテスト。"""
+    client = _client(stub, ResultCache(ttls={"md_to_docx": 0}))
+
+    for _ in range(2):
+        client.md_to_docx("# Test")
+        client.json_to_pptx_analyze_v2("tid")
+        client.xlsx_to_pdf_analyze("tid")
+
+    assert len(stub.requests) == 6
+
+
+def test_errors_are_not_cached() -> None:
+    """エラーとなった呼び出しの結果は保存されないことのテスト。"""
+    calls = 0
+
+    def handler(request: RecordedRequest) -> Any:
+        nonlocal calls
+        calls += 1
+        return (500, {}, b"{}") if calls == 1 else None
+
+    with StubServer(handler=handler) as stub:
+        client = _client(stub, ResultCache())
+        with pytest.raises(InternalError):
+            client.md_to_docx("# Test")
+        assert client.md_to_docx("# Test") == "https://example.com/test.docx"
+        client.md_to_docx("# Test")
+
+    assert len(stub.requests) == 2
+
+
+def test_memory_lru_eviction(stub: StubServer) -> None:
+    """エントリ数の上限を超えた場合に最も古いエントリから破棄されることのテスト。"""
+    client = _client(stub, ResultCache(max_entries=2))
+
+    client.md_to_docx("# 1")
+    client.md_to_docx("# 2")
+    client.md_to_docx("# 1")
+    client.md_to_docx("# 3")  # "# 2" が破棄される
+    client.md_to_docx("# 1")
+    client.md_to_docx("# 2")
+
+    assert len(stub.requests) == 4
+
+
+def test_disk_tier_survives_restart(stub: StubServer, tmp_path: Path) -> None:
+    """ディスクキャッシュが別のインスタンスからも使えることのテスト。"""
+    directory = str(tmp_path / "cache")
+    _client(stub, ResultCache(directory=directory)).md_to_docx("# Test")
+
+    client = _client(stub, ResultCache(directory=directory))
+    assert client.md_to_docx("# Test") == "https://example.com/test.docx"
+    assert len(stub.requests) == 1
+
+
+def test_disk_tier_size_limit(stub: StubServer, tmp_path: Path) -> None:
+    """ディスクキャッシュの合計サイズが上限以下に保たれることのテスト。"""
+    directory = tmp_path / "cache"
+    cache = ResultCache(directory=str(directory), max_disk_bytes=300)
+    client = _client(stub, cache)
+
+    for i in range(10):
+        client.md_to_docx(f"# {i}")
+
+    sizes = [os.path.getsize(p) for p in directory.glob("*.json")]
+    assert 0 < len(sizes) < 10
+    assert sum(sizes) <= 300
+
+
+def test_async_client_uses_cache() -> None:
+    """AsyncToolsClientでもキャッシュにヒットした場合は通信しないことのテスト。"""
+    requests: List[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json=DEFAULT_RESPONSES[request.url.path])
+
+    async def run() -> List[str]:
+        async with AsyncToolsClient(
+            api_key="test_api_key",
+            transport=httpx.MockTransport(handler),
+            cache=ResultCache(),
+        ) as client:
+            return [
+                await client.md_to_pdf("# T", image_paths=["tests/data/test_image.png"])
+                for _ in range(3)
+            ]
+
+    assert asyncio.run(run()) == ["https://example.com/test.pdf"] * 3
+    assert len(requests) == 1
@@ -0,0 +1,200 @@
+"""キャッシュのバックエンドのテストモジュール。"""
+
+import multiprocessing
+from pathlib import Path
+
+import pytest
+
+from middleman_ai.cache import ResultCache
+from middleman_ai.cache_backends import (
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    SQLiteCacheBackend,
+)
+from middleman_ai.client import ToolsClient
+from middleman_ai.template_cache import TEMPLATE_CACHE_URL_ENV, TemplateCache
+from tests.helpers import FakeClock
+from tests.resp_server import RespServer
+from tests.stub_server import StubServer
+
+
+def _write_entries(path: str, worker: int) -> None:
+    """別のプロセスから同じSQLiteのファイルにエントリを書き込みます。"""
+    backend = SQLiteCacheBackend(path)
+    for i in range(50):
+        backend.set(f"w{worker}-{i}", f"value-{worker}-{i}".encode(), 60)
+    backend.close()
+
+
+def test_memory_lru_and_stats() -> None:
+    """LRUで古いエントリが破棄され、統計に記録されることのテスト。"""
+    clock = FakeClock(1_000_000.0)
+    backend = MemoryCacheBackend(max_entries=2, clock=clock)
+
+    backend.set("a", b"1", 60)
+    backend.set("b", b"2", 60)
+    assert backend.get("a") == b"1"
+    backend.set("c", b"3", 60)
+    clock.now += 61
+
+    assert backend.get("b") is None
+    assert backend.get("a") is None
+    stats = backend.stats()
+    assert (stats.hits, stats.misses, stats.sets, stats.evictions) == (1, 2, 3, 1)
+    assert stats.hit_rate == pytest.approx(1 / 3)
+
+
+def test_compression_round_trip() -> None:
+    """大きな値だけが圧縮して保存され、取得時に元に戻ることのテスト。"""
+    backend = MemoryCacheBackend(compress=True, compress_min_size=100)
+    large = b'{"pages": "' + b"x" * 10_000 + b'"}'
+
+    backend.set("large", large, 60)
+    backend.set("small", b"{}", 60)
+
+    assert backend.get("large") == large
+    assert backend.get("small") == b"{}"
+    assert backend.size < len(large) // 10
+
+
+def test_sqlite_shared_between_processes(tmp_path: Path) -> None:
+    """複数のプロセスが同時に書き込んだエントリを読み出せることのテスト。"""
+    path = str(tmp_path / "cache.db")
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_write_entries, args=(path, w)) for w in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+        assert worker.exitcode == 0
+
+    backend = SQLiteCacheBackend(path)
+    assert backend.get("w3-49") == b"value-3-49"
+    assert all(backend.get(f"w{w}-0") is not None for w in range(4))
+    backend.delete_prefix("w1-")
+    assert backend.get("w1-10") is None
+    assert backend.get("w2-10") == b"value-2-10"
+    backend.close()
+
+
+def test_sqlite_size_limit_and_ttl(tmp_path: Path) -> None:
+    """合計サイズの上限を超えると最終アクセスが古いエントリから破棄されることのテスト。"""
+    clock = FakeClock(1_000_000.0)
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.db"), max_bytes=300, clock=clock)
+
+    for i in range(3):
+        backend.set(f"k{i}", b"x" * 99, 60)
+        clock.now += 1
+    backend.get("k0")
+    clock.now += 1
+    backend.set("k3", b"x" * 99, 60)
+
+    assert backend.get("k1") is None
+    assert backend.get("k0") is not None
+    assert backend.stats().evictions == 1
+    clock.now += 61
+    assert backend.get("k3") is None
+    backend.close()
+
+
+def test_redis_backend() -> None:
+    """Redisプロトコルのサーバーに保存・削除できることのテスト。"""
+    with RespServer(password="secret") as server:
+        backend = RedisCacheBackend.from_url(
+            f"redis://:secret@127.0.0.1:{server.port}/2", prefix="test:"
+        )
+        backend.set("t1-a", b"1", 60)
+        backend.set("t1-b", b"2", 60)
+        backend.set("t2-a", b"3", 60)
+        backend.delete_prefix("t1-")
+
+        assert backend.get("t1-a") is None
+        assert backend.get("t2-a") == b"3"
+        assert set(server.data[2]) == {b"test:t2-a"}
+        backend.close()
+
+    # サーバーに接続できない場合は例外を送出せず、ミスとして扱う
+    assert backend.get("t2-a") is None
+    assert backend.stats().errors == 1
+
+
+def test_redis_error_replies_are_misses() -> None:
+    """サーバーのエラー応答や認証の失敗を、例外を送出せずミスとして扱うことのテスト。"""
+    with RespServer(password="secret") as server:
+        backend = RedisCacheBackend(port=server.port, password="secret")
+        backend.set("a", b"1", 60)
+        server.error = "OOM command not allowed when used memory > 'maxmemory'."
+        backend.set("b", b"2", 60)
+        assert backend.get("a") is None
+        backend.delete("a")
+        server.error = None
+        assert backend.get("a") == b"1"
+        backend.close()
+
+        wrong = RedisCacheBackend(port=server.port, password="wrong")
+        assert wrong.get("a") is None
+        wrong.set("a", b"2", 60)
+        wrong.close()
+
+    assert backend.stats().errors == 3
+    assert wrong.stats().errors == 2
+
+
+def test_corrupt_value_is_a_miss() -> None:
+    """壊れた値や形式の分からない値を、例外を送出せずミスとして扱うことのテスト。"""
+    with RespServer() as server:
+        backend = RedisCacheBackend(port=server.port, prefix="test:")
+        backend.set("ok", b"1", 60)
+        server.data[0][b"test:zip"] = (None, b"z" + b"not zlib")
+        server.data[0][b"test:unknown"] = (None, b"?value")
+
+        assert backend.get("zip") is None
+        assert backend.get("unknown") is None
+        assert backend.get("ok") == b"1"
+        backend.close()
+
+    stats = backend.stats()
+    assert (stats.hits, stats.misses, stats.errors) == (1, 2, 2)
+
+
+def test_result_cache_shared_across_clients() -> None:
+    """backendを共有する別々のResultCacheで結果を共有できることのテスト。"""
+    with RespServer() as server, StubServer() as stub:
+        for _ in range(2):
+            cache = ResultCache(backend=RedisCacheBackend.from_url(server.url))
+            with ToolsClient(
+                api_key="test_api_key", base_url=stub.base_url, cache=cache
+            ) as client:
+                client.mermaid_to_image("graph TD; A-->B")
+
+        stats = cache.stats()
+        assert stats["backend"].hits == 1
+        assert stats["memory"].misses == 1
+
+    assert len(stub.requests) == 1
+
+
+def test_template_cache_backend_from_env(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """環境変数で指定したバックエンドでテンプレートのエントリを共有・削除できることのテスト。"""
+    monkeypatch.setenv(TEMPLATE_CACHE_URL_ENV, f"sqlite://{tmp_path}/templates.db")
+
+    with StubServer() as stub:
+        mcp_cache = TemplateCache.from_env()
+        cli_cache = TemplateCache.from_env()
+        assert mcp_cache is not None and cli_cache is not None
+        for cache in (mcp_cache, cli_cache):
+            with ToolsClient(
+                api_key="test_api_key", base_url=stub.base_url, template_cache=cache
+            ) as client:
+                client.json_to_pptx_analyze_v2("t1")
+                client.json_to_pptx_analyze_v2("t2")
+        cli_cache.invalidate("t1")
+        with ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, template_cache=mcp_cache
+        ) as client:
+            client.json_to_pptx_analyze_v2("t1")
+            client.json_to_pptx_analyze_v2("t2")
+
+    assert len(stub.requests) == 3
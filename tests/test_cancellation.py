@@ -0,0 +1,217 @@
+"""キャンセルトークンのテストモジュール。"""
+
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+from urllib3.connection import HTTPConnection
+
+from middleman_ai.cancellation import (
+    CancellationToken,
+    _HTTPConnectionPool,
+    cancellation,
+)
+from middleman_ai.client import ToolsClient
+from middleman_ai.concurrency import AdaptiveConcurrency
+from middleman_ai.exceptions import CancelledError
+from middleman_ai.ratelimit import RateLimiter
+from middleman_ai.retry import RetryPolicy
+from middleman_ai.transport import InMemoryTransport
+from tests.stub_server import RecordedRequest, StubServer
+
+MB = 1024 * 1024
+
+
+def _cancel_after(token: CancellationToken, seconds: float) -> threading.Timer:
+    timer = threading.Timer(seconds, token.cancel)
+    timer.start()
+    return timer
+
+
+def _blocking_handler(release: threading.Event) -> Any:
+    def handler(request: RecordedRequest) -> Any:
+        release.wait(5)
+        return None
+
+    return handler
+
+
+def test_cancel_upload_in_flight(tmp_path: Path) -> None:
+    """アップロード中にキャンセルすると送信を打ち切り、コネクションの枠が解放されることのテスト。"""
+    pdf = tmp_path / "large.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n" + b"0" * (16 * MB))
+    token = CancellationToken()
+
+    with StubServer(read_delay_per_mb=1.0, record_bodies=False) as stub:
+        with ToolsClient(
+            api_key="test_api_key",
+            base_url=stub.base_url,
+            pool_maxsize=1,
+            pool_block=True,
+        ) as client:
+            timer = _cancel_after(token, 0.3)
+            started = time.monotonic()
+            with cancellation(token), pytest.raises(CancelledError):
+                client.pdf_to_page_images(str(pdf))
+            elapsed = time.monotonic() - started
+            timer.join()
+
+            # 中断したコネクションは破棄され、次の呼び出しが待たされない
+            stub.read_delay_per_mb = 0.0
+            assert client.md_to_docx("# Title")
+
+    assert elapsed < 2.0
+    assert stub.requests[0].body_size < 16 * MB
+
+
+def test_cancel_while_waiting_for_response() -> None:
+    """レスポンス待ちの間にキャンセルしてもすぐに中断されることのテスト。"""
+    release = threading.Event()
+    token = CancellationToken()
+
+    with StubServer(handler=_blocking_handler(release)) as stub:
+        client = ToolsClient(api_key="test_api_key", base_url=stub.base_url)
+        timer = _cancel_after(token, 0.3)
+        started = time.monotonic()
+        with cancellation(token), pytest.raises(CancelledError):
+            client.md_to_docx("# Title")
+        elapsed = time.monotonic() - started
+        timer.join()
+        release.set()
+        client.close()
+
+    assert elapsed < 2.0
+
+
+def test_cancelled_before_call() -> None:
+    """キャンセル済みのトークンでは送信せずにCancelledErrorとなることのテスト。"""
+    token = CancellationToken()
+    token.cancel()
+
+    with StubServer() as stub:
+        with ToolsClient(api_key="test_api_key", base_url=stub.base_url) as client:
+            with cancellation(token), pytest.raises(CancelledError):
+                client.md_to_docx("# Title")
+
+    assert stub.requests == []
+    assert token.cancelled
+
+
+def test_cancel_interrupts_retry_wait() -> None:
+    """リトライの待機中にキャンセルするとすぐに中断されることのテスト。"""
+    token = CancellationToken()
+
+    def handler(request: RecordedRequest) -> Any:
+        return 503, {"Retry-After": "5"}, b"{}"
+
+    with StubServer(handler=handler) as stub:
+        with ToolsClient(
+            api_key="test_api_key",
+            base_url=stub.base_url,
+            retry=RetryPolicy(max_attempts=3),
+        ) as client:
+            timer = _cancel_after(token, 0.3)
+            started = time.monotonic()
+            with cancellation(token), pytest.raises(CancelledError):
+                client.md_to_docx("# Title")
+            elapsed = time.monotonic() - started
+            timer.join()
+
+    assert len(stub.requests) == 1
+    assert elapsed < 2.0
+
+
+def test_batch_token_aborts_in_flight_calls() -> None:
+    """batchにトークンを指定すると実行中の呼び出しも中断されることのテスト。"""
+    release = threading.Event()
+    token = CancellationToken()
+
+    with StubServer(handler=_blocking_handler(release)) as stub:
+        client = ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, pool_maxsize=4
+        )
+        timer = _cancel_after(token, 0.3)
+        started = time.monotonic()
+        results = list(
+            client.batch("md_to_docx", ["# A"] * 8, max_concurrency=4, cancel=token)
+        )
+        elapsed = time.monotonic() - started
+        timer.join()
+        release.set()
+        client.close()
+
+    assert all(isinstance(r.error, CancelledError) for r in results)
+    assert len(stub.requests) <= 4
+    assert elapsed < 2.0
+
+
+def test_cancel_interrupts_rate_limit_and_concurrency_waits() -> None:
+    """レートリミッターと同時実行数の枠の待機中にキャンセルできることのテスト。"""
+    limiter = RateLimiter(rate=0.5)
+    concurrency = AdaptiveConcurrency(initial=1, max_limit=1)
+    transport = InMemoryTransport(
+        lambda request: {"docx_url": "https://example.com/a.docx"}
+    )
+    client = ToolsClient(
+        api_key="test_api_key", transport=transport, rate_limiter=limiter
+    )
+    client.md_to_docx("# Title")
+    token = CancellationToken()
+    timer = _cancel_after(token, 0.2)
+    started = time.monotonic()
+    with cancellation(token), pytest.raises(CancelledError):
+        client.md_to_docx("# Title")
+    assert time.monotonic() - started < 1.0
+    timer.join()
+    # 予約したトークンは返却される
+    assert limiter.reserve("md_to_docx") < 2.0
+
+    client = ToolsClient(
+        api_key="test_api_key", transport=transport, concurrency=concurrency
+    )
+    concurrency.acquire()
+    token = CancellationToken()
+    timer = _cancel_after(token, 0.2)
+    started = time.monotonic()
+    with cancellation(token), pytest.raises(CancelledError):
+        client.md_to_docx("# Title")
+    assert time.monotonic() - started < 1.0
+    timer.join()
+    assert concurrency.in_flight == 1
+
+
+@pytest.mark.parametrize(
+    ("owner", "name"),
+    [
+        # コネクションを記録する前にキャンセルされた場合
+        (_HTTPConnectionPool, "_get_conn"),
+        # 記録した後、接続の確立中にキャンセルされた場合
+        (HTTPConnection, "connect"),
+    ],
+)
+def test_cancel_before_socket_is_tracked(
+    owner: type, name: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """ソケットをshutdownできない間にキャンセルされても、すぐに中断されることのテスト。"""
+    original = getattr(owner, name)
+    token = CancellationToken()
+
+    def cancel_then_call(self: Any, *args: Any, **kwargs: Any) -> Any:
+        token.cancel()
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(owner, name, cancel_then_call)
+    release = threading.Event()
+    with StubServer(handler=_blocking_handler(release)) as stub:
+        client = ToolsClient(api_key="test_api_key", base_url=stub.base_url)
+        started = time.monotonic()
+        with cancellation(token), pytest.raises(CancelledError):
+            client.md_to_docx("# Title")
+        elapsed = time.monotonic() - started
+        release.set()
+        client.close()
+
+    assert elapsed < 1.0
+    assert stub.requests == []
@@ -0,0 +1,281 @@
+"""サーキットブレーカーのテストモジュール。"""
+
+import asyncio
+import threading
+from pathlib import Path
+from typing import Any, List
+
+import httpx
+import pytest
+
+from middleman_ai.async_client import AsyncToolsClient
+from middleman_ai.cache import ResultCache
+from middleman_ai.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from middleman_ai.client import ToolsClient
+from middleman_ai.exceptions import (
+    CircuitOpenError,
+    ConnectionError,
+    DeadlineExceededError,
+    InternalError,
+    NotFoundError,
+)
+from middleman_ai.timeouts import deadline
+from tests.helpers import FakeClock
+from tests.stub_server import RecordedRequest, StubServer
+
+MD_TO_DOCX = "/api/v1/tools/md-to-docx"
+
+
+def _breaker(clock: FakeClock) -> CircuitBreaker:
+    return CircuitBreaker(
+        failure_rate_threshold=0.5,
+        minimum_requests=4,
+        window=60,
+        open_duration=30,
+        clock=clock,
+    )
+
+
+def test_opens_on_failure_rate() -> None:
+    """失敗率がしきい値を超えるとopenになり、即座に失敗することのテスト。"""
+    clock = FakeClock()
+    breaker = _breaker(clock)
+
+    for record in [breaker.record_success, breaker.record_failure] * 2:
+        breaker.before_call("md_to_docx")
+        record("md_to_docx")
+
+    assert breaker.state("md_to_docx") == OPEN
+    clock.now += 10
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.before_call(MD_TO_DOCX)
+    assert excinfo.value.retry_after == pytest.approx(20)
+    # 他のエンドポイントには影響しない
+    breaker.before_call("md_to_pdf")
+
+
+def test_minimum_requests_and_window() -> None:
+    """呼び出し数が少ない間や、期間外の失敗ではopenにならないことのテスト。"""
+    clock = FakeClock()
+    breaker = _breaker(clock)
+
+    for _ in range(3):
+        breaker.record_failure("md_to_docx")
+    assert breaker.state("md_to_docx") == CLOSED
+
+    clock.now += 61
+    breaker.record_failure("md_to_docx")
+    snapshot = breaker.snapshot()[MD_TO_DOCX]
+    assert snapshot.state == CLOSED
+    assert snapshot.requests == 1
+
+
+def test_half_open_trial() -> None:
+    """open_duration後は試行を1件だけ通し、結果に応じて状態が変わることのテスト。"""
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    for _ in range(4):
+        breaker.record_failure("md_to_docx")
+
+    clock.now += 30
+    assert breaker.state("md_to_docx") == HALF_OPEN
+    breaker.before_call("md_to_docx")
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call("md_to_docx")
+
+    # 試行が失敗すると再びopenになる
+    breaker.record_failure("md_to_docx")
+    assert breaker.state("md_to_docx") == OPEN
+
+    clock.now += 30
+    breaker.before_call("md_to_docx")
+    breaker.record_ignored("md_to_docx")
+    breaker.before_call("md_to_docx")
+    breaker.record_success("md_to_docx")
+    snapshot = breaker.snapshot()[MD_TO_DOCX]
+    assert snapshot.state == CLOSED
+    assert snapshot.failures == 0
+
+
+def test_check_does_not_take_trial() -> None:
+    """checkは状態を変えず、half_openの試行の枠を消費しないことのテスト。"""
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    breaker.check("md_to_docx")
+    for _ in range(4):
+        breaker.record_failure("md_to_docx")
+
+    with pytest.raises(CircuitOpenError):
+        breaker.check("md_to_docx")
+    clock.now += 30
+    breaker.check("md_to_docx")
+    breaker.check("md_to_docx")
+    breaker.before_call("md_to_docx")
+    with pytest.raises(CircuitOpenError):
+        breaker.check("md_to_docx")
+
+
+class _KeyRecordingCache(ResultCache):
+    """キーを計算した回数を記録するキャッシュ。"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.keys: List[str] = []
+
+    def key(self, path: str, *args: Any, **kwargs: Any) -> str:
+        self.keys.append(path)
+        return super().key(path, *args, **kwargs)
+
+
+def test_open_circuit_skips_cache_key(tmp_path: Path) -> None:
+    """openの間はキャッシュのキーを計算(添付ファイルをハッシュ)せずに失敗することのテスト。"""
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF" + b"\0" * 1024)
+    breaker = CircuitBreaker(minimum_requests=1)
+    breaker.record_failure("pdf_to_page_images")
+    breaker.record_failure("md_to_docx")
+    cache = _KeyRecordingCache()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise AssertionError("unexpected request")
+
+    async def run() -> None:
+        async with AsyncToolsClient(
+            api_key="test_api_key",
+            transport=httpx.MockTransport(handler),
+            circuit_breaker=breaker,
+            cache=cache,
+        ) as client:
+            with pytest.raises(CircuitOpenError):
+                await client.md_to_docx("# Test")
+
+    with StubServer() as stub:
+        client = ToolsClient(
+            api_key="test_api_key",
+            base_url=stub.base_url,
+            circuit_breaker=breaker,
+            cache=cache,
+        )
+        with pytest.raises(CircuitOpenError):
+            client.pdf_to_page_images(str(pdf))
+        asyncio.run(run())
+
+    assert cache.keys == []
+    assert stub.requests == []
+
+
+def test_reset() -> None:
+    """resetでclosedに戻ることのテスト。"""
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    for _ in range(4):
+        breaker.record_failure("md_to_docx")
+
+    breaker.reset("md_to_docx")
+
+    assert breaker.state("md_to_docx") == CLOSED
+
+
+def test_client_fails_fast_without_uploading(tmp_path: Path) -> None:
+    """openの間はファイルをアップロードせずにCircuitOpenErrorとなることのテスト。"""
+    pdf = tmp_path / "large.pdf"
+    pdf.write_bytes(b"%PDF" + b"\0" * (2 * 1024 * 1024))
+    breaker = CircuitBreaker(minimum_requests=3)
+    with StubServer(handler=lambda r: (503, {}, b"{}")) as stub:
+        client = ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, circuit_breaker=breaker
+        )
+        for _ in range(3):
+            with pytest.raises(InternalError):
+                client.pdf_to_page_images(str(pdf))
+        sent = len(stub.requests)
+        with pytest.raises(CircuitOpenError):
+            client.pdf_to_page_images(str(pdf))
+
+    assert len(stub.requests) == sent == 3
+    assert breaker.snapshot()["/api/v1/tools/pdf-to-page-images"].state == OPEN
+
+
+def test_client_counts_connection_errors_not_4xx() -> None:
+    """接続エラーは失敗、4xxは成功として数えることのテスト。"""
+    breaker = CircuitBreaker(minimum_requests=2)
+    with StubServer(handler=lambda r: (404, {}, b"{}")) as stub:
+        client = ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, circuit_breaker=breaker
+        )
+        for _ in range(3):
+            with pytest.raises(NotFoundError):
+                client.md_to_docx("# Test")
+    assert breaker.state("md_to_docx") == CLOSED
+
+    # 停止したサーバーへの新しい接続は接続エラーになる
+    client = ToolsClient(
+        api_key="test_api_key", base_url=stub.base_url, circuit_breaker=breaker
+    )
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            client.md_to_docx("# Test")
+    with pytest.raises(CircuitOpenError):
+        client.md_to_docx("# Test")
+
+
+def test_deadline_is_not_counted_as_failure() -> None:
+    """呼び出し側の期限切れは失敗として数えないことのテスト。"""
+    breaker = CircuitBreaker(minimum_requests=2)
+    release = threading.Event()
+
+    def slow(request: RecordedRequest) -> None:
+        release.wait(5)
+
+    with StubServer(handler=slow) as stub:
+        client = ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, circuit_breaker=breaker
+        )
+        for _ in range(3):
+            with deadline(0.1), pytest.raises(DeadlineExceededError):
+                client.md_to_docx("# Test")
+        release.set()
+        client.close()
+    assert breaker.state("md_to_docx") == CLOSED
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(5)
+        return httpx.Response(200, json={})
+
+    async def run() -> None:
+        async with AsyncToolsClient(
+            api_key="test_api_key",
+            transport=httpx.MockTransport(handler),
+            circuit_breaker=breaker,
+        ) as client:
+            for _ in range(3):
+                with deadline(0.1), pytest.raises(DeadlineExceededError):
+                    await client.md_to_docx("# Test")
+
+    asyncio.run(run())
+    assert breaker.state("md_to_docx") == CLOSED
+
+
+def test_async_client_fails_fast() -> None:
+    """AsyncToolsClientでもopenの間は通信せずに失敗することのテスト。"""
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        return httpx.Response(500, json={"detail": "error"})
+
+    async def run() -> None:
+        async with AsyncToolsClient(
+            api_key="test_api_key",
+            transport=httpx.MockTransport(handler),
+            circuit_breaker=CircuitBreaker(minimum_requests=2),
+        ) as client:
+            for _ in range(2):
+                with pytest.raises(InternalError):
+                    await client.md_to_docx("# Test")
+            with pytest.raises(CircuitOpenError):
+                await client.md_to_docx("# Test")
+
+    asyncio.run(run())
+    assert calls == 2
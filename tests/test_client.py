@@ -59,7 +59,7 @@ def test_md_to_pdf_success(
     client: ToolsClient, mocker: "MockerFixture", mock_response: Mock
 ) -> None:
     """md_to_pdf成功時のテスト。"""
-    mock_post = mocker.patch.object(requests, "post", return_value=mock_response)
+    mock_post = mocker.patch.object(client.session, "post", return_value=mock_response)
 
     result = client.md_to_pdf("# Test")
 
@@ -67,16 +67,34 @@ def test_md_to_pdf_success(
     mock_post.assert_called_once()
     call_args = mock_post.call_args
     assert call_args[0][0] == "https://middleman-ai.com/api/v1/tools/md-to-pdf/form"
-    assert call_args[1]["data"]["markdown"] == "# Test"
-    assert call_args[1]["files"] is None
+    assert call_args[1]["data"].fields["markdown"] == "# Test"
+    assert call_args[1]["data"].files == []
     assert call_args[1]["timeout"] == 30.0
 
 
+def test_multipart_uses_session_with_per_request_content_type(
+    client: ToolsClient, mocker: "MockerFixture", mock_response: Mock
+) -> None:
+    """マルチパート送信がセッション経由でboundary付きのContent-Typeで行われることのテスト。"""
+    mock_response.json.return_value = {
+        "pages": [{"page_no": 1, "image_url": "https://example.com/page1.png"}]
+    }
+    mock_post = mocker.patch.object(client.session, "post", return_value=mock_response)
+    bare_post = mocker.patch.object(requests, "post")
+
+    client.pdf_to_page_images("tests/data/test.pdf")
+
+    bare_post.assert_not_called()
+    content_type = mock_post.call_args[1]["headers"]["Content-Type"]
+    assert content_type.startswith("multipart/form-data; boundary=")
+    assert client.session.headers["Content-Type"] == "application/json"
+
+
 def test_md_to_pdf_success_with_template_id(
     client: ToolsClient, mocker: "MockerFixture", mock_response: Mock
 ) -> None:
     """md_to_pdf成功時のテスト。"""
-    mock_post = mocker.patch.object(requests, "post", return_value=mock_response)
+    mock_post = mocker.patch.object(client.session, "post", return_value=mock_response)
 
     result = client.md_to_pdf(
         "# Test",
@@ -87,10 +105,10 @@ def test_md_to_pdf_success_with_template_id(
     mock_post.assert_called_once()
     call_args = mock_post.call_args
     assert call_args[0][0] == "https://middleman-ai.com/api/v1/tools/md-to-pdf/form"
-    assert call_args[1]["data"]["markdown"] == "# Test"
+    assert call_args[1]["data"].fields["markdown"] == "# Test"
     expected_id = "00000000-0000-0000-0000-000000000001"
-    assert call_args[1]["data"]["pdf_template_id"] == expected_id
-    assert call_args[1]["files"] is None
+    assert call_args[1]["data"].fields["pdf_template_id"] == expected_id
+    assert call_args[1]["data"].files == []
     assert call_args[1]["timeout"] == 30.0
 
 
@@ -117,7 +135,7 @@ def test_md_to_pdf_http_errors(
     mock_response.headers = {"content-type": "application/json"}
     mock_response.text = ""
     mock_response.raise_for_status.side_effect = requests.exceptions.HTTPError()
-    mocker.patch.object(requests, "post", return_value=mock_response)
+    mocker.patch.object(client.session, "post", return_value=mock_response)
 
     with pytest.raises(expected_exception):
         client.md_to_pdf("# Test")
@@ -128,7 +146,7 @@ def test_md_to_pdf_connection_error(
 ) -> None:
     """md_to_pdf 接続エラー時のテスト。"""
     mocker.patch.object(
-        requests,
+        client.session,
         "post",
         side_effect=requests.exceptions.RequestException(),
     )
@@ -142,7 +160,7 @@ def test_md_to_pdf_validation_error(
 ) -> None:
     """md_to_pdf バリデーションエラー時のテスト。"""
     mock_response.json.return_value = {"invalid": "response"}
-    mocker.patch.object(requests, "post", return_value=mock_response)
+    mocker.patch.object(client.session, "post", return_value=mock_response)
 
     with pytest.raises(ValidationError):
         client.md_to_pdf("# Test")
@@ -151,7 +169,7 @@ def test_md_to_pdf_validation_error(
 def test_md_to_pdf_timeout_error(client: ToolsClient, mocker: "MockerFixture") -> None:
     """md_to_pdf タイムアウトエラー時のテスト。"""
     mocker.patch.object(
-        requests,
+        client.session,
         "post",
         side_effect=requests.exceptions.Timeout("Connection timed out"),
     )
@@ -170,7 +188,7 @@ def test_pptx_to_page_images_success(
             {"page_no": 2, "image_url": "https://example.com/page2.png"},
         ]
     }
-    mock_post = mocker.patch.object(requests, "post", return_value=mock_response)
+    mock_post = mocker.patch.object(client.session, "post", return_value=mock_response)
 
     result = client.pptx_to_page_images("tests/data/test.pptx")
 
@@ -198,7 +216,7 @@ def test_docx_to_page_images_success(
             {"page_no": 2, "image_url": "https://example.com/page2.png"},
         ]
     }
-    mock_post = mocker.patch.object(requests, "post", return_value=mock_response)
+    mock_post = mocker.patch.object(client.session, "post", return_value=mock_response)
 
     mocker.patch("os.path.isfile", return_value=True)
 
@@ -231,7 +249,7 @@ def test_xlsx_to_page_images_success(
             {"sheet_name": "Sheet2", "image_url": "https://example.com/page2.png"},
         ]
     }
-    mock_post = mocker.patch.object(requests, "post", return_value=mock_response)
+    mock_post = mocker.patch.object(client.session, "post", return_value=mock_response)
 
     result = client.xlsx_to_page_images("tests/data/test.xlsx")
 
@@ -641,7 +659,7 @@ def test_json_to_pptx_execute_v2_success(
         "pptx_url": "https://example.com/test.pptx",
         "important_remark_for_user": "The URL expires in 1 hour.",
     }
-    mock_post = mocker.patch.object(requests, "post", return_value=mock_response)
+    mock_post = mocker.patch.object(client.session, "post", return_value=mock_response)
 
     presentation = _create_test_presentation()
     result = client.json_to_pptx_execute_v2(
@@ -655,10 +673,10 @@ def test_json_to_pptx_execute_v2_success(
         call_args[0][0]
         == "https://middleman-ai.com/api/v2/tools/json-to-pptx/execute/form"
     )
-    assert "presentation_json" in call_args[1]["data"]
+    assert "presentation_json" in call_args[1]["data"].fields
     expected_id = "00000000-0000-0000-0000-000000000001"
-    assert call_args[1]["data"]["pptx_template_id"] == expected_id
-    assert call_args[1]["files"] is None
+    assert call_args[1]["data"].fields["pptx_template_id"] == expected_id
+    assert call_args[1]["data"].files == []
     assert call_args[1]["timeout"] == 30.0
 
 
@@ -686,7 +704,7 @@ def test_json_to_pptx_execute_v2_http_errors(
     mock_response.text = ""
     mock_response.json.return_value = {}
     mock_response.raise_for_status.side_effect = requests.exceptions.HTTPError()
-    mocker.patch.object(requests, "post", return_value=mock_response)
+    mocker.patch.object(client.session, "post", return_value=mock_response)
 
     presentation = _create_test_presentation()
     with pytest.raises(expected_exception):
@@ -700,7 +718,7 @@ def test_json_to_pptx_execute_v2_connection_error(
 ) -> None:
     """json_to_pptx_execute_v2 接続エラー時のテスト。"""
     mocker.patch.object(
-        requests,
+        client.session,
         "post",
         side_effect=requests.exceptions.RequestException(),
     )
@@ -719,7 +737,7 @@ def test_json_to_pptx_execute_v2_validation_error(
     mock_response = Mock(spec=requests.Response)
     mock_response.status_code = 200
     mock_response.json.return_value = {"invalid": "response"}
-    mocker.patch.object(requests, "post", return_value=mock_response)
+    mocker.patch.object(client.session, "post", return_value=mock_response)
 
     presentation = _create_test_presentation()
     with pytest.raises(ValidationError):
@@ -0,0 +1,139 @@
+"""ローカルスタブサーバーに対してToolsClientを実際に通信させるテストモジュール。"""
+
+import logging
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import pytest
+import requests
+
+from middleman_ai.client import Placeholder, Presentation, Slide, ToolsClient
+from tests.stub_server import StubServer
+
+
+@pytest.fixture
+def stub() -> Iterator[StubServer]:
+    """ローカルスタブサーバーを起動します。"""
+    with StubServer() as server:
+        yield server
+
+
+@pytest.fixture
+def client(stub: StubServer) -> ToolsClient:
+    """スタブサーバーに接続するToolsClientを生成します。"""
+    return ToolsClient(api_key="test_api_key", base_url=stub.base_url)
+
+
+def test_json_and_multipart_share_connection(
+    client: ToolsClient, stub: StubServer
+) -> None:
+    """JSONとマルチパートの呼び出しが1本のコネクションを使い回すことのテスト。"""
+    presentation = Presentation(
+        slides=[Slide(type="title", placeholders=[Placeholder(name="t", content="T")])]
+    )
+
+    client.md_to_docx("# Test")
+    client.pdf_to_page_images("tests/data/test.pdf")
+    client.md_to_pdf("# Test", image_paths=["tests/data/test_image.png"])
+    client.json_to_pptx_execute_v2("template-id", presentation)
+    client.mermaid_to_image("graph TD; A-->B")
+
+    assert len(stub.requests) == 5
+    assert stub.connections_opened == 1
+
+
+def test_multipart_content_type(client: ToolsClient, stub: StubServer) -> None:
+    """マルチパート送信時にboundary付きのContent-Typeが設定されることのテスト。"""
+    client.pdf_to_page_images("tests/data/test.pdf")
+    client.md_to_docx("# Test")
+
+    upload, json_request = stub.requests
+    assert upload.headers["Content-Type"].startswith("multipart/form-data; boundary=")
+    assert upload.headers["Authorization"] == "Bearer test_api_key"
+    assert json_request.headers["Content-Type"] == "application/json"
+
+
+def _call_all_endpoints(client: ToolsClient) -> Dict[str, Any]:
+    """全エンドポイントを1回ずつ呼び出し、結果を返します。"""
+    presentation = Presentation(
+        slides=[Slide(type="title", placeholders=[Placeholder(name="t", content="T")])]
+    )
+    return {
+        "md_to_pdf": client.md_to_pdf(
+            "# Test", image_paths=["tests/data/test_image.png"]
+        ),
+        "md_to_docx": client.md_to_docx("# Test"),
+        "pdf": client.pdf_to_page_images("tests/data/test.pdf"),
+        "pptx": client.pptx_to_page_images("tests/data/test.pptx"),
+        "docx": client.docx_to_page_images("tests/data/test.docx"),
+        "xlsx": client.xlsx_to_page_images("tests/data/test.xlsx"),
+        "analyze": client.json_to_pptx_analyze_v2("template-id"),
+        "execute": client.json_to_pptx_execute_v2("template-id", presentation),
+        "mermaid": client.mermaid_to_image("graph TD; A-->B"),
+        "xlsx_analyze": client.xlsx_to_pdf_analyze("template-id"),
+        "xlsx_execute": client.xlsx_to_pdf_execute("template-id", {"a": "b"}),
+    }
+
+
+def test_thread_safe_stress(stub: StubServer, caplog: pytest.LogCaptureFixture) -> None:
+    """多数のスレッドから全エンドポイントを呼び出しても接続が破棄されないことのテスト。"""
+    threads, rounds = 32, 3
+    client = ToolsClient(
+        api_key="test_api_key",
+        base_url=stub.base_url,
+        pool_maxsize=threads,
+        thread_safe=True,
+    )
+
+    def worker(_: int) -> List[Dict[str, Any]]:
+        return [_call_all_endpoints(client) for _ in range(rounds)]
+
+    with caplog.at_level(logging.WARNING, logger="urllib3.connectionpool"):
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = [r for rs in executor.map(worker, range(threads)) for r in rs]
+    client.close()
+
+    assert len(results) == threads * rounds
+    assert all(r["md_to_docx"] == "https://example.com/test.docx" for r in results)
+    assert all(r["xlsx_analyze"].sheet_name == "Sheet1" for r in results)
+    assert len(stub.requests) == threads * rounds * 11
+    assert stub.connections_opened <= threads
+    assert "Connection pool is full" not in caplog.text
+
+
+def test_thread_safe_uses_session_per_thread(stub: StubServer) -> None:
+    """thread_safe有効時にスレッドごとのSessionがアダプターを共有することのテスト。"""
+    client = ToolsClient(
+        api_key="test_api_key", base_url=stub.base_url, thread_safe=True
+    )
+
+    sessions: List[requests.Session] = []
+    workers = [
+        threading.Thread(target=lambda: sessions.append(client.session))
+        for _ in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert client.session is client.session
+    assert len({id(s) for s in [*sessions, client.session]}) == 5
+    assert all(s.get_adapter(stub.base_url) is client._adapter for s in sessions)
+    assert all(s.headers["Authorization"] == "Bearer test_api_key" for s in sessions)
+
+
+def test_pool_block_limits_connections(stub: StubServer) -> None:
+    """pool_block有効時に同時接続数がpool_maxsize以下に制限されることのテスト。"""
+    stub.delay = 0.01
+    client = ToolsClient(
+        api_key="test_api_key", base_url=stub.base_url, pool_maxsize=4, pool_block=True
+    )
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(lambda i: client.md_to_docx(f"# {i}"), range(64)))
+
+    assert len(results) == 64
+    assert stub.connections_opened <= 4
@@ -0,0 +1,251 @@
+"""同一リクエストのまとめ(single-flight)のテストモジュール。"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List
+
+import httpx
+import pytest
+
+from middleman_ai.async_client import AsyncToolsClient
+from middleman_ai.cache import request_key
+from middleman_ai.client import ToolsClient
+from middleman_ai.coalesce import RequestCoalescer
+from middleman_ai.exceptions import DeadlineExceededError, NotFoundError
+from middleman_ai.timeouts import deadline
+from tests.stub_server import RecordedRequest, StubServer
+
+ANALYZE = "/api/v2/tools/json-to-pptx/analyze"
+CALLERS = 8
+
+
+def _gated_handler(release: threading.Event, status: int = 200) -> Any:
+    """releaseがセットされるまでレスポンスを返さないスタブのハンドラーを生成します。"""
+
+    def handler(request: RecordedRequest) -> Any:
+        release.wait(5)
+        if status != 200:
+            return status, {}, b'{"detail": "Not Found"}'
+        return None
+
+    return handler
+
+
+def _wait_for_callers(coalescer: RequestCoalescer, path: str, count: int) -> None:
+    """count件の呼び出しがまとめの処理に到達するまで待機します。"""
+    for _ in range(500):
+        stats = coalescer.stats().get(path)
+        if stats is not None and stats.calls >= count:
+            return
+        time.sleep(0.01)
+    raise AssertionError("callers did not arrive")
+
+
+def test_concurrent_identical_calls_share_one_request() -> None:
+    """同時に発生した同一の呼び出しが1つのリクエストを共有することのテスト。"""
+    release = threading.Event()
+    coalescer = RequestCoalescer()
+
+    with StubServer(handler=_gated_handler(release)) as stub:
+        client = ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, coalescing=coalescer
+        )
+        with ThreadPoolExecutor(max_workers=CALLERS) as executor:
+            futures = [
+                executor.submit(client.json_to_pptx_analyze_v2, "template-1")
+                for _ in range(CALLERS)
+            ]
+            _wait_for_callers(coalescer, ANALYZE, CALLERS)
+            release.set()
+            results = [f.result() for f in futures]
+        client.close()
+
+    assert len(stub.requests) == 1
+    assert all(r == results[0] for r in results)
+    # 結果はコピーされ、ある呼び出し元が変更しても他に影響しない
+    results[0][0]["type"] = "changed"
+    assert results[1][0]["type"] == "title"
+    stats = coalescer.stats()[ANALYZE]
+    assert (stats.calls, stats.shared) == (CALLERS, CALLERS - 1)
+
+
+def test_exception_is_shared() -> None:
+    """実行中のリクエストが失敗した場合、まとめた全ての呼び出しに例外が返ることのテスト。"""
+    release = threading.Event()
+    coalescer = RequestCoalescer()
+
+    with StubServer(handler=_gated_handler(release, status=404)) as stub:
+        client = ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, coalescing=coalescer
+        )
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [
+                executor.submit(client.xlsx_to_pdf_analyze, "template-1")
+                for _ in range(4)
+            ]
+            _wait_for_callers(coalescer, "/api/v1/tools/xlsx-to-pdf-analyze", 4)
+            release.set()
+            errors = [f.exception() for f in futures]
+        client.close()
+
+    assert len(stub.requests) == 1
+    assert all(isinstance(e, NotFoundError) for e in errors)
+
+
+def test_leader_deadline_is_not_shared() -> None:
+    """送信した呼び出しの期限切れは共有されず、待っていた呼び出しが改めて送信することのテスト。"""
+    release = threading.Event()
+    coalescer = RequestCoalescer()
+
+    def leader() -> Any:
+        with deadline(0.3):
+            return client.json_to_pptx_analyze_v2("template-1")
+
+    with StubServer(handler=_gated_handler(release)) as stub:
+        client = ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, coalescing=coalescer
+        )
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            first = executor.submit(leader)
+            _wait_for_callers(coalescer, ANALYZE, 1)
+            followers = [
+                executor.submit(client.json_to_pptx_analyze_v2, "template-1")
+                for _ in range(3)
+            ]
+            _wait_for_callers(coalescer, ANALYZE, 4)
+            with pytest.raises(DeadlineExceededError):
+                first.result()
+            release.set()
+            results = [f.result() for f in followers]
+        client.close()
+
+    assert all(r[0]["type"] == "title" for r in results)
+    # 期限切れで中断したリクエストと、改めて送信した1件
+    assert len(stub.requests) == 2
+    stats = coalescer.stats()[ANALYZE]
+    assert (stats.calls, stats.shared) == (4, 2)
+
+
+def test_different_or_sequential_calls_are_not_shared() -> None:
+    """内容の異なる呼び出しや、完了後の呼び出しはまとめないことのテスト。"""
+    coalescer = RequestCoalescer()
+    with StubServer() as stub:
+        with ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, coalescing=coalescer
+        ) as client:
+            client.json_to_pptx_analyze_v2("template-1")
+            client.json_to_pptx_analyze_v2("template-1")
+            client.json_to_pptx_analyze_v2("template-2")
+            client.md_to_docx("# Title")
+
+    assert len(stub.requests) == 4
+    assert coalescer.stats()[ANALYZE].shared == 0
+    assert "/api/v1/tools/md-to-docx" not in coalescer.stats()
+
+
+def test_key_ignores_json_key_order() -> None:
+    """JSONのキーの順序が異なっても同じキーになることのテスト。"""
+    a = request_key(ANALYZE, {"a": 1, "b": {"x": 1, "y": 2}})
+    b = request_key(ANALYZE, {"b": {"y": 2, "x": 1}, "a": 1})
+    assert a == b
+    assert a != request_key(ANALYZE, {"a": 2, "b": {"x": 1, "y": 2}})
+
+
+def test_async_calls_share_one_request() -> None:
+    """非同期でも最初の呼び出し元のキャンセルに影響されず結果を共有することのテスト。"""
+    requests: List[httpx.Request] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        await asyncio.sleep(0.2)
+        return httpx.Response(
+            200, json={"image_url": "https://example.com/m.png", "format": "png"}
+        )
+
+    async def run() -> List[Any]:
+        async with AsyncToolsClient(
+            api_key="test_api_key",
+            transport=httpx.MockTransport(handler),
+            coalescing=RequestCoalescer(),
+        ) as client:
+            first = asyncio.create_task(client.mermaid_to_image("graph TD; A-->B"))
+            await asyncio.sleep(0.05)
+            others = [
+                asyncio.create_task(client.mermaid_to_image("graph TD; A-->B"))
+                for _ in range(CALLERS - 1)
+            ]
+            await asyncio.sleep(0.05)
+            first.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            return await asyncio.gather(*others)
+
+    results = asyncio.run(run())
+
+    assert len(requests) == 1
+    assert results == ["https://example.com/m.png"] * (CALLERS - 1)
+
+
+def _slow_mermaid_handler(requests: List[httpx.Request], delay: float) -> Any:
+    """delay秒後にmermaid_to_imageの結果を返すハンドラーを生成します。"""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        await asyncio.sleep(delay)
+        return httpx.Response(
+            200, json={"image_url": "https://example.com/m.png", "format": "png"}
+        )
+
+    return handler
+
+
+def test_async_leader_deadline_is_not_shared() -> None:
+    """非同期で最初の呼び出し元の期限切れが、まとめた呼び出しに共有されないことのテスト。"""
+    requests: List[httpx.Request] = []
+
+    async def run() -> Any:
+        async with AsyncToolsClient(
+            api_key="test_api_key",
+            transport=httpx.MockTransport(_slow_mermaid_handler(requests, 0.3)),
+            coalescing=RequestCoalescer(),
+        ) as client:
+
+            async def leader() -> str:
+                with deadline(0.1):
+                    return await client.mermaid_to_image("graph TD; A-->B")
+
+            first = asyncio.create_task(leader())
+            await asyncio.sleep(0.02)
+            follower = asyncio.create_task(client.mermaid_to_image("graph TD; A-->B"))
+            with pytest.raises(DeadlineExceededError):
+                await first
+            return await follower
+
+    assert asyncio.run(run()) == "https://example.com/m.png"
+    assert len(requests) == 1
+
+
+def test_async_follower_deadline_is_respected() -> None:
+    """非同期でまとめた呼び出しが、自身の期限を過ぎたら待つのをやめることのテスト。"""
+    requests: List[httpx.Request] = []
+
+    async def run() -> Any:
+        async with AsyncToolsClient(
+            api_key="test_api_key",
+            transport=httpx.MockTransport(_slow_mermaid_handler(requests, 0.5)),
+            coalescing=RequestCoalescer(),
+        ) as client:
+            first = asyncio.create_task(client.mermaid_to_image("graph TD; A-->B"))
+            await asyncio.sleep(0.02)
+            started = time.monotonic()
+            with deadline(0.1), pytest.raises(DeadlineExceededError):
+                await client.mermaid_to_image("graph TD; A-->B")
+            elapsed = time.monotonic() - started
+            return elapsed, await first
+
+    elapsed, result = asyncio.run(run())
+    assert elapsed < 0.3
+    assert result == "https://example.com/m.png"
+    assert len(requests) == 1
@@ -0,0 +1,97 @@
+"""リクエストボディの圧縮のテストモジュール。"""
+
+import asyncio
+import json
+from pathlib import Path
+
+from middleman_ai.async_client import AsyncToolsClient
+from middleman_ai.client import ToolsClient
+from middleman_ai.compression import CompressionPolicy
+from middleman_ai.retry import RetryPolicy
+from tests.helpers import multipart_parts
+from tests.stub_server import RecordedRequest, StubResponse, StubServer
+
+# 圧縮が効く大きなMarkdown
+LARGE_MARKDOWN = "".join(
+    f"## 第{i}章\n\n本文の段落です。同じような文章が繰り返されます。\n\n"
+    for i in range(2000)
+)
+
+
+def test_large_json_body_is_compressed() -> None:
+    """しきい値以上のJSONボディだけがgzipで圧縮されることのテスト。"""
+    policy = CompressionPolicy()
+    with StubServer() as stub:
+        client = ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, compression=policy
+        )
+        client.md_to_docx(LARGE_MARKDOWN)
+        client.md_to_docx("# 短い文書")
+        client.mermaid_to_image("graph TD; A-->B" + " " * 50_000)
+
+    large, small, mermaid = stub.requests
+    assert large.headers["Content-Encoding"] == "gzip"
+    assert large.headers["Content-Type"] == "application/json"
+    assert json.loads(large.body)["markdown"] == LARGE_MARKDOWN
+    assert large.body_size < len(large.body) / 5
+    assert "Content-Encoding" not in small.headers
+    assert "Content-Encoding" not in mermaid.headers
+    stats = policy.stats()
+    assert stats.requests == 1
+    assert stats.compressed_bytes == large.body_size
+    assert stats.ratio < 0.2
+
+
+def test_form_text_fields_are_compressed_on_retry(tmp_path: Path) -> None:
+    """大きなテキストフィールドを含むフォームは圧縮して送信され、リトライ時も圧縮し直すことのテスト。"""
+    image = tmp_path / "logo.png"
+    image.write_bytes(b"\x89PNG logo")
+    calls = 0
+
+    def handler(request: RecordedRequest) -> StubResponse | None:
+        nonlocal calls
+        calls += 1
+        return (503, {}, b"{}") if calls == 1 else None
+
+    retry = RetryPolicy(max_attempts=2, backoff_base=0.0)
+    with StubServer(handler=handler) as stub:
+        client = ToolsClient(
+            api_key="test_api_key",
+            base_url=stub.base_url,
+            retry=retry,
+            compression=CompressionPolicy(),
+        )
+        client.md_to_pdf(LARGE_MARKDOWN, image_paths=[str(image)])
+
+    assert len(stub.requests) == 2
+    for request in stub.requests:
+        assert request.headers["Content-Encoding"] == "gzip"
+        assert request.headers["Transfer-Encoding"] == "chunked"
+        markdown, files = multipart_parts(request)
+        assert markdown.get_payload(decode=True).decode() == LARGE_MARKDOWN
+        assert files.get_payload(decode=True) == b"\x89PNG logo"
+
+
+def test_async_client_compresses_bodies() -> None:
+    """非同期クライアントでもJSONとフォームを圧縮して送信することのテスト。"""
+
+    async def run(base_url: str) -> None:
+        async with AsyncToolsClient(
+            api_key="test_api_key",
+            base_url=base_url,
+            compression=CompressionPolicy(min_size=1024),
+        ) as client:
+            await client.md_to_docx(LARGE_MARKDOWN)
+            await client.md_to_pdf(LARGE_MARKDOWN)
+
+    with StubServer() as stub:
+        asyncio.run(run(stub.base_url))
+
+    json_request, form_request = stub.requests
+    assert json.loads(json_request.body)["markdown"] == LARGE_MARKDOWN
+    assert form_request.headers["Content-Encoding"] == "gzip"
+    assert (
+        multipart_parts(form_request)[0].get_payload(decode=True).decode()
+        == LARGE_MARKDOWN
+    )
+    assert form_request.body_size < len(form_request.body) / 5
@@ -0,0 +1,241 @@
+"""適応的な同時実行数の制御のテストモジュール。"""
+
+import asyncio
+import threading
+import time
+from typing import Any, List
+
+import httpx
+import pytest
+import requests
+
+from middleman_ai.async_client import AsyncToolsClient
+from middleman_ai.client import ToolsClient
+from middleman_ai.concurrency import AdaptiveConcurrency
+from middleman_ai.exceptions import DeadlineExceededError
+from middleman_ai.retry import RetryPolicy
+from middleman_ai.timeouts import deadline
+from middleman_ai.transport import InMemoryRequest, InMemoryTransport
+from tests.helpers import FakeClock
+from tests.stub_server import RecordedRequest, StubServer
+
+# サーバーが処理できる同時リクエスト数
+CAPACITY = 6
+
+
+def _complete(
+    limiter: AdaptiveConcurrency, clock: FakeClock, latency: float, **kwargs: Any
+) -> None:
+    started = limiter.acquire()
+    clock.now += latency
+    limiter.release(started, **kwargs)
+
+
+def test_additive_increase_while_latency_is_stable() -> None:
+    """レイテンシが安定している間は上限が1ずつ増えることのテスト。"""
+    clock = FakeClock()
+    limiter = AdaptiveConcurrency(initial=2, max_limit=5, clock=clock)
+
+    for _ in range(200):
+        _complete(limiter, clock, 0.1, status=200)
+
+    snapshot = limiter.snapshot()
+    assert snapshot.limit == 5
+    assert snapshot.increases == 3
+    assert snapshot.decreases == 0
+    assert snapshot.p95 == pytest.approx(0.1)
+
+
+def test_multiplicative_decrease_on_throttling() -> None:
+    """429/503を受けると上限が減り、同じ過負荷で続けて減らないことのテスト。"""
+    clock = FakeClock()
+    limiter = AdaptiveConcurrency(initial=8, max_limit=8, clock=clock)
+
+    started = [limiter.acquire() for _ in range(4)]
+    clock.now += 0.1
+    for s in started:
+        limiter.release(s, status=429)
+    assert limiter.limit == 4
+
+    # 減らした後に送信したリクエストの失敗では再び減らす
+    _complete(limiter, clock, 0.1, status=503)
+    assert limiter.limit == 2
+    assert limiter.snapshot().decreases == 2
+
+
+def test_decrease_on_timeout_and_rising_latency() -> None:
+    """タイムアウトとレイテンシの悪化で上限が減ることのテスト。"""
+    clock = FakeClock()
+    limiter = AdaptiveConcurrency(initial=16, max_limit=16, clock=clock)
+
+    _complete(limiter, clock, 5.0, error=requests.exceptions.ReadTimeout())
+    assert limiter.limit == 8
+
+    # 最初の評価でp95を基準として記録し、上限を1増やす
+    for _ in range(10):
+        _complete(limiter, clock, 0.1, status=200)
+    assert limiter.limit == 9
+    for _ in range(9):
+        _complete(limiter, clock, 1.0, status=200)
+    assert limiter.limit == 4
+
+
+def test_other_errors_are_neutral() -> None:
+    """タイムアウト以外の例外や4xxでは上限が変わらないことのテスト。"""
+    clock = FakeClock()
+    limiter = AdaptiveConcurrency(initial=4, clock=clock)
+
+    _complete(limiter, clock, 0.1, error=requests.exceptions.ConnectionError())
+    _complete(limiter, clock, 0.1, status=404)
+
+    assert limiter.limit == 4
+    assert limiter.in_flight == 0
+
+
+def test_rate_limit_headers() -> None:
+    """RateLimit-Remainingヘッダーが0の場合だけ上限を下げることのテスト。"""
+    clock = FakeClock()
+    limiter = AdaptiveConcurrency(initial=10, max_limit=10, clock=clock)
+
+    # 残りが少なくても上限はその値に合わせず、AIMDに任せる
+    _complete(limiter, clock, 0.1, status=200, headers={"X-RateLimit-Remaining": "3"})
+    assert limiter.limit == 10
+    _complete(limiter, clock, 0.1, status=200, headers={"RateLimit-Remaining": "0"})
+    assert limiter.limit == 5
+
+
+def test_caller_deadline_is_not_a_timeout() -> None:
+    """呼び出し元の期限で短くなったタイムアウトでは上限を下げないことのテスト。"""
+    limiter = AdaptiveConcurrency(initial=4, max_limit=4)
+
+    # 期限に合わせて切り詰めたタイムアウトが、期限を過ぎた時点で発生した状況を再現する
+    def timed_out(request: InMemoryRequest) -> dict:
+        time.sleep(0.15)
+        raise requests.exceptions.ReadTimeout()
+
+    client = ToolsClient(
+        api_key="test_api_key",
+        transport=InMemoryTransport(timed_out),
+        concurrency=limiter,
+    )
+    with deadline(0.1), pytest.raises(DeadlineExceededError):
+        client.md_to_docx("# Test")
+    client.close()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        time.sleep(0.15)
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    async def run() -> None:
+        async with AsyncToolsClient(
+            api_key="test_api_key",
+            transport=httpx.MockTransport(handler),
+            concurrency=limiter,
+        ) as client:
+            with deadline(0.1), pytest.raises(DeadlineExceededError):
+                await client.md_to_docx("# Test")
+
+    asyncio.run(run())
+    assert limiter.limit == 4
+    assert limiter.in_flight == 0
+
+
+def test_acquire_blocks_at_limit() -> None:
+    """実行中の数が上限に達している間はacquireが待機することのテスト。"""
+    limiter = AdaptiveConcurrency(initial=1, max_limit=1)
+    started = limiter.acquire()
+    acquired = threading.Event()
+
+    def worker() -> None:
+        limiter.release(limiter.acquire(), status=200)
+        acquired.set()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    assert not acquired.wait(0.1)
+    limiter.release(started, status=200)
+    assert acquired.wait(5)
+    thread.join()
+
+
+def test_invalid_arguments() -> None:
+    """上限の範囲や割合が不正な場合にValueErrorとなることのテスト。"""
+    with pytest.raises(ValueError):
+        AdaptiveConcurrency(initial=10, max_limit=5)
+    with pytest.raises(ValueError):
+        AdaptiveConcurrency(backoff=1.0)
+
+
+class OverloadingHandler:
+    """同時に処理中のリクエストがCAPACITYを超えると429を返すハンドラー。"""
+
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, request: RecordedRequest) -> Any:
+        with self._lock:
+            self.in_flight += 1
+            overloaded = self.in_flight > CAPACITY
+            if overloaded:
+                self.throttled += 1
+        try:
+            if overloaded:
+                return 429, {}, b'{"detail": "Too Many Requests"}'
+            time.sleep(0.01)
+            return None
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def test_batch_adapts_to_server_capacity() -> None:
+    """バッチ処理の同時実行数がサーバーの処理能力に合わせて調整されることのテスト。"""
+    handler = OverloadingHandler()
+    limiter = AdaptiveConcurrency(initial=2, max_limit=32)
+    with StubServer(handler=handler) as stub:
+        client = ToolsClient(
+            api_key="test_api_key",
+            base_url=stub.base_url,
+            pool_maxsize=32,
+            retry=RetryPolicy(max_attempts=10, backoff_base=0.01),
+            concurrency=limiter,
+        )
+        results = list(client.batch("md_to_docx", [f"# {i}" for i in range(300)]))
+
+    snapshot = limiter.snapshot()
+    assert all(r.ok for r in results)
+    assert snapshot.increases > 0
+    assert snapshot.decreases > 0
+    assert snapshot.limit < 32
+    assert handler.throttled < len(results) / 2
+
+
+def test_async_client_adapts() -> None:
+    """AsyncToolsClientでも同時実行数が調整されることのテスト。"""
+    handler = OverloadingHandler()
+    limiter = AdaptiveConcurrency(initial=2, max_limit=32)
+    limits: List[int] = []
+
+    async def run(base_url: str) -> None:
+        async with AsyncToolsClient(
+            api_key="test_api_key",
+            base_url=base_url,
+            retry=RetryPolicy(max_attempts=10, backoff_base=0.01),
+            concurrency=limiter,
+        ) as client:
+
+            async def convert(i: int) -> None:
+                await client.md_to_docx(f"# {i}")
+                limits.append(limiter.limit)
+
+            await asyncio.gather(*(convert(i) for i in range(200)))
+
+    with StubServer(handler=handler) as stub:
+        asyncio.run(run(stub.base_url))
+
+    assert len(limits) == 200
+    assert max(limits) > 2
+    assert limiter.snapshot().decreases > 0
+    assert limiter.in_flight == 0
@@ -0,0 +1,268 @@
+"""変換結果のダウンロードのテストモジュール。"""
+
+import io
+import json
+import os
+import threading
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+
+from middleman_ai.client import ToolsClient
+from middleman_ai.download import STATE_SUFFIX, Downloader
+from middleman_ai.exceptions import DeadlineExceededError, DownloadError
+from tests.stub_server import RecordedRequest, StubServer
+
+PART_SIZE = 64 * 1024
+
+
+def _content(size: int, seed: int = 0) -> bytes:
+    return bytes((i * 31 + seed) % 251 for i in range(size))
+
+
+def test_parallel_parts(tmp_path: Path) -> None:
+    """Rangeリクエストで分割して取得した部分が正しく結合されることのテスト。"""
+    content = _content(PART_SIZE * 5 + 123)
+    with StubServer(files={"/big.pdf": content}) as stub:
+        with Downloader(part_size=PART_SIZE) as downloader:
+            result = downloader.download(stub.file_url("/big.pdf"), tmp_path / "a.pdf")
+
+    assert (tmp_path / "a.pdf").read_bytes() == content
+    assert result.size == len(content)
+    assert result.parts == 6
+    assert len(stub.requests) == 6
+    assert not (tmp_path / ("a.pdf" + STATE_SUFFIX)).exists()
+
+
+def test_many_urls_share_connections(tmp_path: Path) -> None:
+    """複数のURLを並列にダウンロードし、コネクションが再利用されることのテスト。"""
+    files = {f"/page{i}.png": _content(1000 + i, seed=i) for i in range(30)}
+    with StubServer(files=files) as stub:
+        with Downloader(max_concurrency=4, part_concurrency=1) as downloader:
+            items = [(stub.file_url(p), tmp_path / p[1:]) for p in files]
+            results = list(downloader.download_many(items))
+
+    assert all(r.ok for r in results)
+    for path, content in files.items():
+        assert (tmp_path / path[1:]).read_bytes() == content
+    assert stub.connections_opened <= 4
+
+
+def test_resume_fetches_only_missing_parts(tmp_path: Path) -> None:
+    """中断したダウンロードを再開すると、未取得の部分だけを取得することのテスト。"""
+    content = _content(PART_SIZE * 4)
+    failing = {f"bytes={PART_SIZE * 2}-{PART_SIZE * 3 - 1}"}
+
+    def handler(request: RecordedRequest) -> Any:
+        if request.headers.get("Range") in failing:
+            return 500, {}, b"{}"
+        return None
+
+    destination = tmp_path / "out.docx"
+    with StubServer(handler=handler, files={"/f.docx": content}) as stub:
+        downloader = Downloader(part_size=PART_SIZE, part_concurrency=1)
+        with pytest.raises(DownloadError):
+            downloader.download(stub.file_url("/f.docx"), destination)
+        assert not destination.exists()
+        first_attempt = len(stub.requests)
+
+        failing.clear()
+        result = downloader.download(stub.file_url("/f.docx"), destination)
+
+    ranges = [r.headers["Range"] for r in stub.requests[first_attempt:]]
+    # 先頭の部分は確認のために再取得し、失敗した部分だけを追加で取得する
+    assert ranges == [
+        f"bytes=0-{PART_SIZE - 1}",
+        f"bytes={PART_SIZE * 2}-{PART_SIZE * 3 - 1}",
+    ]
+    assert destination.read_bytes() == content
+    assert result.resumed_bytes == PART_SIZE * 3
+
+
+def test_changed_file_restarts(tmp_path: Path) -> None:
+    """サーバー上のファイルが変わった場合は最初からダウンロードし直すことのテスト。"""
+    files = {"/f.pdf": _content(PART_SIZE * 3)}
+    destination = tmp_path / "out.pdf"
+    fail = threading.Event()
+    fail.set()
+
+    def handler(request: RecordedRequest) -> Any:
+        if fail.is_set() and request.headers.get("Range", "").startswith(
+            f"bytes={PART_SIZE * 2}"
+        ):
+            return 500, {}, b"{}"
+        return None
+
+    with StubServer(handler=handler, files=files) as stub:
+        downloader = Downloader(part_size=PART_SIZE, part_concurrency=1)
+        with pytest.raises(DownloadError):
+            downloader.download(stub.file_url("/f.pdf"), destination)
+        fail.clear()
+        files["/f.pdf"] = _content(PART_SIZE * 3, seed=7)
+        result = downloader.download(stub.file_url("/f.pdf"), destination)
+
+    assert destination.read_bytes() == files["/f.pdf"]
+    assert result.resumed_bytes == 0
+
+
+def test_no_validator_restarts(tmp_path: Path) -> None:
+    """ETagもLast-Modifiedも返さないサーバーの場合は再開せず最初からダウンロードすることのテスト。"""
+    files = {"/f.pdf": _content(PART_SIZE * 3)}
+    destination = tmp_path / "out.pdf"
+    fail = threading.Event()
+    fail.set()
+
+    def handler(request: RecordedRequest) -> Any:
+        if fail.is_set() and request.headers.get("Range", "").startswith(
+            f"bytes={PART_SIZE * 2}"
+        ):
+            return 500, {}, b"{}"
+        status, headers, body = stub.file_response(request)
+        del headers["ETag"]
+        return status, headers, body
+
+    with StubServer(handler=handler, files=files) as stub:
+        downloader = Downloader(part_size=PART_SIZE, part_concurrency=1)
+        with pytest.raises(DownloadError):
+            downloader.download(stub.file_url("/f.pdf"), destination)
+        fail.clear()
+        files["/f.pdf"] = _content(PART_SIZE * 3, seed=7)
+        result = downloader.download(stub.file_url("/f.pdf"), destination)
+
+    assert destination.read_bytes() == files["/f.pdf"]
+    assert result.resumed_bytes == 0
+
+
+def test_deadline_is_not_retried(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """部分のダウンロードで期限切れになった場合は再試行せずに中断することのテスト。"""
+    ranges: List[str] = []
+    downloader = Downloader(part_size=PART_SIZE, part_concurrency=1)
+    get = downloader._get
+
+    def expire_after_first(url: str, headers: Dict[str, str]) -> Any:
+        ranges.append(headers["Range"])
+        if len(ranges) > 1:
+            raise DeadlineExceededError()
+        return get(url, headers)
+
+    monkeypatch.setattr(downloader, "_get", expire_after_first)
+    with StubServer(files={"/f.pdf": _content(PART_SIZE * 2)}) as stub:
+        with pytest.raises(DeadlineExceededError):
+            downloader.download(stub.file_url("/f.pdf"), tmp_path / "f.pdf")
+        downloader.close()
+
+    assert ranges == [
+        f"bytes=0-{PART_SIZE - 1}",
+        f"bytes={PART_SIZE}-{PART_SIZE * 2 - 1}",
+    ]
+
+
+def test_server_without_range_support(tmp_path: Path) -> None:
+    """Range非対応のサーバーからは一括でダウンロードすることのテスト。"""
+    content = _content(PART_SIZE * 3)
+    with StubServer(files={"/f.pdf": content}, range_support=False) as stub:
+        with Downloader(part_size=PART_SIZE) as downloader:
+            result = downloader.download(stub.file_url("/f.pdf"), tmp_path / "f.pdf")
+
+    assert (tmp_path / "f.pdf").read_bytes() == content
+    assert result.parts == 1
+    assert len(stub.requests) == 1
+
+
+def test_download_to_sink() -> None:
+    """writeメソッドを持つオブジェクトに書き込めることのテスト。"""
+    content = _content(PART_SIZE * 2)
+    sink = io.BytesIO()
+    with StubServer(files={"/f.png": content}) as stub:
+        with Downloader() as downloader:
+            result = downloader.download(stub.file_url("/f.png"), sink)
+
+    assert sink.getvalue() == content
+    assert result.path is None
+    assert "Range" not in stub.requests[0].headers
+
+
+def test_http_error(tmp_path: Path) -> None:
+    """存在しないURLの場合にDownloadErrorとなり、ファイルが作られないことのテスト。"""
+    with StubServer() as stub:
+        with Downloader() as downloader, pytest.raises(DownloadError):
+            downloader.download(stub.file_url("/missing.pdf"), tmp_path / "x.pdf")
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_bounded_memory(tmp_path: Path) -> None:
+    """ファイル全体をメモリに載せずにダウンロードすることのテスト。"""
+    content = os.urandom(8 * 1024 * 1024)
+    with StubServer(files={"/big.pdf": content}) as stub:
+        with Downloader(part_size=1024 * 1024) as downloader:
+            tracemalloc.start()
+            try:
+                downloader.download(stub.file_url("/big.pdf"), tmp_path / "big.pdf")
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+    assert (tmp_path / "big.pdf").read_bytes() == content
+    # スタブサーバーが同じプロセスで部分ごとに応答を組み立てる分を含めても
+    # ファイルサイズより十分小さいこと
+    assert peak < len(content) / 2
+
+
+def test_convert_and_download(tmp_path: Path) -> None:
+    """変換結果のファイルがダウンロードされ、APIキーが送信されないことのテスト。"""
+    pdf = _content(5000)
+    pages = [_content(300, seed=i) for i in range(3)]
+    files = {"/r/out.pdf": pdf}
+    files.update({f"/r/p{i}.png": page for i, page in enumerate(pages)})
+    urls: List[str] = []
+
+    def handler(request: RecordedRequest) -> Any:
+        base = urls[0]
+        if request.path == "/api/v1/tools/md-to-pdf/form":
+            body = {"pdf_url": f"{base}/r/out.pdf"}
+        elif request.path == "/api/v1/tools/pdf-to-page-images":
+            body = {
+                "pages": [
+                    {"page_no": i + 1, "image_url": f"{base}/r/p{i}.png"}
+                    for i in range(len(pages))
+                ]
+            }
+        else:
+            return None
+        return 200, {}, json.dumps(body).encode()
+
+    with StubServer(handler=handler, files=files) as stub:
+        urls.append(stub.base_url)
+        client = ToolsClient(api_key="test_api_key", base_url=stub.base_url)
+        with client:
+            pdf_results = client.convert_and_download(
+                "md_to_pdf", "# Title", destination=str(tmp_path / "doc.pdf")
+            )
+            page_results = client.convert_and_download(
+                "pdf_to_page_images",
+                "tests/data/test.pdf",
+                destination=str(tmp_path / "pages"),
+            )
+            with pytest.raises(ValueError):
+                client.convert_and_download(
+                    "xlsx_to_pdf_analyze", "tid", destination=str(tmp_path)
+                )
+
+    assert (tmp_path / "doc.pdf").read_bytes() == pdf
+    assert pdf_results[0].size == len(pdf)
+    assert sorted(os.listdir(tmp_path / "pages")) == [
+        "page_0001.png",
+        "page_0002.png",
+        "page_0003.png",
+    ]
+    for i, page in enumerate(pages):
+        assert (tmp_path / "pages" / f"page_{i + 1:04d}.png").read_bytes() == page
+    assert len(page_results) == len(pages)
+    downloads = [r for r in stub.requests if r.method == "GET"]
+    assert downloads
+    assert all("Authorization" not in r.headers for r in downloads)
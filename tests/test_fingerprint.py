@@ -0,0 +1,81 @@
+"""ファイルのフィンガープリントのテストモジュール。"""
+
+import multiprocessing
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from middleman_ai.fingerprint import FileFingerprinter, hash_file
+from tests.helpers import write_file
+
+MB = 1024 * 1024
+
+
+def _fingerprint_in_subprocess(index_path: str, path: str) -> None:
+    fingerprinter = FileFingerprinter(index_path=index_path)
+    fingerprinter.fingerprint(path)
+    fingerprinter.close()
+
+
+def test_unchanged_file_is_not_rehashed(tmp_path: Path) -> None:
+    """変更されていないファイルはハッシュ値を再計算しないことのテスト。"""
+    path = tmp_path / "large.pdf"
+    write_file(path, b"%PDF-1.4\n" + b"0" * MB)
+    fingerprinter = FileFingerprinter()
+
+    first = fingerprinter.fingerprint(str(path))
+    second = fingerprinter.fingerprint(str(path))
+    # 同じサイズで中身を書き換えても、更新日時が変わるため再計算する
+    write_file(path, b"%PDF-1.4\n" + b"1" * MB, age=30)
+    third = fingerprinter.fingerprint(str(path))
+
+    assert first == second
+    assert third != first
+    assert third == hash_file(str(path))
+    stats = fingerprinter.stats()
+    assert (stats.hits, stats.misses) == (1, 2)
+    assert stats.hashed_bytes == 2 * (MB + 9)
+
+
+def test_recently_modified_file_is_not_recorded(tmp_path: Path) -> None:
+    """更新直後のファイルは同じ時刻の書き換えを検出できないため記録しないことのテスト。"""
+    path = tmp_path / "image.png"
+    path.write_bytes(b"\x89PNG first")
+    fingerprinter = FileFingerprinter()
+
+    fingerprinter.fingerprint(str(path))
+    fingerprinter.fingerprint(str(path))
+
+    assert fingerprinter.stats().misses == 2
+
+
+def test_concurrent_calls_hash_once(tmp_path: Path) -> None:
+    """複数のスレッドから同時に同じファイルを指定してもハッシュ値の計算は1回であることのテスト。"""
+    path = tmp_path / "large.pptx"
+    write_file(path, os.urandom(8 * MB))
+    fingerprinter = FileFingerprinter()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        digests = set(executor.map(fingerprinter.fingerprint, [str(path)] * 16))
+
+    assert digests == {hash_file(str(path))}
+    assert fingerprinter.stats().misses == 1
+
+
+def test_persistent_index_shared_between_processes(tmp_path: Path) -> None:
+    """別のプロセスが記録したハッシュ値を永続インデックスから再利用することのテスト。"""
+    path = tmp_path / "large.pdf"
+    write_file(path, b"%PDF-1.4\n" + b"0" * MB)
+    index_path = str(tmp_path / "fingerprints.db")
+    context = multiprocessing.get_context("spawn")
+    process = context.Process(
+        target=_fingerprint_in_subprocess, args=(index_path, str(path))
+    )
+    process.start()
+    process.join(30)
+    assert process.exitcode == 0
+
+    fingerprinter = FileFingerprinter(index_path=index_path)
+    assert fingerprinter.fingerprint(str(path)) == hash_file(str(path))
+    assert (fingerprinter.stats().hits, fingerprinter.stats().misses) == (1, 0)
+    fingerprinter.close()
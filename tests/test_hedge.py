@@ -0,0 +1,214 @@
+"""ヘッジリクエストのテストモジュール。"""
+
+import asyncio
+import threading
+import time
+from typing import Any
+
+import httpx
+import pytest
+
+from middleman_ai.async_client import AsyncToolsClient
+from middleman_ai.client import ToolsClient
+from middleman_ai.exceptions import NotFoundError
+from middleman_ai.hedge import HedgingPolicy
+from tests.helpers import FakeClock
+from tests.stub_server import DEFAULT_RESPONSES, RecordedRequest, StubServer
+
+MD_TO_DOCX = "/api/v1/tools/md-to-docx"
+
+
+def _first_call_slow(delay: float) -> Any:
+    """最初の呼び出しだけ応答が遅いスタブのハンドラーを生成します。"""
+    calls = 0
+    lock = threading.Lock()
+
+    def handler(request: RecordedRequest) -> Any:
+        nonlocal calls
+        with lock:
+            calls += 1
+            first = calls == 1
+        if first:
+            time.sleep(delay)
+        return None
+
+    return handler
+
+
+def test_delay_follows_latency_percentile() -> None:
+    """待機秒数がレイテンシのパーセンタイルに従い、上下限に収まることのテスト。"""
+    policy = HedgingPolicy(
+        initial_delay=0.5, min_delay=0.01, max_delay=2.0, clock=FakeClock()
+    )
+
+    assert policy.start(MD_TO_DOCX) == 0.5
+    for i in range(100):
+        policy.finish(MD_TO_DOCX, 0.1 if i < 90 else 1.0, hedge_won=False)
+    assert policy.start(MD_TO_DOCX) == pytest.approx(1.0)
+    for _ in range(200):
+        policy.finish(MD_TO_DOCX, 0.001, hedge_won=False)
+    assert policy.start(MD_TO_DOCX) == pytest.approx(0.01)
+
+
+def test_budget() -> None:
+    """追加のリクエスト数が呼び出し数のbudgetの割合までに制限されることのテスト。"""
+    policy = HedgingPolicy(budget=0.5)
+
+    policy.start(MD_TO_DOCX)
+    assert not policy.acquire_hedge(MD_TO_DOCX)
+    policy.start(MD_TO_DOCX)
+    assert policy.acquire_hedge(MD_TO_DOCX)
+    assert not policy.acquire_hedge(MD_TO_DOCX)
+
+    stats = policy.stats()[MD_TO_DOCX]
+    assert (stats.requests, stats.hedges, stats.budget_denied) == (2, 1, 2)
+
+
+def test_applies_to() -> None:
+    """デフォルトではJSONの冪等なエンドポイントだけが対象であることのテスト。"""
+    policy = HedgingPolicy()
+
+    assert policy.applies_to("mermaid_to_image")
+    assert policy.applies_to("json_to_pptx_analyze_v2")
+    assert not policy.applies_to("md_to_pdf")
+    assert not policy.applies_to("xlsx_to_pdf_execute")
+
+
+def test_hedge_wins_slow_request() -> None:
+    """応答が遅い場合に追加のリクエストの結果が使われることのテスト。"""
+    policy = HedgingPolicy(initial_delay=0.05, budget=1.0)
+    with StubServer(handler=_first_call_slow(1.0)) as stub:
+        client = ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, hedging=policy
+        )
+        started = time.monotonic()
+        result = client.md_to_docx("# Test")
+        elapsed = time.monotonic() - started
+        client.close()
+
+    assert result == DEFAULT_RESPONSES[MD_TO_DOCX]["docx_url"]
+    assert elapsed < 0.5
+    stats = policy.stats()[MD_TO_DOCX]
+    assert (stats.hedges, stats.hedge_wins, stats.win_rate) == (1, 1, 1.0)
+
+
+def test_fast_request_is_not_hedged() -> None:
+    """待機秒数以内に応答が返った場合は追加で送信しないことのテスト。"""
+    policy = HedgingPolicy(initial_delay=1.0, budget=1.0)
+    with StubServer() as stub:
+        client = ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, hedging=policy
+        )
+        for _ in range(5):
+            client.md_to_docx("# Test")
+
+    assert len(stub.requests) == 5
+    assert policy.stats()[MD_TO_DOCX].hedges == 0
+
+
+def test_multipart_endpoints_are_not_hedged() -> None:
+    """ファイルを送信するエンドポイントはヘッジしないことのテスト。"""
+    policy = HedgingPolicy(
+        initial_delay=0.01, budget=1.0, endpoints=frozenset({"md_to_pdf"})
+    )
+    with StubServer(handler=_first_call_slow(0.2)) as stub:
+        client = ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, hedging=policy
+        )
+        client.md_to_pdf("# Test")
+
+    assert len(stub.requests) == 1
+
+
+def test_errors_are_raised() -> None:
+    """全てのリクエストが失敗した場合は例外が送出されることのテスト。"""
+    policy = HedgingPolicy(initial_delay=0.01, budget=1.0)
+    with StubServer(handler=lambda r: (404, {}, b"{}")) as stub:
+        client = ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, hedging=policy
+        )
+        with pytest.raises(NotFoundError):
+            client.md_to_docx("# Test")
+
+
+def test_server_error_does_not_win() -> None:
+    """先に返った5xxの応答ではなく、後から返った成功の応答が使われることのテスト。"""
+    calls = 0
+    lock = threading.Lock()
+
+    def handler(request: RecordedRequest) -> Any:
+        nonlocal calls
+        with lock:
+            calls += 1
+            first = calls == 1
+        if first:
+            time.sleep(0.3)
+            return None
+        return (503, {}, b"{}")
+
+    policy = HedgingPolicy(initial_delay=0.05, budget=1.0)
+    with StubServer(handler=handler) as stub:
+        client = ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, hedging=policy
+        )
+        result = client.md_to_docx("# Test")
+        client.close()
+
+    assert result == DEFAULT_RESPONSES[MD_TO_DOCX]["docx_url"]
+    assert len(stub.requests) == 2
+    assert policy.stats()[MD_TO_DOCX].hedge_wins == 0
+
+
+def test_sync_hedge_cancels_loser() -> None:
+    """ToolsClientでも負けた方のリクエストが中断され、スレッドがすぐに解放されることのテスト。"""
+    policy = HedgingPolicy(initial_delay=0.05, budget=1.0)
+    with StubServer(handler=_first_call_slow(3.0)) as stub:
+        client = ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, hedging=policy
+        )
+        client.md_to_docx("# Test")
+        executor = client._hedge_executor
+        assert executor is not None
+        started = time.monotonic()
+        executor.shutdown(wait=True)
+        elapsed = time.monotonic() - started
+        client.close()
+
+    assert elapsed < 1
+    assert policy.stats()[MD_TO_DOCX].hedge_wins == 1
+
+
+def test_async_hedge_cancels_loser() -> None:
+    """AsyncToolsClientでは負けた方のリクエストが中断されることのテスト。"""
+    calls = 0
+    cancelled = asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+        return httpx.Response(200, json=DEFAULT_RESPONSES[request.url.path])
+
+    policy = HedgingPolicy(initial_delay=0.05, budget=1.0)
+
+    async def run() -> float:
+        async with AsyncToolsClient(
+            api_key="test_api_key",
+            transport=httpx.MockTransport(handler),
+            hedging=policy,
+        ) as client:
+            started = time.monotonic()
+            await client.mermaid_to_image("graph TD; A-->B")
+            elapsed = time.monotonic() - started
+            await asyncio.wait_for(cancelled.wait(), timeout=1)
+            return elapsed
+
+    assert asyncio.run(run()) < 1
+    assert calls == 2
+    stats = policy.stats()["/api/v1/tools/mermaid-to-image"]
+    assert stats.hedge_wins == 1
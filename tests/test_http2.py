@@ -0,0 +1,182 @@
+"""HTTP/2での送信のテストモジュール。"""
+
+import asyncio
+import importlib.util
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import pytest
+import requests
+
+from middleman_ai.async_client import AsyncToolsClient
+from middleman_ai.cancellation import CancellationToken, cancellation
+from middleman_ai.client import ToolsClient
+from middleman_ai.exceptions import CancelledError, ConnectionError
+from middleman_ai.http2 import HTTP2Adapter, HTTP2Transport
+from middleman_ai.retry import RetryPolicy
+from tests.helpers import multipart_files
+from tests.stub_server import RecordedRequest, StubResponse, StubServer
+
+pytest.importorskip("h2")
+
+from tests.h2_stub_server import H2StubServer
+
+
+def test_sync_client_multiplexes_requests(tmp_path: Path) -> None:
+    """同時の呼び出しが1本のコネクションに多重化されることのテスト。"""
+    image = tmp_path / "logo.png"
+    image.write_bytes(b"\x89PNG logo" * 10_000)
+    adapter = HTTP2Adapter(http1=False)
+    with H2StubServer(delay=0.2) as stub:
+        with ToolsClient(api_key="test_api_key", base_url=stub.base_url) as client:
+            client.session.mount("http://", adapter)
+            with ThreadPoolExecutor(max_workers=20) as executor:
+                docx = list(
+                    executor.map(lambda _: client.md_to_docx("# 見出し"), range(20))
+                )
+            pdf = client.md_to_pdf("![logo](logo.png)", image_paths=[str(image)])
+    adapter.close()
+
+    assert docx == ["https://example.com/test.docx"] * 20
+    assert pdf == "https://example.com/test.pdf"
+    assert stub.connections_opened == 1
+    assert stub.max_active_streams == 20
+    assert stub.requests[0].headers["authorization"] == "Bearer test_api_key"
+    assert multipart_files(stub.requests[-1]) == {"logo.png": b"\x89PNG logo" * 10_000}
+
+
+def test_falls_back_to_http1(tmp_path: Path) -> None:
+    """HTTP/2に対応していないサーバーにはHTTP/1.1で送信し、リトライもできることのテスト。"""
+    image = tmp_path / "logo.png"
+    image.write_bytes(b"\x89PNG logo")
+    calls = 0
+
+    def handler(request: RecordedRequest) -> StubResponse | None:
+        nonlocal calls
+        calls += 1
+        return (503, {}, b"{}") if calls == 1 else None
+
+    retry = RetryPolicy(max_attempts=2, backoff_base=0.0)
+    with StubServer(handler=handler) as stub:
+        with ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, retry=retry, http2=True
+        ) as client:
+            assert isinstance(client.session.get_adapter(stub.base_url), HTTP2Adapter)
+            result = client.md_to_pdf("# report", image_paths=[str(image)])
+            response = client.session.get(stub.base_url + "/api/v1/tools/md-to-docx")
+
+    assert result == "https://example.com/test.pdf"
+    assert response.raw.version == "HTTP/1.1"
+    assert len(stub.requests) == 3
+    assert stub.connections_opened == 1
+    for request in stub.requests[:2]:
+        assert multipart_files(request) == {"logo.png": b"\x89PNG logo"}
+
+
+def test_errors_are_mapped_to_requests_exceptions() -> None:
+    """httpxの通信エラーがrequestsの例外に変換されることのテスト。"""
+    with H2StubServer(delay=1.0) as stub:
+        base_url = stub.base_url
+        adapter = HTTP2Adapter(http1=False)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            session.post(stub.base_url + "/api/v1/tools/md-to-docx", timeout=0.1)
+        adapter.close()
+
+    with ToolsClient(api_key="test_api_key", base_url=base_url, http2=True) as c:
+        with pytest.raises(ConnectionError) as excinfo:
+            c.md_to_docx("# 見出し")
+    assert isinstance(excinfo.value.__cause__, requests.exceptions.ConnectionError)
+
+
+def test_cancel_resets_only_the_stream() -> None:
+    """キャンセルした呼び出しのストリームだけをリセットし、他の呼び出しは続行することのテスト。"""
+    token = CancellationToken()
+    adapter = HTTP2Adapter(http1=False)
+    with H2StubServer(delay=0.5) as stub:
+        with ToolsClient(api_key="test_api_key", base_url=stub.base_url) as client:
+            client.session.mount("http://", adapter)
+
+            errors: list = []
+
+            def cancelled_call() -> None:
+                with cancellation(token):
+                    try:
+                        client.md_to_docx("# キャンセル")
+                    except CancelledError as e:
+                        errors.append((e, time.monotonic() - started))
+
+            started = time.monotonic()
+            thread = threading.Thread(target=cancelled_call)
+            thread.start()
+            threading.Timer(0.1, token.cancel).start()
+            result = client.md_to_docx("# 続行")
+            thread.join()
+    adapter.close()
+
+    assert result == "https://example.com/test.docx"
+    # レスポンスを待たずに中断し、同じコネクションで他の呼び出しは完了する
+    assert len(errors) == 1 and errors[0][1] < 0.4
+    assert stub.connections_opened == 1
+
+
+def test_async_client_multiplexes_requests() -> None:
+    """非同期クライアントでもHTTP/2で多重化し、非対応のサーバーにはHTTP/1.1で送信することのテスト。"""
+
+    async def run(base_url: str, **kwargs: Any) -> list:
+        async with AsyncToolsClient(
+            api_key="test_api_key", base_url=base_url, **kwargs
+        ) as client:
+            return await asyncio.gather(
+                *(client.md_to_docx("# 見出し") for _ in range(30))
+            )
+
+    with H2StubServer(delay=0.2) as stub:
+        transport = HTTP2Transport(http1=False)
+        results = asyncio.run(run(stub.base_url, transport=transport))
+    assert results == ["https://example.com/test.docx"] * 30
+    assert stub.connections_opened == 1
+    assert stub.max_active_streams == 30
+
+    with StubServer() as http1_stub:
+        results = asyncio.run(run(http1_stub.base_url, http2=True))
+    assert results == ["https://example.com/test.docx"] * 30
+
+
+def test_connections_are_added_per_stream_limit() -> None:
+    """実行中のリクエストがストリーム数の上限に達するとコネクションを追加することのテスト。"""
+    adapter = HTTP2Adapter(http1=False, max_connections=4, streams_per_connection=10)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    with H2StubServer(delay=0.3, max_concurrent_streams=10) as stub:
+        url = stub.base_url + "/api/v1/tools/md-to-docx"
+        with ThreadPoolExecutor(max_workers=50) as executor:
+            responses = list(executor.map(lambda _: session.post(url), range(50)))
+    adapter.close()
+
+    assert [r.status_code for r in responses] == [200] * 50
+    assert responses[0].json() == {"docx_url": "https://example.com/test.docx"}
+    assert responses[0].raw.version == "HTTP/2"
+    # 上限(max_connections)までコネクションを追加し、それ以上は空きを待つ
+    assert stub.connections_opened == 4
+    assert stub.max_active_streams <= 10
+
+
+def test_requires_h2_package(monkeypatch: pytest.MonkeyPatch) -> None:
+    """h2パッケージがない場合はhttp2=Trueの指定でImportErrorになることのテスト。"""
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(
+        importlib.util,
+        "find_spec",
+        lambda name, *args: None if name == "h2" else find_spec(name, *args),
+    )
+    with pytest.raises(ImportError, match=r"middleman-ai\[http2\]"):
+        ToolsClient(api_key="test_api_key", http2=True)
+    with pytest.raises(ImportError, match=r"middleman-ai\[http2\]"):
+        AsyncToolsClient(api_key="test_api_key", http2=True)
+    # http2を指定しなければh2パッケージは不要
+    ToolsClient(api_key="test_api_key").close()
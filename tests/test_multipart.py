@@ -0,0 +1,237 @@
+"""マルチパートエンコーダーのテストモジュール。"""
+
+import asyncio
+import io
+import os
+import tracemalloc
+from email.parser import BytesParser
+from email.policy import HTTP
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from middleman_ai.async_client import AsyncToolsClient
+from middleman_ai.cache import ResultCache
+from middleman_ai.client import ToolsClient
+from middleman_ai.exceptions import InternalError, ValidationError
+from middleman_ai.multipart import FilePart, MultipartEncoder
+from middleman_ai.retry import RetryPolicy
+from tests.helpers import multipart_parts
+from tests.stub_server import RecordedRequest, StubResponse, StubServer
+
+LARGE_FILE_SIZE = 48 * 1024 * 1024
+MEMORY_LIMIT = 4 * 1024 * 1024
+
+
+@pytest.fixture(scope="module")
+def large_file(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """ストリーミング確認用の大きなファイルを生成します。"""
+    path = tmp_path_factory.mktemp("large") / "large.pdf"
+    block = os.urandom(1024 * 1024)
+    with path.open("wb") as f:
+        for _ in range(LARGE_FILE_SIZE // len(block)):
+            f.write(block)
+    return path
+
+
+def _parse(encoder: MultipartEncoder) -> list:
+    """エンコード結果をemailパーサーで解析し、パートの一覧を返します。"""
+    body = encoder.read()
+    header = f"Content-Type: {encoder.content_type}\r\n\r\n".encode()
+    message = BytesParser(policy=HTTP).parsebytes(header + body)
+    return list(message.iter_parts())
+
+
+def test_encoder_fields_and_files(tmp_path: Path) -> None:
+    """テキストフィールドとファイルが正しくエンコードされることのテスト。"""
+    image = tmp_path / "テスト画像.png"
+    image.write_bytes(b"\x89PNG image data")
+
+    with MultipartEncoder(
+        {"markdown": "# 見出し", "pdf_template_id": "template-id"},
+        [FilePart(name="files", path=str(image), content_type="image/png")],
+    ) as encoder:
+        size = len(encoder)
+        parts = _parse(encoder)
+
+    assert [p.get_param("name", header="content-disposition") for p in parts] == [
+        "markdown",
+        "pdf_template_id",
+        "files",
+    ]
+    assert parts[0].get_payload(decode=True).decode() == "# 見出し"
+    assert parts[2].get_filename() == "テスト画像.png"
+    assert parts[2].get_content_type() == "image/png"
+    assert parts[2].get_payload(decode=True) == b"\x89PNG image data"
+    assert size > len(b"\x89PNG image data")
+
+
+def test_encoder_length_matches_body(tmp_path: Path) -> None:
+    """__len__が実際に読み出されるボディのサイズと一致することのテスト。"""
+    data = tmp_path / "test.pdf"
+    data.write_bytes(os.urandom(200_000))
+
+    with MultipartEncoder(
+        {"field": "value"},
+        [FilePart(name="pdf_file", path=str(data), content_type="application/pdf")],
+        chunk_size=4096,
+    ) as encoder:
+        chunks = list(encoder)
+
+    assert all(len(chunk) <= 4096 for chunk in chunks)
+    assert sum(len(chunk) for chunk in chunks) == len(encoder)
+
+
+def test_encoder_reset(tmp_path: Path) -> None:
+    """reset後に同じボディを再度読み出せることのテスト。"""
+    data = tmp_path / "test.pdf"
+    data.write_bytes(b"pdf content")
+
+    part = FilePart(name="pdf_file", path=str(data), content_type="application/pdf")
+    with MultipartEncoder(files=[part]) as encoder:
+        first = encoder.read()
+        encoder.reset()
+        second = encoder.read()
+
+    assert first == second
+
+
+def test_encoder_missing_file() -> None:
+    """存在しないファイルを指定した場合にOSErrorとなることのテスト。"""
+    with pytest.raises(OSError):
+        MultipartEncoder(
+            files=[FilePart(name="f", path="nonexistent.pdf", content_type="x")]
+        )
+
+
+def test_encoder_peak_memory_is_bounded(large_file: Path) -> None:
+    """大きなファイルを読み出してもメモリ使用量のピークが一定に収まることのテスト。"""
+    tracemalloc.start()
+    try:
+        part = FilePart(
+            name="pdf_file", path=str(large_file), content_type="application/pdf"
+        )
+        with MultipartEncoder(files=[part]) as encoder:
+            total = sum(len(chunk) for chunk in encoder)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert total > LARGE_FILE_SIZE
+    assert peak < MEMORY_LIMIT
+
+
+def test_upload_peak_memory_is_bounded(large_file: Path) -> None:
+    """大きなファイルのアップロード中もメモリ使用量のピークが一定に収まることのテスト。"""
+    with StubServer(record_bodies=False) as stub:
+        client = ToolsClient(api_key="test_api_key", base_url=stub.base_url)
+        tracemalloc.start()
+        try:
+            pages = client.pdf_to_page_images(str(large_file))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    assert pages[0]["page_no"] == 1
+    assert stub.requests[0].body_size > LARGE_FILE_SIZE
+    assert peak < MEMORY_LIMIT
+
+
+def _chunks(data: bytes, size: int) -> Iterator[bytes]:
+    for i in range(0, len(data), size):
+        yield data[i : i + size]
+
+
+def test_upload_from_memory_and_file_objects(tmp_path: Path) -> None:
+    """バイト列・memoryview・ファイルオブジェクトをContent-Length付きで送信できることのテスト。"""
+    content = os.urandom(200_000)
+    path = tmp_path / "report.pdf"
+    path.write_bytes(content)
+
+    with StubServer() as stub:
+        client = ToolsClient(api_key="test_api_key", base_url=stub.base_url)
+        client.pdf_to_page_images(content)
+        client.pdf_to_page_images(memoryview(bytearray(content)), filename="a.pdf")
+        with path.open("rb") as f:
+            client.pdf_to_page_images(f)
+        stream = io.BytesIO(b"header" + content)
+        stream.seek(len(b"header"))
+        client.pdf_to_page_images(stream)
+
+    filenames = []
+    for request in stub.requests:
+        assert "Content-Length" in request.headers
+        part = multipart_parts(request)[0]
+        assert part.get_payload(decode=True) == content
+        filenames.append(part.get_filename())
+    assert filenames == ["document.pdf", "a.pdf", "report.pdf", "document.pdf"]
+
+
+def test_iterator_upload_is_chunked_and_not_retried() -> None:
+    """イテレーターはチャンク形式で送信され、送り直せないためリトライしないことのテスト。"""
+    content = os.urandom(300_000)
+    calls = 0
+
+    def handler(request: RecordedRequest) -> StubResponse | None:
+        nonlocal calls
+        calls += 1
+        return (503, {}, b"{}") if calls == 1 else None
+
+    retry = RetryPolicy(max_attempts=3, backoff_base=0.0)
+    with StubServer(handler=handler) as stub:
+        client = ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, retry=retry
+        )
+        with pytest.raises(InternalError):
+            client.pdf_to_page_images(_chunks(content, 100_000))
+        # シークできるストリームは先頭から送り直す
+        client.pdf_to_page_images(io.BytesIO(content))
+        client.pdf_to_page_images(_chunks(content, 100_000))
+
+    assert len(stub.requests) == 3
+    assert stub.requests[0].headers["Transfer-Encoding"] == "chunked"
+    assert multipart_parts(stub.requests[2])[0].get_payload(decode=True) == content
+
+
+def test_stream_inputs_bypass_cache() -> None:
+    """バイト列は中身でキャッシュされ、イテレーターはキャッシュされないことのテスト。"""
+    with StubServer() as stub:
+        client = ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, cache=ResultCache()
+        )
+        for _ in range(2):
+            client.pdf_to_page_images(b"%PDF-1.4 same")
+            client.pdf_to_page_images(iter([b"%PDF-1.4 ", b"same"]))
+
+    assert len(stub.requests) == 3
+
+
+def test_image_inputs_need_filenames() -> None:
+    """画像のバイト列は(ファイル名, 中身)で指定する必要があることのテスト。"""
+    with StubServer() as stub:
+        client = ToolsClient(api_key="test_api_key", base_url=stub.base_url)
+        client.md_to_pdf("![](logo.png)", image_paths=[("logo.png", b"\x89PNG")])
+        with pytest.raises(ValidationError):
+            client.md_to_pdf("# report", image_paths=[b"\x89PNG"])
+
+    part = multipart_parts(stub.requests[0])[1]
+    assert (part.get_filename(), part.get_content_type()) == ("logo.png", "image/png")
+    assert len(stub.requests) == 1
+
+
+def test_async_iterator_upload() -> None:
+    """非同期クライアントでもイテレーターをチャンク形式で送信できることのテスト。"""
+    content = os.urandom(150_000)
+
+    async def run(base_url: str) -> None:
+        async with AsyncToolsClient(api_key="test_api_key", base_url=base_url) as c:
+            await c.docx_to_page_images(_chunks(content, 50_000), filename="a.docx")
+
+    with StubServer() as stub:
+        asyncio.run(run(stub.base_url))
+
+    request = stub.requests[0]
+    assert request.headers["Transfer-Encoding"] == "chunked"
+    part = multipart_parts(request)[0]
+    assert (part.get_filename(), part.get_payload(decode=True)) == ("a.docx", content)
@@ -0,0 +1,206 @@
+"""レートリミッターのテストモジュール。"""
+
+import asyncio
+import multiprocessing
+import threading
+import time
+from pathlib import Path
+from typing import Any, List
+
+import httpx
+import pytest
+
+from middleman_ai.async_client import AsyncToolsClient
+from middleman_ai.client import ToolsClient
+from middleman_ai.ratelimit import (
+    FileBackend,
+    RateLimitBackend,
+    RateLimiter,
+    TokenBucket,
+)
+from tests.helpers import FakeClock
+from tests.stub_server import DEFAULT_RESPONSES, RecordedRequest, StubServer
+
+MD_TO_DOCX = "/api/v1/tools/md-to-docx"
+MERMAID = "/api/v1/tools/mermaid-to-image"
+
+
+def test_token_bucket_burst_and_refill() -> None:
+    """バーストまでは待機せず、以降はrateに従った待機秒数となることのテスト。"""
+    clock = FakeClock(100.0)
+    bucket = TokenBucket(rate=2, burst=3, clock=clock)
+
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # 予約した順に0.5秒ずつ後ろに並ぶ
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+    clock.now += 10
+    assert bucket.reserve() == 0.0
+
+
+def test_token_bucket_validation() -> None:
+    """不正なrate/burstでValueErrorとなることのテスト。"""
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+    with pytest.raises(ValueError):
+        TokenBucket(rate=1, burst=0.5)
+
+
+def test_per_endpoint_limits() -> None:
+    """エンドポイントごとに別のバケットと統計を持つことのテスト。"""
+    clock = FakeClock(100.0)
+    limiter = RateLimiter(limits={"md_to_docx": (1, 1), MERMAID: 100}, clock=clock)
+
+    assert limiter.reserve("md_to_docx") == 0.0
+    assert limiter.reserve(MD_TO_DOCX) == pytest.approx(1.0)
+    assert limiter.reserve("mermaid_to_image") == 0.0
+    # 指定のないエンドポイントは制限しない
+    assert limiter.reserve("md_to_pdf") == 0.0
+
+    stats = limiter.stats()
+    assert stats[MD_TO_DOCX].requests == 2
+    assert stats[MD_TO_DOCX].waited == 1
+    assert stats[MD_TO_DOCX].max_wait == pytest.approx(1.0)
+    assert stats[MD_TO_DOCX].mean_wait == pytest.approx(0.5)
+    assert stats[MERMAID].waited == 0
+
+    limiter.reset_stats()
+    assert limiter.stats() == {}
+
+
+def test_threaded_client_is_paced() -> None:
+    """複数スレッドから呼び出しても送信ペースが制限されることのテスト。"""
+    limiter = RateLimiter(limits={"md_to_docx": (50, 1)})
+    with StubServer() as stub:
+        client = ToolsClient(
+            api_key="test_api_key",
+            base_url=stub.base_url,
+            thread_safe=True,
+            rate_limiter=limiter,
+        )
+        started = time.monotonic()
+        threads = [
+            threading.Thread(target=client.md_to_docx, args=(f"# {i}",))
+            for i in range(11)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+    assert len(stub.requests) == 11
+    # 1件目以降は1/50秒間隔でしか送信できない
+    assert elapsed >= 10 / 50 * 0.9
+    assert limiter.stats()[MD_TO_DOCX].waited == 10
+
+
+def test_async_client_is_paced() -> None:
+    """AsyncToolsClientでもイベントループをブロックせずにペースが制限されることのテスト。"""
+    sent: List[float] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(time.monotonic())
+        return httpx.Response(200, json=DEFAULT_RESPONSES[request.url.path])
+
+    limiter = RateLimiter(rate=40, burst=2)
+
+    async def run() -> None:
+        async with AsyncToolsClient(
+            api_key="test_api_key",
+            transport=httpx.MockTransport(handler),
+            rate_limiter=limiter,
+        ) as client:
+            await asyncio.gather(*(client.md_to_docx(f"# {i}") for i in range(10)))
+
+    asyncio.run(run())
+
+    assert len(sent) == 10
+    assert sent[-1] - sent[0] >= 8 / 40 * 0.9
+    assert limiter.stats()[MD_TO_DOCX].waited == 8
+
+
+def test_custom_backend() -> None:
+    """独自のバックエンドにエンドポイントのパスと制限が渡されることのテスト。"""
+    calls: List[tuple] = []
+
+    class RecordingBackend(RateLimitBackend):
+        def reserve(self, key: str, rate: float, burst: float) -> float:
+            calls.append((key, rate, burst))
+            return 0.0
+
+    limiter = RateLimiter(rate=5, backend=RecordingBackend())
+    limiter.acquire("md_to_docx")
+
+    assert calls == [(MD_TO_DOCX, 5, 5)]
+
+
+def test_file_backend_shares_bucket(tmp_path: Path) -> None:
+    """同じディレクトリを指定したFileBackend同士でバケットを共有することのテスト。"""
+    clock = FakeClock(100.0)
+    first = RateLimiter(rate=1, backend=FileBackend(str(tmp_path), clock=clock))
+    second = RateLimiter(rate=1, backend=FileBackend(str(tmp_path), clock=clock))
+
+    assert first.reserve("md_to_docx") == 0.0
+    assert second.reserve("md_to_docx") == pytest.approx(1.0)
+    assert first.reserve("md_to_docx") == pytest.approx(2.0)
+    # 別のエンドポイントは別のバケット
+    assert second.reserve("md_to_pdf") == 0.0
+
+
+# プロセス間で共有する制限
+RATE = 40.0
+BURST = 4.0
+
+
+def _worker(directory: str, base_url: str, count: int, barrier: Any) -> None:
+    """別プロセスからFileBackendを共有するクライアントでAPIを呼び出します。"""
+    limiter = RateLimiter(rate=RATE, burst=BURST, backend=FileBackend(directory))
+    client = ToolsClient(
+        api_key="test_api_key", base_url=base_url, rate_limiter=limiter
+    )
+    # 予約から送信までの間に接続の確立や他のプロセスの起動(インポート)が
+    # 重なると送信がまとまってしまうため、接続を確立して全プロセスの準備が
+    # できてから呼び出す
+    client.session.get(base_url + "/warmup", timeout=10)
+    barrier.wait()
+    for i in range(count):
+        client.md_to_docx(f"# {i}")
+
+
+def test_file_backend_across_processes(tmp_path: Path) -> None:
+    """複数のプロセスの合計の送信ペースが上限以下に収まることのテスト。"""
+    processes, per_process = 4, 10
+    sent: List[float] = []
+
+    def handler(request: RecordedRequest) -> None:
+        if request.method == "POST":
+            sent.append(time.monotonic())
+
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(processes)
+    with StubServer(handler=handler) as stub:
+        workers = [
+            context.Process(
+                target=_worker,
+                args=(str(tmp_path), stub.base_url, per_process, barrier),
+            )
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=30)
+        assert all(worker.exitcode == 0 for worker in workers)
+
+    total = processes * per_process
+    assert len(sent) == total
+    sent.sort()
+    # 任意の区間で、送信数がバースト + 経過時間 * rate を超えないこと。
+    # 受信時刻には通信のばらつきがあるため、2件までの誤差を許容する
+    for i, start in enumerate(sent):
+        for j in range(i, total):
+            allowed = BURST + (sent[j] - start) * RATE
+            assert j - i + 1 <= allowed + 2
+    assert sent[-1] - sent[0] >= (total - BURST) / RATE * 0.9
@@ -0,0 +1,203 @@
+"""リトライポリシーのテストモジュール。"""
+
+import asyncio
+from email.utils import formatdate
+from typing import Any, List
+from unittest.mock import Mock
+
+import httpx
+import pytest
+import requests
+from pytest_mock import MockerFixture
+
+from middleman_ai.async_client import AsyncToolsClient
+from middleman_ai.client import ToolsClient
+from middleman_ai.exceptions import BadRequestError, ConnectionError, InternalError
+from middleman_ai.retry import IDEMPOTENCY_KEY_HEADER, RetryPolicy, parse_retry_after
+from tests.stub_server import DEFAULT_RESPONSES, RecordedRequest, StubServer
+
+# テストで待機しないリトライポリシー
+NO_WAIT = RetryPolicy(max_attempts=3, backoff_base=0.0)
+
+
+def _failing_handler(failures: int, status: int = 503, headers: Any = None) -> Any:
+    """最初のfailures回だけエラーを返すスタブのハンドラーを生成します。"""
+    calls = 0
+
+    def handler(request: RecordedRequest) -> Any:
+        nonlocal calls
+        calls += 1
+        if calls <= failures:
+            return status, headers or {}, b'{"detail": "unavailable"}'
+        return None
+
+    return handler
+
+
+def test_backoff_full_jitter() -> None:
+    """バックオフが0以上、指数的な上限以下に収まることのテスト。"""
+    policy = RetryPolicy(backoff_base=1.0, backoff_max=5.0)
+
+    for attempt, cap in [(1, 1.0), (2, 2.0), (3, 4.0), (4, 5.0), (10, 5.0)]:
+        delays = [policy.backoff(attempt) for _ in range(200)]
+        assert all(0.0 <= d <= cap for d in delays)
+        assert max(delays) > cap / 2
+
+
+def test_delay_respects_retry_after_and_max_attempts() -> None:
+    """Retry-Afterと最大試行回数に従って待機秒数が決まることのテスト。"""
+    policy = RetryPolicy(max_attempts=3, max_retry_after=10.0)
+
+    assert policy.delay(1, "7") == 7.0
+    assert policy.delay(1, "120") is None
+    assert policy.delay(3) is None
+    assert RetryPolicy(respect_retry_after=False, backoff_base=0).delay(1, "7") == 0
+
+
+def test_parse_retry_after() -> None:
+    """Retry-Afterの秒数形式とHTTP日付形式を解釈できることのテスト。"""
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    seconds = parse_retry_after(formatdate(timeval=None, usegmt=True))
+    assert seconds is not None and seconds <= 1.0
+
+
+def test_retry_on_service_unavailable() -> None:
+    """503の後に成功した場合、同じ冪等キーで再送されることのテスト。"""
+    with StubServer(handler=_failing_handler(2)) as stub:
+        client = ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, retry=NO_WAIT
+        )
+        url = client.md_to_pdf("# Test")
+        client.md_to_docx("# Test")
+
+    assert url == "https://example.com/test.pdf"
+    keys = [r.headers[IDEMPOTENCY_KEY_HEADER] for r in stub.requests]
+    assert len(keys) == 4
+    assert keys[0] == keys[1] == keys[2]
+    assert keys[3] != keys[0]
+
+
+def test_retry_restreams_upload(tmp_path: Any) -> None:
+    """アップロードのリトライ時にファイルが先頭から送り直されることのテスト。"""
+    pdf = tmp_path / "test.pdf"
+    pdf.write_bytes(b"%PDF" + bytes(range(256)) * 1000)
+
+    with StubServer(handler=_failing_handler(2, status=502)) as stub:
+        client = ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, retry=NO_WAIT
+        )
+        pages = client.pdf_to_page_images(str(pdf))
+
+    assert pages[0]["page_no"] == 1
+    bodies = [r.body for r in stub.requests]
+    assert len(bodies) == 3
+    assert all(int(r.headers["Content-Length"]) == len(r.body) for r in stub.requests)
+    # boundaryは同じエンコーダーのものなので、ボディ全体が一致する
+    assert bodies[0] == bodies[1] == bodies[2]
+    assert pdf.read_bytes() in bodies[2]
+
+
+def test_retry_exhausted_raises_last_error() -> None:
+    """最大試行回数を超えた場合に最後のエラーが送出されることのテスト。"""
+    with StubServer(handler=_failing_handler(10)) as stub:
+        client = ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, retry=NO_WAIT
+        )
+        with pytest.raises(InternalError):
+            client.md_to_docx("# Test")
+
+    assert len(stub.requests) == 3
+
+
+def test_non_retryable_status_is_not_retried() -> None:
+    """リトライ対象外のステータスは再送されないことのテスト。"""
+    with StubServer(handler=_failing_handler(1, status=400)) as stub:
+        client = ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, retry=NO_WAIT
+        )
+        with pytest.raises(BadRequestError):
+            client.md_to_docx("# Test")
+
+    assert len(stub.requests) == 1
+
+
+def test_retry_after_is_honored(mocker: MockerFixture) -> None:
+    """Retry-Afterヘッダーの秒数だけ待機してから再送されることのテスト。"""
+    sleep = mocker.patch("middleman_ai.client.time.sleep")
+    handler = _failing_handler(1, status=429, headers={"Retry-After": "2"})
+    with StubServer(handler=handler) as stub:
+        client = ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, retry=NO_WAIT
+        )
+        client.mermaid_to_image("graph TD; A-->B")
+
+    sleep.assert_called_once_with(2.0)
+    assert len(stub.requests) == 2
+
+
+def test_retry_on_connection_error(mocker: MockerFixture) -> None:
+    """接続エラーがリトライされ、最後は成功することのテスト。"""
+    client = ToolsClient(api_key="test_api_key", retry=NO_WAIT)
+    ok = Mock(status_code=200)
+    ok.json.return_value = {"docx_url": "https://example.com/test.docx"}
+    mock_post = mocker.patch.object(
+        client.session,
+        "post",
+        side_effect=[requests.exceptions.ConnectionError(), ok],
+    )
+
+    assert client.md_to_docx("# Test") == "https://example.com/test.docx"
+    assert mock_post.call_count == 2
+
+
+def test_non_retryable_exception_is_not_retried(mocker: MockerFixture) -> None:
+    """リトライ対象外の例外は再送されないことのテスト。"""
+    client = ToolsClient(
+        api_key="test_api_key",
+        retry=RetryPolicy(backoff_base=0.0, retry_exceptions=()),
+    )
+    mock_post = mocker.patch.object(
+        client.session, "post", side_effect=requests.exceptions.ConnectionError()
+    )
+
+    with pytest.raises(ConnectionError):
+        client.md_to_docx("# Test")
+    assert mock_post.call_count == 1
+
+
+def test_no_idempotency_key_without_policy() -> None:
+    """リトライポリシー未指定の場合は冪等キーが送信されないことのテスト。"""
+    with StubServer() as stub:
+        ToolsClient(api_key="test_api_key", base_url=stub.base_url).md_to_docx("# T")
+
+    assert IDEMPOTENCY_KEY_HEADER not in stub.requests[0].headers
+
+
+def test_async_retry() -> None:
+    """AsyncToolsClientでも同じ冪等キーで再送されることのテスト。"""
+    requests_: List[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        request.read()
+        requests_.append(request)
+        if len(requests_) <= 2:
+            return httpx.Response(503)
+        return httpx.Response(200, json=DEFAULT_RESPONSES[request.url.path])
+
+    async def run() -> Any:
+        async with AsyncToolsClient(
+            api_key="test_api_key",
+            transport=httpx.MockTransport(handler),
+            retry=NO_WAIT,
+        ) as client:
+            return await client.md_to_pdf(
+                "# Test", image_paths=["tests/data/test_image.png"]
+            )
+
+    assert asyncio.run(run()) == "https://example.com/test.pdf"
+    assert len(requests_) == 3
+    assert len({r.headers[IDEMPOTENCY_KEY_HEADER] for r in requests_}) == 1
+    assert requests_[0].content == requests_[2].content
@@ -0,0 +1,299 @@
+"""テンプレート解析結果キャッシュのテストモジュール。"""
+
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+import pytest
+from click.testing import CliRunner
+
+from middleman_ai.async_client import AsyncToolsClient
+from middleman_ai.cli.main import cli
+from middleman_ai.client import ToolsClient
+from middleman_ai.exceptions import NotFoundError
+from middleman_ai.models import XlsxToPdfAnalyzeResponse
+from middleman_ai.template_cache import (
+    TEMPLATE_CACHE_DIR_ENV,
+    TEMPLATE_CACHE_TTL_ENV,
+    TEMPLATE_CACHE_URL_ENV,
+    TemplateCache,
+    _MemoryStore,
+)
+from tests.helpers import FakeClock
+from tests.stub_server import DEFAULT_RESPONSES, RecordedRequest, StubServer
+
+ANALYZE_PATH = "/api/v2/tools/json-to-pptx/analyze"
+
+
+def _versioned_handler() -> Any:
+    """呼び出されるたびにスライドの種類が変わるスタブのハンドラーを生成します。"""
+    calls = 0
+
+    def handler(request: RecordedRequest) -> Any:
+        nonlocal calls
+        if request.path != ANALYZE_PATH:
+            return None
+        calls += 1
+        body = {"slides": [{"type": f"v{calls}", "placeholders": []}]}
+        return 200, {"Content-Type": "application/json"}, json.dumps(body).encode()
+
+    return handler
+
+
+def _client(stub: StubServer, cache: TemplateCache) -> ToolsClient:
+    return ToolsClient(
+        api_key="test_api_key", base_url=stub.base_url, template_cache=cache
+    )
+
+
+def test_fresh_hit_skips_network() -> None:
+    """有効期間内は同じテンプレートの解析で通信しないことのテスト。"""
+    with StubServer() as stub:
+        client = _client(stub, TemplateCache())
+        first = client.json_to_pptx_analyze_v2("tid")
+        second = client.json_to_pptx_analyze_v2("tid")
+        client.xlsx_to_pdf_analyze("tid")
+        client.xlsx_to_pdf_analyze("tid", sheet_name="Sheet2")
+        client.xlsx_to_pdf_analyze("tid", sheet_name="Sheet2")
+
+    assert first == second
+    assert len(stub.requests) == 3
+
+
+def test_stale_while_revalidate() -> None:
+    """有効期間切れの直後は古い結果を即座に返し、裏で再取得することのテスト。"""
+    clock = FakeClock(1_000_000.0)
+    cache = TemplateCache(ttl=60, stale_ttl=600, clock=clock)
+    with StubServer(handler=_versioned_handler()) as stub:
+        client = _client(stub, cache)
+        assert client.json_to_pptx_analyze_v2("tid")[0]["type"] == "v1"
+
+        clock.now += 61
+        assert client.json_to_pptx_analyze_v2("tid")[0]["type"] == "v1"
+        cache.join(timeout=5)
+        assert client.json_to_pptx_analyze_v2("tid")[0]["type"] == "v2"
+
+        # stale_ttlも過ぎた場合は同期的に再取得する
+        clock.now += 1000
+        assert client.json_to_pptx_analyze_v2("tid")[0]["type"] == "v3"
+
+    assert len(stub.requests) == 3
+
+
+def test_negative_caching() -> None:
+    """NotFoundErrorがnegative_ttlの間は通信せずに送出されることのテスト。"""
+    clock = FakeClock(1_000_000.0)
+    cache = TemplateCache(negative_ttl=30, clock=clock)
+    with StubServer(handler=lambda r: (404, {}, b"{}")) as stub:
+        client = _client(stub, cache)
+        for _ in range(3):
+            with pytest.raises(NotFoundError):
+                client.json_to_pptx_analyze_v2("missing")
+        clock.now += 31
+        with pytest.raises(NotFoundError):
+            client.json_to_pptx_analyze_v2("missing")
+
+    assert len(stub.requests) == 2
+
+
+def test_invalidate() -> None:
+    """invalidateで指定したテンプレートのエントリだけが削除されることのテスト。"""
+    cache = TemplateCache()
+    with StubServer() as stub:
+        client = _client(stub, cache)
+        client.json_to_pptx_analyze_v2("t1")
+        client.json_to_pptx_analyze_v2("t2")
+        cache.invalidate("t1")
+        client.json_to_pptx_analyze_v2("t1")
+        client.json_to_pptx_analyze_v2("t2")
+        cache.invalidate()
+        client.json_to_pptx_analyze_v2("t2")
+
+    assert len(stub.requests) == 4
+
+
+def test_shared_directory_from_env(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """環境変数で指定したディレクトリを複数のクライアントで共有できることのテスト。"""
+    monkeypatch.setenv(TEMPLATE_CACHE_DIR_ENV, str(tmp_path))
+    monkeypatch.setenv(TEMPLATE_CACHE_TTL_ENV, "120")
+
+    with StubServer() as stub:
+        mcp_cache = TemplateCache.from_env()
+        cli_cache = TemplateCache.from_env()
+        assert mcp_cache is not None and cli_cache is not None
+        _client(stub, mcp_cache).json_to_pptx_analyze_v2("tid")
+        _client(stub, cli_cache).json_to_pptx_analyze_v2("tid")
+        cli_cache.invalidate("tid")
+        _client(stub, mcp_cache).json_to_pptx_analyze_v2("tid")
+
+    assert cli_cache.ttl == 120
+    assert len(stub.requests) == 2
+
+
+def test_from_env_disabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    """TTLに0を指定した場合はキャッシュを使わないことのテスト。"""
+    monkeypatch.setenv(TEMPLATE_CACHE_TTL_ENV, "0")
+
+    assert TemplateCache.from_env() is None
+
+
+def test_from_env_is_opt_in(monkeypatch: pytest.MonkeyPatch) -> None:
+    """環境変数を指定しない場合はキャッシュを使わないことのテスト。"""
+    for env in (TEMPLATE_CACHE_DIR_ENV, TEMPLATE_CACHE_TTL_ENV, TEMPLATE_CACHE_URL_ENV):
+        monkeypatch.delenv(env, raising=False)
+
+    assert TemplateCache.from_env() is None
+    monkeypatch.setenv(TEMPLATE_CACHE_TTL_ENV, "120")
+    assert TemplateCache.from_env() is not None
+
+
+def test_memory_store_is_bounded() -> None:
+    """プロセス内のストアが最も長く使われていないエントリから破棄されることのテスト。"""
+    store = _MemoryStore(max_entries=2)
+    for template_id in ("t1", "t2"):
+        store.set(template_id, "key", {"fetched_at": 0.0, "data": {}})
+    store.get("t1", "key")
+    store.set("t3", "key", {"fetched_at": 0.0, "data": {}})
+
+    assert store.get("t1", "key") is not None
+    assert store.get("t2", "key") is None
+    assert store.get("t3", "key") is not None
+
+
+def test_cli_waits_for_background_refresh(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """CLIが終了する前に裏での再取得の完了を待つことのテスト。"""
+    versioned = _versioned_handler()
+
+    def handler(request: RecordedRequest) -> Any:
+        response = versioned(request)
+        if json.loads(response[2])["slides"][0]["type"] == "v2":
+            time.sleep(0.3)
+        return response
+
+    with StubServer(handler=handler) as stub:
+        # 有効期間が切れた古い結果を共有ディレクトリに保存しておく
+        stale = TemplateCache(directory=str(tmp_path), clock=lambda: time.time() - 120)
+        _client(stub, stale).json_to_pptx_analyze_v2("tid")
+        monkeypatch.setenv(TEMPLATE_CACHE_DIR_ENV, str(tmp_path))
+        monkeypatch.setenv(TEMPLATE_CACHE_TTL_ENV, "60")
+        monkeypatch.setenv("MIDDLEMAN_BASE_URL", stub.base_url)
+        monkeypatch.setenv("MIDDLEMAN_API_KEY", "test_api_key")
+
+        runner = CliRunner()
+        first = runner.invoke(cli, ["json-to-pptx-analyze", "tid"])
+        second = runner.invoke(cli, ["json-to-pptx-analyze", "tid"])
+
+    assert '"v1"' in first.output
+    assert '"v2"' in second.output
+    assert len(stub.requests) == 2
+
+
+def _etag_handler(versions: List[str]) -> Any:
+    """versionsの末尾をETagとし、If-None-Matchが一致すれば304を返すハンドラーです。"""
+
+    def handler(request: RecordedRequest) -> Any:
+        etag = f'"{versions[-1]}"'
+        if request.headers.get("If-None-Match") == etag:
+            return 304, {"ETag": etag}, b""
+        body = dict(DEFAULT_RESPONSES[request.path])
+        body["sheet_name"] = versions[-1]
+        return 200, {"ETag": etag}, json.dumps(body).encode()
+
+    return handler
+
+
+def test_conditional_revalidation() -> None:
+    """期限切れの再取得が条件付きのリクエストになり、304では解析済みのモデルを返すことのテスト。"""
+    clock = FakeClock(1_000_000.0)
+    versions = ["v1"]
+    cache = TemplateCache(ttl=60, stale_ttl=600, revalidate=True, clock=clock)
+    with StubServer(handler=_etag_handler(versions)) as stub:
+        client = _client(stub, cache)
+        first = client.xlsx_to_pdf_analyze("tid")
+
+        # stale_ttlも過ぎた場合は同期的に条件付きのリクエストを送る
+        clock.now += 1000
+        second = client.xlsx_to_pdf_analyze("tid")
+
+        # 裏での再取得も条件付きのリクエストで行う
+        versions.append("v2")
+        clock.now += 61
+        assert client.xlsx_to_pdf_analyze("tid") is first
+        cache.join(timeout=5)
+        third = client.xlsx_to_pdf_analyze("tid")
+
+    assert isinstance(first, XlsxToPdfAnalyzeResponse)
+    assert second is first
+    assert third.sheet_name == "v2"
+    conditions = [r.headers.get("If-None-Match") for r in stub.requests]
+    assert conditions == [None, '"v1"', '"v1"']
+
+
+def test_async_conditional_revalidation() -> None:
+    """AsyncToolsClientでもLast-Modifiedによる条件付きのリクエストを送ることのテスト。"""
+    clock = FakeClock(1_000_000.0)
+    requests: List[httpx.Request] = []
+    last_modified = "Wed, 01 Jul 2026 00:00:00 GMT"
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.headers.get("If-Modified-Since") == last_modified:
+            return httpx.Response(304, headers={"Last-Modified": last_modified})
+        return httpx.Response(
+            200,
+            json=DEFAULT_RESPONSES[ANALYZE_PATH],
+            headers={"Last-Modified": last_modified},
+        )
+
+    async def run() -> List[Any]:
+        async with AsyncToolsClient(
+            api_key="test_api_key",
+            transport=httpx.MockTransport(handler),
+            template_cache=TemplateCache(
+                ttl=60, stale_ttl=0, revalidate=True, clock=clock
+            ),
+        ) as client:
+            first = await client.json_to_pptx_analyze_v2("tid")
+            clock.now += 61
+            return [first, await client.json_to_pptx_analyze_v2("tid")]
+
+    first, second = asyncio.run(run())
+
+    assert second is first
+    assert len(requests) == 2
+    assert requests[1].headers["If-Modified-Since"] == last_modified
+
+
+def test_async_stale_while_revalidate() -> None:
+    """AsyncToolsClientでも古い結果を返しつつ裏で再取得することのテスト。"""
+    clock = FakeClock(1_000_000.0)
+    requests: List[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        body: Dict[str, Any] = dict(DEFAULT_RESPONSES[request.url.path])
+        body["sheet_name"] = f"v{len(requests)}"
+        return httpx.Response(200, json=body)
+
+    async def run() -> List[str]:
+        async with AsyncToolsClient(
+            api_key="test_api_key",
+            transport=httpx.MockTransport(handler),
+            template_cache=TemplateCache(ttl=60, clock=clock),
+        ) as client:
+            names = [(await client.xlsx_to_pdf_analyze("tid")).sheet_name]
+            clock.now += 61
+            names.append((await client.xlsx_to_pdf_analyze("tid")).sheet_name)
+            await asyncio.sleep(0.05)
+            names.append((await client.xlsx_to_pdf_analyze("tid")).sheet_name)
+            return names
+
+    assert asyncio.run(run()) == ["v1", "v1", "v2"]
+    assert len(requests) == 2
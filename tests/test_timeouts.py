@@ -0,0 +1,235 @@
+"""タイムアウトと呼び出しの期限のテストモジュール。"""
+
+import asyncio
+import threading
+import time
+from pathlib import Path
+from typing import Any, List
+
+import httpx
+import pytest
+from pytest_mock import MockerFixture
+
+from middleman_ai.async_client import AsyncToolsClient
+from middleman_ai.client import ToolsClient
+from middleman_ai.concurrency import AdaptiveConcurrency
+from middleman_ai.exceptions import DeadlineExceededError, InternalError
+from middleman_ai.ratelimit import RateLimiter
+from middleman_ai.retry import RetryPolicy
+from middleman_ai.timeouts import (
+    Timeout,
+    deadline,
+    httpx_timeout,
+    remaining,
+    requests_timeout,
+)
+from middleman_ai.transport import InMemoryTransport
+from tests.stub_server import RecordedRequest, StubServer
+
+MB = 1024 * 1024
+
+
+def test_requests_timeout() -> None:
+    """Timeoutが (接続, 読み込みと書き込みの長い方) に変換されることのテスト。"""
+    assert requests_timeout(30.0) == 30.0
+    timeout = Timeout(connect=2.0, read=5.0, write=8.0, per_mb=1.0)
+    assert requests_timeout(timeout) == (2.0, 8.0)
+    assert requests_timeout(timeout, upload_bytes=4 * MB) == (2.0, 12.0)
+
+    converted = httpx_timeout(timeout, upload_bytes=2 * MB)
+    assert (converted.connect, converted.read, converted.write) == (2.0, 7.0, 10.0)
+
+
+def test_deadline_caps_timeout() -> None:
+    """期限の中ではタイムアウトが残り時間に切り詰められ、入れ子では早い方が適用されることのテスト。"""
+    assert remaining() is None
+    with deadline(5.0):
+        with deadline(1.0):
+            capped = requests_timeout(Timeout(connect=10.0, read=30.0))
+            assert isinstance(capped, tuple)
+            assert max(capped) <= 1.0
+        with deadline(60.0):
+            left = remaining()
+            assert left is not None and left <= 5.0
+        assert requests_timeout(30.0) <= 5.0  # type: ignore[operator]
+    assert remaining() is None
+
+    with deadline(0.0), pytest.raises(DeadlineExceededError):
+        requests_timeout(30.0)
+
+
+def test_upload_size_scales_timeout(tmp_path: Path, mocker: MockerFixture) -> None:
+    """アップロードするファイルの大きさに応じてタイムアウトが延びることのテスト。"""
+    pdf = tmp_path / "large.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n" + b"0" * (3 * MB))
+    client = ToolsClient(
+        api_key="test_api_key",
+        timeout=Timeout(connect=5.0, read=10.0, write=10.0, per_mb=2.0),
+    )
+    response = mocker.Mock(status_code=200)
+    response.json.return_value = {"pages": []}
+    post = mocker.patch.object(client.session, "post", return_value=response)
+
+    client.pdf_to_page_images(str(pdf))
+
+    connect, read = post.call_args.kwargs["timeout"]
+    assert connect == 5.0
+    assert read == pytest.approx(16.0, abs=0.01)
+
+
+def test_deadline_covers_retries() -> None:
+    """リトライを含めて期限までに打ち切られることのテスト。"""
+    calls: List[int] = []
+    release = threading.Event()
+
+    def handler(request: RecordedRequest) -> Any:
+        calls.append(1)
+        if len(calls) == 1:
+            return 503, {}, b"{}"
+        release.wait(5)
+        return None
+
+    with StubServer(handler=handler) as stub:
+        client = ToolsClient(
+            api_key="test_api_key",
+            base_url=stub.base_url,
+            retry=RetryPolicy(max_attempts=10, backoff_base=0.01),
+        )
+        started = time.monotonic()
+        with deadline(0.8), pytest.raises(DeadlineExceededError):
+            client.md_to_docx("# Title")
+        elapsed = time.monotonic() - started
+        release.set()
+        client.close()
+
+    assert len(calls) == 2
+    assert elapsed < 1.5
+
+
+def test_retry_skipped_when_wait_exceeds_deadline() -> None:
+    """待機すると期限に間に合わないリトライは行わないことのテスト。"""
+
+    def handler(request: RecordedRequest) -> Any:
+        return 503, {"Retry-After": "5"}, b"{}"
+
+    with StubServer(handler=handler) as stub:
+        with ToolsClient(
+            api_key="test_api_key",
+            base_url=stub.base_url,
+            retry=RetryPolicy(max_attempts=3),
+        ) as client:
+            started = time.monotonic()
+            with deadline(2.0), pytest.raises(InternalError):
+                client.md_to_docx("# Title")
+            elapsed = time.monotonic() - started
+
+    assert len(stub.requests) == 1
+    assert elapsed < 1.0
+
+
+def test_deadline_bounds_trickling_response() -> None:
+    """少しずつ応答が届く場合でも、同期クライアントの呼び出し全体が期限までに終わることのテスト。"""
+    # 1バイトごとの間隔は読み込みタイムアウトより短いため、タイムアウトでは打ち切れない
+    with StubServer(trickle_delay=0.05) as stub:
+        client = ToolsClient(api_key="test_api_key", base_url=stub.base_url)
+        started = time.monotonic()
+        with deadline(0.5), pytest.raises(DeadlineExceededError):
+            client.md_to_docx("# Title")
+        elapsed = time.monotonic() - started
+        client.close()
+
+    assert elapsed < 1.0
+
+
+def test_deadline_propagates_to_batch() -> None:
+    """バッチのワーカーにも呼び出し時の期限が引き継がれることのテスト。"""
+    release = threading.Event()
+
+    def handler(request: RecordedRequest) -> Any:
+        release.wait(5)
+        return None
+
+    with StubServer(handler=handler) as stub:
+        client = ToolsClient(api_key="test_api_key", base_url=stub.base_url)
+        started = time.monotonic()
+        with deadline(0.5):
+            results = client.batch("md_to_docx", ["# A", "# B", "# C"])
+        # 結果の読み出しは期限のwith文の外で行っても、呼び出し時の期限が適用される
+        errors = [r.error for r in results]
+        elapsed = time.monotonic() - started
+        release.set()
+        client.close()
+
+    assert all(isinstance(e, DeadlineExceededError) for e in errors)
+    assert elapsed < 1.5
+
+
+def test_async_deadline() -> None:
+    """非同期クライアントでも期限までに打ち切られることのテスト。"""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(5)
+        return httpx.Response(200, json={"docx_url": "https://example.com/a.docx"})
+
+    async def run() -> float:
+        async with AsyncToolsClient(
+            api_key="test_api_key",
+            transport=httpx.MockTransport(handler),
+            retry=RetryPolicy(max_attempts=3, backoff_base=0.01),
+        ) as client:
+            started = time.monotonic()
+            with deadline(0.3), pytest.raises(DeadlineExceededError):
+                await client.md_to_docx("# Title")
+            return time.monotonic() - started
+
+    assert asyncio.run(run()) < 1.0
+
+
+def test_rate_limit_and_concurrency_waits_respect_deadline() -> None:
+    """レートリミッターと同時実行数の枠の待機も期限までに打ち切られることのテスト。"""
+    limiter = RateLimiter(rate=0.5)
+    client = ToolsClient(
+        api_key="test_api_key",
+        transport=InMemoryTransport(
+            lambda request: {"docx_url": "https://example.com/a.docx"}
+        ),
+        rate_limiter=limiter,
+    )
+    client.md_to_docx("# Title")
+    started = time.monotonic()
+    with deadline(0.2), pytest.raises(DeadlineExceededError):
+        client.md_to_docx("# Title")
+    # 待機せずに失敗し、予約したトークンは返却される
+    assert time.monotonic() - started < 0.1
+    assert limiter.reserve("md_to_docx") == pytest.approx(2.0, abs=0.1)
+    assert limiter.stats()["/api/v1/tools/md-to-docx"].requests == 2
+
+    concurrency = AdaptiveConcurrency(initial=1, max_limit=1)
+    client = ToolsClient(
+        api_key="test_api_key",
+        transport=InMemoryTransport(
+            lambda request: {"docx_url": "https://example.com/a.docx"}
+        ),
+        concurrency=concurrency,
+    )
+    concurrency.acquire()
+    started = time.monotonic()
+    with deadline(0.2), pytest.raises(DeadlineExceededError):
+        client.md_to_docx("# Title")
+    assert time.monotonic() - started < 0.5
+    assert concurrency.in_flight == 1
+
+    async def run() -> float:
+        async with AsyncToolsClient(
+            api_key="test_api_key",
+            transport=httpx.MockTransport(lambda request: httpx.Response(200)),
+            concurrency=concurrency,
+        ) as async_client:
+            started = time.monotonic()
+            with deadline(0.2), pytest.raises(DeadlineExceededError):
+                await async_client.md_to_docx("# Title")
+            with deadline(0.2), pytest.raises(DeadlineExceededError):
+                await limiter.aacquire("md_to_docx")
+            return time.monotonic() - started
+
+    assert asyncio.run(run()) < 0.5
@@ -0,0 +1,118 @@
+"""トランスポートの差し替えのテストモジュール。"""
+
+from pathlib import Path
+
+import pytest
+import requests
+
+from middleman_ai.client import ToolsClient
+from middleman_ai.exceptions import ConnectionError, NotFoundError
+from middleman_ai.retry import RetryPolicy
+from middleman_ai.transport import (
+    InMemoryRequest,
+    InMemoryResponse,
+    InMemoryTransport,
+    RequestsTransport,
+    UnixSocketTransport,
+)
+from tests.helpers import multipart_files
+from tests.stub_server import StubServer
+
+
+def test_default_transport_uses_session() -> None:
+    """デフォルトではToolsClient.sessionで送信するRequestsTransportを使用することのテスト。"""
+    with StubServer() as stub:
+        with ToolsClient(api_key="test_api_key", base_url=stub.base_url) as client:
+            assert isinstance(client.transport, RequestsTransport)
+            assert client.transport.session is client.session
+            result = client.md_to_docx("# 見出し")
+
+    assert result == "https://example.com/test.docx"
+    assert stub.requests[0].headers["Authorization"] == "Bearer test_api_key"
+
+
+def test_in_memory_transport(tmp_path: Path) -> None:
+    """InMemoryTransportがパス・認証ヘッダー・ボディをハンドラーに渡すことのテスト。"""
+    image = tmp_path / "logo.png"
+    image.write_bytes(b"\x89PNG logo")
+    received: list = []
+
+    def handler(request: InMemoryRequest) -> dict | InMemoryResponse:
+        received.append(request)
+        if request.path == "/api/v1/tools/md-to-docx":
+            return {"docx_url": "https://example.com/memory.docx"}
+        return InMemoryResponse(
+            json={"pdf_url": "https://example.com/memory.pdf"},
+            headers={"X-Request-Id": "abc"},
+        )
+
+    client = ToolsClient(api_key="test_api_key", transport=InMemoryTransport(handler))
+    assert client.md_to_docx("# 見出し") == "https://example.com/memory.docx"
+    pdf = client.md_to_pdf("![logo](logo.png)", image_paths=[str(image)])
+    client.close()
+
+    assert pdf == "https://example.com/memory.pdf"
+    docx, form = received
+    assert docx.method == "POST"
+    assert docx.url == "https://middleman-ai.com/api/v1/tools/md-to-docx"
+    assert docx.headers["Authorization"] == "Bearer test_api_key"
+    assert docx.json()["markdown"] == "# 見出し"
+    assert form.path == "/api/v1/tools/md-to-pdf/form"
+    assert form.headers["Content-Type"].startswith("multipart/form-data")
+    assert multipart_files(form) == {"logo.png": b"\x89PNG logo"}
+
+
+def test_in_memory_transport_errors_and_retry() -> None:
+    """ハンドラーのステータスコードと例外がHTTPで受けた場合と同じに扱われることのテスト。"""
+    calls = 0
+
+    def flaky(request: InMemoryRequest) -> dict | InMemoryResponse:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            return InMemoryResponse(status_code=503, json={})
+        return {"docx_url": "https://example.com/memory.docx"}
+
+    retry = RetryPolicy(max_attempts=2, backoff_base=0.0)
+    client = ToolsClient(
+        api_key="test_api_key", transport=InMemoryTransport(flaky), retry=retry
+    )
+    assert client.md_to_docx("# 見出し") == "https://example.com/memory.docx"
+    assert calls == 2
+
+    client.transport = InMemoryTransport(
+        lambda request: InMemoryResponse(status_code=404, content=b"")
+    )
+    with pytest.raises(NotFoundError):
+        client.md_to_docx("# 見出し")
+
+    def unreachable(request: InMemoryRequest) -> dict:
+        raise requests.exceptions.ConnectionError("refused")
+
+    client.transport = InMemoryTransport(unreachable)
+    with pytest.raises(ConnectionError):
+        client.md_to_docx("# 見出し")
+
+
+def test_unix_socket_transport(tmp_path: Path) -> None:
+    """UnixSocketTransportでUnixドメインソケットのサーバーに送信することのテスト。"""
+    image = tmp_path / "logo.png"
+    image.write_bytes(b"\x89PNG logo")
+    socket_path = str(tmp_path / "api.sock")
+    with StubServer(unix_socket=socket_path) as stub:
+        transport = UnixSocketTransport(socket_path)
+        with ToolsClient(
+            api_key="test_api_key", base_url=stub.base_url, transport=transport
+        ) as client:
+            docx = client.md_to_docx("# 見出し")
+            pdf = client.md_to_pdf("# report", image_paths=[str(image)])
+
+    assert docx == "https://example.com/test.docx"
+    assert pdf == "https://example.com/test.pdf"
+    first, second = stub.requests
+    assert first.path == "/api/v1/tools/md-to-docx"
+    assert first.headers["Host"] == "localhost"
+    assert first.headers["Authorization"] == "Bearer test_api_key"
+    assert second.path == "/api/v1/tools/md-to-pdf/form"
+    # コネクションは再利用される
+    assert stub.connections_opened == 1